@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from recorrencia import estadias, expandir
+
+# Chaves estrangeiras das reservas para os ids (índices) das tabelas de parceiros e proprietários
+COLUNA_PARCEIRO = 'ID do parceiro'
+COLUNA_PROPRIETARIO = 'ID do proprietário'
+
+# Regras de acerto: comissão de cada parceiro e repasse de cada proprietário, em % do valor da hospedagem
+COLUNA_COMISSAO = 'Comissão (%)'
+COLUNA_REPASSE = 'Repasse (%)'
+
+# Partes de um acerto: (tipo, coluna da chave na reserva, coluna do valor informado na reserva, coluna da regra)
+PARTES = (
+    ('proprietario', COLUNA_PROPRIETARIO, 'Valor para o proprietário', COLUNA_REPASSE),
+    ('parceiro', COLUNA_PARCEIRO, 'A pagar para parceiros', COLUNA_COMISSAO),
+)
+
+
+def _ausente(valor):
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor))
+
+
+def _centavos(valor):
+    return 0 if _ausente(valor) else int(round(float(valor) * 100))
+
+
+def periodo_mes(mes):
+    """Converte 'AAAA-MM', datas ou Period para o Period mensal usado como chave do livro."""
+    return mes if isinstance(mes, pd.Period) and mes.freqstr == 'M' else pd.Period(mes, freq='M')
+
+
+def regras(df, coluna):
+    """{id: percentual} da coluna de regra de uma tabela de partes (vazio se a coluna não existe)."""
+    if coluna not in df.columns:
+        return {}
+    percentuais = pd.to_numeric(df[coluna], errors='coerce')
+    percentuais = percentuais[percentuais.notna()]
+    return dict(zip(percentuais.index.tolist(), percentuais.tolist()))
+
+
+class LivroAcertos:
+    """Saldos de acerto de cada parceiro e proprietário, por mês, mantidos lançamento a lançamento.
+
+    Cada reserva ligada a uma parte gera um lançamento no mês da data de saída (a estadia já concluída); a
+    recorrente gera um por ocorrência, no mês da saída de cada uma:
+    - proprietário: a pagar o 'Valor para o proprietário' da reserva ou, se vazio, o Repasse (%) dele sobre
+      o valor da hospedagem;
+    - parceiro: a pagar o 'A pagar para parceiros' da reserva ou, se vazio, a Comissão (%) dele; a receber
+      o 'A receber de parceiros'.
+    Os valores ficam em centavos inteiros. Incluir, alterar ou remover uma reserva só mexe nos lançamentos
+    dela, e o fechamento de um mês lê apenas as partes com movimento no mês.
+    """
+
+    def __init__(self, comissoes=None, repasses=None):
+        self._regras = {'parceiro': dict(comissoes or {}), 'proprietario': dict(repasses or {})}
+        self._por_mes = {}  # Period -> {(tipo, id): [a pagar, a receber]}
+        self._totais = {}  # (tipo, id) -> [a pagar, a receber]
+        self._lancamentos = {}  # id da reserva -> ((mês, (tipo, id), a pagar, a receber), ...)
+
+    @classmethod
+    def construir(cls, reservas, comissoes=None, repasses=None):
+        """Monta o livro a partir da tabela de reservas inteira, de forma vetorizada."""
+        livro = cls(comissoes, repasses)
+        if reservas.empty or 'Data de saída' not in reservas.columns:
+            return livro
+        # As ocorrências repetem o id da reserva de origem; os lançamentos dela se acumulam abaixo
+        reservas = expandir(reservas)
+        meses = pd.to_datetime(reservas['Data de saída'], errors='coerce').dt.to_period('M')
+        valor = pd.to_numeric(reservas.get('Valor da hospedagem'), errors='coerce').fillna(0)
+        receber_parceiro = pd.to_numeric(reservas.get('A receber de parceiros'), errors='coerce').fillna(0)
+
+        por_reserva = {}
+        for tipo, coluna_id, coluna_valor, _ in PARTES:
+            if coluna_id not in reservas.columns:
+                continue
+            ids = pd.to_numeric(reservas[coluna_id], errors='coerce')
+            validos = (ids.notna() & meses.notna()).to_numpy()
+            if not validos.any():
+                continue
+            taxa = ids.map(livro._regras[tipo]).fillna(0)
+            informado = pd.to_numeric(reservas.get(coluna_valor), errors='coerce')
+            pagar = informado.where(informado.notna(), valor * taxa / 100) if informado is not None else valor * taxa / 100
+            pagar = np.round(pagar.to_numpy(np.float64)[validos] * 100).astype(np.int64)
+            receber = (np.round(receber_parceiro.to_numpy(np.float64)[validos] * 100).astype(np.int64)
+                       if tipo == 'parceiro' else np.zeros(int(validos.sum()), dtype=np.int64))
+            partes = ids.to_numpy()[validos].astype(np.int64)
+            meses_validos = meses[validos]
+            for id_reserva, mes, parte, a_pagar, a_receber in zip(
+                    reservas.index[validos], meses_validos, partes.tolist(), pagar.tolist(), receber.tolist()):
+                por_reserva.setdefault(id_reserva, []).append((mes, (tipo, parte), a_pagar, a_receber))
+
+            # Somas por (mês, parte) de uma vez, em vez de lançamento a lançamento
+            somas = pd.DataFrame({'mes': meses_validos.to_numpy(), 'parte': partes, 'pagar': pagar, 'receber': receber})
+            for (mes, parte), linha in somas.groupby(['mes', 'parte'], sort=False)[['pagar', 'receber']].sum().iterrows():
+                livro._somar(mes, (tipo, int(parte)), int(linha['pagar']), int(linha['receber']))
+        livro._lancamentos = {id_reserva: tuple(lancamentos) for id_reserva, lancamentos in por_reserva.items()}
+        return livro
+
+    def _somar(self, mes, parte, a_pagar, a_receber):
+        for saldos, chave in ((self._por_mes.setdefault(mes, {}), parte), (self._totais, parte)):
+            saldo = saldos.setdefault(chave, [0, 0])
+            saldo[0] += a_pagar
+            saldo[1] += a_receber
+            if saldo == [0, 0]:
+                del saldos[chave]
+
+    def _calcular_lancamentos(self, id_reserva, reserva):
+        meses = [pd.Timestamp(saida).to_period('M') for _, saida in estadias(id_reserva, reserva) if not _ausente(saida)]
+        if not meses:
+            return ()
+        valor = reserva.get('Valor da hospedagem')
+        valor = 0.0 if _ausente(valor) else float(valor)
+        lancamentos = []
+        for tipo, coluna_id, coluna_valor, _ in PARTES:
+            parte = reserva.get(coluna_id)
+            if _ausente(parte):
+                continue
+            parte = int(parte)
+            informado = reserva.get(coluna_valor)
+            a_pagar = informado if not _ausente(informado) else valor * self._regras[tipo].get(parte, 0) / 100
+            a_receber = reserva.get('A receber de parceiros') if tipo == 'parceiro' else 0
+            lancamentos.extend((mes, (tipo, parte), _centavos(a_pagar), _centavos(a_receber)) for mes in meses)
+        return tuple(lancamentos)
+
+    def adicionar(self, id_reserva, reserva):
+        """Inclui (ou substitui) os lançamentos da reserva `id_reserva` (Series ou dict com a linha)."""
+        self.remover(id_reserva)
+        lancamentos = self._calcular_lancamentos(id_reserva, reserva)
+        if lancamentos:
+            self._lancamentos[id_reserva] = lancamentos
+        for mes, parte, a_pagar, a_receber in lancamentos:
+            self._somar(mes, parte, a_pagar, a_receber)
+
+    def remover(self, id_reserva):
+        for mes, parte, a_pagar, a_receber in self._lancamentos.pop(id_reserva, ()):
+            self._somar(mes, parte, -a_pagar, -a_receber)
+
+    @staticmethod
+    def _tabela(saldos):
+        linhas = [(tipo, parte, a_pagar / 100, a_receber / 100) for (tipo, parte), (a_pagar, a_receber) in saldos.items()]
+        df = pd.DataFrame(linhas, columns=['Tipo', 'ID', 'A pagar', 'A receber'])
+        df['Saldo'] = (df['A receber'] - df['A pagar']).round(2)
+        return df.sort_values(['Tipo', 'ID'], ignore_index=True)
+
+    def fechamento(self, mes):
+        """Saldos de cada parte com movimento no mês: Tipo, ID, A pagar, A receber e Saldo (receber - pagar)."""
+        return self._tabela(self._por_mes.get(periodo_mes(mes), {}))
+
+    def saldos(self):
+        """Saldos acumulados de todas as partes, no mesmo formato de fechamento()."""
+        return self._tabela(self._totais)
+
+    def total(self, tipo, parte):
+        """(a pagar, a receber) acumulados de uma parte, em reais."""
+        a_pagar, a_receber = self._totais.get((tipo, parte), (0, 0))
+        return a_pagar / 100, a_receber / 100
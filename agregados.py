@@ -0,0 +1,311 @@
+import numpy as np
+import pandas as pd
+
+from disponibilidade import chave_apartamento, chaves_apartamentos
+from esquema import colunas_do_tipo
+from indice_intervalos import para_dia, para_dias
+from recorrencia import estadias, expandir
+
+# Colunas monetárias somadas nos totais (guardadas em centavos, então as somas são exatas)
+COLUNAS_VALORES = colunas_do_tipo('reservas', 'dinheiro')
+
+# Folga, em dias, acrescentada nas pontas do eixo de datas quando ele precisa crescer
+_MARGEM_DIAS = 366
+
+# Períodos aceitos por relatorio_periodico (semanas de segunda a domingo)
+FREQUENCIAS = {'semana': 'W-SUN', 'mes': 'M', 'ano': 'Y'}
+
+
+def _centavos(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return 0
+    try:
+        return int(round(float(valor) * 100))
+    except (TypeError, ValueError):
+        return 0
+
+
+class AgregadoDiario:
+    """Ocupação e receita por dia e por apartamento (condomínio, número), mantidas incrementalmente.
+
+    Tudo é guardado como vetores por dia em que cada reserva só marca o dia de entrada e o dia de saída:
+    - por apartamento, a quantidade de entradas e de saídas em cada dia e a receita rateada por diária
+      (+valor/noites na entrada, -valor/noites na saída). A soma acumulada dá a ocupação e a receita de cada dia.
+    - no total, a soma dos valores das reservas que entram e que saem em cada dia.
+
+    Incluir ou remover uma reserva altera só esses dois dias. Os totais de um período [a, b] saem de somas
+    de prefixo: reservas que tocam o período = (entradas até b) - (saídas antes de a), com a mesma
+    semântica de sobreposição fechada do IndiceIntervalos. Uma reserva recorrente marca cada ocorrência
+    como uma estadia à parte, com os valores da reserva.
+    """
+
+    def __init__(self):
+        self._dia0 = 0
+        self._linhas = {}
+        self._rotulos = []
+        self._numeros = []
+        self._registros = {}  # id -> [(linha, entrada, saída, valores, rateio) de cada estadia]
+        self._entradas = np.zeros((0, 0), dtype=np.int32)
+        self._saidas = np.zeros((0, 0), dtype=np.int32)
+        self._receita = np.zeros((0, 0), dtype=np.float64)
+        # Linha 0: quantidade de reservas; demais: COLUNAS_VALORES em centavos
+        self._valores_entrada = np.zeros((len(COLUNAS_VALORES) + 1, 0), dtype=np.int64)
+        self._valores_saida = np.zeros((len(COLUNAS_VALORES) + 1, 0), dtype=np.int64)
+        self._prefixos = None
+
+    def __len__(self):
+        return len(self._registros)
+
+    @property
+    def _dias(self):
+        return self._entradas.shape[1]
+
+    @classmethod
+    def construir(cls, df):
+        """Monta o agregado de uma vez a partir do DataFrame de reservas (as recorrentes entram com cada ocorrência)."""
+        agregado = cls()
+        if df.empty:
+            return agregado
+        df = expandir(df)
+        dias_entrada, validos_entrada = para_dias(df['Data de entrada'])
+        dias_saida, validos_saida = para_dias(df['Data de saída'])
+        validos = validos_entrada & validos_saida
+        if not validos.any():
+            return agregado
+        df = df[validos]
+        entrada = dias_entrada[validos]
+        saida = np.maximum(dias_saida[validos], entrada)
+        agregado._garantir_dias(int(entrada.min()), int(saida.max()))
+
+        chaves = chaves_apartamentos(df)
+        linhas = np.array([
+            agregado._linha(chave, condominio, numero)
+            for chave, condominio, numero in zip(
+                zip(chaves['condominio'], chaves['bloco'], chaves['numero']),
+                df.get('Nome do Condomínio', pd.Series('', index=df.index)),
+                df['Número do apartamento'],
+            )
+        ], dtype=np.int64)
+        valores = np.vstack([np.ones(len(df), dtype=np.int64)] + [
+            df[coluna].map(_centavos).to_numpy(np.int64) if coluna in df.columns else np.zeros(len(df), np.int64)
+            for coluna in COLUNAS_VALORES
+        ])
+        noites = saida - entrada
+        hospedagem = valores[1 + COLUNAS_VALORES.index('Valor da hospedagem')]
+        rateio = np.divide(hospedagem, noites, out=np.zeros(len(df)), where=noites > 0)
+
+        e, s = entrada - agregado._dia0, saida - agregado._dia0
+        np.add.at(agregado._entradas, (linhas, e), 1)
+        np.add.at(agregado._saidas, (linhas, s), 1)
+        np.add.at(agregado._receita, (linhas, e), rateio)
+        np.add.at(agregado._receita, (linhas, s), -rateio)
+        for canal in range(valores.shape[0]):
+            np.add.at(agregado._valores_entrada[canal], e, valores[canal])
+            np.add.at(agregado._valores_saida[canal], s, valores[canal])
+
+        for id_, linha, dia_e, dia_s, v, r in zip(df.index, linhas.tolist(), e.tolist(), s.tolist(),
+                                                valores.T.tolist(), rateio.tolist()):
+            agregado._registros.setdefault(id_, []).append((linha, dia_e + agregado._dia0, dia_s + agregado._dia0, v, r))
+        return agregado
+
+    def adicionar(self, id_, reserva):
+        """Inclui (ou substitui) a reserva `id_`; `reserva` é a linha da tabela (Series ou dict)."""
+        self.remover(id_)
+        condominio, numero = reserva.get('Nome do Condomínio'), reserva.get('Número do apartamento')
+        valores = [1] + [_centavos(reserva.get(coluna)) for coluna in COLUNAS_VALORES]
+        registros = []
+        for entrada, saida in estadias(id_, reserva):
+            entrada, saida = para_dia(entrada), para_dia(saida)
+            if entrada is None or saida is None:
+                continue
+            saida = max(saida, entrada)
+            self._garantir_dias(entrada, saida)
+            linha = self._linha(chave_apartamento(condominio, reserva.get('Bloco'), numero), condominio, numero)
+            noites = saida - entrada
+            rateio = valores[1 + COLUNAS_VALORES.index('Valor da hospedagem')] / noites if noites else 0.0
+            registros.append((linha, entrada, saida, valores, rateio))
+            self._marcar(linha, entrada, saida, valores, rateio, 1)
+        if registros:
+            self._registros[id_] = registros
+
+    def remover(self, id_):
+        for linha, entrada, saida, valores, rateio in self._registros.pop(id_, ()):
+            self._marcar(linha, entrada, saida, valores, rateio, -1)
+
+    def _marcar(self, linha, entrada, saida, valores, rateio, sinal):
+        e, s = entrada - self._dia0, saida - self._dia0
+        self._entradas[linha, e] += sinal
+        self._saidas[linha, s] += sinal
+        self._receita[linha, e] += sinal * rateio
+        self._receita[linha, s] -= sinal * rateio
+        self._valores_entrada[:, e] += sinal * np.asarray(valores, dtype=np.int64)
+        self._valores_saida[:, s] += sinal * np.asarray(valores, dtype=np.int64)
+        self._prefixos = None
+
+    def _linha(self, chave, condominio, numero):
+        # Uma linha por apartamento, identificado como no MapaOcupacao; o bloco não entra no rótulo exibido
+        linha = self._linhas.get(chave)
+        if linha is None:
+            linha = len(self._rotulos)
+            self._linhas[chave] = linha
+            self._rotulos.append((condominio, numero))
+            self._numeros.append(chave[2])
+            if linha >= self._entradas.shape[0]:
+                capacidade = max(8, 2 * self._entradas.shape[0])
+                self._entradas = self._redimensionar(self._entradas, linhas=capacidade)
+                self._saidas = self._redimensionar(self._saidas, linhas=capacidade)
+                self._receita = self._redimensionar(self._receita, linhas=capacidade)
+        return linha
+
+    def _garantir_dias(self, primeiro, ultimo):
+        """Estende o eixo de datas para cobrir [primeiro, ultimo]."""
+        if self._dias == 0:
+            self._dia0 = primeiro - _MARGEM_DIAS
+            deslocamento, dias = 0, ultimo - primeiro + 1 + 2 * _MARGEM_DIAS
+        elif primeiro >= self._dia0 and ultimo < self._dia0 + self._dias:
+            return
+        else:
+            inicio = min(self._dia0, primeiro - _MARGEM_DIAS)
+            fim = max(self._dia0 + self._dias, ultimo + 1 + _MARGEM_DIAS)
+            deslocamento, dias = self._dia0 - inicio, fim - inicio
+            self._dia0 = inicio
+        for nome in ('_entradas', '_saidas', '_receita', '_valores_entrada', '_valores_saida'):
+            setattr(self, nome, self._redimensionar(getattr(self, nome), dias=dias, deslocamento=deslocamento))
+        self._prefixos = None
+
+    @staticmethod
+    def _redimensionar(matriz, linhas=None, dias=None, deslocamento=0):
+        linhas = matriz.shape[0] if linhas is None else linhas
+        dias = matriz.shape[1] if dias is None else dias
+        nova = np.zeros((linhas, dias), dtype=matriz.dtype)
+        nova[:matriz.shape[0], deslocamento:deslocamento + matriz.shape[1]] = matriz
+        return nova
+
+    def _obter_prefixos(self):
+        # Somas acumuladas por dia, refeitas (em C) só depois de alguma alteração
+        if self._prefixos is None:
+            n = len(self._rotulos)
+            self._prefixos = (
+                np.cumsum(self._valores_entrada, axis=1),
+                np.cumsum(self._valores_saida, axis=1),
+                np.cumsum(self._entradas[:n], axis=1),
+                np.cumsum(self._saidas[:n], axis=1),
+            )
+        return self._prefixos
+
+    def _ate(self, prefixo, dia):
+        """Coluna do prefixo com a soma de todos os dias <= `dia` (zeros se `dia` é anterior ao eixo)."""
+        k = dia - self._dia0
+        if k < 0 or prefixo.shape[1] == 0:
+            return np.zeros(prefixo.shape[0], dtype=prefixo.dtype)
+        return prefixo[:, min(k, prefixo.shape[1] - 1)]
+
+    def totais(self, inicio, fim):
+        """Totais das reservas que ocupam algum dia entre `inicio` e `fim` (inclusive).
+
+        Retorna um dict com 'Reservas', 'Apartamentos ocupados' (números de apartamento distintos) e a soma
+        de cada coluna de COLUNAS_VALORES.
+        """
+        a, b = para_dia(inicio), para_dia(fim)
+        resultado = {'Reservas': 0, 'Apartamentos ocupados': 0}
+        resultado.update({coluna: 0.0 for coluna in COLUNAS_VALORES})
+        if a is None or b is None or b < a or not self._registros:
+            return resultado
+        valores_entrada, valores_saida, entradas, saidas = self._obter_prefixos()
+        somas = self._ate(valores_entrada, b) - self._ate(valores_saida, a - 1)
+        resultado['Reservas'] = int(somas[0])
+        for coluna, centavos in zip(COLUNAS_VALORES, somas[1:].tolist()):
+            resultado[coluna] = centavos / 100
+        resultado['Apartamentos ocupados'] = len(self.numeros_ocupados(inicio, fim))
+        return resultado
+
+    def numeros_ocupados(self, inicio, fim):
+        """Números de apartamento (normalizados, como em chave_apartamento) com alguma reserva entre `inicio` e `fim`."""
+        a, b = para_dia(inicio), para_dia(fim)
+        if a is None or b is None or b < a or not self._registros:
+            return set()
+        _, _, entradas, saidas = self._obter_prefixos()
+        ocupados = (self._ate(entradas, b) - self._ate(saidas, a - 1)) > 0
+        return {numero for numero, ocupado in zip(self._numeros, ocupados.tolist()) if ocupado and numero != ''}
+
+    def totais_por_periodo(self, inicios, fins):
+        """Mesmo cálculo de `totais` para vários períodos de uma vez (sem contar apartamentos distintos)."""
+        a = np.array([para_dia(d) for d in inicios], dtype=np.int64)
+        b = np.array([para_dia(d) for d in fins], dtype=np.int64)
+        colunas = ['Reservas'] + COLUNAS_VALORES
+        if not self._registros or not len(a):
+            return pd.DataFrame(0, index=range(len(a)), columns=colunas)
+        valores_entrada, valores_saida, _, _ = self._obter_prefixos()
+
+        def ate(prefixo, dias):
+            k = dias - self._dia0
+            colunas_prefixo = prefixo[:, np.clip(k, 0, prefixo.shape[1] - 1)]
+            return np.where(k >= 0, colunas_prefixo, 0)
+
+        somas = (ate(valores_entrada, b) - ate(valores_saida, a - 1)).T
+        resultado = pd.DataFrame(somas[:, 1:] / 100, columns=COLUNAS_VALORES)
+        resultado.insert(0, 'Reservas', somas[:, 0])
+        return resultado
+
+    def serie_diaria(self, inicio, fim):
+        """Diárias ocupadas e receita rateada (somadas entre os apartamentos) em cada dia de [inicio, fim]."""
+        datas = pd.date_range(pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize(), freq='D')
+        n = len(self._rotulos)
+        if not len(datas) or self._dias == 0:
+            return pd.DataFrame({'Diárias ocupadas': 0, 'Receita rateada': 0.0}, index=datas)
+        ocupacao = np.cumsum(self._entradas[:n].sum(axis=0) - self._saidas[:n].sum(axis=0))
+        receita = np.cumsum(self._receita[:n].sum(axis=0))
+        k = np.clip(np.arange(len(datas)) + para_dia(datas[0]) - self._dia0, -1, self._dias)
+        dentro = (k >= 0) & (k < self._dias)
+        posicoes = np.clip(k, 0, self._dias - 1)
+        return pd.DataFrame({
+            'Diárias ocupadas': np.where(dentro, ocupacao[posicoes], 0),
+            'Receita rateada': np.where(dentro, receita[posicoes], 0.0).round() / 100,
+        }, index=datas)
+
+    def por_apartamento(self, inicio, fim):
+        """Uma linha por (data, condomínio, apartamento) ocupado em [inicio, fim], com a receita rateada do dia."""
+        colunas = ['Data', 'Nome do Condomínio', 'Número do apartamento', 'Diárias ocupadas', 'Receita rateada']
+        a, b = para_dia(inicio), para_dia(fim)
+        n = len(self._rotulos)
+        if a is None or b is None or self._dias == 0 or not n:
+            return pd.DataFrame(columns=colunas)
+        ka, kb = max(a - self._dia0, 0), min(b - self._dia0, self._dias - 1)
+        if ka > kb:
+            return pd.DataFrame(columns=colunas)
+        ocupacao = np.cumsum(self._entradas[:n] - self._saidas[:n], axis=1)[:, ka:kb + 1]
+        receita = np.cumsum(self._receita[:n], axis=1)[:, ka:kb + 1]
+        linhas, dias = np.nonzero(ocupacao)
+        return pd.DataFrame({
+            'Data': pd.to_datetime(dias + ka + self._dia0, unit='D'),
+            'Nome do Condomínio': [self._rotulos[linha][0] for linha in linhas.tolist()],
+            'Número do apartamento': [self._rotulos[linha][1] for linha in linhas.tolist()],
+            'Diárias ocupadas': ocupacao[linhas, dias],
+            'Receita rateada': receita[linhas, dias].round() / 100,
+        }, columns=colunas).sort_values(['Data', 'Nome do Condomínio', 'Número do apartamento'], ignore_index=True)
+
+    def relatorio_periodico(self, inicio, fim, frequencia='mes'):
+        """Resumo por semana, mês ou ano entre `inicio` e `fim`.
+
+        Para cada período: diárias ocupadas, receita rateada, taxa de ocupação (sobre os apartamentos conhecidos)
+        e os totais das reservas que tocam o período, como em `totais`.
+        """
+        diaria = self.serie_diaria(inicio, fim)
+        if diaria.empty:
+            return pd.DataFrame()
+        periodos = diaria.index.to_period(FREQUENCIAS[frequencia])
+        datas = pd.Series(diaria.index, index=diaria.index).groupby(periodos)
+        inicios, fins, dias = datas.min(), datas.max(), datas.size()
+
+        resumo = diaria.groupby(periodos).sum()
+        apartamentos = len(self._rotulos)
+        resumo['Taxa de ocupação'] = (
+            resumo['Diárias ocupadas'] / (dias * apartamentos) if apartamentos else 0.0
+        ).round(4)
+        totais = self.totais_por_periodo(inicios.tolist(), fins.tolist())
+        totais.index = resumo.index
+        resultado = pd.concat([resumo, totais], axis=1)
+        resultado.insert(0, 'Fim', fins)
+        resultado.insert(0, 'Início', inicios)
+        resultado.insert(0, 'Período', resultado.index.astype(str))
+        return resultado.reset_index(drop=True)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from agregados import FREQUENCIAS
+from indice_intervalos import para_dia, para_dias
+
+# Data em que a reserva foi feita; a antecedência é a distância entre ela e a data de entrada
+COLUNA_DATA_RESERVA = 'Data da reserva'
+
+# Níveis de agrupamento dos indicadores: nível -> colunas que identificam o grupo
+NIVEIS = {
+    'total': [],
+    'condominio': ['Nome do Condomínio'],
+    'bloco': ['Nome do Condomínio', 'Bloco'],
+    'apartamento': ['Nome do Condomínio', 'Bloco', 'Número do apartamento'],
+}
+
+def _limites(inicio, fim, frequencia):
+    """Dias (desde 1970-01-01) que delimitam os períodos: [limites[k], limites[k + 1]) é o período k.
+
+    O último limite é o dia seguinte a `fim`, então a noite de `fim` conta. Sem `frequencia`, o
+    intervalo inteiro é um período só.
+    """
+    a, b = para_dia(inicio), para_dia(fim)
+    if a is None or b is None or b < a:
+        raise ValueError("Período inválido: informe início e fim, com o início até o fim.")
+    if frequencia is None:
+        return np.array([a, b + 1], dtype=np.int64), ['']
+    periodos = pd.period_range(pd.Timestamp(inicio), pd.Timestamp(fim), freq=FREQUENCIAS[frequencia])
+    inicios = para_dias(periodos.start_time)[0]
+    limites = np.r_[a, inicios[1:], b + 1].astype(np.int64)
+    return limites, [str(p) for p in periodos]
+
+
+def _grupos(df, nivel):
+    """(código do grupo de cada linha, DataFrame com as colunas do nível de cada grupo)."""
+    colunas = NIVEIS[nivel]
+    if not colunas:
+        return np.zeros(len(df), dtype=np.int64), pd.DataFrame(index=range(1))
+    presentes = pd.DataFrame({c: df[c] if c in df.columns else pd.Series(pd.NA, index=df.index) for c in colunas})
+    agrupado = presentes.groupby(colunas, observed=True, dropna=False, sort=True)
+    rotulos = agrupado.size().index.to_frame(index=False)
+    return agrupado.ngroup().to_numpy(np.int64), rotulos
+
+
+def _unidades(df, grupo, quantidade):
+    """Apartamentos distintos (condomínio, bloco, número) conhecidos em cada grupo."""
+    colunas = [c for c in NIVEIS['apartamento'] if c in df.columns]
+    apartamento = df[colunas].groupby(colunas, observed=True, dropna=False, sort=False).ngroup().to_numpy(np.int64)
+    fator = int(apartamento.max()) + 1
+    pares = np.unique(grupo * fator + apartamento)
+    return np.bincount(pares // fator, minlength=quantidade)
+
+
+def indicadores(df, inicio, fim, nivel='condominio', frequencia=None):
+    """Indicadores de ocupação e receita das reservas de `df` entre `inicio` e `fim` (inclusive).
+
+    Uma linha por grupo do `nivel` ('total', 'condominio', 'bloco' ou 'apartamento') e, com `frequencia`
+    ('semana', 'mes' ou 'ano'), por período. Cada estadia conta as noites (da entrada até a véspera da saída)
+    que caem no período, com o valor da hospedagem rateado por noite:
+    - Diárias disponíveis: unidades do grupo (apartamentos conhecidos na tabela) x noites do período;
+    - Taxa de ocupação: diárias ocupadas / disponíveis; ADR: receita / diárias ocupadas;
+      RevPAR: receita / diárias disponíveis;
+    - Chegadas, Estadia média (noites) e Antecedência média (dias entre a data da reserva e a entrada)
+      consideram as reservas com entrada no período.
+    Tudo é calculado com operações vetorizadas sobre as colunas, sem percorrer as reservas uma a uma.
+    """
+    limites, nomes_periodos = _limites(inicio, fim, frequencia)
+    quantidade_periodos = len(nomes_periodos)
+    grupo, rotulos = _grupos(df, nivel)
+    quantidade_grupos = len(rotulos)
+
+    diarias = np.zeros(quantidade_grupos * quantidade_periodos)
+    receita = np.zeros(quantidade_grupos * quantidade_periodos)
+    chegadas = np.zeros(quantidade_grupos * quantidade_periodos)
+    noites_chegadas = np.zeros(quantidade_grupos * quantidade_periodos)
+    antecedencia = np.zeros(quantidade_grupos * quantidade_periodos)
+    com_antecedencia = np.zeros(quantidade_grupos * quantidade_periodos)
+    unidades = np.zeros(quantidade_grupos, dtype=np.int64)
+
+    if len(df) and {'Data de entrada', 'Data de saída'} <= set(df.columns):
+        unidades = _unidades(df, grupo, quantidade_grupos)
+        entrada, validos_entrada = para_dias(df['Data de entrada'])
+        saida, validos_saida = para_dias(df['Data de saída'])
+        validos = validos_entrada & validos_saida
+        entrada, grupo_valido = entrada[validos], grupo[validos]
+        saida = np.maximum(saida[validos], entrada)
+        noites = saida - entrada
+        valor = pd.to_numeric(df.get('Valor da hospedagem'), errors='coerce')
+        valor = (valor.to_numpy(np.float64, na_value=0.0)[validos] if valor is not None
+                 else np.zeros(len(entrada)))
+        diaria = np.divide(valor, noites, out=np.zeros(len(entrada)), where=noites > 0)
+
+        # Noites dentro do intervalo inteiro; cada estadia é repetida uma vez por período que ela alcança
+        a, b = limites[0], limites[-1]
+        inicio_noites, fim_noites = np.maximum(entrada, a), np.minimum(saida, b)
+        dentro = fim_noites > inicio_noites
+        primeiro = np.searchsorted(limites, inicio_noites[dentro], side='right') - 1
+        ultimo = np.searchsorted(limites, fim_noites[dentro] - 1, side='right') - 1
+        repeticoes = ultimo - primeiro + 1
+        linha = np.repeat(np.flatnonzero(dentro), repeticoes)
+        periodo = np.repeat(primeiro, repeticoes) + (
+            np.arange(repeticoes.sum()) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes))
+        noites_periodo = (np.minimum(fim_noites[linha], limites[periodo + 1])
+                          - np.maximum(inicio_noites[linha], limites[periodo]))
+        posicao = grupo_valido[linha] * quantidade_periodos + periodo
+        diarias = np.bincount(posicao, weights=noites_periodo, minlength=len(diarias))
+        receita = np.bincount(posicao, weights=noites_periodo * diaria[linha], minlength=len(receita))
+
+        # Chegadas: reservas com entrada no intervalo, no período da entrada
+        chegou = (entrada >= a) & (entrada < b)
+        posicao = grupo_valido[chegou] * quantidade_periodos + np.searchsorted(limites, entrada[chegou], side='right') - 1
+        chegadas = np.bincount(posicao, minlength=len(chegadas)).astype(np.float64)
+        noites_chegadas = np.bincount(posicao, weights=noites[chegou], minlength=len(noites_chegadas))
+        if COLUNA_DATA_RESERVA in df.columns:
+            reserva, validos_reserva = para_dias(df[COLUNA_DATA_RESERVA])
+            com_data = validos_reserva[validos][chegou]
+            dias_antes = np.maximum(entrada[chegou] - reserva[validos][chegou], 0)
+            antecedencia = np.bincount(posicao[com_data], weights=dias_antes[com_data], minlength=len(antecedencia))
+            com_antecedencia = np.bincount(posicao[com_data], minlength=len(com_antecedencia)).astype(np.float64)
+
+    noites_por_periodo = np.tile(np.diff(limites), quantidade_grupos)
+    disponiveis = np.repeat(unidades, quantidade_periodos) * noites_por_periodo
+
+    def razao(numerador, denominador, casas):
+        return np.round(np.divide(numerador, denominador, out=np.full(len(numerador), np.nan),
+                                  where=denominador > 0), casas)
+
+    resultado = rotulos.loc[rotulos.index.repeat(quantidade_periodos)].reset_index(drop=True)
+    if frequencia is not None:
+        resultado['Período'] = np.tile(np.asarray(nomes_periodos, dtype=object), quantidade_grupos)
+    resultado['Unidades'] = np.repeat(unidades, quantidade_periodos)
+    resultado['Chegadas'] = chegadas.astype(np.int64)
+    resultado['Diárias ocupadas'] = diarias.astype(np.int64)
+    resultado['Diárias disponíveis'] = disponiveis
+    resultado['Receita'] = np.round(receita, 2)
+    resultado['Taxa de ocupação'] = razao(diarias, disponiveis, 4)
+    resultado['ADR'] = razao(receita, diarias, 2)
+    resultado['RevPAR'] = razao(receita, disponiveis, 2)
+    resultado['Estadia média'] = razao(noites_chegadas, chegadas, 2)
+    resultado['Antecedência média'] = razao(antecedencia, com_antecedencia, 1)
+    return resultado
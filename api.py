@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+from datetime import date, timedelta
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from eventos import valores_json
+from gerenciamento_reservas import obter_gerenciador
+from instrumentacao import configurar_log, log, medir, metricas
+
+# Planilhas servidas por padrão: as mesmas da interface (app.py)
+_DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+CAMINHOS_PADRAO = tuple(os.path.join(_DIRETORIO, nome)
+                        for nome in ('reservas.xlsx', 'parceiros.xlsx', 'proprietarios.xlsx'))
+
+# Tamanho de página das listagens quando o cliente não informa 'por_pagina', e o máximo aceito
+POR_PAGINA_PADRAO = 50
+POR_PAGINA_MAXIMO = 1000
+
+# Respostas menores que isso vão sem gzip: a compressão não compensa
+TAMANHO_MINIMO_GZIP = 1024
+
+TABELAS = ('reservas', 'parceiros', 'proprietarios')
+
+# Filtros de /reservas -> argumento de GerenciamentoReservas.filtrar_reservas
+FILTROS_RESERVAS = {
+    'nome': 'nome',
+    'apartamento': 'numero_apartamento',
+    'entrada_de': 'entrada_de',
+    'entrada_ate': 'entrada_ate',
+    'termo': 'termo',
+}
+
+
+class ErroHttp(Exception):
+    """Erro que vira uma resposta com o `status` informado e {"erro": mensagem} no corpo."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class Resposta:
+    """Resposta HTTP: status, cabeçalhos (nomes em minúsculas) e corpo em bytes."""
+
+    def __init__(self, status, corpo=b'', cabecalhos=None):
+        self.status = status
+        self.corpo = corpo
+        self.cabecalhos = dict(cabecalhos or {})
+
+    def texto(self):
+        """Corpo decodificado (descomprimido, se veio em gzip)."""
+        corpo = self.corpo
+        if self.cabecalhos.get('content-encoding') == 'gzip':
+            corpo = gzip.decompress(corpo)
+        return corpo.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.texto())
+
+    def em_bytes(self, com_corpo=True, manter_conexao=True):
+        """A resposta serializada em HTTP/1.1 (sem o corpo para HEAD)."""
+        cabecalhos = dict(self.cabecalhos)
+        cabecalhos['content-length'] = str(len(self.corpo))
+        cabecalhos['connection'] = 'keep-alive' if manter_conexao else 'close'
+        linhas = [f'HTTP/1.1 {self.status} {HTTPStatus(self.status).phrase}']
+        linhas += [f'{nome.title()}: {valor}' for nome, valor in cabecalhos.items()]
+        inicio = ('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1')
+        return inicio + self.corpo if com_corpo and self.status != 304 else inicio
+
+
+def registros(df):
+    """Linhas do DataFrame como dicts JSON ('ID' primeiro), convertendo coluna a coluna."""
+    colunas = {'ID': valores_json(df.index.to_series())}
+    for coluna in df.columns:
+        colunas[coluna] = valores_json(df[coluna])
+    nomes = list(colunas)
+    return [dict(zip(nomes, linha)) for linha in zip(*colunas.values())]
+
+
+def _parametro(parametros, nome, padrao=None):
+    valores = parametros.get(nome)
+    return valores[-1] if valores else padrao
+
+
+def _inteiro(parametros, nome, padrao, minimo, maximo=None):
+    texto = _parametro(parametros, nome)
+    if texto is None:
+        return padrao
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise ErroHttp(400, f"Parâmetro '{nome}' deve ser um número inteiro.") from None
+    if valor < minimo or (maximo is not None and valor > maximo):
+        limite = f"entre {minimo} e {maximo}" if maximo is not None else f"a partir de {minimo}"
+        raise ErroHttp(400, f"Parâmetro '{nome}' deve estar {limite}.")
+    return valor
+
+
+def _data(parametros, nome, obrigatoria=True, padrao=None):
+    texto = _parametro(parametros, nome)
+    if texto is None:
+        if obrigatoria:
+            raise ErroHttp(400, f"Parâmetro '{nome}' é obrigatório (AAAA-MM-DD).")
+        return padrao
+    try:
+        return pd.Timestamp(texto).date()
+    except ValueError:
+        raise ErroHttp(400, f"Parâmetro '{nome}' não é uma data válida (AAAA-MM-DD).") from None
+
+
+def _totais(inicio, fim, totais):
+    total_hospedagem, total_a_pagar, total_a_receber, apartamentos_ocupados = totais
+    return {
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'total_hospedagem': float(total_hospedagem),
+        'total_a_pagar': float(total_a_pagar),
+        'total_a_receber': float(total_a_receber),
+        'apartamentos_ocupados': int(apartamentos_ocupados),
+    }
+
+
+class ApiReservas:
+    """API HTTP/JSON somente de leitura sobre GerenciamentoReservas, para integrações.
+
+    Rotas (GET e HEAD):
+    - /reservas, /parceiros, /proprietarios: listagem paginada ('pagina' a partir de 1, 'por_pagina',
+      'ordenar' e 'desc=1'); /reservas aceita ainda os filtros de FILTROS_RESERVAS (nas outras, eles dão 400);
+    - /<tabela>/<id>: um registro;
+    - /disponibilidade?inicio=&fim=: apartamentos livres no período;
+    - /totais?inicio=&fim= e /totais/semana?data=: totais do período e da semana (segunda a domingo) da data;
+    - /saude e /metrics (formato Prometheus, as mesmas métricas de instrumentacao.py).
+
+    Todas as requisições usam o mesmo gerenciador em memória (obter_gerenciador, que só relê as tabelas que
+    mudaram no armazenamento); o trabalho com os dados roda em threads para não travar o laço de eventos.
+    Cada resposta de dados leva um ETag derivado da versão das tabelas que ela consulta: com If-None-Match
+    igual, a resposta é 304 sem que nada seja calculado. Clientes que aceitam gzip recebem o corpo comprimido.
+    """
+
+    def __init__(self, caminhos=CAMINHOS_PADRAO, gerenciador=None):
+        self.caminhos = tuple(caminhos)
+        self._gerenciador = gerenciador
+        # (padrão do caminho, nome da rota, tabelas consultadas, depende do dia de hoje, função)
+        self._rotas = [
+            (re.compile(r'^/(reservas|parceiros|proprietarios)$'), 'listar', None, False, self._listar),
+            (re.compile(r'^/(reservas|parceiros|proprietarios)/([^/]+)$'), 'registro', None, False, self._registro),
+            (re.compile(r'^/disponibilidade$'), 'disponibilidade', ('reservas',), False, self._disponibilidade),
+            (re.compile(r'^/totais$'), 'totais', ('reservas',), False, self._totais_periodo),
+            (re.compile(r'^/totais/semana$'), 'totais_semana', ('reservas',), True, self._totais_semana),
+        ]
+
+    def gerenciador(self):
+        if self._gerenciador is not None:
+            return self._gerenciador
+        return obter_gerenciador(*self.caminhos)
+
+    async def responder(self, metodo, alvo, cabecalhos=None):
+        """Trata uma requisição e retorna a Resposta (usado pelo servidor e pelo ClienteLocal)."""
+        cabecalhos = {nome.lower(): valor for nome, valor in (cabecalhos or {}).items()}
+        partes = urlsplit(alvo)
+        caminho = partes.path.rstrip('/') or '/'
+        parametros = parse_qs(partes.query)
+        try:
+            if metodo not in ('GET', 'HEAD'):
+                raise ErroHttp(405, f"Método {metodo} não suportado (a API é somente leitura).")
+            if caminho == '/metrics':
+                corpo = metricas.texto_prometheus().encode('utf-8')
+                return self._finalizar(Resposta(200, corpo, {'content-type': 'text/plain; version=0.0.4; charset=utf-8'}),
+                                       cabecalhos)
+            if caminho == '/saude':
+                return self._finalizar(self._json(200, {'status': 'ok'}), cabecalhos)
+            for padrao, nome, tabelas, do_dia, funcao in self._rotas:
+                casamento = padrao.match(caminho)
+                if casamento:
+                    grupos = casamento.groups()
+                    return await asyncio.to_thread(
+                        self._executar, nome, tabelas or grupos[:1], do_dia, funcao, grupos, parametros, caminho, cabecalhos
+                    )
+            raise ErroHttp(404, f"Rota não encontrada: {caminho}")
+        except ErroHttp as e:
+            return self._json(e.status, {'erro': str(e)})
+        except ValueError as e:
+            return self._json(400, {'erro': str(e)})
+        except Exception:
+            log.exception("Erro na API ao atender %s %s", metodo, alvo)
+            return self._json(500, {'erro': 'Erro interno.'})
+
+    def _executar(self, nome, tabelas, do_dia, funcao, grupos, parametros, caminho, cabecalhos):
+        with medir(f'api_{nome}', tabelas[0]):
+            gerenciador = self.gerenciador()
+            # A versão entra no ETag: lida antes do carregamento, a primeira resposta nunca voltaria como 304
+            gerenciador.carregar(*tabelas)
+            etag = self._etag(gerenciador, tabelas, caminho, parametros, do_dia)
+            if etag in [v.strip() for v in cabecalhos.get('if-none-match', '').split(',')]:
+                return Resposta(304, cabecalhos={'etag': etag})
+            resposta = self._json(200, funcao(gerenciador, parametros, *grupos))
+            resposta.cabecalhos['etag'] = etag
+            resposta.cabecalhos['cache-control'] = 'no-cache'
+            return self._finalizar(resposta, cabecalhos)
+
+    @staticmethod
+    def _etag(gerenciador, tabelas, caminho, parametros, do_dia):
+        """ETag da resposta: muda quando alguma das `tabelas` muda (em memória ou no armazenamento)."""
+        estado = [
+            gerenciador.assinatura_dados(*tabelas),
+            [gerenciador.versoes[tabela] for tabela in tabelas],
+            caminho,
+            sorted(parametros.items()),
+            date.today().isoformat() if do_dia else None,
+        ]
+        texto = json.dumps(estado, sort_keys=True, default=str, ensure_ascii=False)
+        return '"' + hashlib.sha1(texto.encode('utf-8')).hexdigest()[:32] + '"'
+
+    @staticmethod
+    def _json(status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+        return Resposta(status, corpo, {'content-type': 'application/json; charset=utf-8'})
+
+    @staticmethod
+    def _finalizar(resposta, cabecalhos):
+        """Comprime o corpo em gzip quando o cliente aceita e o corpo é grande o bastante."""
+        resposta.cabecalhos['vary'] = 'Accept-Encoding'
+        aceitas = [parte.split(';')[0].strip() for parte in cabecalhos.get('accept-encoding', '').split(',')]
+        if 'gzip' in aceitas and len(resposta.corpo) >= TAMANHO_MINIMO_GZIP:
+            resposta.corpo = gzip.compress(resposta.corpo, compresslevel=5)
+            resposta.cabecalhos['content-encoding'] = 'gzip'
+        return resposta
+
+    # Rotas (rodam em uma thread, com o gerenciador compartilhado)
+
+    def _listar(self, gerenciador, parametros, tabela):
+        pagina = _inteiro(parametros, 'pagina', 1, 1)
+        por_pagina = _inteiro(parametros, 'por_pagina', POR_PAGINA_PADRAO, 1, POR_PAGINA_MAXIMO)
+        ordenar = _parametro(parametros, 'ordenar')
+        ascendente = _parametro(parametros, 'desc', '0') in ('0', 'false', '')
+        inicio = (pagina - 1) * por_pagina
+        filtros = {argumento: _parametro(parametros, nome) for nome, argumento in FILTROS_RESERVAS.items()
+                   if _parametro(parametros, nome) is not None}
+        if filtros and tabela != 'reservas':
+            nomes = [nome for nome in FILTROS_RESERVAS if _parametro(parametros, nome) is not None]
+            raise ErroHttp(400, f"Filtros {nomes} só valem para /reservas.")
+        if filtros:
+            if 'numero_apartamento' in filtros:
+                filtros['numero_apartamento'] = _inteiro(parametros, 'apartamento', None, 0)
+            if 'entrada_de' in filtros:
+                filtros['entrada_de'] = pd.Timestamp(_data(parametros, 'entrada_de'))
+            if 'entrada_ate' in filtros:
+                # A data vale pelo dia inteiro: a entrada às 14h do último dia também passa
+                fim_do_dia = pd.Timestamp(_data(parametros, 'entrada_ate')) + pd.Timedelta(days=1)
+                filtros['entrada_ate'] = fim_do_dia - pd.Timedelta(microseconds=1)
+            encontradas = gerenciador.filtrar_reservas(**filtros)
+            if ordenar in encontradas.columns:
+                encontradas = encontradas.sort_values(ordenar, ascending=ascendente, kind='stable', na_position='last')
+            elif not ascendente:
+                encontradas = encontradas.iloc[::-1]
+            total = len(encontradas)
+            df = encontradas.iloc[inicio:inicio + por_pagina]
+        else:
+            df, total = gerenciador.consultar(tabela, inicio, por_pagina, ordenar, ascendente)
+        return {
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'total': total,
+            'paginas': math.ceil(total / por_pagina),
+            'itens': registros(df),
+        }
+
+    def _registro(self, gerenciador, parametros, tabela, id_):
+        df = getattr(gerenciador, f'df_{tabela}')
+        try:
+            id_ = int(id_)
+        except ValueError:
+            raise ErroHttp(404, f"Registro não encontrado: {id_}") from None
+        if id_ not in df.index:
+            raise ErroHttp(404, f"Registro não encontrado: {id_}")
+        return registros(df.loc[[id_]])[0]
+
+    def _disponibilidade(self, gerenciador, parametros):
+        inicio, fim = _data(parametros, 'inicio'), _data(parametros, 'fim')
+        if fim <= inicio:
+            raise ErroHttp(400, "A data 'fim' (saída) deve ser posterior a 'inicio'.")
+        livres = gerenciador.disponibilidade(inicio, fim)
+        return {'inicio': inicio.isoformat(), 'fim': fim.isoformat(),
+                'apartamentos': registros(livres.reset_index(drop=True))}
+
+    def _totais_periodo(self, gerenciador, parametros):
+        inicio, fim = _data(parametros, 'inicio'), _data(parametros, 'fim')
+        if fim < inicio:
+            raise ErroHttp(400, "A data 'fim' deve ser igual ou posterior a 'inicio'.")
+        return _totais(inicio, fim, gerenciador.totais_periodo(inicio, fim))
+
+    def _totais_semana(self, gerenciador, parametros):
+        dia = _data(parametros, 'data', obrigatoria=False, padrao=date.today())
+        inicio = dia - timedelta(days=dia.weekday())
+        fim = inicio + timedelta(days=6)
+        return _totais(inicio, fim, gerenciador.totais_periodo(inicio, fim))
+
+    # Servidor HTTP
+
+    async def servir(self, endereco='127.0.0.1', porta=8000):
+        """Abre o servidor HTTP/1.1 (com keep-alive) e o retorna; use `serve_forever()` para atender."""
+        servidor = await asyncio.start_server(self._atender, endereco, porta)
+        log.info("API de reservas em http://%s:%s", endereco, servidor.sockets[0].getsockname()[1])
+        return servidor
+
+    async def _atender(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, alvo, versao = linha.decode('latin-1').split()
+                except ValueError:
+                    escritor.write(self._json(400, {'erro': 'Requisição malformada.'}).em_bytes(manter_conexao=False))
+                    break
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get('content-length') or 0)
+                if tamanho:
+                    await leitor.readexactly(tamanho)
+                resposta = await self.responder(metodo, alvo, cabecalhos)
+                manter = versao == 'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+                escritor.write(resposta.em_bytes(metodo != 'HEAD', manter))
+                await escritor.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Conexão encerrada pelo cliente, corpo incompleto ou linha longa demais
+            pass
+        finally:
+            escritor.close()
+
+
+class ClienteLocal:
+    """Cliente da API no mesmo processo, sem rede: chama ApiReservas.responder diretamente.
+
+    Útil para testar integrações localmente; as respostas são as mesmas do servidor (ETag, gzip, status).
+    """
+
+    def __init__(self, api=None):
+        self.api = api if api is not None else ApiReservas()
+
+    def get(self, alvo, cabecalhos=None):
+        return asyncio.run(self.api.responder('GET', alvo, cabecalhos))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a API HTTP/JSON de reservas para integrações.")
+    parser.add_argument("--endereco", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--reservas", default=CAMINHOS_PADRAO[0], help="Planilha (ou base) de reservas")
+    parser.add_argument("--parceiros", default=CAMINHOS_PADRAO[1])
+    parser.add_argument("--proprietarios", default=CAMINHOS_PADRAO[2])
+    args = parser.parse_args()
+
+    configurar_log()
+    api = ApiReservas((args.reservas, args.parceiros, args.proprietarios))
+    # Carrega as tabelas antes de aceitar conexões: a primeira requisição não paga a leitura das planilhas
+    api.gerenciador().carregar()
+
+    async def principal():
+        servidor = await api.servir(args.endereco, args.porta)
+        async with servidor:
+            await servidor.serve_forever()
+
+    asyncio.run(principal())
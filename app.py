@@ -1,44 +1,104 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
+import time
 from datetime import date, timedelta
 import os
 
-# Importe a classe GerenciamentoReservas do arquivo onde ela foi definida
-from gerenciamento_reservas import GerenciamentoReservas 
+# Início desta execução do script (o Streamlit o reexecuta a cada interação), para o perfil de inicialização
+inicio_execucao = time.perf_counter()
+
+from perfil_inicializacao import importacoes, importar, relatorio_importacoes, relatorio_paginas, renderizacao
+
+with importacoes('streamlit'):
+    import streamlit as st
+
+# O pandas vem com o gerenciador, que toda página usa; o Plotly só é importado pelas páginas com gráficos
+with importacoes('gerenciamento_reservas'):
+    import pandas as pd
+    # Importe a classe GerenciamentoReservas do arquivo onde ela foi definida
+    from gerenciamento_reservas import obter_gerenciador
+    from concorrencia import ConflitoVersaoError
+    from esquema import valor_texto
+    from eventos import definir_usuario
+    from instrumentacao import metricas
+    from componentes import (campos_recorrencia, encerrar_edicao, registro_em_edicao, selecionar_parte,
+                             selecionar_registro, tabela_paginada)
 
 # Função para exibir a página inicial do dashboard
 def dashboard_home(reservas):
     st.title("Gerenciamento de Reserva - Home")
     st.write("Bem-vindo ao sistema de gerenciamento de reservas!")
     
+    # Só a página visível de cada tabela é enviada ao navegador
     st.subheader("Tabela de Reservas")
-    st.dataframe(reservas.df_reservas)  # Exibe a tabela de reservas
+    tabela_paginada(reservas, 'reservas', "home_reservas")
 
     st.subheader("Tabela de Parceiros")
-    st.dataframe(reservas.df_parceiros)  # Exibe a tabela de parceiros
+    tabela_paginada(reservas, 'parceiros', "home_parceiros")
 
     st.subheader("Tabela de Proprietários")
-    st.dataframe(reservas.df_proprietarios)  # Exibe a tabela de proprietários
+    tabela_paginada(reservas, 'proprietarios', "home_proprietarios")
+
+    with st.expander("Uso de memória das tabelas"):
+        st.dataframe(pd.DataFrame(list(reservas.relatorios_memoria.values())))
 
 # Função para exibir a página de relatórios
 def relatorios(reservas):
     st.title("Relatórios")
 
-    # Botão para recarregar dados
+    # Botão para forçar a releitura das planilhas (alterações no disco já são detectadas automaticamente)
     if st.button("Recarregar Dados", key="recarregar_dados"):
-        reservas.df_reservas = reservas.load_data(reservas.reservas_path)
-        reservas.df_parceiros = reservas.load_data(reservas.parceiros_path)
-        reservas.df_proprietarios = reservas.load_data(reservas.proprietarios_path)
+        reservas.recarregar()
         st.success("Dados recarregados com sucesso!")
     
     exibir_relatorio_semanal(reservas)
+    exibir_relatorio_periodico(reservas)
     exibir_relatorio_parceiros(reservas)
+    exibir_acertos(reservas)
+    exibir_resumo_condominios(reservas)
+
+# Função para exibir a página de análises de ocupação e receita
+def analises(reservas):
+    st.title("Análises")
+    hoje = date.today()
+    inicio = st.date_input("De", date(hoje.year, 1, 1), key="inicio_analises")
+    fim = st.date_input("Até", hoje, key="fim_analises")
+    if fim < inicio:
+        st.warning("A data final deve ser igual ou posterior à inicial.")
+        return
+    niveis = {"Condomínio": "condominio", "Bloco": "bloco", "Apartamento": "apartamento"}
+    nivel = st.selectbox("Agrupar por", list(niveis), key="nivel_analises")
+    frequencias = {"Período inteiro": None, "Semana": "semana", "Mês": "mes", "Ano": "ano"}
+    frequencia = st.selectbox("Dividir em", list(frequencias), index=2, key="frequencia_analises")
+
+    # Indicadores do portfólio inteiro no período
+    total = reservas.indicadores(inicio, fim, 'total').iloc[0]
+    colunas = st.columns(5)
+    colunas[0].metric("Taxa de ocupação", f"{total['Taxa de ocupação']:.1%}" if pd.notna(total['Taxa de ocupação']) else "-")
+    colunas[1].metric("ADR", f"{total['ADR']:.2f}" if pd.notna(total['ADR']) else "-")
+    colunas[2].metric("RevPAR", f"{total['RevPAR']:.2f}" if pd.notna(total['RevPAR']) else "-")
+    colunas[3].metric("Estadia média (noites)", f"{total['Estadia média']:.1f}" if pd.notna(total['Estadia média']) else "-")
+    colunas[4].metric("Antecedência média (dias)",
+                      f"{total['Antecedência média']:.0f}" if pd.notna(total['Antecedência média']) else "-")
+
+    tabela = reservas.indicadores(inicio, fim, niveis[nivel], frequencias[frequencia])
+    st.dataframe(tabela)
+    if frequencias[frequencia] is not None and not tabela.empty:
+        px = importar('plotly.express')
+        indicador = st.selectbox("Indicador no gráfico", ['Taxa de ocupação', 'ADR', 'RevPAR', 'Estadia média',
+                                                          'Antecedência média'], key="indicador_analises")
+        if niveis[nivel] != 'apartamento':
+            grupos = tabela[['Nome do Condomínio', 'Bloco']] if niveis[nivel] == 'bloco' else tabela[['Nome do Condomínio']]
+            tabela = tabela.assign(Grupo=grupos.astype(str).agg(' / '.join, axis=1))
+            fig = px.line(tabela, x='Período', y=indicador, color='Grupo', title=f"{indicador} por {nivel.lower()}")
+        else:
+            # Um apartamento por linha deixaria o gráfico ilegível: mostra a distribuição em cada período
+            fig = px.box(tabela, x='Período', y=indicador, title=f"{indicador} dos apartamentos")
+        st.plotly_chart(fig)
 
 # Função para exibir a página de gestão de reservas
 def gestao_reservas(reservas):
     st.title("Gestão de Reservas")
     adicionar_nova_reserva(reservas)
+    consultar_disponibilidade(reservas)
     editar_reservas(reservas)
     exibir_detalhamento_reservas(reservas)
 
@@ -54,6 +114,46 @@ def gestao_proprietarios(reservas):
     adicionar_novo_proprietario(reservas)
     editar_proprietarios(reservas)
 
+# Função para exibir a página de importação de reservas em massa
+def importar_reservas(reservas):
+    st.title("Importar Reservas")
+    st.write("Envie um CSV ou XLSX (inclusive exportações de channel managers) com uma reserva por linha.")
+
+    arquivo = st.file_uploader("Arquivo de reservas", type=["csv", "xlsx"], key="arquivo_importacao")
+    if arquivo is not None and st.button("Importar", key="botao_importar"):
+        relatorio = reservas.importar_reservas(arquivo)
+        importadas = int((relatorio['Situação'] == 'importada').sum())
+        rejeitadas = len(relatorio) - importadas
+        st.success(f"{importadas} reservas importadas, {rejeitadas} linhas rejeitadas.")
+        if rejeitadas:
+            st.dataframe(relatorio[relatorio['Situação'] == 'rejeitada'])
+        with st.expander("Relatório completo"):
+            st.dataframe(relatorio)
+
+# Função para exibir a página de administração: latências, contadores e memória das tabelas
+def administracao(reservas):
+    st.title("Administração")
+    st.subheader("Operações")
+    resumo = metricas.resumo()
+    if resumo.empty:
+        st.info("Nenhuma operação medida ainda.")
+    else:
+        st.dataframe(resumo)
+    st.download_button("Baixar métricas (formato Prometheus)", metricas.texto_prometheus(),
+                       file_name="metricas_reservas.prom", mime="text/plain", key="baixar_metricas")
+    if st.button("Zerar métricas", key="zerar_metricas"):
+        metricas.limpar()
+        st.rerun()
+
+    st.subheader("Memória das tabelas")
+    st.dataframe(pd.DataFrame(list(reservas.relatorios_memoria.values())))
+
+    # Primeiro desenho de cada página e importações neste processo (partida a frio: perfil_inicializacao.py)
+    st.subheader("Inicialização")
+    st.write("**Tabelas em memória:**", ", ".join(reservas.tabelas_carregadas()) or "nenhuma")
+    st.dataframe(pd.DataFrame(relatorio_paginas()), hide_index=True)
+    st.dataframe(pd.DataFrame(relatorio_importacoes()), hide_index=True)
+
 # Funções para exibir relatórios, adicionar e editar dados:
 def exibir_relatorio_semanal(reservas):
     st.subheader("Relatório Semanal")
@@ -68,9 +168,28 @@ def exibir_relatorio_semanal(reservas):
         'Descrição': ['Total Hospedagem', 'Total a Pagar', 'Total a Receber'],
         'Valores': [total_hospedagem, total_a_pagar, total_a_receber_parceiros]
     })
+    px = importar('plotly.express')
     fig = px.bar(grafico_df, x='Descrição', y='Valores', title="Totais Semanais")
     st.plotly_chart(fig)
 
+def exibir_relatorio_periodico(reservas):
+    st.subheader("Relatório por Período")
+    frequencias = {"Semana": "semana", "Mês": "mes", "Ano": "ano"}
+    frequencia = st.selectbox("Agrupar por", list(frequencias), index=1, key="frequencia_relatorio")
+    hoje = date.today()
+    inicio = st.date_input("De", date(hoje.year, 1, 1), key="inicio_relatorio_periodico")
+    fim = st.date_input("Até", hoje, key="fim_relatorio_periodico")
+
+    # Totais por somas de prefixo no agregado diário: não varre o histórico a cada execução
+    relatorio = reservas.relatorio_periodico(inicio, fim, frequencias[frequencia])
+    if relatorio.empty:
+        st.write("Nenhum dado no período.")
+        return
+    st.dataframe(relatorio)
+    px = importar('plotly.express')
+    fig = px.line(relatorio, x='Início', y=['Receita rateada', 'Valor da hospedagem'], title="Receita por Período")
+    st.plotly_chart(fig)
+
 def exibir_relatorio_parceiros(reservas):
     st.subheader("Relatório de Parceiros")
     df_parceiros, total_a_receber, total_a_pagar = reservas.gerar_relatorio_parceiros()
@@ -80,9 +199,28 @@ def exibir_relatorio_parceiros(reservas):
     st.write("**Resumo por Parceiro:**")
     st.dataframe(df_parceiros)
 
+    px = importar('plotly.express')
     fig = px.bar(df_parceiros, x='Parceiro', y=['A receber', 'A pagar'], title="Valores a Receber e Pagar por Parceiro")
     st.plotly_chart(fig)
 
+def exibir_acertos(reservas):
+    st.subheader("Acerto com Parceiros e Proprietários")
+    mes = st.date_input("Mês do acerto", date.today().replace(day=1), key="mes_acerto")
+    fechamento = reservas.fechar_mes(mes.strftime('%Y-%m'))
+    st.write(f"**Reservas com saída em {mes.strftime('%m/%Y')}:**")
+    st.dataframe(fechamento)
+    st.write("**Total a pagar no mês:**", round(fechamento['A pagar'].sum(), 2))
+    st.write("**Total a receber no mês:**", round(fechamento['A receber'].sum(), 2))
+    with st.expander("Saldos acumulados"):
+        st.dataframe(reservas.saldos_acerto())
+
+def exibir_resumo_condominios(reservas):
+    st.subheader("Resumo por Condomínio")
+    hoje = date.today()
+    periodo = st.date_input("Período do resumo", (hoje.replace(day=1), hoje), key="periodo_resumo_condominios")
+    if isinstance(periodo, (list, tuple)) and len(periodo) == 2:
+        st.dataframe(reservas.resumo_por_condominio(periodo[0], periodo[1]))
+
 def exibir_detalhamento_reservas(reservas):
     st.subheader("Detalhes das Reservas Semanais")
     df_semanal, *_ = reservas.calcular_totais_semanal()
@@ -109,30 +247,53 @@ def adicionar_nova_reserva(reservas):
         telefone_responsavel = st.text_input("Telefone do Responsável", key="telefone_responsavel_novo")
         documento_responsavel = st.text_input("Documento do Responsável", key="documento_responsavel_novo")
 
+        # Partes do acerto da reserva
+        id_parceiro = selecionar_parte(reservas, 'parceiros', "Parceiro", "parceiro_reserva_novo")
+        id_proprietario = selecionar_parte(reservas, 'proprietarios', "Proprietário", "proprietario_reserva_novo")
+
+        # Contratos mensais ou fins de semana fixos ficam em um único registro com a regra de repetição
+        recorrencia, excecoes = campos_recorrencia("recorrencia_reserva_novo")
+
         # Botão para adicionar a reserva com as novas informações
         if st.button("Adicionar Reserva", key="botao_adicionar_reserva"):
-            reservas.adicionar_reserva(
-                nome, data_entrada, data_saida, numero_apartamento, valor_hospedagem, 
-                condominio, bloco, endereco, status, 
-                email_responsavel=email_responsavel, telefone_responsavel=telefone_responsavel, documento_responsavel=documento_responsavel
-            )
-            st.success("Nova reserva adicionada com sucesso!")
+            try:
+                reservas.adicionar_reserva(
+                    nome, data_entrada, data_saida, numero_apartamento, valor_hospedagem, 
+                    condominio, bloco, endereco, status, 
+                    email_responsavel=email_responsavel, telefone_responsavel=telefone_responsavel, documento_responsavel=documento_responsavel,
+                    id_parceiro=id_parceiro, id_proprietario=id_proprietario,
+                    recorrencia=recorrencia, excecoes=excecoes
+                )
+                st.success("Nova reserva adicionada com sucesso!")
+            except ValueError as e:
+                # Inclui ConflitoReservaError e regras de repetição inválidas
+                st.error(str(e))
+
+def consultar_disponibilidade(reservas):
+    with st.expander("Consultar Disponibilidade"):
+        inicio = st.date_input("Entrada", date.today(), key="disponibilidade_inicio")
+        fim = st.date_input("Saída", date.today() + timedelta(days=1), key="disponibilidade_fim")
+        if st.button("Buscar Apartamentos Livres", key="botao_disponibilidade"):
+            st.dataframe(reservas.disponibilidade(inicio, fim))
 
 
 def editar_reservas(reservas):
     st.subheader("Editar Reservas")
-    id_reserva = st.selectbox("Selecione a Reserva para Editar", reservas.df_reservas.index, key="reserva_edit")
+    id_reserva = selecionar_registro(reservas, 'reservas', "a Reserva", "reserva_edit")
+    if id_reserva is None:
+        return
     reserva_selecionada = reservas.df_reservas.loc[id_reserva]
+    base = registro_em_edicao(reservas, 'reservas', id_reserva, "reserva_edit")
 
     # Campos para editar informações da reserva
-    nome = st.text_input("Nome do Hóspede", reserva_selecionada['Nome do hóspede'], key="nome_hospede")
+    nome = st.text_input("Nome do Hóspede", valor_texto(reserva_selecionada['Nome do hóspede']), key="nome_hospede")
     data_entrada = st.date_input("Data de Entrada", reserva_selecionada['Data de entrada'], key="data_entrada")
     data_saida = st.date_input("Data de Saída", reserva_selecionada['Data de saída'], key="data_saida")
     numero_apartamento = st.number_input("Número do Apartamento", value=int(reserva_selecionada['Número do apartamento']), key="numero_apartamento")
     valor_hospedagem = st.number_input("Valor da Hospedagem", value=float(reserva_selecionada['Valor da hospedagem']), key="valor_hospedagem")
-    condominio = st.text_input("Nome do Condomínio", reserva_selecionada['Nome do Condomínio'], key="condominio")
-    bloco = st.text_input("Bloco", reserva_selecionada['Bloco'], key="bloco")
-    endereco = st.text_input("Endereço", reserva_selecionada['Endereço'], key="endereco")
+    condominio = st.text_input("Nome do Condomínio", valor_texto(reserva_selecionada['Nome do Condomínio']), key="condominio")
+    bloco = st.text_input("Bloco", valor_texto(reserva_selecionada['Bloco']), key="bloco")
+    endereco = st.text_input("Endereço", valor_texto(reserva_selecionada['Endereço']), key="endereco")
     
     # Campos para valores pagos e a pagar
     pago = st.number_input("Pago", value=float(reserva_selecionada.get('Pago', 0)), key="pago")
@@ -145,19 +306,44 @@ def editar_reservas(reservas):
     status = st.selectbox("Status do Pagamento", status_lista, index=index_status, key="status_pagamento")
 
     # Campos para as informações do responsável
-    email_responsavel = st.text_input("Email do Responsável", reserva_selecionada.get('Email do responsável', ''), key="email_responsavel")
-    telefone_responsavel = st.text_input("Telefone do Responsável", reserva_selecionada.get('Telefone do responsável', ''), key="telefone_responsavel")
-    documento_responsavel = st.text_input("Documento do Responsável", reserva_selecionada.get('Documento do responsável', ''), key="documento_responsavel")
+    email_responsavel = st.text_input("Email do Responsável", valor_texto(reserva_selecionada.get('Email do responsável', '')), key="email_responsavel")
+    telefone_responsavel = st.text_input("Telefone do Responsável", valor_texto(reserva_selecionada.get('Telefone do responsável', '')), key="telefone_responsavel")
+    documento_responsavel = st.text_input("Documento do Responsável", valor_texto(reserva_selecionada.get('Documento do responsável', '')), key="documento_responsavel")
+
+    # Partes do acerto da reserva
+    id_parceiro = selecionar_parte(reservas, 'parceiros', "Parceiro", "parceiro_reserva",
+                                   reserva_selecionada.get('ID do parceiro'))
+    id_proprietario = selecionar_parte(reservas, 'proprietarios', "Proprietário", "proprietario_reserva",
+                                       reserva_selecionada.get('ID do proprietário'))
+    recorrencia, excecoes = campos_recorrencia("recorrencia_reserva", reserva_selecionada.get('Recorrência'),
+                                               reserva_selecionada.get('Exceções'))
 
     # Salva as alterações com todos os argumentos necessários, incluindo as novas informações
     if st.button("Salvar Alterações", key="salvar_alteracoes_reserva"):
-        reservas.atualizar_reserva(
-            id_reserva, nome, data_entrada, data_saida, numero_apartamento, 
-            valor_hospedagem, condominio, bloco, endereco, status, 
-            pago, a_pagar, email_responsavel=email_responsavel, 
-            telefone_responsavel=telefone_responsavel, documento_responsavel=documento_responsavel
-        )
-        st.success("Reserva atualizada com sucesso!")
+        try:
+            reservas.atualizar_reserva(
+                id_reserva, nome, data_entrada, data_saida, numero_apartamento, 
+                valor_hospedagem, condominio, bloco, endereco, status, 
+                pago, a_pagar, email_responsavel=email_responsavel, 
+                telefone_responsavel=telefone_responsavel, documento_responsavel=documento_responsavel,
+                id_parceiro=id_parceiro, id_proprietario=id_proprietario,
+                versao_esperada=base.get('Versão'), base=base, recorrencia=recorrencia, excecoes=excecoes
+            )
+            encerrar_edicao("reserva_edit")
+            st.success("Reserva atualizada com sucesso!")
+        except ConflitoVersaoError as e:
+            encerrar_edicao("reserva_edit")
+            st.error(str(e))
+        except ValueError as e:
+            # Inclui ConflitoReservaError e regras de repetição inválidas
+            st.error(str(e))
+
+    with st.expander("Histórico de alterações"):
+        historico = reservas.historico('reservas', id_reserva)
+        if historico.empty:
+            st.info("Nenhuma alteração registrada para esta reserva.")
+        else:
+            st.dataframe(historico.iloc[::-1], hide_index=True)
 
 
 
@@ -166,23 +352,35 @@ def adicionar_novo_parceiro(reservas):
         parceiro = st.text_input("Nome do Parceiro", key="nome_parceiro_novo")
         a_receber = st.number_input("A Receber", min_value=0.0, step=0.01, key="a_receber_parceiro_novo")
         a_pagar = st.number_input("A Pagar", min_value=0.0, step=0.01, key="a_pagar_parceiro_novo")
+        comissao = st.number_input("Comissão (%)", min_value=0.0, max_value=100.0, step=0.5, key="comissao_parceiro_novo")
 
         if st.button("Adicionar Parceiro", key="botao_adicionar_parceiro"):
-            reservas.adicionar_parceiro(parceiro, a_receber, a_pagar)
+            reservas.adicionar_parceiro(parceiro, a_receber, a_pagar, comissao)
             st.success("Novo parceiro adicionado com sucesso!")
 
 def editar_parceiros(reservas):
     st.subheader("Editar Parceiros")
-    id_parceiro = st.selectbox("Selecione o Parceiro para Editar", reservas.df_parceiros.index, key="parceiro_edit")
+    id_parceiro = selecionar_registro(reservas, 'parceiros', "o Parceiro", "parceiro_edit")
+    if id_parceiro is None:
+        return
     parceiro_selecionado = reservas.df_parceiros.loc[id_parceiro]
+    base = registro_em_edicao(reservas, 'parceiros', id_parceiro, "parceiro_edit")
 
-    parceiro = st.text_input("Nome do Parceiro", parceiro_selecionado['Parceiro'], key="nome_parceiro")
+    parceiro = st.text_input("Nome do Parceiro", valor_texto(parceiro_selecionado['Parceiro']), key="nome_parceiro")
     a_receber = st.number_input("A Receber", value=float(parceiro_selecionado['A receber']), key="a_receber_parceiro")
     a_pagar = st.number_input("A Pagar", value=float(parceiro_selecionado['A pagar']), key="a_pagar_parceiro")
+    comissao_atual = parceiro_selecionado.get('Comissão (%)')
+    comissao = st.number_input("Comissão (%)", min_value=0.0, max_value=100.0, step=0.5,
+                               value=float(comissao_atual) if pd.notna(comissao_atual) else 0.0, key="comissao_parceiro")
 
     if st.button("Salvar Alterações no Parceiro", key="salvar_alteracoes_parceiro"):
-        reservas.atualizar_parceiro(id_parceiro, parceiro, a_receber, a_pagar)
-        st.success("Parceiro atualizado com sucesso!")
+        try:
+            reservas.atualizar_parceiro(id_parceiro, parceiro, a_receber, a_pagar, comissao,
+                                        versao_esperada=base.get('Versão'), base=base)
+            st.success("Parceiro atualizado com sucesso!")
+        except ConflitoVersaoError as e:
+            st.error(str(e))
+        encerrar_edicao("parceiro_edit")
 
 # Funções para adicionar e editar proprietários
 def adicionar_novo_proprietario(reservas):
@@ -191,44 +389,68 @@ def adicionar_novo_proprietario(reservas):
         email = st.text_input("Email", key="email_proprietario_novo")
         telefone = st.text_input("Telefone", key="telefone_proprietario_novo")
         documento = st.text_input("Documento", key="documento_proprietario_novo")
+        repasse = st.number_input("Repasse (%)", min_value=0.0, max_value=100.0, step=0.5, key="repasse_proprietario_novo")
 
         if st.button("Adicionar Proprietário", key="botao_adicionar_proprietario"):
-            reservas.adicionar_proprietario(nome, email, telefone, documento)
+            reservas.adicionar_proprietario(nome, email, telefone, documento, repasse)
             st.success("Novo proprietário adicionado com sucesso!")
 
 def editar_proprietarios(reservas):
     st.subheader("Editar Proprietários")
-    id_proprietario = st.selectbox("Selecione o Proprietário para Editar", reservas.df_proprietarios.index, key="proprietario_edit")
+    id_proprietario = selecionar_registro(reservas, 'proprietarios', "o Proprietário", "proprietario_edit")
+    if id_proprietario is None:
+        return
     proprietario_selecionado = reservas.df_proprietarios.loc[id_proprietario]
+    base = registro_em_edicao(reservas, 'proprietarios', id_proprietario, "proprietario_edit")
 
-    nome = st.text_input("Nome Completo", proprietario_selecionado['Nome Completo'], key="nome_proprietario")
-    email = st.text_input("Email", proprietario_selecionado['Email'], key="email_proprietario")
-    telefone = st.text_input("Telefone", proprietario_selecionado['Telefone'], key="telefone_proprietario")
-    documento = st.text_input("Documento", proprietario_selecionado['Documento'], key="documento_proprietario")
+    nome = st.text_input("Nome Completo", valor_texto(proprietario_selecionado['Nome Completo']), key="nome_proprietario")
+    email = st.text_input("Email", valor_texto(proprietario_selecionado['Email']), key="email_proprietario")
+    telefone = st.text_input("Telefone", valor_texto(proprietario_selecionado['Telefone']), key="telefone_proprietario")
+    documento = st.text_input("Documento", valor_texto(proprietario_selecionado['Documento']), key="documento_proprietario")
+    repasse_atual = proprietario_selecionado.get('Repasse (%)')
+    repasse = st.number_input("Repasse (%)", min_value=0.0, max_value=100.0, step=0.5,
+                              value=float(repasse_atual) if pd.notna(repasse_atual) else 0.0, key="repasse_proprietario")
 
     if st.button("Salvar Alterações no Proprietário", key="salvar_alteracoes_proprietario"):
-        reservas.atualizar_proprietario(id_proprietario, nome, email, telefone, documento)
-        st.success("Proprietário atualizado com sucesso!")
+        try:
+            reservas.atualizar_proprietario(id_proprietario, nome, email, telefone, documento, repasse,
+                                            versao_esperada=base.get('Versão'), base=base)
+            st.success("Proprietário atualizado com sucesso!")
+        except ConflitoVersaoError as e:
+            st.error(str(e))
+        encerrar_edicao("proprietario_edit")
 
 # Mapeamento das páginas
 pages = {
     "Dashboard Home": lambda: dashboard_home(reservas),
     "Relatórios": lambda: relatorios(reservas),
+    "Análises": lambda: analises(reservas),
     "Gestão de Reservas": lambda: gestao_reservas(reservas),
+    "Importar Reservas": lambda: importar_reservas(reservas),
     "Gestão de Parceiros": lambda: gestao_parceiros(reservas),
     "Gestão de Proprietários": lambda: gestao_proprietarios(reservas),
+    "Administração": lambda: administracao(reservas),
 }
 
 # Criação do seletor de páginas na barra lateral
 st.sidebar.title("Navegação")
-selected_page = st.sidebar.selectbox("Escolha uma página", list(pages.keys()))
+# ?pagina=<nome> abre direto na página (o perfil_inicializacao.py usa isso para medir cada uma a frio)
+nomes_paginas = list(pages.keys())
+pagina_pedida = st.query_params.get("pagina")
+selected_page = st.sidebar.selectbox("Escolha uma página", nomes_paginas,
+                                     index=nomes_paginas.index(pagina_pedida) if pagina_pedida in nomes_paginas else 0)
+
+# Quem assina as alterações feitas nesta sessão no log de eventos
+definir_usuario(st.sidebar.text_input("Usuário", key="usuario_sessao").strip())
 
-# Inicialização do objeto de gerenciamento de reservas
+# Obtém o objeto de gerenciamento de reservas compartilhado entre as reexecuções do script; as tabelas
+# só são lidas quando a página as consulta
 current_dir = os.path.dirname(os.path.abspath(__file__))
 reservas_path = os.path.join(current_dir, "reservas.xlsx")
 parceiros_path = os.path.join(current_dir, "parceiros.xlsx")
 proprietarios_path = os.path.join(current_dir, "proprietarios.xlsx")
-reservas = GerenciamentoReservas(reservas_path, parceiros_path, proprietarios_path)
+reservas = obter_gerenciador(reservas_path, parceiros_path, proprietarios_path)
 
 # Chamada da função correspondente à página selecionada
-pages[selected_page]()
+with renderizacao(selected_page, inicio_execucao, reservas):
+    pages[selected_page]()
@@ -0,0 +1,933 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import snapshot
+from concorrencia import trava_arquivo
+from instrumentacao import log, medir
+from esquema import aplicar_esquema, atribuir_celula, colunas_do_tipo
+from recorrencia import expandir
+
+# Tabelas gerenciadas por GerenciamentoReservas
+TABELAS = ('reservas', 'parceiros', 'proprietarios')
+
+# Colunas gravadas como data mesmo quando o DataFrame as traz como objeto
+COLUNAS_DATA = tuple(colunas_do_tipo('reservas', 'data'))
+
+# Formato único das datas no SQLite: com isoformat() umas saíam com fração de segundo e outras sem
+FORMATO_DATA_SQL = '%Y-%m-%d %H:%M:%S.%f'
+
+# Até quantas linhas uma entrada do journal é lida linha a linha (acima disso, por um único df.loc)
+LINHAS_LEITURA_CELULA = 20
+
+# Coluna com o id global da reserva nas planilhas de partição e o manifesto que lista as partições
+COLUNA_ID_PARTICAO = 'id'
+MANIFESTO_PARTICOES = '_particoes.json'
+
+# Índices criados no SQLite para acelerar as consultas por apartamento e período
+INDICES_SQLITE = {
+    'reservas': {
+        'idx_reservas_apartamento': ['Número do apartamento'],
+        'idx_reservas_entrada': ['Data de entrada'],
+        'idx_reservas_saida': ['Data de saída'],
+    },
+}
+
+
+def assinatura_arquivo(file_path):
+    """Retorna (mtime, tamanho) do arquivo, ou None se ele não existir."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def ler_excel(file_path):
+    """Carrega dados de uma planilha Excel e retorna um DataFrame."""
+    try:
+        with medir('ler_excel') as medicao:
+            df = pd.read_excel(file_path)
+            medicao['linhas'] = len(df)
+        log.debug("Colunas carregadas de %s: %s", file_path, df.columns.tolist())
+        return df
+    except FileNotFoundError:
+        log.error("Arquivo '%s' não encontrado.", file_path)
+        return pd.DataFrame()
+    except Exception as e:
+        log.error("Erro ao carregar '%s': %s", file_path, e)
+        return pd.DataFrame()
+
+
+def gravar_excel_atomico(df, file_path):
+    """Grava a planilha em um arquivo temporário na mesma pasta e o coloca no lugar com os.replace.
+
+    Quem lê a planilha ao mesmo tempo (outro processo, o Excel) vê a versão anterior inteira ou a nova
+    inteira, nunca um arquivo pela metade.
+    """
+    base, extensao = os.path.splitext(file_path)
+    temporario = f"{base}.tmp-{os.getpid()}-{threading.get_ident()}{extensao}"
+    try:
+        with medir('gravar_excel') as medicao:
+            df.to_excel(temporario, index=False)
+            with open(temporario, 'rb+') as arquivo:
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, file_path)
+            medicao['linhas'] = len(df)
+            medicao['bytes'] = os.path.getsize(file_path)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def escrever_excel(df, file_path):
+    """Salva DataFrames no formato Excel."""
+    try:
+        gravar_excel_atomico(df, file_path)
+        log.info("Arquivo salvo em %s (%d linhas)", file_path, len(df))
+    except Exception as e:
+        log.error("Erro ao salvar arquivo Excel: %s", e)
+
+
+class ArmazenamentoExcel:
+    """Guarda cada tabela em uma planilha Excel própria (formato original do projeto).
+
+    Toda alteração regrava a planilha inteira, então o custo de uma edição cresce com o tamanho da tabela.
+    Com o pyarrow instalado, cada planilha ganha um snapshot colunar ao lado (reservas.xlsx -> reservas.arrow)
+    com tipos explícitos; a leitura usa o snapshot sempre que ele foi gerado a partir da versão atual da
+    planilha, e a planilha continua sendo o arquivo que as pessoas abrem e editam.
+    """
+
+    def __init__(self, caminhos, formato_snapshot='arrow'):
+        # caminhos: {'reservas': ..., 'parceiros': ..., 'proprietarios': ...}
+        self.caminhos = dict(caminhos)
+        # 'arrow' (Arrow IPC, lido por mapeamento de memória), 'parquet' ou None para desativar
+        if formato_snapshot is not None and not snapshot.snapshots_disponiveis():
+            formato_snapshot = None
+        self.formato_snapshot = formato_snapshot
+
+    def assinatura(self, tabela):
+        return assinatura_arquivo(self.caminhos[tabela])
+
+    def bloquear(self, tabela):
+        """Trava exclusiva, entre processos, da planilha `tabela` (arquivo reservas.xlsx.lock ao lado dela)."""
+        return trava_arquivo(self.caminhos[tabela] + '.lock')
+
+    def carregar(self, tabela):
+        caminho = self.caminhos[tabela]
+        if self.formato_snapshot is None:
+            return ler_excel(caminho)
+
+        origem = self.assinatura(tabela)
+        caminho_snapshot = snapshot.caminho_snapshot(caminho, self.formato_snapshot)
+        df = snapshot.carregar_snapshot(caminho_snapshot, self.formato_snapshot, origem)
+        if df is not None:
+            log.debug("Colunas carregadas de %s: %s", caminho_snapshot, df.columns.tolist())
+            return df
+
+        df = ler_excel(caminho)
+        if origem is not None and not df.empty:
+            self._gravar_snapshot(tabela, df, origem)
+        return df
+
+    def salvar(self, tabela, df):
+        # Diferente de escrever_excel, deixa o erro subir para que quem chamou saiba que nada foi gravado
+        gravar_excel_atomico(df, self.caminhos[tabela])
+        log.info("Arquivo salvo em %s (%d linhas)", self.caminhos[tabela], len(df))
+        if self.formato_snapshot is not None:
+            self._gravar_snapshot(tabela, df, self.assinatura(tabela))
+
+    def _gravar_snapshot(self, tabela, df, origem):
+        caminho_snapshot = snapshot.caminho_snapshot(self.caminhos[tabela], self.formato_snapshot)
+        try:
+            snapshot.salvar_snapshot(df, caminho_snapshot, self.formato_snapshot, origem, tabela)
+        except Exception as e:
+            # O snapshot é só um acelerador: sem ele a próxima leitura volta para a planilha
+            log.warning("Não foi possível gravar o snapshot '%s': %s", caminho_snapshot, e)
+
+    def inserir(self, tabela, df, indices):
+        """Persiste as linhas novas `indices` de `df` (no Excel, regrava a planilha)."""
+        self.salvar(tabela, df)
+
+    def atualizar(self, tabela, df, indices):
+        """Persiste as linhas alteradas `indices` de `df` (no Excel, regrava a planilha)."""
+        self.salvar(tabela, df)
+
+
+class ArmazenamentoSQLite:
+    """Guarda as tabelas em um banco SQLite embutido.
+
+    Cada inclusão ou alteração é um INSERT/UPDATE das linhas afetadas dentro de uma transação, então o custo
+    de salvar não cresce com o histórico. O índice do DataFrame é gravado na coluna `id`.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(db_path, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("CREATE TABLE IF NOT EXISTS _versoes (tabela TEXT PRIMARY KEY, versao INTEGER NOT NULL)")
+        self._con.commit()
+
+    def fechar(self):
+        with self._lock:
+            self._con.close()
+
+    def assinatura(self, tabela):
+        with self._lock:
+            linha = self._con.execute("SELECT versao FROM _versoes WHERE tabela = ?", (tabela,)).fetchone()
+        return linha[0] if linha else None
+
+    def bloquear(self, tabela):
+        """Trava exclusiva, entre processos, da tabela `tabela` (arquivo <banco>.<tabela>.lock).
+
+        As transações do SQLite já isolam cada gravação; a trava cobre a leitura-conferência-gravação
+        feita por GerenciamentoReservas em volta delas.
+        """
+        return trava_arquivo(f"{self.db_path}.{tabela}.lock")
+
+    def carregar(self, tabela):
+        with self._lock:
+            colunas = self._colunas(tabela)
+            if not colunas:
+                log.warning("Tabela '%s' não encontrada em %s.", tabela, self.db_path)
+                return pd.DataFrame()
+            df = pd.read_sql_query(f'SELECT * FROM {_q(tabela)} ORDER BY id', self._con, index_col='id')
+        df.index.name = None
+        for coluna, tipo in colunas.items():
+            if tipo == 'TIMESTAMP' and coluna in df.columns:
+                # ISO8601 aceita também as datas gravadas por isoformat() (com e sem fração de segundo)
+                df[coluna] = pd.to_datetime(df[coluna], format='ISO8601')
+        log.debug("Colunas carregadas de %s:%s: %s", self.db_path, tabela, df.columns.tolist())
+        return df
+
+    def salvar(self, tabela, df):
+        """Substitui o conteúdo inteiro da tabela (usado na importação)."""
+        with self._lock, self._con:
+            self._con.execute(f"DROP TABLE IF EXISTS {_q(tabela)}")
+            self._garantir_tabela(tabela, df)
+            self._executar_insercao(tabela, df, df.index)
+            self._incrementar_versao(tabela)
+
+    def inserir(self, tabela, df, indices):
+        with medir('sqlite_inserir', tabela) as medicao, self._lock, self._con:
+            self._garantir_tabela(tabela, df)
+            self._executar_insercao(tabela, df, indices)
+            self._incrementar_versao(tabela)
+            medicao['linhas'] = len(indices)
+
+    def atualizar(self, tabela, df, indices):
+        with medir('sqlite_atualizar', tabela) as medicao, self._lock, self._con:
+            medicao['linhas'] = len(indices)
+            self._garantir_tabela(tabela, df)
+            colunas = list(df.columns)
+            atribuicoes = ", ".join(f"{_q(c)} = ?" for c in colunas)
+            sql = f"UPDATE {_q(tabela)} SET {atribuicoes} WHERE id = ?"
+            linhas = df.loc[list(indices), colunas]
+            self._con.executemany(sql, [
+                [_valor_sql(v) for v in valores] + [int(indice)]
+                for indice, valores in zip(linhas.index, linhas.itertuples(index=False, name=None))
+            ])
+            self._incrementar_versao(tabela)
+
+    def _executar_insercao(self, tabela, df, indices):
+        colunas = list(df.columns)
+        marcadores = ", ".join("?" for _ in range(len(colunas) + 1))
+        nomes = ", ".join(['id'] + [_q(c) for c in colunas])
+        sql = f"INSERT INTO {_q(tabela)} ({nomes}) VALUES ({marcadores})"
+        linhas = df.loc[list(indices), colunas]
+        self._con.executemany(sql, [
+            [int(indice)] + [_valor_sql(v) for v in valores]
+            for indice, valores in zip(linhas.index, linhas.itertuples(index=False, name=None))
+        ])
+
+    def _colunas(self, tabela):
+        """Retorna {coluna: tipo declarado} da tabela, sem a coluna id."""
+        info = self._con.execute(f"PRAGMA table_info({_q(tabela)})").fetchall()
+        return {nome: tipo for _, nome, tipo, *_ in info if nome != 'id'}
+
+    def _garantir_tabela(self, tabela, df):
+        """Cria a tabela (e seus índices) ou acrescenta as colunas que o DataFrame ganhou desde a criação."""
+        existentes = self._colunas(tabela)
+        if not existentes:
+            definicoes = ", ".join(f"{_q(c)} {_tipo_sql(df, c)}" for c in df.columns)
+            separador = ", " if definicoes else ""
+            self._con.execute(f"CREATE TABLE {_q(tabela)} (id INTEGER PRIMARY KEY{separador}{definicoes})")
+        else:
+            for coluna in df.columns:
+                if coluna not in existentes:
+                    self._con.execute(f"ALTER TABLE {_q(tabela)} ADD COLUMN {_q(coluna)} {_tipo_sql(df, coluna)}")
+        for nome, colunas in INDICES_SQLITE.get(tabela, {}).items():
+            if all(c in df.columns for c in colunas):
+                self._con.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_q(nome)} ON {_q(tabela)} ({', '.join(_q(c) for c in colunas)})"
+                )
+
+    def _incrementar_versao(self, tabela):
+        self._con.execute(
+            "INSERT INTO _versoes (tabela, versao) VALUES (?, 1) "
+            "ON CONFLICT(tabela) DO UPDATE SET versao = versao + 1",
+            (tabela,)
+        )
+
+
+class ArmazenamentoJournal:
+    """Envolve outro armazenamento (normalmente Excel) com um journal de escrita antecipada.
+
+    Cada inclusão/alteração vira uma linha JSON acrescentada ao journal e sincronizada com fsync, e a chamada
+    retorna sem regravar a planilha. Uma thread em segundo plano compacta o journal na tabela do armazenamento
+    interno a cada `intervalo` segundos ou quando há `max_entradas` pendentes. Ao carregar uma tabela, as
+    entradas ainda não compactadas são reaplicadas sobre os dados lidos.
+
+    O flusher nunca lê o DataFrame do gerenciador: ele guarda a sua própria cópia de cada tabela (feita ao
+    carregar ou na regravação completa) e reaplica sobre ela as entradas pendentes antes de gravar. Assim
+    a gravação de uma inclusão/alteração só serializa as linhas afetadas e faz o fsync, sem custo que cresça
+    com a tabela (veja a operação 'journal_registrar' nas métricas).
+    """
+
+    def __init__(self, interno, journal_path, intervalo=5.0, max_entradas=50):
+        self.interno = interno
+        self.journal_path = journal_path
+        self.intervalo = intervalo
+        self.max_entradas = max_entradas
+
+        self._cond = threading.Condition()
+        self._entradas = []  # [(seq, tabela, linha JSON)] ainda não compactadas no armazenamento interno
+        self._seq = 0
+        self._tabelas = {}  # Cópia própria de cada tabela, usada e alterada só pelo flush
+        self._aplicadas = {}  # tabela -> maior seq já contido em self._tabelas[tabela]
+        self._flush_lock = threading.Lock()  # Um flush por vez: é ele que altera as cópias
+        self._sujas = set()
+        self._base = {}  # assinatura do armazenamento interno gravada/lida por este processo
+        self._versao = {}
+        self._ultimo_flush = time.monotonic()
+        self._fechado = False
+
+        self._ler_journal()
+        self._arquivo = open(self.journal_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._executar_flusher, name='journal-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.fechar)
+
+    def assinatura(self, tabela):
+        # Gravações feitas pelo próprio flusher não contam como alteração externa
+        atual = self.interno.assinatura(tabela)
+        self._base.setdefault(tabela, atual)
+        if atual == self._base[tabela]:
+            return ('local', self._versao.get(tabela, 0))
+        return ('externo', atual)
+
+    def bloquear(self, tabela):
+        """Trava do armazenamento interno.
+
+        As entradas ainda no journal só são vistas pelo processo que as escreveu: com vários processos
+        gravando, use o Excel ou o SQLite diretamente.
+        """
+        return self.interno.bloquear(tabela)
+
+    def carregar(self, tabela):
+        # Com a trava do flush, a leitura não pega a planilha já gravada e as entradas ainda não descartadas
+        with self._flush_lock:
+            self._base[tabela] = self.interno.assinatura(tabela)
+            # Nos tipos do esquema, como no gerenciador: as entradas trazem valores já nesses tipos
+            df = aplicar_esquema(self.interno.carregar(tabela), tabela)
+            with self._cond:
+                # Cópia lida uma vez por carregamento; as entradas pendentes entram nela só no flush
+                self._tabelas[tabela] = df.copy()
+                self._aplicadas[tabela] = 0
+                entradas = [json.loads(linha) for _, t, linha in self._entradas if t == tabela]
+                for entrada in entradas:
+                    df = _aplicar_entrada(df, entrada)
+                if entradas:
+                    log.info("%d entradas do journal reaplicadas na tabela '%s'", len(entradas), tabela)
+                    self._sujas.add(tabela)
+                    self._cond.notify()
+        return df
+
+    def salvar(self, tabela, df):
+        # Regravação completa: vai direto para o armazenamento interno, cobrindo o que estava pendente
+        copia = df.copy()
+        with self._cond:
+            self._tabelas[tabela] = copia
+            self._aplicadas[tabela] = self._seq
+            self._sujas.add(tabela)
+            self._versao[tabela] = self._versao.get(tabela, 0) + 1
+        self.flush()
+
+    def inserir(self, tabela, df, indices):
+        with self._cond:
+            self._registrar(tabela, df, indices)
+
+    def atualizar(self, tabela, df, indices):
+        with self._cond:
+            self._registrar(tabela, df, indices)
+
+    def flush(self):
+        """Compacta imediatamente as entradas pendentes no armazenamento interno."""
+        with self._flush_lock:
+            with self._cond:
+                if not self._sujas:
+                    return
+                seq_limite = self._seq
+                pendentes = {
+                    tabela: (self._tabelas.get(tabela), [
+                        linha for seq, t, linha in self._entradas
+                        if t == tabela and self._aplicadas.get(tabela, 0) < seq <= seq_limite
+                    ])
+                    for tabela in self._sujas
+                }
+                self._sujas.clear()
+                self._ultimo_flush = time.monotonic()
+
+            gravadas = []
+            for tabela, (df, linhas) in pendentes.items():
+                try:
+                    with self.interno.bloquear(tabela):
+                        if df is None:
+                            # Tabela nunca carregada por este processo: a base é a do armazenamento interno
+                            df = aplicar_esquema(self.interno.carregar(tabela), tabela)
+                        for linha in linhas:
+                            df = _aplicar_entrada(df, json.loads(linha))
+                        self.interno.salvar(tabela, df)
+                except Exception as e:
+                    log.error("Erro ao compactar o journal na tabela '%s': %s", tabela, e)
+                    # A cópia pode ter recebido parte das entradas; reaplicá-las na próxima tentativa não muda
+                    # nada, porque cada entrada traz as linhas inteiras
+                    with self._cond:
+                        self._sujas.add(tabela)
+                    continue
+                self._base[tabela] = self.interno.assinatura(tabela)
+                gravadas.append(tabela)
+                with self._cond:
+                    # Uma regravação completa feita no meio do flush já trouxe a sua própria cópia
+                    if self._tabelas.get(tabela) is pendentes[tabela][0]:
+                        self._tabelas[tabela] = df
+                        self._aplicadas[tabela] = seq_limite
+
+            with self._cond:
+                self._entradas = [e for e in self._entradas if e[0] > seq_limite or e[1] not in gravadas]
+                self._reescrever_journal()
+
+    def fechar(self):
+        """Para o flusher, compacta o que estiver pendente e fecha o journal."""
+        with self._cond:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        with self._cond:
+            self._arquivo.close()
+
+    def _registrar(self, tabela, df, indices):
+        """Acrescenta uma entrada ao journal (com fsync). Deve ser chamado com self._cond adquirido.
+
+        Só as linhas `indices` de `df` são lidas, enquanto o gerenciador ainda segura a trava dele; o DataFrame
+        não é guardado (o flush reaplica a entrada sobre a cópia própria da tabela).
+        """
+        self._seq += 1
+        if len(indices) <= LINHAS_LEITURA_CELULA:
+            # Poucas linhas (o caso de uma edição na interface): uma linha por vez evita montar um DataFrame
+            linhas = [(indice, df.iloc[df.index.get_loc(indice)].to_dict()) for indice in indices]
+        else:
+            selecionadas = df.loc[list(indices)]
+            linhas = zip(selecionadas.index, selecionadas.to_dict('records'))
+        entrada = {
+            'seq': self._seq,
+            'tabela': tabela,
+            'linhas': [
+                {'indice': _valor_json(indice), 'valores': {str(c): _valor_json(v) for c, v in valores.items()}}
+                for indice, valores in linhas
+            ],
+        }
+        linha_json = json.dumps(entrada, ensure_ascii=False)
+        with medir('journal_registrar', tabela) as medicao:
+            self._arquivo.write(linha_json + '\n')
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            medicao['linhas'] = len(entrada['linhas'])
+            medicao['bytes'] = len(linha_json.encode('utf-8')) + 1
+
+        self._entradas.append((self._seq, tabela, linha_json))
+        self._sujas.add(tabela)
+        self._versao[tabela] = self._versao.get(tabela, 0) + 1
+        if len(self._entradas) >= self.max_entradas:
+            self._cond.notify()
+
+    def _ler_journal(self):
+        """Lê as entradas deixadas por uma execução anterior que não chegaram a ser compactadas."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    # Linha incompleta (queda durante a escrita): nunca foi confirmada a quem chamou
+                    log.warning("Linha inválida ignorada no journal %s", self.journal_path)
+                    continue
+                self._entradas.append((entrada['seq'], entrada['tabela'], linha))
+                self._seq = max(self._seq, entrada['seq'])
+
+    def _reescrever_journal(self):
+        """Substitui o journal só pelas entradas ainda pendentes. Deve ser chamado com self._cond adquirido."""
+        temporario = self.journal_path + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            for _, _, linha in self._entradas:
+                arquivo.write(linha + '\n')
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        self._arquivo.close()
+        os.replace(temporario, self.journal_path)
+        self._arquivo = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _executar_flusher(self):
+        while True:
+            with self._cond:
+                if self._fechado:
+                    return
+                self._cond.wait(timeout=self.intervalo)
+                if self._fechado:
+                    return
+                vencido = time.monotonic() - self._ultimo_flush >= self.intervalo
+                cheio = len(self._entradas) >= self.max_entradas
+                if not self._sujas or not (vencido or cheio):
+                    continue
+            self.flush()
+
+class ArmazenamentoParticionado:
+    """Guarda as reservas em uma planilha por condomínio (e, opcionalmente, por ano de entrada).
+
+    Parceiros e proprietários continuam em planilhas únicas (ArmazenamentoExcel). As partições ficam em
+    `pasta` (ex.: Condominio_1-1a2b3c4d.xlsx ou Condominio_1-1a2b3c4d/2024.xlsx), cada uma com a coluna
+    `id`: o id da reserva é global e não muda quando ela troca de partição. O manifesto _particoes.json
+    lista as partições com o condomínio, o ano, o número de linhas, o maior id e o ano da última saída de
+    cada uma (contando as ocorrências das reservas recorrentes).
+
+    - `condominios` e `anos` restringem o escopo: só essas partições são lidas (em paralelo) e vigiadas;
+    - uma inclusão ou alteração regrava apenas as partições das linhas afetadas (a de origem e a de destino,
+      se a reserva mudou de condomínio ou de ano); uma partição fora do escopo é lida, mesclada e regravada;
+    - mapear_particoes() aplica uma função a cada partição em paralelo, para visões de todo o portfólio
+      sem carregá-lo no gerenciador.
+    """
+
+    def __init__(self, pasta, caminhos, por_ano=False, condominios=None, anos=None, formato_snapshot='arrow',
+                 trabalhadores=None):
+        self.pasta = pasta
+        self.por_ano = por_ano
+        self.condominios = None if condominios is None else {str(c) for c in condominios}
+        self.anos = None if anos is None else {int(a) for a in anos}
+        if formato_snapshot is not None and not snapshot.snapshots_disponiveis():
+            formato_snapshot = None
+        self.formato_snapshot = formato_snapshot
+        self.trabalhadores = trabalhadores or min(8, os.cpu_count() or 1)
+        # Parceiros e proprietários não são particionados
+        self.outras = ArmazenamentoExcel({t: c for t, c in caminhos.items() if t != 'reservas'}, formato_snapshot)
+        # Ids de cada partição conhecida por inteiro (lida ou gravada por esta instância) e a partição de cada id
+        self._membros = {}
+        self._particao = {}
+        self._completas = set()
+        os.makedirs(pasta, exist_ok=True)
+
+    # Parceiros e proprietários vão direto para as planilhas únicas
+
+    def assinatura(self, tabela):
+        if tabela != 'reservas':
+            return self.outras.assinatura(tabela)
+        return tuple(sorted(
+            (relativo, assinatura_arquivo(os.path.join(self.pasta, relativo)))
+            for relativo, info in self._ler_manifesto().items() if self._no_escopo(info)
+        ))
+
+    def bloquear(self, tabela):
+        """Trava da tabela; as reservas têm uma única trava para todas as partições (reservas.lock na pasta)."""
+        if tabela != 'reservas':
+            return self.outras.bloquear(tabela)
+        return trava_arquivo(os.path.join(self.pasta, 'reservas.lock'))
+
+    def carregar(self, tabela):
+        if tabela != 'reservas':
+            return self.outras.carregar(tabela)
+        escopo = [relativo for relativo, info in self._ler_manifesto().items() if self._no_escopo(info)]
+        with medir('carregar_particoes', tabela) as medicao:
+            with ThreadPoolExecutor(max_workers=self.trabalhadores) as executor:
+                partes = list(executor.map(self._ler_particao, escopo))
+            self._membros = {relativo: set(parte.index) for relativo, parte in zip(escopo, partes)}
+            self._particao = {id_: relativo for relativo, ids in self._membros.items() for id_ in ids}
+            self._completas = set(escopo)
+            partes = [parte for parte in partes if not parte.empty]
+            df = pd.concat(partes).sort_index() if partes else pd.DataFrame()
+            medicao['linhas'] = len(df)
+        log.debug("%d partições de reservas carregadas de %s.", len(escopo), self.pasta)
+        return df
+
+    def salvar(self, tabela, df):
+        """Substitui as partições das linhas de `df` e apaga as do escopo que ficaram sem linhas."""
+        if tabela != 'reservas':
+            return self.outras.salvar(tabela, df)
+        manifesto = self._ler_manifesto()
+        grupos = self._grupos(df)
+        self._membros, self._particao = {}, {}
+        for (condominio, ano), ids in grupos.items():
+            relativo = self._relativo(condominio, ano)
+            self._membros[relativo] = set(ids)
+            self._particao.update(dict.fromkeys(ids, relativo))
+        vazias = {relativo for relativo, info in manifesto.items() if self._no_escopo(info)} - set(self._membros)
+        self._completas = set(self._membros) | vazias
+        self._gravar_particoes(df, self._completas, self._infos(grupos), manifesto)
+
+    def inserir(self, tabela, df, indices):
+        """Persiste as linhas novas `indices`, regravando só as partições delas."""
+        if tabela != 'reservas':
+            return self.outras.inserir(tabela, df, indices)
+        self._gravar_linhas(df, indices)
+
+    def atualizar(self, tabela, df, indices):
+        """Persiste as linhas alteradas `indices`, regravando só as partições de origem e de destino delas."""
+        if tabela != 'reservas':
+            return self.outras.atualizar(tabela, df, indices)
+        self._gravar_linhas(df, indices)
+
+    def proximo_id(self, tabela):
+        """Primeiro id livre das reservas em todas as partições, inclusive as fora do escopo carregado."""
+        if tabela != 'reservas':
+            return 0
+        maiores = [info['id_max'] for info in self._ler_manifesto().values() if info.get('id_max') is not None]
+        return max(maiores) + 1 if maiores else 0
+
+    def mapear_particoes(self, funcao, condominios=None, anos=None):
+        """Aplica `funcao(df_particao)` a cada partição escolhida, em paralelo, e retorna a lista de resultados.
+
+        Sem `condominios`/`anos`, percorre todas as partições da pasta (não só as do escopo). Com `anos`, entram
+        também as partições de anos anteriores cujas reservas (ou ocorrências delas) ainda ocupam algum deles.
+        """
+        condominios = None if condominios is None else {str(c) for c in condominios}
+        anos = None if anos is None else {int(a) for a in anos}
+        escolhidas = [relativo for relativo, info in self._ler_manifesto().items()
+                      if self._no_escopo(info, condominios, None) and (anos is None or self._alcanca(info, anos))]
+
+        def aplicar(relativo):
+            return funcao(self._ler_particao(relativo))
+
+        with ThreadPoolExecutor(max_workers=self.trabalhadores) as executor:
+            return list(executor.map(aplicar, escolhidas))
+
+    # Partições
+
+    def _no_escopo(self, info, condominios=False, anos=False):
+        condominios = self.condominios if condominios is False else condominios
+        anos = self.anos if anos is False else anos
+        if condominios is not None and info.get('condominio') not in condominios:
+            return False
+        if anos is not None and self.por_ano and info.get('ano') not in anos:
+            return False
+        return True
+
+    def _alcanca(self, info, anos):
+        """Indica se a partição tem alguma estadia em `anos`, do ano de entrada até o ano da última saída."""
+        if not self.por_ano:
+            return True
+        ano = info.get('ano')
+        if ano is None:
+            return False
+        # Manifestos gravados antes do 'ano_final' só conhecem o ano de entrada
+        ano_final = info.get('ano_final') or ano
+        return any(ano <= a <= ano_final for a in anos)
+
+    def _relativo(self, condominio, ano=None):
+        """Caminho da partição dentro da pasta: nome do condomínio legível + hash (nomes parecidos não colidem)."""
+        if condominio is None:
+            base = 'sem_condominio'
+        else:
+            legivel = re.sub(r'[^\w.-]+', '_', condominio).strip('_')[:40] or 'condominio'
+            base = f"{legivel}-{hashlib.sha1(condominio.encode('utf-8')).hexdigest()[:8]}"
+        if not self.por_ano:
+            return base + '.xlsx'
+        return os.path.join(base, f"{'sem_data' if ano is None else ano}.xlsx")
+
+    def _grupos(self, df):
+        """{(condomínio, ano): [ids]} das linhas de `df` (ano None sem particionamento por ano ou sem data)."""
+        if df.empty:
+            return {}
+        if 'Nome do Condomínio' in df.columns:
+            condominios = df['Nome do Condomínio'].astype(object)
+            condominios = condominios.where(condominios.notna(), None).map(lambda c: None if c is None else str(c))
+        else:
+            condominios = pd.Series(None, index=df.index, dtype=object)
+        if self.por_ano and 'Data de entrada' in df.columns:
+            anos = pd.to_datetime(df['Data de entrada'], errors='coerce').dt.year.astype('Int64')
+        else:
+            anos = pd.Series(pd.NA, index=df.index, dtype='Int64')
+        chaves = pd.DataFrame({'condominio': condominios.fillna('\0'), 'ano': anos.fillna(-1)}, index=df.index)
+        grupos = {}
+        for (condominio, ano), posicoes in chaves.groupby(['condominio', 'ano'], sort=False).indices.items():
+            chave = (None if condominio == '\0' else condominio, None if ano == -1 else int(ano))
+            grupos[chave] = df.index[posicoes].tolist()
+        return grupos
+
+    def _infos(self, grupos):
+        return {self._relativo(condominio, ano): (condominio, ano) for condominio, ano in grupos}
+
+    def _gravar_linhas(self, df, indices):
+        manifesto = self._ler_manifesto()
+        afetadas = set()
+        saidas = {}
+        grupos = self._grupos(df.loc[list(indices)])
+        for (condominio, ano), ids in grupos.items():
+            relativo = self._relativo(condominio, ano)
+            for id_ in ids:
+                anterior = self._particao.get(id_)
+                if anterior is not None and anterior != relativo:
+                    self._membros[anterior].discard(id_)
+                    saidas.setdefault(anterior, set()).add(id_)
+                    afetadas.add(anterior)
+                self._particao[id_] = relativo
+            self._membros.setdefault(relativo, set()).update(ids)
+            afetadas.add(relativo)
+        self._gravar_particoes(df, afetadas, self._infos(grupos), manifesto, saidas)
+
+    def _gravar_particoes(self, df, particoes, infos, manifesto, saidas=None):
+        with medir('gravar_particoes', 'reservas') as medicao:
+            for relativo in sorted(particoes):
+                ids = sorted(self._membros.get(relativo, ()))
+                linhas = df.loc[ids]
+                if relativo not in self._completas:
+                    # Partição fora do escopo: as linhas dela que não estão em memória vêm do disco
+                    em_disco = self._ler_particao(relativo) if relativo in manifesto else pd.DataFrame()
+                    if not em_disco.empty:
+                        descartar = set(ids) | (saidas or {}).get(relativo, set())
+                        em_disco = em_disco[~em_disco.index.isin(descartar)]
+                        linhas = pd.concat([em_disco, linhas]).sort_index()
+                caminho = os.path.join(self.pasta, relativo)
+                if linhas.empty:
+                    self._remover_particao(caminho)
+                    manifesto.pop(relativo, None)
+                    continue
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                self._excel(relativo).salvar('reservas', linhas.rename_axis(COLUNA_ID_PARTICAO).reset_index())
+                condominio, ano = infos.get(relativo) or (manifesto[relativo]['condominio'], manifesto[relativo]['ano'])
+                manifesto[relativo] = {'condominio': condominio, 'ano': ano, 'linhas': len(linhas),
+                                       'id_max': int(linhas.index.max()), 'ano_final': self._ano_final(linhas, ano)}
+                medicao['linhas'] += len(linhas)
+            self._gravar_manifesto(manifesto)
+
+    @staticmethod
+    def _ano_final(linhas, ano):
+        """Ano da última saída das linhas de uma partição, contando cada ocorrência das recorrentes."""
+        if ano is None or 'Data de saída' not in linhas.columns:
+            return ano
+        saidas = pd.to_datetime(expandir(linhas)['Data de saída'], errors='coerce')
+        return max(int(saidas.max().year), ano) if saidas.notna().any() else ano
+
+    def _excel(self, relativo):
+        return ArmazenamentoExcel({'reservas': os.path.join(self.pasta, relativo)}, self.formato_snapshot)
+
+    def _ler_particao(self, relativo):
+        df = self._excel(relativo).carregar('reservas')
+        if COLUNA_ID_PARTICAO in df.columns:
+            df = df.set_index(COLUNA_ID_PARTICAO)
+            df.index = df.index.astype(np.int64)
+            df.index.name = None
+        return df
+
+    def _remover_particao(self, caminho):
+        arquivos = [caminho]
+        if self.formato_snapshot is not None:
+            arquivos.append(snapshot.caminho_snapshot(caminho, self.formato_snapshot))
+        for arquivo in arquivos:
+            try:
+                os.remove(arquivo)
+            except FileNotFoundError:
+                pass
+
+    def _ler_manifesto(self):
+        try:
+            with open(os.path.join(self.pasta, MANIFESTO_PARTICOES), encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return {}
+
+    def _gravar_manifesto(self, manifesto):
+        caminho = os.path.join(self.pasta, MANIFESTO_PARTICOES)
+        temporario = f"{caminho}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+
+
+def particionar_reservas(reservas_path, pasta, por_ano=False, formato_snapshot='arrow'):
+    """Divide a planilha de reservas em partições por condomínio (e ano) dentro de `pasta`.
+
+    Os ids das reservas são as posições delas na planilha original.
+    """
+    particionado = ArmazenamentoParticionado(pasta, {'reservas': reservas_path}, por_ano=por_ano,
+                                             formato_snapshot=formato_snapshot)
+    df = ler_excel(reservas_path)
+    with particionado.bloquear('reservas'):
+        particionado.salvar('reservas', df)
+    log.info("%d reservas divididas em %d partições em %s", len(df), len(particionado._ler_manifesto()), pasta)
+
+
+def _valor_json(valor):
+    """Converte um valor do DataFrame para JSON, marcando datas para que voltem como Timestamp."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (pd.Timestamp, datetime, date)):
+        return {'$data': pd.Timestamp(valor).isoformat()}
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (int, float, str, bool)):
+        return valor
+    return str(valor)
+
+
+def _valor_de_json(valor):
+    if isinstance(valor, dict) and '$data' in valor:
+        return pd.Timestamp(valor['$data'])
+    return valor
+
+
+def _aplicar_entrada(df, entrada):
+    """Reaplica uma entrada do journal (inclusão ou alteração de linhas inteiras) sobre o DataFrame."""
+    tabela = entrada['tabela']
+    for linha in entrada['linhas']:
+        indice = linha['indice']
+        valores = {coluna: _valor_de_json(v) for coluna, v in linha['valores'].items()}
+        for coluna in valores:
+            if coluna not in df.columns:
+                df[coluna] = None
+        if indice in df.index:
+            for coluna, valor in valores.items():
+                atribuir_celula(df, indice, coluna, valor, tabela)
+        else:
+            nova = pd.DataFrame([valores], index=[indice])
+            df = pd.concat([df, nova]) if len(df) else nova
+    return df
+
+
+def _q(nome):
+    """Coloca um identificador entre aspas para o SQLite (os nomes de coluna têm espaços e acentos)."""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def _tipo_sql(df, coluna):
+    dtype = df[coluna].dtype
+    if coluna in COLUNAS_DATA or pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _valor_sql(valor):
+    """Converte um valor do DataFrame para um tipo aceito pelo sqlite3."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (pd.Timestamp, datetime, date)):
+        return pd.Timestamp(valor).strftime(FORMATO_DATA_SQL)
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (int, float, str, bytes)):
+        return valor
+    return str(valor)
+
+
+def importar_excel_para_sqlite(db_path, reservas_path, parceiros_path, proprietarios_path):
+    """Importa as três planilhas Excel para um banco SQLite, substituindo o conteúdo das tabelas."""
+    destino = ArmazenamentoSQLite(db_path)
+    origem = ArmazenamentoExcel({
+        'reservas': reservas_path,
+        'parceiros': parceiros_path,
+        'proprietarios': proprietarios_path,
+    })
+    try:
+        for tabela in TABELAS:
+            df = origem.carregar(tabela)
+            destino.salvar(tabela, df)
+            log.info("%d linhas importadas para a tabela '%s' em %s", len(df), tabela, db_path)
+    finally:
+        destino.fechar()
+
+
+def armazenamento_padrao(reservas_path, parceiros_path, proprietarios_path):
+    """Cria o armazenamento configurado pela variável de ambiente RESERVAS_ARMAZENAMENTO ('excel', 'sqlite'
+    ou 'particionado').
+
+    No modo SQLite o banco fica em RESERVAS_SQLITE_PATH (padrão: reservas.db ao lado de reservas.xlsx) e,
+    se ainda não existir, é criado a partir das planilhas. No modo Excel, RESERVAS_SNAPSHOT escolhe o formato
+    do snapshot colunar ('arrow', 'parquet' ou 'nenhum') e RESERVAS_JOURNAL=1 ativa o journal de escrita
+    antecipada (ver ArmazenamentoJournal). No modo particionado as reservas ficam em RESERVAS_PARTICOES_PASTA
+    (padrão: pasta reservas_particoes ao lado de reservas.xlsx, criada a partir da planilha se não existir),
+    RESERVAS_PARTICIONAR_POR_ANO=1 divide também por ano e RESERVAS_CONDOMINIOS / RESERVAS_ANOS (listas
+    separadas por vírgula) limitam as partições carregadas (ver ArmazenamentoParticionado).
+    """
+    tipo = os.environ.get('RESERVAS_ARMAZENAMENTO', 'excel').lower()
+    if tipo == 'sqlite':
+        db_path = os.environ.get('RESERVAS_SQLITE_PATH') or os.path.join(os.path.dirname(reservas_path), 'reservas.db')
+        if not os.path.exists(db_path):
+            importar_excel_para_sqlite(db_path, reservas_path, parceiros_path, proprietarios_path)
+        return ArmazenamentoSQLite(db_path)
+    formato_snapshot = os.environ.get('RESERVAS_SNAPSHOT', 'arrow').lower()
+    if formato_snapshot not in snapshot.FORMATOS:
+        formato_snapshot = None
+    if tipo == 'particionado':
+        pasta = (os.environ.get('RESERVAS_PARTICOES_PASTA')
+                 or os.path.join(os.path.dirname(reservas_path), 'reservas_particoes'))
+        por_ano = os.environ.get('RESERVAS_PARTICIONAR_POR_ANO', '0').lower() in ('1', 'true', 'sim')
+        if not os.path.exists(os.path.join(pasta, MANIFESTO_PARTICOES)):
+            particionar_reservas(reservas_path, pasta, por_ano, formato_snapshot)
+        condominios = os.environ.get('RESERVAS_CONDOMINIOS')
+        anos = os.environ.get('RESERVAS_ANOS')
+        return ArmazenamentoParticionado(
+            pasta,
+            {'reservas': reservas_path, 'parceiros': parceiros_path, 'proprietarios': proprietarios_path},
+            por_ano=por_ano,
+            condominios=[c.strip() for c in condominios.split(',') if c.strip()] if condominios else None,
+            anos=[int(a) for a in anos.split(',') if a.strip()] if anos else None,
+            formato_snapshot=formato_snapshot,
+        )
+    if tipo != 'excel':
+        log.warning("Armazenamento '%s' desconhecido. Usando Excel.", tipo)
+    excel = ArmazenamentoExcel({
+        'reservas': reservas_path,
+        'parceiros': parceiros_path,
+        'proprietarios': proprietarios_path,
+    }, formato_snapshot=formato_snapshot)
+    if os.environ.get('RESERVAS_JOURNAL', '0').lower() in ('1', 'true', 'sim'):
+        return ArmazenamentoJournal(
+            excel,
+            os.path.join(os.path.dirname(reservas_path), 'reservas.journal'),
+            intervalo=float(os.environ.get('RESERVAS_JOURNAL_INTERVALO', 5.0)),
+            max_entradas=int(os.environ.get('RESERVAS_JOURNAL_MAX_ENTRADAS', 50)),
+        )
+    return excel
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa as planilhas de reservas para um banco SQLite.")
+    parser.add_argument("db_path", help="Arquivo SQLite de destino")
+    parser.add_argument("--reservas", default="reservas.xlsx")
+    parser.add_argument("--parceiros", default="parceiros.xlsx")
+    parser.add_argument("--proprietarios", default="proprietarios.xlsx")
+    args = parser.parse_args()
+    importar_excel_para_sqlite(args.db_path, args.reservas, args.parceiros, args.proprietarios)
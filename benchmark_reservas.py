@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import ArmazenamentoExcel, ArmazenamentoSQLite, importar_excel_para_sqlite
+from gerador_dados import gerar_planilhas
+from gerenciamento_reservas import TABELAS, GerenciamentoReservas
+from instrumentacao import configurar_log
+
+# Tamanhos (linhas de reservas) medidos quando nada é informado na linha de comando
+TAMANHOS_PADRAO = (1000, 10000, 100000, 1000000)
+
+# Variação máxima tolerada por comparar() antes de apontar uma regressão
+TOLERANCIA_REGRESSAO = 0.20
+
+# Armazenamentos que o benchmark sabe montar (--armazenamento)
+ARMAZENAMENTOS = ('excel', 'sqlite')
+
+
+def medir(funcao, repeticoes=3, memoria=True):
+    """Executa `funcao` `repeticoes` vezes e retorna os tempos (s) e o pico de memória alocada (bytes).
+
+    O pico vem do tracemalloc, ligado só na primeira execução para não inflar o tempo das demais.
+    """
+    tempos = []
+    pico = None
+    for repeticao in range(repeticoes):
+        rastrear = memoria and repeticao == 0
+        if rastrear:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if rastrear:
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    # Com o tracemalloc ligado a primeira execução fica mais lenta: ela só conta se for a única
+    validos = tempos[1:] if memoria and len(tempos) > 1 else tempos
+    return validos, pico
+
+
+def criar_armazenamento(tipo, caminhos):
+    """Armazenamento `tipo` sobre as planilhas geradas.
+
+    Montado aqui, e não por armazenamento_padrao: as variáveis RESERVAS_* do ambiente não valem para o
+    benchmark (um journal ligado por elas, por exemplo, deixaria threads de flush rodando entre as medições).
+    """
+    if tipo == 'sqlite':
+        db_path = os.path.join(os.path.dirname(caminhos[0]), 'reservas.db')
+        importar_excel_para_sqlite(db_path, *caminhos)
+        return ArmazenamentoSQLite(db_path)
+    return ArmazenamentoExcel(dict(zip(TABELAS, caminhos)))
+
+
+def novo_gerenciador(caminhos, armazenamento):
+    # Sem log de eventos: as inclusões e alterações fictícias não podem ir para o histórico de auditoria real
+    return GerenciamentoReservas(*caminhos, armazenamento=armazenamento, eventos=False)
+
+
+def _consumir(gerador):
+    for _ in gerador:
+        pass
+
+
+def operacoes(gerenciador, caminhos, rng):
+    """Operações medidas, como {nome: função sem argumentos} sobre um gerenciador já carregado."""
+    df = gerenciador.df_reservas
+    inicio_ano = df['Data de entrada'].min().normalize()
+    fim_ano = inicio_ano + timedelta(days=364)
+    ids = df.index.to_numpy()
+    nova_data = [datetime(2100, 1, 1)]
+
+    def adicionar():
+        # Datas distantes em um apartamento que não existe: nunca conflita com as reservas geradas
+        nova_data[0] += timedelta(days=10)
+        gerenciador.adicionar_reserva('Benchmark', nova_data[0], nova_data[0] + timedelta(days=3), 9999,
+                                      1000.0, 'Condomínio Benchmark', 'Z', 'Rua Benchmark', 'Paga')
+
+    def atualizar():
+        id_reserva = int(rng.choice(ids))
+        r = gerenciador.df_reservas.loc[id_reserva]
+        gerenciador.atualizar_reserva(id_reserva, r['Nome do hóspede'], r['Data de entrada'], r['Data de saída'],
+                                      r['Número do apartamento'], r['Valor da hospedagem'] + 1,
+                                      r['Nome do Condomínio'], r['Bloco'], r['Endereço'], r['Status'],
+                                      r['Pago'], r['A pagar'])
+
+    return {
+        'load_data': lambda: gerenciador.load_data(caminhos[0]),
+        'carregar_gerenciador': lambda: novo_gerenciador(caminhos, gerenciador.armazenamento).carregar(),
+        'calcular_totais_semanal': gerenciador.calcular_totais_semanal,
+        'calcular_totais_ano': lambda: gerenciador.calcular_totais(inicio_ano, fim_ano),
+        'filtrar_reservas': lambda: gerenciador.filtrar_reservas(nome='silva', entrada_de=inicio_ano,
+                                                                 entrada_ate=fim_ano),
+        'gerar_relatorio_parceiros': gerenciador.gerar_relatorio_parceiros,
+        'adicionar_reserva': adicionar,
+        'atualizar_reserva': atualizar,
+        'exportar_csv': lambda: _consumir(gerenciador.exportar_reservas('csv')),
+        'exportar_xlsx': lambda: _consumir(gerenciador.exportar_reservas('xlsx')),
+    }
+
+
+def executar(tamanhos=TAMANHOS_PADRAO, selecionadas=None, repeticoes=3, memoria=True, pasta=None, semente=0,
+             armazenamento='excel'):
+    """Gera planilhas de cada tamanho, mede as operações e retorna uma lista de resultados (um dict por medição).
+
+    `armazenamento` ('excel' ou 'sqlite') é o armazenamento do gerenciador medido.
+    """
+    resultados = []
+    rng = np.random.default_rng(semente)
+    with tempfile.TemporaryDirectory() as temporaria:
+        for linhas in tamanhos:
+            destino = os.path.join(pasta or temporaria, f'{linhas}')
+            print(f"Gerando {linhas} reservas em {destino}...")
+            caminhos = gerar_planilhas(destino, linhas, semente=semente)
+            armazenamento_medido = criar_armazenamento(armazenamento, caminhos)
+            try:
+                gerenciador = novo_gerenciador(caminhos, armazenamento_medido)
+                for nome, funcao in operacoes(gerenciador, caminhos, rng).items():
+                    if selecionadas and nome not in selecionadas:
+                        continue
+                    tempos, pico = medir(funcao, repeticoes, memoria)
+                    resultado = {
+                        'operacao': nome,
+                        'linhas': linhas,
+                        'segundos_mediana': statistics.median(tempos),
+                        'segundos_minimo': min(tempos),
+                        'repeticoes': len(tempos),
+                        'pico_memoria_bytes': pico,
+                    }
+                    resultados.append(resultado)
+                    memoria_texto = '' if pico is None else f", pico {pico / 2 ** 20:.1f} MiB"
+                    print(f"  {nome:<26} {resultado['segundos_mediana']:9.4f} s{memoria_texto}")
+            finally:
+                if isinstance(armazenamento_medido, ArmazenamentoSQLite):
+                    armazenamento_medido.fechar()
+    return resultados
+
+
+def _revisao():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar_resultados(resultados, caminho, armazenamento='excel'):
+    """Grava os resultados em JSON, com o ambiente em que foram medidos."""
+    documento = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'revisao': _revisao(),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'armazenamento': armazenamento,
+        'resultados': resultados,
+    }
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(documento, arquivo, ensure_ascii=False, indent=2)
+    print(f"Arquivo salvo com sucesso em: {caminho}")
+
+
+def comparar(atual, anterior, tolerancia=TOLERANCIA_REGRESSAO):
+    """Compara dois arquivos de resultados e retorna um DataFrame com a razão atual/anterior de cada medição.
+
+    A coluna 'Regressão' marca as medições que ficaram mais de `tolerancia` mais lentas.
+    """
+    def carregar(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = pd.DataFrame(json.load(arquivo)['resultados'])
+        return dados.set_index(['operacao', 'linhas'])[['segundos_mediana', 'pico_memoria_bytes']]
+
+    tabela = carregar(anterior).join(carregar(atual), lsuffix='_anterior', rsuffix='_atual', how='inner')
+    tabela['Razão tempo'] = tabela['segundos_mediana_atual'] / tabela['segundos_mediana_anterior']
+    tabela['Razão memória'] = tabela['pico_memoria_bytes_atual'] / tabela['pico_memoria_bytes_anterior']
+    tabela['Regressão'] = tabela['Razão tempo'] > 1 + tolerancia
+    return tabela
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o desempenho das operações de reservas em dados fictícios.")
+    parser.add_argument("--tamanhos", default=",".join(str(t) for t in TAMANHOS_PADRAO),
+                        help="Quantidades de reservas separadas por vírgula")
+    parser.add_argument("--operacoes", default="", help="Operações a medir, separadas por vírgula (padrão: todas)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória (tracemalloc)")
+    parser.add_argument("--pasta", help="Mantém as planilhas geradas nesta pasta (padrão: pasta temporária)")
+    parser.add_argument("--saida", default="benchmark_resultados.json", help="Arquivo JSON de resultados")
+    parser.add_argument("--comparar", help="Resultados anteriores (JSON) para apontar regressões")
+    parser.add_argument("--armazenamento", choices=ARMAZENAMENTOS, default='excel',
+                        help="Armazenamento do gerenciador medido (as variáveis RESERVAS_* são ignoradas)")
+    args = parser.parse_args()
+
+    # O log de cada leitura e gravação só atrapalharia a leitura dos tempos
+    configurar_log('WARNING')
+    resultados = executar(
+        tamanhos=[int(t) for t in args.tamanhos.split(',') if t],
+        selecionadas={o for o in args.operacoes.split(',') if o},
+        repeticoes=args.repeticoes,
+        memoria=not args.sem_memoria,
+        pasta=args.pasta,
+        armazenamento=args.armazenamento,
+    )
+    salvar_resultados(resultados, args.saida, args.armazenamento)
+    if args.comparar:
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(comparar(args.saida, args.comparar))
@@ -0,0 +1,138 @@
+import math
+import os
+
+import streamlit as st
+
+from exportacao import FORMATOS
+from recorrencia import Recorrencia, eh_recorrente, regra_valida
+from tarefas import ERRO, obter_fila
+
+# Componentes de interface compartilhados por app.py e teste_app.py
+
+
+def tabela_paginada(reservas, tabela, chave, tamanhos=(25, 50, 100, 250)):
+    """Exibe uma página da tabela por vez; a ordenação e o recorte são feitos no servidor."""
+    colunas_tabela = list(getattr(reservas, f'df_{tabela}').columns)
+    ordem_inclusao = "(ordem de inclusão)"
+
+    col1, col2, col3, col4 = st.columns(4)
+    ordenar_por = col1.selectbox("Ordenar por", [ordem_inclusao] + colunas_tabela, key=f"{chave}_ordenar_por")
+    ascendente = col2.checkbox("Crescente", value=True, key=f"{chave}_ascendente")
+    tamanho = col3.selectbox("Linhas por página", list(tamanhos), key=f"{chave}_tamanho")
+    total = len(getattr(reservas, f'df_{tabela}'))
+    paginas = max(1, math.ceil(total / tamanho))
+    pagina = col4.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key=f"{chave}_pagina")
+    colunas = st.multiselect("Colunas", colunas_tabela, default=colunas_tabela, key=f"{chave}_colunas")
+
+    inicio = (int(pagina) - 1) * tamanho
+    dados, total = reservas.consultar(
+        tabela, inicio, tamanho, None if ordenar_por == ordem_inclusao else ordenar_por, ascendente, colunas
+    )
+    st.dataframe(dados)
+    st.caption(f"Linhas {min(inicio + 1, total)}–{min(inicio + tamanho, total)} de {total}")
+
+
+def selecionar_registro(reservas, tabela, descricao, chave):
+    """Campo de busca + seletor com só os registros encontrados. Retorna o id escolhido, ou None."""
+    termo = st.text_input(f"Buscar {descricao}", key=f"{chave}_busca")
+    encontrados = reservas.buscar_registros(tabela, termo)
+    if encontrados.empty:
+        st.info("Nenhum registro encontrado.")
+        return None
+    return st.selectbox(f"Selecione {descricao} para Editar", encontrados.index,
+                        format_func=lambda id_: encontrados.get(id_, str(id_)), key=chave)
+
+
+def selecionar_parte(reservas, tabela, descricao, chave, atual=None):
+    """Seletor opcional de um parceiro ou proprietário para ligar à reserva. Retorna o id escolhido, ou None."""
+    rotulos = reservas.rotulos_registros(tabela)
+    opcoes = [None] + list(rotulos.index)
+    indice = opcoes.index(atual) if atual in rotulos.index else 0
+    return st.selectbox(descricao, opcoes, index=indice, key=chave,
+                        format_func=lambda id_: "(nenhum)" if id_ is None else rotulos.get(id_, str(id_)))
+
+
+def campos_recorrencia(chave, atual=None, excecoes=None):
+    """Campos da regra de repetição de uma reserva. Retorna (regra em texto, exceções); regra '' = avulsa."""
+    frequencias = {"Não se repete": None, "Diária": 'diaria', "Semanal": 'semanal', "Mensal": 'mensal'}
+    regra = Recorrencia.de_texto(atual) if eh_recorrente(atual) and regra_valida(atual) else None
+    opcoes = list(frequencias)
+    indice = opcoes.index(next(nome for nome, f in frequencias.items() if f == regra.frequencia)) if regra else 0
+    frequencia = frequencias[st.selectbox("Repetição", opcoes, index=indice, key=f"{chave}_frequencia")]
+    if frequencia is None:
+        return '', ''
+    intervalo = st.number_input("Repetir a cada", min_value=1, step=1, value=regra.intervalo if regra else 1,
+                                key=f"{chave}_intervalo")
+    ate = st.date_input("Repetir até", regra.ate if regra and regra.ate is not None else None, key=f"{chave}_ate")
+    vezes = st.number_input("Ou número de vezes (0 = usar a data)", min_value=0, step=1,
+                            value=regra.vezes if regra and regra.vezes else 0, key=f"{chave}_vezes")
+    excecoes = st.text_input("Datas puladas (AAAA-MM-DD, separadas por vírgula)",
+                             excecoes if isinstance(excecoes, str) else '', key=f"{chave}_excecoes")
+    partes = [frequencia, f"intervalo={int(intervalo)}"]
+    if ate is not None:
+        partes.append(f"ate={ate.strftime('%Y-%m-%d')}")
+    if vezes:
+        partes.append(f"vezes={int(vezes)}")
+    return ';'.join(partes), excecoes
+
+
+def registro_em_edicao(reservas, tabela, id_, chave):
+    """Registro `id_` como estava quando o formulário de edição foi aberto (guardado na sessão até ser salvo).
+
+    Vai como `base` e `versao_esperada` para o atualizar_*: se outra pessoa gravou o registro nesse meio-tempo,
+    o gerenciador mescla as alterações ou levanta ConflitoVersaoError.
+    """
+    guardado = st.session_state.get(f"{chave}_base")
+    if guardado is None or guardado[0] != id_:
+        guardado = (id_, getattr(reservas, f'df_{tabela}').loc[id_].to_dict())
+        st.session_state[f"{chave}_base"] = guardado
+    return guardado[1]
+
+
+def encerrar_edicao(chave):
+    """Descarta o registro guardado por registro_em_edicao; a próxima edição parte dos dados atuais."""
+    st.session_state.pop(f"{chave}_base", None)
+
+
+def acompanhar_tarefa(chave, rotulo, nome_arquivo):
+    """Progresso da tarefa cujo id está em st.session_state[chave] e, ao terminar, o botão de download.
+
+    Só enquanto a tarefa não termina a barra de progresso é reexecutada a cada segundo (sem travar o restante
+    da página); depois disso nada mais é reexecutado sozinho.
+    """
+    tarefa = obter_fila().obter(st.session_state.get(chave))
+    if tarefa is None:
+        return
+    if not tarefa.terminada:
+        _aguardar_tarefa(chave)
+        return
+    if tarefa.situacao == ERRO:
+        st.error(f"Falha ao gerar o relatório: {tarefa.erro}")
+        return
+    extensao = os.path.splitext(tarefa.caminho)[1]
+    mime = next((m for m, e in FORMATOS.values() if e == extensao), 'application/octet-stream')
+    try:
+        dados = open(tarefa.caminho, 'rb')
+    except OSError:
+        # Apagado pelo limite de tamanho do cache antes do download: é preciso gerar de novo
+        st.session_state.pop(chave, None)
+        st.warning("O relatório expirou; gere-o novamente.")
+        return
+    with dados:
+        st.download_button(
+            label=f"{rotulo} como {extensao.lstrip('.').upper()}" + (" (do cache)" if tarefa.do_cache else ""),
+            data=dados,
+            file_name=nome_arquivo + extensao,
+            mime=mime,
+            key=f"{chave}_download"
+        )
+
+
+@st.fragment(run_every=1.0)
+def _aguardar_tarefa(chave):
+    """Barra de progresso da tarefa pendente; ao terminar, reexecuta a página, que troca a barra pelo resultado."""
+    tarefa = obter_fila().obter(st.session_state.get(chave))
+    if tarefa is None or tarefa.terminada:
+        # Sem esta reexecução completa o fragmento continuaria agendado a cada segundo
+        st.rerun()
+    st.progress(tarefa.progresso, text=f"Gerando... {tarefa.progresso:.0%}")
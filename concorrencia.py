@@ -0,0 +1,124 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from esquema import converter_valor
+
+# Trava de arquivo entre processos: fcntl no Linux/macOS, msvcrt no Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Coluna com a versão de cada registro, incrementada a cada alteração gravada
+COLUNA_VERSAO = 'Versão'
+
+
+class ConflitoVersaoError(ValueError):
+    """Levantado quando um registro foi alterado por outro processo e a edição não pode ser combinada com ele."""
+
+    def __init__(self, mensagem, campos):
+        super().__init__(mensagem)
+        self.campos = list(campos)
+
+
+# Por caminho: [RLock da thread dona, profundidade de reentrada, arquivo com a trava do sistema]
+_travas = {}
+_travas_lock = threading.Lock()
+
+
+@contextmanager
+def trava_arquivo(caminho):
+    """Trava exclusiva entre processos sobre o arquivo `caminho` (criado se preciso).
+
+    Dentro do mesmo processo é reentrante para a thread que a detém e serializa as demais threads,
+    já que a trava do sistema operacional não distingue threads de um mesmo processo.
+    """
+    with _travas_lock:
+        estado = _travas.setdefault(caminho, [threading.RLock(), 0, None])
+    estado[0].acquire()
+    try:
+        if estado[1] == 0:
+            estado[2] = open(caminho, 'a+b')
+            _travar(estado[2])
+        estado[1] += 1
+        try:
+            yield
+        finally:
+            estado[1] -= 1
+            if estado[1] == 0:
+                _destravar(estado[2])
+                estado[2].close()
+                estado[2] = None
+    finally:
+        estado[0].release()
+
+
+def _travar(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        return
+    # msvcrt.locking só espera ~10 s com LK_LOCK: tenta sem bloquear até conseguir
+    arquivo.seek(0)
+    while True:
+        try:
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+def _destravar(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+        return
+    arquivo.seek(0)
+    msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _ausente(valor):
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor))
+
+
+def _iguais(tabela, coluna, a, b):
+    """Compara dois valores de uma coluna depois de convertê-los para o tipo dela (ausentes são iguais entre si)."""
+    try:
+        a, b = converter_valor(tabela, coluna, a), converter_valor(tabela, coluna, b)
+    except (TypeError, ValueError):
+        pass
+    if _ausente(a) or _ausente(b):
+        return _ausente(a) and _ausente(b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return str(a) == str(b)
+
+
+def mesclar_alteracoes(tabela, atuais, novos, base):
+    """Combina a edição `novos`, feita a partir de `base`, com os valores `atuais` gravados por outro processo.
+
+    Campos que a edição não mudou ficam como estão gravados; campos que só a edição mudou recebem o valor
+    novo. Se o mesmo campo mudou dos dois lados para valores diferentes, levanta ConflitoVersaoError.
+    Retorna {coluna: valor} com o que deve ser gravado.
+    """
+    mesclados = {}
+    conflitos = []
+    for coluna, valor in novos.items():
+        original = base.get(coluna)
+        if _iguais(tabela, coluna, valor, original):
+            continue
+        atual = atuais.get(coluna)
+        if _iguais(tabela, coluna, atual, original) or _iguais(tabela, coluna, atual, valor):
+            mesclados[coluna] = valor
+        else:
+            conflitos.append(coluna)
+    if conflitos:
+        raise ConflitoVersaoError(
+            f"O registro foi alterado por outra pessoa enquanto era editado. Campos em conflito: {conflitos}. "
+            f"Recarregue o registro e refaça a edição.",
+            conflitos
+        )
+    return mesclados
@@ -0,0 +1,125 @@
+import pandas as pd
+
+from indice_intervalos import IndiceIntervalos
+
+UM_DIA = pd.Timedelta(days=1)
+
+
+class ConflitoReservaError(ValueError):
+    """Levantado quando uma reserva ocuparia um apartamento já reservado no período."""
+
+    def __init__(self, mensagem, conflitos):
+        super().__init__(mensagem)
+        self.conflitos = list(conflitos)
+
+
+def _normalizar_texto(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    return str(valor).strip().casefold()
+
+
+def _normalizar_numero(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return str(valor).strip().casefold()
+
+
+def chave_apartamento(condominio, bloco, numero_apartamento):
+    """Identifica um apartamento por (condomínio, bloco, número), ignorando maiúsculas e espaços nas pontas."""
+    return (_normalizar_texto(condominio), _normalizar_texto(bloco), _normalizar_numero(numero_apartamento))
+
+
+def chaves_apartamentos(df):
+    """Mesma normalização de chave_apartamento aplicada a todas as linhas de um DataFrame de reservas."""
+    vazio = pd.Series('', index=df.index)
+    return pd.DataFrame({
+        'condominio': df.get('Nome do Condomínio', vazio).map(_normalizar_texto).astype(object),
+        'bloco': df.get('Bloco', vazio).map(_normalizar_texto).astype(object),
+        'numero': df['Número do apartamento'].map(_normalizar_numero).astype(object),
+    }, index=df.index)
+
+
+class MapaOcupacao:
+    """Intervalos reservados de cada apartamento, cada um em um IndiceIntervalos próprio.
+
+    As noites de uma reserva vão da data de entrada até a véspera da saída, então o dia de saída de uma
+    estadia pode ser o dia de entrada da seguinte sem conflito.
+    """
+
+    def __init__(self):
+        self._por_apartamento = {}
+        self._chave_por_id = {}
+        # Forma original (não normalizada) de cada chave, usada para exibir os apartamentos livres
+        self._rotulos = {}
+
+    @classmethod
+    def construir(cls, df):
+        """Monta o mapa a partir do DataFrame de reservas agrupando as linhas por apartamento."""
+        mapa = cls()
+        if df.empty:
+            return mapa
+        vazio = pd.Series('', index=df.index)
+        condominios = df['Nome do Condomínio'] if 'Nome do Condomínio' in df.columns else vazio
+        blocos = df['Bloco'] if 'Bloco' in df.columns else vazio
+        numeros = df['Número do apartamento']
+        chaves = chaves_apartamentos(df)
+
+        for chave, posicoes in chaves.groupby(['condominio', 'bloco', 'numero'], sort=False).indices.items():
+            linhas = df.iloc[posicoes]
+            mapa._por_apartamento[chave] = IndiceIntervalos.construir(
+                linhas.index, linhas['Data de entrada'], linhas['Data de saída']
+            )
+            primeira = posicoes[0]
+            mapa._rotulos[chave] = (condominios.iloc[primeira], blocos.iloc[primeira], numeros.iloc[primeira])
+            for id_ in linhas.index:
+                mapa._chave_por_id[id_] = chave
+        return mapa
+
+    def adicionar(self, id_, condominio, bloco, numero_apartamento, entrada, saida):
+        """Inclui (ou move) a reserva `id_` no apartamento informado."""
+        self.remover(id_)
+        chave = chave_apartamento(condominio, bloco, numero_apartamento)
+        if chave not in self._por_apartamento:
+            self._por_apartamento[chave] = IndiceIntervalos()
+            self._rotulos[chave] = (condominio, bloco, numero_apartamento)
+        self._por_apartamento[chave].adicionar(id_, entrada, saida)
+        self._chave_por_id[id_] = chave
+
+    def remover(self, id_):
+        chave = self._chave_por_id.pop(id_, None)
+        if chave is not None:
+            self._por_apartamento[chave].remover(id_)
+
+    def conflitos(self, condominio, bloco, numero_apartamento, entrada, saida, ignorar=None):
+        """Retorna os ids das reservas do apartamento que dividem alguma noite com [entrada, saída)."""
+        indice = self._por_apartamento.get(chave_apartamento(condominio, bloco, numero_apartamento))
+        if indice is None:
+            return []
+        return [id_ for id_ in self._conflitos_no_indice(indice, entrada, saida).tolist() if id_ != ignorar]
+
+    def disponiveis(self, inicio, fim, ocupados=(), rotulos=None):
+        """Retorna os apartamentos conhecidos que não têm nenhuma noite reservada entre `inicio` e `fim` (saída).
+
+        `ocupados` são chaves ocupadas por reservas de fora do mapa (ex.: as recorrentes) e `rotulos`
+        ({chave: (condomínio, bloco, número)}) acrescenta apartamentos que o mapa ainda não conhece.
+        """
+        todos = dict(self._rotulos)
+        for chave, rotulo in (rotulos or {}).items():
+            todos.setdefault(chave, rotulo)
+        livres = [
+            rotulo
+            for chave, rotulo in todos.items()
+            if chave not in ocupados and (chave not in self._por_apartamento
+                                          or not len(self._conflitos_no_indice(self._por_apartamento[chave], inicio, fim)))
+        ]
+        return pd.DataFrame(livres, columns=['Nome do Condomínio', 'Bloco', 'Número do apartamento'])
+
+    @staticmethod
+    def _conflitos_no_indice(indice, entrada, saida):
+        # Reservas existentes [e, s) conflitam com [E, S) quando e <= S - 1 dia e s >= E + 1 dia,
+        # que é exatamente a consulta de sobreposição fechada do índice com a janela (E + 1, S - 1)
+        return indice.sobrepostos(pd.Timestamp(entrada) + UM_DIA, pd.Timestamp(saida) - UM_DIA)
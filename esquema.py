@@ -0,0 +1,259 @@
+import pandas as pd
+
+from instrumentacao import log
+
+# Com o pyarrow instalado o texto fica em buffers Arrow, bem mais compactos que objetos str do Python
+try:
+    import pyarrow  # noqa: F401
+    _ARMAZENAMENTO_TEXTO = 'pyarrow'
+except ImportError:
+    _ARMAZENAMENTO_TEXTO = 'python'
+
+# Tipos lógicos usados nos esquemas:
+#   'data'      -> datetime64
+#   'dinheiro'  -> float64 arredondado para centavos (cada valor é exato em centavos; os totais que precisam
+#                  ser exatos somam em centavos inteiros, como em agregados.py e acerto.py)
+#   'inteiro'   -> Int64 (inteiro que aceita valores ausentes)
+#   'categoria' -> category (texto curto e muito repetido), ou string quando as categorias não economizam memória
+#   'texto'     -> string (Arrow quando disponível)
+#
+# A coluna 'Versão' (em todas as tabelas) conta as alterações gravadas de cada registro; veja concorrencia.py
+ESQUEMAS = {
+    'reservas': {
+        'Data de entrada': 'data',
+        'Data de saída': 'data',
+        'Data da reserva': 'data',
+        'Valor da hospedagem': 'dinheiro',
+        'Valor para o proprietário': 'dinheiro',
+        'A receber de parceiros': 'dinheiro',
+        'A pagar para parceiros': 'dinheiro',
+        'Pago': 'dinheiro',
+        'A pagar': 'dinheiro',
+        'Número do apartamento': 'inteiro',
+        'Quantidade de pessoas': 'inteiro',
+        'Nome do Condomínio': 'categoria',
+        'Bloco': 'categoria',
+        'Status': 'categoria',
+        'Nome do hóspede': 'texto',
+        'Nome do proprietário': 'texto',
+        'Endereço': 'texto',
+        'Email do responsável': 'texto',
+        'Telefone do responsável': 'texto',
+        'Documento do responsável': 'texto',
+        'ID do parceiro': 'inteiro',
+        'ID do proprietário': 'inteiro',
+        'Recorrência': 'texto',
+        'Exceções': 'texto',
+        'Versão': 'inteiro',
+    },
+    'parceiros': {
+        'Parceiro': 'texto',
+        'A receber': 'dinheiro',
+        'A pagar': 'dinheiro',
+        'Comissão (%)': 'dinheiro',
+        'Versão': 'inteiro',
+    },
+    'proprietarios': {
+        'Nome Completo': 'texto',
+        'Email': 'texto',
+        'Telefone': 'texto',
+        'Documento': 'texto',
+        'A pagar': 'dinheiro',
+        'Repasse (%)': 'dinheiro',
+        'Versão': 'inteiro',
+    },
+}
+
+TIPO_TEXTO = pd.StringDtype(_ARMAZENAMENTO_TEXTO)
+
+
+def colunas_do_tipo(tabela, tipo):
+    """Lista as colunas da tabela declaradas com o tipo lógico informado."""
+    return [coluna for coluna, t in ESQUEMAS.get(tabela, {}).items() if t == tipo]
+
+
+def _no_tipo(serie, tipo):
+    if tipo == 'data':
+        return pd.api.types.is_datetime64_dtype(serie.dtype)
+    if tipo == 'dinheiro':
+        return serie.dtype == 'float64'
+    if tipo == 'inteiro':
+        return serie.dtype == 'Int64'
+    if tipo == 'categoria':
+        # Texto só conta como já convertido no TIPO_TEXTO exato, que é o que converter_serie devolve
+        return isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == TIPO_TEXTO
+    return isinstance(serie.dtype, pd.StringDtype)
+
+
+def converter_serie(serie, tipo):
+    """Converte uma coluna para o tipo lógico; valores que não se encaixam viram ausentes."""
+    if tipo == 'data':
+        return pd.to_datetime(serie, errors='coerce')
+    if tipo == 'dinheiro':
+        return pd.to_numeric(serie, errors='coerce').astype('float64').round(2)
+    if tipo == 'inteiro':
+        return pd.to_numeric(serie, errors='coerce').round().astype('Int64')
+    if tipo == 'categoria':
+        texto = serie.astype(TIPO_TEXTO)
+        categorias = texto.astype('category')
+        # Com poucas repetições (ou poucas linhas) a tabela de categorias gasta mais que o próprio texto
+        if categorias.memory_usage(deep=True, index=False) < texto.memory_usage(deep=True, index=False):
+            return categorias
+        return texto
+    return _para_texto(serie)
+
+
+def _perdas(serie, convertida, tipo):
+    """Máscara dos valores preenchidos de `serie` que a conversão para `tipo` descartaria ou alteraria.
+
+    Valores que não são números ou datas viram ausentes, e números com casas decimais seriam arredondados
+    numa coluna inteira. O arredondamento de 'dinheiro' para centavos é intencional e não conta.
+    """
+    if tipo not in ('data', 'dinheiro', 'inteiro'):
+        return pd.Series(False, index=serie.index)
+    preenchida = serie.notna() & (serie.astype(str).str.strip() != '')
+    perdida = preenchida & convertida.isna()
+    if tipo == 'inteiro':
+        numeros = pd.to_numeric(serie, errors='coerce')
+        perdida |= numeros.notna() & (numeros % 1 != 0)
+    return perdida
+
+
+def _para_texto(serie):
+    # Números lidos do Excel (ex.: telefones sem máscara) viram texto sem o sufixo ".0"
+    if pd.api.types.is_float_dtype(serie.dtype):
+        inteiros = serie.notna() & (serie % 1 == 0)
+        texto = serie.astype(TIPO_TEXTO)
+        texto[inteiros] = serie[inteiros].astype('int64').astype(TIPO_TEXTO)
+        return texto
+    return serie.astype(TIPO_TEXTO)
+
+
+def converter_valor(tabela, coluna, valor):
+    """Converte um valor isolado para o tipo declarado da coluna (usado nas atribuições célula a célula)."""
+    tipo = ESQUEMAS.get(tabela, {}).get(coluna)
+    if tipo is None or valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return valor
+    if tipo == 'data':
+        return pd.Timestamp(valor)
+    if tipo == 'dinheiro':
+        return round(float(valor), 2)
+    if tipo == 'inteiro':
+        return int(round(float(valor)))
+    return str(valor)
+
+
+def valor_texto(valor):
+    """Texto para exibir em um campo de formulário: valores ausentes (None, NaN, pd.NA) viram string vazia."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    return str(valor)
+
+
+def aplicar_esquema(df, tabela, coagir=False):
+    """Retorna o DataFrame com as colunas conhecidas da tabela nos tipos declarados (as demais ficam como estão).
+
+    Uma coluna cuja conversão perderia valores (ex.: apartamento '101A' numa coluna inteira, ou uma data
+    ilegível) fica como veio, com um aviso no log: assim a próxima gravação não apaga o que estava na planilha.
+    Com `coagir`, esses valores viram ausentes (a importação usa isso para rejeitar as linhas inválidas).
+    """
+    esquema = ESQUEMAS.get(tabela, {})
+    pendentes = [c for c, tipo in esquema.items() if c in df.columns and not _no_tipo(df[c], tipo)]
+    if not pendentes:
+        return df
+    df = df.copy()
+    for coluna in pendentes:
+        convertida = converter_serie(df[coluna], esquema[coluna])
+        if not coagir:
+            perdidas = _perdas(df[coluna], convertida, esquema[coluna])
+            if perdidas.any():
+                log.warning("Coluna '%s' da tabela '%s' mantida sem conversão para '%s': %d valores não se encaixam "
+                            "(ex.: %s).", coluna, tabela, esquema[coluna], int(perdidas.sum()),
+                            df[coluna][perdidas].head(3).tolist())
+                continue
+        df[coluna] = convertida
+    return df
+
+
+def concatenar(df, novas, tabela, primeiro_id=0):
+    """pd.concat que preserva o esquema: tipa as linhas novas e une as categorias antes de juntar.
+
+    As linhas de `df` mantêm seus ids; as novas recebem ids seguidos a partir do maior id existente + 1
+    (ou de `primeiro_id`, se for maior, quando há ids em uso fora de `df`).
+    """
+    novas = aplicar_esquema(novas, tabela)
+    inicio = max(int(df.index.max()) + 1 if len(df) else 0, primeiro_id)
+    novas = novas.set_axis(pd.RangeIndex(inicio, inicio + len(novas)))
+    if df.empty:
+        return novas
+    df = aplicar_esquema(df, tabela)
+    for coluna in novas.columns.intersection(df.columns):
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            if not isinstance(novas[coluna].dtype, pd.CategoricalDtype):
+                # Categoria ou texto é escolhido pelo tamanho de cada conjunto: as linhas novas seguem a tabela
+                novas[coluna] = novas[coluna].astype(TIPO_TEXTO).astype('category')
+            categorias = df[coluna].cat.categories.union(novas[coluna].cat.categories)
+            if len(categorias) != len(df[coluna].cat.categories):
+                df[coluna] = df[coluna].cat.set_categories(categorias)
+            novas[coluna] = novas[coluna].cat.set_categories(categorias)
+        elif isinstance(df[coluna].dtype, pd.StringDtype) and novas[coluna].dtype != df[coluna].dtype:
+            # Variantes diferentes de string (ex.: 'str' e 'string') virariam objeto no concat
+            novas[coluna] = novas[coluna].astype(df[coluna].dtype)
+    return aplicar_esquema(pd.concat([df, novas]), tabela)
+
+
+def atribuir_celula(df, indice, coluna, valor, tabela=None):
+    """Atribui um valor a uma célula, convertendo-o para o tipo da coluna e incluindo-o nas categorias se preciso."""
+    if tabela is not None:
+        valor = converter_valor(tabela, coluna, valor)
+    serie = df.get(coluna)
+    if (serie is not None and isinstance(serie.dtype, pd.CategoricalDtype)
+            and not pd.isna(valor) and valor not in serie.cat.categories):
+        df[coluna] = serie.cat.add_categories([valor])
+    df.at[indice, coluna] = valor
+
+
+def atribuir_valores(df, indices, coluna, valores, tabela=None):
+    """Atribui `valores` às linhas `indices` da coluna em uma única operação, preservando o tipo declarado.
+
+    `valores` é um escalar (o mesmo para todas as linhas) ou uma Series indexada pelos ids. Os valores são
+    convertidos para o tipo lógico da coluna antes da atribuição, categorias novas são incluídas e, se a
+    coluna ainda não existe, ela é criada já no tipo do esquema.
+    """
+    tipo = ESQUEMAS.get(tabela, {}).get(coluna)
+    if isinstance(valores, pd.Series):
+        if tipo is not None:
+            # Em coluna categórica os valores entram como texto; as categorias são ajustadas logo abaixo
+            valores = converter_serie(valores, 'texto' if tipo == 'categoria' else tipo)
+        novos = valores.dropna().unique()
+    else:
+        if tabela is not None:
+            valores = converter_valor(tabela, coluna, valores)
+        novos = [] if valores is None or (not isinstance(valores, str) and pd.isna(valores)) else [valores]
+
+    if coluna not in df.columns:
+        vazia = pd.Series(None, index=df.index, dtype=object)
+        df[coluna] = converter_serie(vazia, tipo) if tipo is not None else vazia
+    serie = df[coluna]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        faltantes = [v for v in novos if v not in serie.cat.categories]
+        if faltantes:
+            df[coluna] = serie.cat.add_categories(faltantes)
+    df.loc[indices, coluna] = valores
+
+
+def memoria(df):
+    """Memória ocupada pelo DataFrame, em bytes (incluindo o conteúdo das strings)."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def relatorio_memoria(tabela, antes, depois, linhas):
+    """Resumo da memória antes/depois de aplicar o esquema, total e por linha."""
+    return {
+        'tabela': tabela,
+        'linhas': linhas,
+        'bytes_antes': antes,
+        'bytes_depois': depois,
+        'bytes_por_linha_antes': round(antes / linhas, 1) if linhas else 0.0,
+        'bytes_por_linha_depois': round(depois / linhas, 1) if linhas else 0.0,
+    }
@@ -0,0 +1,322 @@
+import contextvars
+import getpass
+import json
+import math
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from concorrencia import trava_arquivo
+from instrumentacao import log, medir
+
+# Pasta do log de alterações (RESERVAS_EVENTOS_PASTA) e tamanho, em MiB, a partir do qual um novo
+# segmento é aberto (RESERVAS_EVENTOS_SEGMENTO_MB)
+PASTA_EVENTOS = os.environ.get(
+    'RESERVAS_EVENTOS_PASTA', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eventos')
+)
+TAMANHO_SEGMENTO_BYTES = int(float(os.environ.get('RESERVAS_EVENTOS_SEGMENTO_MB', '16')) * 2 ** 20)
+
+# Operações registradas
+INSERIR, ATUALIZAR = 'inserir', 'atualizar'
+
+# Segmentos: eventos-<número do primeiro evento>.jsonl, uma linha JSON por evento
+_SEGMENTO = re.compile(r'^eventos-(\d{20})\.jsonl$')
+
+# Quem está fazendo as alterações nesta thread/contexto (cada sessão da interface define o seu)
+_usuario = contextvars.ContextVar('usuario', default=None)
+
+
+def usuario_padrao():
+    """Usuário do sistema operacional (ou RESERVAS_USUARIO), usado quando nenhum foi definido."""
+    try:
+        return os.environ.get('RESERVAS_USUARIO') or getpass.getuser()
+    except (KeyError, OSError):
+        return 'desconhecido'
+
+
+def definir_usuario(nome):
+    """Define quem assina as alterações feitas a partir deste contexto (None volta ao usuário padrão)."""
+    _usuario.set(nome or None)
+
+
+def usuario_atual():
+    return _usuario.get() or usuario_padrao()
+
+
+def valor_json(valor):
+    """Converte um valor de célula para JSON: datas em ISO, ausentes em None, escalares NumPy em Python."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, (pd.Timestamp, datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    if isinstance(valor, (str, int, float, bool)):
+        return valor
+    return str(valor)
+
+
+def valores_json(serie):
+    """valor_json aplicado a uma coluna inteira, com as conversões feitas sobre o vetor."""
+    ausentes = serie.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        datas = serie.to_numpy('datetime64[us]')
+        unidade = 's' if not (datas[~ausentes].astype(np.int64) % 10 ** 6).any() else 'us'
+        valores = np.datetime_as_string(datas, unit=unidade).astype(object)
+    else:
+        if serie.dtype == object:
+            # Colunas de objetos podem guardar datas ou escalares NumPy: aí a conversão é valor a valor
+            return [valor_json(valor) for valor in serie.tolist()]
+        valores = serie.to_numpy(dtype=object, na_value=None)
+    valores[ausentes] = None
+    return valores.tolist()
+
+
+def diferencas(antes, depois):
+    """{id: {coluna: [antes, depois]}} das células que mudaram entre dois DataFrames com os mesmos ids.
+
+    Colunas que faltam em `antes` (recém-criadas) contam como ausentes. A comparação é feita coluna a
+    coluna sobre os vetores; só as células alteradas são convertidas para JSON.
+    """
+    alteracoes = {}
+    for coluna in depois.columns:
+        novo = depois[coluna]
+        velho = antes[coluna] if coluna in antes.columns else pd.Series(None, index=depois.index, dtype=object)
+        velho_ausente, novo_ausente = velho.isna().to_numpy(), novo.isna().to_numpy()
+        iguais = velho_ausente & novo_ausente
+        # Só compara onde os dois lados têm valor (pd.NA não tem verdadeiro/falso)
+        ambos = ~velho_ausente & ~novo_ausente
+        iguais[ambos] = velho.to_numpy(dtype=object)[ambos] == novo.to_numpy(dtype=object)[ambos]
+        mudou = ~iguais
+        if not mudou.any():
+            continue
+        for id_, a, d in zip(depois.index[mudou].tolist(), valores_json(velho[mudou]), valores_json(novo[mudou])):
+            alteracoes.setdefault(id_, {})[coluna] = [a, d]
+    return alteracoes
+
+
+class Assinatura:
+    """Inscrição de uma função no LogEventos; `cancelar()` a remove."""
+
+    def __init__(self, log_eventos, funcao, tabelas):
+        self._log = log_eventos
+        self.funcao = funcao
+        self.tabelas = None if tabelas is None else set(tabelas)
+
+    def cancelar(self):
+        self._log._cancelar(self)
+
+
+class LogEventos:
+    """Log de alterações somente de acréscimo, em segmentos JSON Lines numa pasta.
+
+    Cada evento é um dict com 'seq' (crescente, sem lacunas), 'momento', 'usuario', 'tabela', 'id',
+    'operacao' ('inserir' ou 'atualizar'), 'versao' e 'alteracoes' ({coluna: [antes, depois]}). Um segmento
+    que passa de `tamanho_segmento` bytes é fechado e o próximo começa; o nome de cada um traz o número do
+    seu primeiro evento, então ler_desde pula direto para o segmento certo. A gravação usa uma trava entre
+    processos, assim vários processos podem registrar no mesmo log. Consumidores acompanham o log por
+    `assinar` (no mesmo processo, a cada gravação) ou por ler_desde/acompanhar (a partir do último 'seq' lido).
+    `historico` usa um índice em memória das posições das linhas de cada registro, que a cada consulta só
+    lê o que foi acrescentado aos segmentos desde a anterior.
+    """
+
+    def __init__(self, pasta=PASTA_EVENTOS, tamanho_segmento=TAMANHO_SEGMENTO_BYTES):
+        self.pasta = pasta
+        self.tamanho_segmento = tamanho_segmento
+        os.makedirs(pasta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._assinaturas = []
+        self._posicoes = {}  # (tabela, id em JSON) -> [(caminho do segmento, posição da linha)]
+        self._indexado = {}  # caminho do segmento -> bytes já indexados
+
+    def _trava(self):
+        return trava_arquivo(os.path.join(self.pasta, 'eventos.lock'))
+
+    def segmentos(self):
+        """[(número do primeiro evento, caminho)] dos segmentos, em ordem."""
+        encontrados = []
+        for nome in os.listdir(self.pasta):
+            casamento = _SEGMENTO.match(nome)
+            if casamento:
+                encontrados.append((int(casamento.group(1)), os.path.join(self.pasta, nome)))
+        return sorted(encontrados)
+
+    @staticmethod
+    def _ultima_linha(caminho):
+        with open(caminho, 'rb') as arquivo:
+            arquivo.seek(0, os.SEEK_END)
+            fim = arquivo.tell()
+            bloco = 4096
+            while True:
+                inicio = max(fim - bloco, 0)
+                arquivo.seek(inicio)
+                linhas = arquivo.read(fim - inicio).rstrip(b'\n').split(b'\n')
+                if len(linhas) > 1 or inicio == 0:
+                    return linhas[-1]
+                bloco *= 2
+
+    def ultimo_seq(self):
+        """Número do último evento gravado (0 se o log está vazio)."""
+        segmentos = self.segmentos()
+        if not segmentos:
+            return 0
+        primeiro, caminho = segmentos[-1]
+        linha = self._ultima_linha(caminho)
+        return json.loads(linha)['seq'] if linha else primeiro - 1
+
+    def registrar(self, eventos):
+        """Grava os eventos (dicts com 'tabela', 'id', 'operacao', 'versao' e 'alteracoes') e os retorna completos.
+
+        'seq', 'momento' e 'usuario' são preenchidos aqui. Depois de gravados, os eventos são entregues aos
+        assinantes; uma falha em um assinante é registrada no log e não afeta a gravação.
+        """
+        if not eventos:
+            return []
+        momento = datetime.now().isoformat(timespec='milliseconds')
+        usuario = usuario_atual()
+        with medir('registrar_eventos') as medicao, self._lock, self._trava():
+            segmentos = self.segmentos()
+            seq = self.ultimo_seq()
+            caminho = segmentos[-1][1] if segmentos else None
+            tamanho = os.path.getsize(caminho) if caminho is not None else self.tamanho_segmento
+            completos = []
+            # (caminho, linhas) de cada segmento a gravar: um lote grande continua em segmentos novos
+            blocos = []
+            for evento in eventos:
+                seq += 1
+                completo = {'seq': seq, 'momento': momento, 'usuario': usuario, **evento}
+                completos.append(completo)
+                linha = (json.dumps(completo, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+                if tamanho >= self.tamanho_segmento:
+                    caminho, tamanho = os.path.join(self.pasta, f'eventos-{seq:020d}.jsonl'), 0
+                    blocos.append((caminho, []))
+                elif not blocos:
+                    blocos.append((caminho, []))
+                blocos[-1][1].append(linha)
+                tamanho += len(linha)
+            for caminho, linhas in blocos:
+                with open(caminho, 'ab') as arquivo:
+                    arquivo.write(b''.join(linhas))
+            medicao['linhas'] = len(completos)
+            medicao['segmentos'] = len(blocos)
+        self._notificar(completos)
+        return completos
+
+    def assinar(self, funcao, tabelas=None):
+        """Chama `funcao(eventos)` a cada gravação deste processo (só eventos de `tabelas`, se informadas)."""
+        assinatura = Assinatura(self, funcao, tabelas)
+        with self._lock:
+            self._assinaturas.append(assinatura)
+        return assinatura
+
+    def _cancelar(self, assinatura):
+        with self._lock:
+            if assinatura in self._assinaturas:
+                self._assinaturas.remove(assinatura)
+
+    def _notificar(self, eventos):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            selecionados = [e for e in eventos if assinatura.tabelas is None or e['tabela'] in assinatura.tabelas]
+            if not selecionados:
+                continue
+            try:
+                assinatura.funcao(selecionados)
+            except Exception:
+                log.exception("Falha em um assinante do log de eventos.")
+
+    def ler_desde(self, seq=0, tabela=None, id_=None):
+        """Eventos com número maior que `seq`, em ordem (só da `tabela` e do registro `id_`, se informados).
+
+        Os segmentos inteiramente anteriores a `seq` não são abertos. Com `id_`, as linhas são pré-filtradas
+        como texto antes do json.loads.
+        """
+        segmentos = self.segmentos()
+        marcador = None
+        if tabela is not None and id_ is not None:
+            marcador = f'"tabela":{json.dumps(tabela, ensure_ascii=False)},"id":{json.dumps(valor_json(id_))},'.encode('utf-8')
+        for posicao, (_, caminho) in enumerate(segmentos):
+            if posicao + 1 < len(segmentos) and segmentos[posicao + 1][0] <= seq + 1:
+                continue
+            with open(caminho, 'rb') as arquivo:
+                for linha in arquivo:
+                    if not linha.endswith(b'\n'):
+                        break  # linha ainda sendo gravada por outro processo
+                    if marcador is not None and marcador not in linha:
+                        continue
+                    evento = json.loads(linha)
+                    if evento['seq'] <= seq or (tabela is not None and evento['tabela'] != tabela):
+                        continue
+                    yield evento
+
+    def acompanhar(self, seq=0, intervalo=1.0, parar=None):
+        """Como ler_desde, mas continua esperando novos eventos (também de outros processos) até `parar` ser setado.
+
+        `parar` é um threading.Event opcional; sem ele, o gerador só termina quando o consumidor o fecha.
+        """
+        while parar is None or not parar.is_set():
+            for evento in self.ler_desde(seq):
+                seq = evento['seq']
+                yield evento
+            if parar is not None:
+                parar.wait(intervalo)
+            else:
+                time.sleep(intervalo)
+
+    def _atualizar_indice(self):
+        """Indexa as linhas completas gravadas desde a última chamada. Deve ser chamado com self._lock adquirido."""
+        for _, caminho in self.segmentos():
+            posicao = self._indexado.get(caminho, 0)
+            if posicao >= os.path.getsize(caminho):
+                continue
+            with open(caminho, 'rb') as arquivo:
+                arquivo.seek(posicao)
+                for linha in arquivo:
+                    if not linha.endswith(b'\n'):
+                        break  # linha ainda sendo gravada por outro processo: fica para a próxima
+                    evento = json.loads(linha)
+                    self._posicoes.setdefault((evento['tabela'], evento['id']), []).append((caminho, posicao))
+                    posicao += len(linha)
+            self._indexado[caminho] = posicao
+
+    def historico(self, tabela, id_):
+        """Eventos do registro `id_` da `tabela`, do mais antigo ao mais recente.
+
+        Só as linhas do registro são lidas (o log é somente de acréscimo, então as posições indexadas não mudam).
+        """
+        with self._lock:
+            self._atualizar_indice()
+            posicoes = list(self._posicoes.get((tabela, valor_json(id_)), []))
+        eventos = []
+        arquivos = {}
+        try:
+            for caminho, posicao in posicoes:
+                if caminho not in arquivos:
+                    arquivos[caminho] = open(caminho, 'rb')
+                arquivos[caminho].seek(posicao)
+                eventos.append(json.loads(arquivos[caminho].readline()))
+        finally:
+            for arquivo in arquivos.values():
+                arquivo.close()
+        return eventos
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def obter_log(pasta=PASTA_EVENTOS):
+    """Log compartilhado pelo processo para a pasta (todas as instâncias do gerenciador gravam no mesmo)."""
+    pasta = os.path.abspath(pasta)
+    with _logs_lock:
+        if pasta not in _logs:
+            _logs[pasta] = LogEventos(pasta)
+        return _logs[pasta]
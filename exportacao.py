@@ -0,0 +1,93 @@
+import tempfile
+
+import pandas as pd
+
+# Linhas por lote do bloco de detalhe: limita a memória da exportação independentemente do tamanho do histórico
+TAMANHO_LOTE = 5000
+
+# Tamanho dos pedaços de bytes entregues pelos geradores
+TAMANHO_BLOCO = 1 << 16
+
+FORMATOS = {
+    'csv': ('text/csv', '.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+}
+
+
+def lotes_dataframe(df, rotulos=None, colunas=None, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Percorre as linhas `rotulos` (todas, se None) de `df` em DataFrames de até `tamanho_lote` linhas.
+
+    `progresso(fracao)`, se informado, é chamado depois de cada lote com a fração das linhas já entregue.
+    """
+    if rotulos is None:
+        rotulos = df.index
+    colunas = list(df.columns) if colunas is None else [c for c in colunas if c in df.columns]
+    for inicio in range(0, len(rotulos), tamanho_lote):
+        yield df.loc[rotulos[inicio:inicio + tamanho_lote], colunas]
+        if progresso is not None:
+            progresso(min(inicio + tamanho_lote, len(rotulos)) / len(rotulos))
+
+
+def _resumo_dataframe(resumo):
+    return pd.DataFrame({'Descrição': [d for d, _ in resumo], 'Valores': [v for _, v in resumo]})
+
+
+def gerar_csv(resumo, lotes, colunas):
+    """Gera o relatório em CSV, em pedaços de bytes: bloco de resumo, linha em branco e o detalhe lote a lote.
+
+    `resumo` é uma lista de pares (descrição, valor); `lotes` é um iterável de DataFrames já com `colunas`.
+    """
+    yield _resumo_dataframe(resumo).to_csv(index=False).encode('utf-8')
+    yield b"\n"
+    yield pd.DataFrame(columns=colunas).to_csv(index=False).encode('utf-8')
+    for lote in lotes:
+        yield lote.to_csv(index=False, header=False, float_format="%.2f").encode('utf-8')
+
+
+def gerar_xlsx(resumo, lotes, colunas, nome_planilha="Relatório"):
+    """Gera o relatório em XLSX com o openpyxl em modo somente escrita, em pedaços de bytes.
+
+    As linhas vão para o disco à medida que são escritas; a pasta de trabalho nunca fica inteira em memória.
+    """
+    from openpyxl import Workbook
+
+    pasta = Workbook(write_only=True)
+    planilha = pasta.create_sheet(nome_planilha)
+    planilha.append(['Descrição', 'Valores'])
+    for descricao, valor in resumo:
+        planilha.append([descricao, _valor_celula(valor)])
+    planilha.append([])
+    planilha.append(list(colunas))
+    for lote in lotes:
+        valores = lote.astype(object).where(lote.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            planilha.append([_valor_celula(v) for v in linha])
+
+    with tempfile.TemporaryFile() as arquivo:
+        pasta.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            yield bloco
+
+
+def _valor_celula(valor):
+    # Tipos do numpy/pandas que o openpyxl não reconhece viram tipos nativos do Python
+    if valor is None:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
+
+
+def gerar_relatorio(formato, resumo, lotes, colunas):
+    """Despacha para gerar_csv ou gerar_xlsx conforme o formato ('csv' ou 'xlsx')."""
+    if formato == 'xlsx':
+        return gerar_xlsx(resumo, lotes, colunas)
+    if formato == 'csv':
+        return gerar_csv(resumo, lotes, colunas)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
@@ -0,0 +1,153 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Nomes usados para montar hóspedes, proprietários e parceiros fictícios
+PRIMEIROS_NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+                   'João', 'Karina', 'Lucas', 'Mariana', 'Nicolas', 'Olívia', 'Pedro', 'Rafaela', 'Sérgio',
+                   'Tatiana', 'Vinícius']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Lima', 'Pereira', 'Costa', 'Ferreira', 'Almeida',
+              'Ribeiro', 'Carvalho', 'Gomes', 'Martins', 'Araújo', 'Barbosa']
+STATUS = ['Paga', 'A Pagar']
+
+
+def _nomes(rng, n):
+    primeiros = np.asarray(PRIMEIROS_NOMES, dtype=object)[rng.integers(0, len(PRIMEIROS_NOMES), n)]
+    sobrenomes = np.asarray(SOBRENOMES, dtype=object)[rng.integers(0, len(SOBRENOMES), n)]
+    return primeiros + ' ' + sobrenomes
+
+
+def gerar_reservas(linhas, condominios=5, apartamentos=40, blocos=('A', 'B'), anos=3, taxa_sobreposicao=0.0,
+                   inicio='2022-01-01', semente=0):
+    """Gera um DataFrame de reservas fictícias no formato da planilha reservas.xlsx.
+
+    As `linhas` reservas são distribuídas entre `condominios` x `blocos` x `apartamentos` unidades e,
+    em cada unidade, enfileiradas sem sobreposição ao longo de cerca de `anos` anos a partir de `inicio`
+    (ou mais, quando as estadias de uma unidade não cabem nesse período).
+    Uma fração `taxa_sobreposicao` delas é antecipada para dividir noites com a reserva anterior da mesma
+    unidade (útil para exercitar a detecção de conflitos). A mesma `semente` gera sempre os mesmos dados.
+    """
+    rng = np.random.default_rng(semente)
+    unidades = condominios * len(blocos) * apartamentos
+    unidade = np.sort(rng.integers(0, unidades, linhas))
+    condominio = unidade // (len(blocos) * apartamentos)
+    bloco = (unidade // apartamentos) % len(blocos)
+    apartamento = 101 + unidade % apartamentos
+
+    # Em cada unidade as estadias se sucedem: a entrada é a soma das estadias e intervalos anteriores
+    noites = rng.integers(1, 15, linhas)
+    por_unidade = np.bincount(unidade, minlength=unidades)
+    passo_medio = anos * 365 / np.maximum(por_unidade, 1)
+    folga_media = np.maximum(passo_medio - noites.mean(), 0)[unidade]
+    intervalo = np.floor(rng.random(linhas) * 2 * folga_media).astype(np.int64)
+    passo = noites + intervalo
+    acumulado = np.cumsum(passo)
+    primeira = np.r_[True, unidade[1:] != unidade[:-1]]
+    deslocamento_unidade = np.maximum.accumulate(np.where(primeira, acumulado - passo, 0))
+    dia_entrada = acumulado - passo - deslocamento_unidade + intervalo
+
+    # Sobreposições propositais: a entrada recua para dentro da estadia anterior da mesma unidade
+    sobrepor = (rng.random(linhas) < taxa_sobreposicao) & ~primeira
+    noites_anteriores = np.r_[0, noites[:-1]]
+    recuo = intervalo + 1 + np.floor(rng.random(linhas) * np.maximum(noites_anteriores - 1, 0)).astype(np.int64)
+    dia_entrada = np.where(sobrepor, dia_entrada - recuo, dia_entrada)
+
+    origem = pd.Timestamp(inicio)
+    entrada = origem + pd.to_timedelta(dia_entrada, unit='D') + pd.Timedelta(hours=14)
+    saida = entrada + pd.to_timedelta(noites, unit='D') - pd.Timedelta(hours=3)
+    # Reservas feitas de 0 a 120 dias antes da entrada, mais concentradas nas semanas próximas
+    antecedencia = np.minimum(np.floor(rng.exponential(30, linhas)), 120).astype(np.int64)
+    data_reserva = entrada.normalize() - pd.to_timedelta(antecedencia, unit='D')
+
+    diaria = rng.integers(150, 900, unidades)[unidade]
+    valor = (diaria * noites).astype(np.float64)
+    proprietario = np.round(valor * 0.7, 2)
+    pago = np.where(rng.random(linhas) < 0.8, valor, np.round(valor * 0.3, 2))
+    nomes_condominio = np.asarray([f'Condomínio {i + 1}' for i in range(condominios)], dtype=object)
+    hospedes = _nomes(rng, linhas)
+    documento = rng.integers(10 ** 10, 10 ** 11, linhas)
+
+    return pd.DataFrame({
+        'Data de entrada': entrada,
+        'Data de saída': saida,
+        'Data da reserva': data_reserva,
+        'Valor da hospedagem': valor,
+        'Valor para o proprietário': proprietario,
+        'Nome do hóspede': hospedes,
+        'Quantidade de pessoas': rng.integers(1, 7, linhas),
+        'Número do apartamento': apartamento,
+        'Nome do proprietário': _nomes(rng, unidades)[unidade],
+        'A receber de parceiros': np.round(valor * rng.choice([0, 0.05, 0.1], linhas), 2),
+        'A pagar para parceiros': np.round(valor * rng.choice([0, 0.03, 0.05], linhas), 2),
+        'Nome do Condomínio': nomes_condominio[condominio],
+        'Bloco': np.asarray(blocos, dtype=object)[bloco],
+        'Endereço': [f'Rua {c + 1}, {a}' for c, a in zip(condominio, apartamento)],
+        'Pago': pago,
+        'A pagar': np.round(valor - pago, 2),
+        'Email do responsável': [n.lower().replace(' ', '.') + '@exemplo.com' for n in hospedes],
+        'Telefone do responsável': [f'(11) 9{t:04d}-{t % 10000:04d}' for t in rng.integers(0, 10000, linhas)],
+        'Documento do responsável': documento.astype(str),
+        'Status': np.where(pago >= valor, STATUS[0], STATUS[1]),
+    })
+
+
+def gerar_parceiros(linhas, semente=0):
+    """Gera parceiros fictícios no formato da planilha parceiros.xlsx."""
+    rng = np.random.default_rng(semente + 1)
+    return pd.DataFrame({
+        'Parceiro': [f'Parceiro {i + 1}' for i in range(linhas)],
+        'A receber': np.round(rng.random(linhas) * 5000, 2),
+        'A pagar': np.round(rng.random(linhas) * 3000, 2),
+    })
+
+
+def gerar_proprietarios(linhas, semente=0):
+    """Gera proprietários fictícios no formato da planilha proprietarios.xlsx."""
+    rng = np.random.default_rng(semente + 2)
+    nomes = _nomes(rng, linhas)
+    return pd.DataFrame({
+        'Nome Completo': nomes,
+        'Email': [f'{n.lower().replace(" ", ".")}{i}@exemplo.com' for i, n in enumerate(nomes)],
+        'Telefone': [f'(11) 3{t:03d}-{t % 10000:04d}' for t in rng.integers(0, 1000, linhas)],
+        'Documento': rng.integers(10 ** 10, 10 ** 11, linhas).astype(str),
+        'A pagar': np.round(rng.random(linhas) * 10000, 2),
+    })
+
+
+def gerar_planilhas(pasta, linhas, parceiros=50, proprietarios=None, **opcoes):
+    """Grava reservas.xlsx, parceiros.xlsx e proprietarios.xlsx fictícios em `pasta` e retorna os três caminhos.
+
+    `opcoes` vai para gerar_reservas; sem `proprietarios`, gera um por unidade.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    reservas = gerar_reservas(linhas, **opcoes)
+    if proprietarios is None:
+        proprietarios = reservas[['Nome do Condomínio', 'Bloco', 'Número do apartamento']].drop_duplicates().shape[0]
+    semente = opcoes.get('semente', 0)
+    caminhos = tuple(os.path.join(pasta, nome) for nome in ('reservas.xlsx', 'parceiros.xlsx', 'proprietarios.xlsx'))
+    reservas.to_excel(caminhos[0], index=False)
+    gerar_parceiros(parceiros, semente).to_excel(caminhos[1], index=False)
+    gerar_proprietarios(proprietarios, semente).to_excel(caminhos[2], index=False)
+    return caminhos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera planilhas fictícias de reservas, parceiros e proprietários.")
+    parser.add_argument("pasta", help="Pasta de destino das planilhas")
+    parser.add_argument("--linhas", type=int, default=10000, help="Quantidade de reservas")
+    parser.add_argument("--condominios", type=int, default=5)
+    parser.add_argument("--apartamentos", type=int, default=40, help="Apartamentos por bloco")
+    parser.add_argument("--blocos", default="A,B", help="Blocos separados por vírgula")
+    parser.add_argument("--anos", type=float, default=3, help="Anos cobertos pelas reservas")
+    parser.add_argument("--sobreposicao", type=float, default=0.0, help="Fração de reservas sobrepostas (0 a 1)")
+    parser.add_argument("--inicio", default="2022-01-01", help="Data da primeira reserva")
+    parser.add_argument("--parceiros", type=int, default=50)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+    for caminho in gerar_planilhas(args.pasta, args.linhas, parceiros=args.parceiros, condominios=args.condominios,
+                                   apartamentos=args.apartamentos, blocos=tuple(args.blocos.split(',')),
+                                   anos=args.anos, taxa_sobreposicao=args.sobreposicao, inicio=args.inicio,
+                                   semente=args.semente):
+        print(f"Arquivo salvo com sucesso em: {caminho}")
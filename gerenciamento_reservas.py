@@ -1,30 +1,676 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import os
+import threading
+from contextlib import contextmanager
+
+from armazenamento import armazenamento_padrao, escrever_excel, ler_excel
+from esquema import ESQUEMAS, aplicar_esquema, atribuir_valores, concatenar, converter_serie, memoria, relatorio_memoria
+from disponibilidade import ConflitoReservaError, MapaOcupacao
+from indice_intervalos import IndiceIntervalos, para_dia
+from importacao import detectar_conflitos, ler_em_lotes, validar_lote
+from exportacao import TAMANHO_LOTE, gerar_relatorio, lotes_dataframe
+from agregados import AgregadoDiario
+from analises import COLUNA_DATA_RESERVA, indicadores
+from recorrencia import (COLUNA_EXCECOES, COLUNA_RECORRENCIA, AgendaRecorrente, Recorrencia, eh_recorrente,
+                         expandir, ler_excecoes, linhas_ocorrencias, recorrentes, texto_excecoes)
+from indice_busca import LIMITE_PENDENTES, IndiceBuscaReservas
+from concorrencia import COLUNA_VERSAO, ConflitoVersaoError, mesclar_alteracoes
+from acerto import (COLUNA_COMISSAO, COLUNA_PARCEIRO, COLUNA_PROPRIETARIO, COLUNA_REPASSE, LivroAcertos,
+                    regras)
+from eventos import ATUALIZAR, INSERIR, diferencas, obter_log, valor_json
+from instrumentacao import iniciar_exportacao, instrumentar, log, medir, medir_gerador
+
+# Acima deste número de linhas alteradas de uma vez, as estruturas derivadas são reconstruídas em vez de atualizadas
+LIMITE_ATUALIZACAO_INCREMENTAL = 200
+
+# Limites usados quando o período de exportação fica aberto em uma das pontas
+DATA_MINIMA = pd.Timestamp('1900-01-01')
+DATA_MAXIMA = pd.Timestamp('2200-12-31')
+
+# Colunas que compõem o rótulo de cada registro no seletor pesquisável da interface
+CAMPOS_ROTULO = {
+    'reservas': ['Nome do hóspede', 'Número do apartamento', 'Data de entrada'],
+    'parceiros': ['Parceiro'],
+    'proprietarios': ['Nome Completo'],
+}
+
+# Chaves de filtro de atualizar_reservas resolvidas pelo índice de busca (mesmos parâmetros de filtrar_reservas)
+FILTROS_BUSCA = ('nome', 'numero_apartamento', 'entrada_de', 'entrada_ate', 'termo')
+
+# Colunas que definem onde e quando uma reserva ocupa um apartamento (alterá-las exige checar conflitos)
+COLUNAS_OCUPACAO = ['Data de entrada', 'Data de saída', 'Número do apartamento', 'Nome do Condomínio', 'Bloco',
+                    COLUNA_RECORRENCIA, COLUNA_EXCECOES]
+
+# Partes do acerto: tipo no livro -> (tabela, coluna do nome, coluna da regra)
+TABELAS_ACERTO = {
+    'parceiro': ('parceiros', 'Parceiro', COLUNA_COMISSAO),
+    'proprietario': ('proprietarios', 'Nome Completo', COLUNA_REPASSE),
+}
+
+# Colunas somadas por condomínio em resumo_por_condominio
+COLUNAS_RESUMO_CONDOMINIO = ['Valor da hospedagem', 'A pagar', 'Pago']
+
+TABELAS = ('reservas', 'parceiros', 'proprietarios')
+
+# Instâncias compartilhadas por todo o processo (o Streamlit reexecuta o script a cada
+# interação, mas os módulos importados permanecem carregados entre as execuções)
+_instancias = {}
+_instancias_lock = threading.Lock()
+
+
+def _lotes_detalhe(partes, colunas, tamanho_lote, progresso=None):
+    """lotes_dataframe de cada (df, rótulos) de `partes`, em sequência, com o `progresso` somado sobre todas."""
+    total = sum(len(rotulos) for _, rotulos in partes)
+    entregues = 0
+    for df, rotulos in partes:
+        if not len(rotulos):
+            continue
+        parcial = None
+        if progresso is not None:
+            parcial = lambda fracao, base=entregues, n=len(rotulos): progresso((base + fracao * n) / total)
+        yield from lotes_dataframe(df, rotulos, colunas, tamanho_lote, parcial)
+        entregues += len(rotulos)
+
+
+def _no_periodo(df, inicio=None, fim=None):
+    """Só as colunas usadas por _resumo_condominios, das reservas de `df` que ocupam algum dia do período."""
+    colunas = ['Nome do Condomínio', 'Bloco', 'Número do apartamento'] + COLUNAS_RESUMO_CONDOMINIO
+    if df.empty or not {'Data de entrada', 'Data de saída'} <= set(df.columns):
+        return pd.DataFrame(columns=colunas)
+    mascara = pd.Series(True, index=df.index)
+    if fim is not None:
+        mascara &= pd.to_datetime(df['Data de entrada'], errors='coerce').dt.normalize() <= pd.Timestamp(fim).normalize()
+    if inicio is not None:
+        mascara &= pd.to_datetime(df['Data de saída'], errors='coerce').dt.normalize() >= pd.Timestamp(inicio).normalize()
+    return df.loc[mascara, [c for c in colunas if c in df.columns]].reindex(columns=colunas)
+
+
+def _resumo_condominios(periodo):
+    """Reservas, somas e apartamentos ocupados por condomínio (`periodo` vem de _no_periodo)."""
+    colunas = ['Nome do Condomínio', 'Reservas'] + COLUNAS_RESUMO_CONDOMINIO + ['Apartamentos ocupados']
+    if periodo.empty:
+        return pd.DataFrame(columns=colunas)
+    condominio = periodo['Nome do Condomínio'].astype(object)
+    grupos = periodo.groupby(condominio, dropna=False, sort=False)
+    resumo = pd.DataFrame({'Reservas': grupos.size()})
+    for coluna in COLUNAS_RESUMO_CONDOMINIO:
+        resumo[coluna] = grupos[coluna].sum().round(2)
+    apartamentos = periodo[['Nome do Condomínio', 'Bloco', 'Número do apartamento']].astype(object)
+    resumo['Apartamentos ocupados'] = apartamentos.drop_duplicates().groupby('Nome do Condomínio', dropna=False).size()
+    return resumo.rename_axis('Nome do Condomínio').reset_index().sort_values('Nome do Condomínio', ignore_index=True)[colunas]
+
+
+def obter_gerenciador(reservas_path, parceiros_path, proprietarios_path):
+    """Retorna a instância compartilhada para esses arquivos, recarregando apenas as tabelas que mudaram no armazenamento."""
+    chave = (reservas_path, parceiros_path, proprietarios_path)
+    with _instancias_lock:
+        gerenciador = _instancias.get(chave)
+        if gerenciador is None:
+            iniciar_exportacao()
+            gerenciador = GerenciamentoReservas(reservas_path, parceiros_path, proprietarios_path)
+            _instancias[chave] = gerenciador
+            return gerenciador
+    gerenciador.recarregar_se_modificado()
+    return gerenciador
+
+
+class _TabelaSobDemanda:
+    """Atributo df_<tabela> do gerenciador: a tabela só é lida do armazenamento no primeiro acesso."""
+
+    def __set_name__(self, dono, nome):
+        self.tabela = nome[len('df_'):]
+
+    def __get__(self, gerenciador, dono=None):
+        if gerenciador is None:
+            return self
+        df = gerenciador._dados.get(self.tabela)
+        if df is None:
+            with gerenciador._lock:
+                if self.tabela not in gerenciador._dados:
+                    gerenciador._carregar_tabela(self.tabela)
+                df = gerenciador._dados[self.tabela]
+        return df
+
+    def __set__(self, gerenciador, df):
+        gerenciador._dados[self.tabela] = df
+
 
 class GerenciamentoReservas:
-    def __init__(self, reservas_path, parceiros_path, proprietarios_path):
+    # Cada página da interface só paga pela leitura das tabelas que de fato consulta
+    df_reservas = _TabelaSobDemanda()
+    df_parceiros = _TabelaSobDemanda()
+    df_proprietarios = _TabelaSobDemanda()
+
+    def __init__(self, reservas_path, parceiros_path, proprietarios_path, armazenamento=None, eventos=None):
         current_dir = os.path.dirname(os.path.abspath(__file__))
 
         # Caminhos para os arquivos
         self.reservas_path = os.path.join(current_dir, reservas_path)
         self.parceiros_path = os.path.join(current_dir, parceiros_path)
         self.proprietarios_path = os.path.join(current_dir, proprietarios_path)
-        
-        # Carregar dados das planilhas
-        self.df_reservas = self.load_data(self.reservas_path)
-        self.df_parceiros = self.load_data(self.parceiros_path)
-        self.df_proprietarios = self.load_data(self.proprietarios_path)
 
-        # Verificar e adicionar colunas faltantes para as informações do responsável na tabela de reservas
-        self.ensure_responsavel_columns()
+        # Backend de persistência (Excel por padrão, SQLite via RESERVAS_ARMAZENAMENTO=sqlite)
+        if armazenamento is None:
+            armazenamento = armazenamento_padrao(self.reservas_path, self.parceiros_path, self.proprietarios_path)
+        self.armazenamento = armazenamento
+
+        # Log de alterações (eventos.LogEventos) que recebe cada inclusão e alteração; None desliga o registro
+        self.eventos = obter_log() if eventos is None else (eventos or None)
+
+        # Tabelas já lidas (tabela -> DataFrame); as demais são carregadas no primeiro acesso a df_<tabela>
+        self._dados = {}
+        # Assinatura de cada tabela no armazenamento no momento da última leitura/gravação
+        self._assinaturas = {}
+        # Contadores de versão dos dados (total e por tabela), incrementados a cada carregamento ou alteração;
+        # a interface usa-os como chave para reaproveitar relatórios já calculados
+        self.versao = 0
+        self.versoes = {'reservas': 0, 'parceiros': 0, 'proprietarios': 0}
+        self._lock = threading.RLock()
+        # Memória de cada tabela antes/depois de aplicar o esquema no último carregamento
+        self.relatorios_memoria = {}
+
+        # Índice de intervalos (entrada, saída) das reservas, montado sob demanda na primeira consulta
+        self._indice_reservas = None
+        # Noites reservadas por apartamento, para detectar reservas duplicadas (também montado sob demanda)
+        self._mapa_ocupacao = None
+        # Ocupação e valores por dia e por apartamento, para totais de períodos por somas de prefixo (sob demanda)
+        self._agregado_diario = None
+        # Trigramas dos campos de texto e índices ordenados de apartamento e entrada, para os filtros (sob demanda)
+        self._indice_busca = None
+        # Saldos de acerto de parceiros e proprietários, lançados a partir das reservas (sob demanda)
+        self._livro_acertos = None
+        # Reservas recorrentes (regra + exceções), expandidas só na janela de cada consulta (sob demanda)
+        self._agenda_recorrente = None
+        # O que fazer com uma reserva que conflita com outra: 'rejeitar', 'sinalizar' (só avisa) ou 'ignorar'
+        self.politica_conflitos = 'rejeitar'
+        # Ordenações e rótulos já calculados para a paginação, guardados com a versão da tabela
+        self._ordenacoes = {}
+        self._rotulos = {}
+
+    def carregar(self, *tabelas):
+        """Lê agora as `tabelas` (todas, se nenhuma) que ainda não estão em memória; as já lidas ficam como estão."""
+        with self._lock:
+            for tabela in tabelas or TABELAS:
+                if tabela not in self._dados:
+                    self._carregar_tabela(tabela)
+        return self
+
+    def tabelas_carregadas(self):
+        """Tabelas que já estão em memória."""
+        return [tabela for tabela in TABELAS if tabela in self._dados]
+
+    def recarregar(self):
+        """Força a releitura das tabelas já carregadas (as demais serão lidas no primeiro acesso)."""
+        with self._lock:
+            for tabela in self.tabelas_carregadas():
+                self._carregar_tabela(tabela)
+
+    def recarregar_se_modificado(self):
+        """Relê apenas as tabelas carregadas que mudaram desde a última leitura. Retorna True se algo foi recarregado."""
+        recarregou = False
+        with self._lock:
+            for tabela in self.tabelas_carregadas():
+                if self._modificado(tabela):
+                    self._carregar_tabela(tabela)
+                    recarregou = True
+        return recarregou
+
+    def _modificado(self, tabela):
+        """Verifica se a tabela mudou no armazenamento desde a última leitura/gravação feita por esta instância."""
+        return self.armazenamento.assinatura(tabela) != self._assinaturas.get(tabela)
+
+    def _carregar_tabela(self, tabela):
+        """Lê uma tabela do armazenamento para o atributo df_<tabela>."""
+        # A assinatura é lida antes dos dados: se a tabela mudar durante a leitura, a próxima verificação recarrega
+        with medir('carregar', tabela) as medicao:
+            self._assinaturas[tabela] = self.armazenamento.assinatura(tabela)
+            df = self.armazenamento.carregar(tabela)
+
+            # Aplica o esquema declarado (datas, categorias, inteiros e valores monetários) e registra a memória
+            # antes e depois; nem sempre diminui (ex.: documentos lidos como número passam a texto)
+            antes = memoria(df)
+            df = aplicar_esquema(df, tabela)
+            # Medido antes de acrescentar a coluna de versão, que não existia na leitura
+            depois = memoria(df)
+            if COLUNA_VERSAO not in df.columns:
+                # Tabelas gravadas antes do controle de versão: todos os registros começam na versão 0
+                df[COLUNA_VERSAO] = converter_serie(pd.Series(0, index=df.index), 'inteiro')
+            elif df[COLUNA_VERSAO].isna().any():
+                # Linhas sem versão (partições ainda não regravadas, linhas incluídas à mão na planilha) também
+                df[COLUNA_VERSAO] = df[COLUNA_VERSAO].fillna(0)
+            medicao['linhas'] = len(df)
+        relatorio = relatorio_memoria(tabela, antes, depois, len(df))
+        self.relatorios_memoria[tabela] = relatorio
+        log.info("Tabela '%s' carregada: %d linhas, %s -> %s bytes/linha", tabela, relatorio['linhas'],
+                 relatorio['bytes_por_linha_antes'], relatorio['bytes_por_linha_depois'])
+
+        setattr(self, f'df_{tabela}', df)
+        self._nova_versao(tabela)
+        if tabela == 'reservas':
+            # Verificar e adicionar colunas faltantes para as informações do responsável na tabela de reservas
+            self.ensure_responsavel_columns()
+            self._invalidar_derivados_reservas()
+        else:
+            # As regras de comissão e repasse vêm das tabelas de parceiros e proprietários
+            self._livro_acertos = None
+
+    @contextmanager
+    def _escrita(self, tabela):
+        """Seção de escrita de uma tabela, exclusiva entre as threads e entre os processos que usam o armazenamento.
+
+        Se outro processo gravou a tabela desde a última leitura, ela é relida antes da alteração, que assim
+        parte dos dados atuais em vez de sobrescrever a gravação do outro processo.
+        """
+        with self._lock, self.armazenamento.bloquear(tabela):
+            if tabela not in self._dados:
+                self._carregar_tabela(tabela)
+            elif self._modificado(tabela):
+                log.info("Tabela '%s' alterada por outro processo; recarregando antes de gravar.", tabela)
+                self._carregar_tabela(tabela)
+            yield
+
+    def _concatenar(self, tabela, novas):
+        """Acrescenta as linhas `novas` a df_<tabela> com ids novos.
+
+        Com o armazenamento particionado, os ids também não colidem com os das partições não carregadas.
+        """
+        proximo_id = getattr(self.armazenamento, 'proximo_id', None)
+        primeiro_id = proximo_id(tabela) if proximo_id is not None else 0
+        setattr(self, f'df_{tabela}', concatenar(getattr(self, f'df_{tabela}'), novas, tabela, primeiro_id))
+
+    def _versao_registro(self, tabela, id_):
+        versao = getattr(self, f'df_{tabela}').at[id_, COLUNA_VERSAO]
+        return 0 if pd.isna(versao) else int(versao)
+
+    def _conferir_versao(self, tabela, id_, valores, versao_esperada, base):
+        """Controle otimista: confere se o registro ainda está na versão em que a edição começou.
+
+        Sem `versao_esperada`, ou com o registro ainda nessa versão, os `valores` valem como vieram. Se outro
+        processo gravou o registro nesse meio-tempo, a edição é combinada com a gravação dele quando `base` (o
+        registro como estava ao abrir a edição) é informado e os campos alterados não se sobrepõem; senão
+        levanta ConflitoVersaoError. Retorna {coluna: valor} a gravar.
+        """
+        if versao_esperada is None or pd.isna(versao_esperada):
+            return valores
+        atual = self._versao_registro(tabela, id_)
+        if atual == int(versao_esperada):
+            return valores
+        if base is None:
+            raise ConflitoVersaoError(
+                f"O registro {id_} foi alterado por outra pessoa (versão {atual}, edição iniciada na versão "
+                f"{int(versao_esperada)}). Recarregue o registro e refaça a edição.",
+                []
+            )
+        atuais = getattr(self, f'df_{tabela}').loc[id_].to_dict()
+        return mesclar_alteracoes(tabela, atuais, valores, base)
+
+    def _aplicar_campos(self, tabela, ids, valores):
+        """Grava `valores` ({coluna: escalar ou Series por id}) nas linhas `ids`, uma atribuição por coluna.
+
+        Incrementa a versão das linhas e persiste todas elas de uma vez.
+        """
+        df = getattr(self, f'df_{tabela}')
+        antes = df.loc[ids, [c for c in valores if c in df.columns]] if self.eventos is not None else None
+        for coluna, valor in valores.items():
+            atribuir_valores(df, ids, coluna, valor, tabela)
+        df.loc[ids, COLUNA_VERSAO] = df.loc[ids, COLUNA_VERSAO].fillna(0) + 1
+        if self._persistir(tabela, ids) and antes is not None:
+            self._registrar_eventos(tabela, ATUALIZAR, antes, df.loc[ids, list(valores)])
+        if COLUNA_COMISSAO in valores or COLUNA_REPASSE in valores:
+            # Mudou uma regra: os lançamentos calculados por percentual são refeitos na próxima consulta
+            self._livro_acertos = None
+
+    def _selecionar(self, tabela, filtro):
+        """Ids de df_<tabela> escolhidos por `filtro` (formatos aceitos em atualizar_reservas)."""
+        df = getattr(self, f'df_{tabela}')
+        if callable(filtro):
+            filtro = filtro(df)
+        if isinstance(filtro, dict):
+            filtro = dict(filtro)
+            mascara = np.ones(len(df), dtype=bool)
+            busca = {}
+            if tabela == 'reservas':
+                busca = {chave: filtro.pop(chave) for chave in FILTROS_BUSCA if chave in filtro}
+            if busca:
+                mascara &= df.index.isin(self._obter_indice_busca().filtrar(df, **busca))
+            for coluna, valor in filtro.items():
+                if coluna not in df.columns:
+                    raise KeyError(f"Coluna desconhecida no filtro: {coluna}")
+                if isinstance(valor, (list, tuple, set, np.ndarray, pd.Index)):
+                    mascara &= df[coluna].isin(list(valor)).to_numpy(dtype=bool)
+                else:
+                    mascara &= (df[coluna] == valor).fillna(False).to_numpy(dtype=bool)
+            return df.index[mascara]
+        if isinstance(filtro, pd.Series) and pd.api.types.is_bool_dtype(filtro.dtype):
+            return df.index[filtro.reindex(df.index, fill_value=False).to_numpy(dtype=bool)]
+        ids = pd.Index(np.atleast_1d(filtro))
+        encontrados = df.index[df.index.isin(ids)]
+        if len(encontrados) < len(ids):
+            log.warning("%d ids não encontrados na tabela '%s' foram ignorados.", len(ids) - len(encontrados), tabela)
+        return encontrados
+
+    def _resolver_campos(self, tabela, ids, campos):
+        """Confere as colunas de `campos` e calcula os valores dados por função (recebem a coluna atual das linhas)."""
+        df = getattr(self, f'df_{tabela}')
+        valores = {}
+        for coluna, valor in campos.items():
+            if coluna == COLUNA_VERSAO:
+                raise ValueError(f"A coluna '{COLUNA_VERSAO}' é controlada pelo gerenciador.")
+            if coluna not in df.columns and coluna not in ESQUEMAS[tabela]:
+                raise KeyError(f"Coluna desconhecida na tabela '{tabela}': {coluna}")
+            if callable(valor):
+                atual = df.loc[ids, coluna] if coluna in df.columns else pd.Series(None, index=ids, dtype=object)
+                valor = pd.Series(valor(atual), index=ids)
+            valores[coluna] = valor
+        return valores
+
+    def _conferir_conflitos_em_massa(self, ids, valores):
+        """Aplica a politica_conflitos às reservas `ids` como ficariam com `valores` (entre si e com as demais)."""
+        if self.politica_conflitos == 'ignorar' or not any(c in valores for c in COLUNAS_OCUPACAO):
+            return
+        df = self.df_reservas
+        colunas = [c for c in COLUNAS_OCUPACAO if c in df.columns or c in valores]
+        novas = df.loc[ids, [c for c in colunas if c in df.columns]].copy()
+        for coluna, valor in valores.items():
+            if coluna in colunas:
+                atribuir_valores(novas, ids, coluna, valor, 'reservas')
+        existentes = df.loc[~df.index.isin(ids), [c for c in colunas if c in df.columns]]
+        conflitos = sorted(detectar_conflitos(existentes, novas))
+        if not conflitos:
+            return
+        mensagem = (f"A alteração deixaria {len(conflitos)} reservas em conflito com outras do mesmo "
+                    f"apartamento: {conflitos[:20]}{'...' if len(conflitos) > 20 else ''}")
+        if self.politica_conflitos == 'rejeitar':
+            raise ConflitoReservaError(mensagem, conflitos)
+        log.warning(mensagem)
+
+    def _atualizar_em_massa(self, tabela, filtro, campos):
+        with self._escrita(tabela), medir(f'atualizar_{tabela}_em_massa', tabela) as medicao:
+            ids = self._selecionar(tabela, filtro)
+            medicao['linhas'] = len(ids)
+            if ids.empty or not campos:
+                return 0
+            valores = self._resolver_campos(tabela, ids, campos)
+            if tabela == 'reservas':
+                self._conferir_conflitos_em_massa(ids, valores)
+            self._aplicar_campos(tabela, ids, valores)
+            if tabela == 'reservas':
+                self._ao_alterar_reservas(ids)
+            log.info("%d registros da tabela '%s' atualizados (%s).", len(ids), tabela, ', '.join(valores))
+            return len(ids)
+
+    def assinatura_dados(self, *tabelas):
+        """Versão dos dados em memória das `tabelas` (todas, se nenhuma), estável entre processos e reinícios.
+
+        É a assinatura do armazenamento no último carregamento ou gravação de cada tabela, junto com os
+        caminhos; serve de chave para os relatórios guardados em disco (veja tarefas.py). Assinaturas que
+        só valem dentro deste processo (o contador local do journal) levam o pid junto.
+        """
+        with self._lock:
+            assinaturas = []
+            for tabela in tabelas or TABELAS:
+                # Tabela ainda não lida: vale a assinatura atual do armazenamento, que é a que será carregada
+                assinatura = (self._assinaturas.get(tabela) if tabela in self._dados
+                              else self.armazenamento.assinatura(tabela))
+                if isinstance(assinatura, tuple) and assinatura[:1] == ('local',):
+                    assinatura = (os.getpid(), id(self)) + assinatura
+                assinaturas.append((tabela, assinatura))
+            return [self.reservas_path, self.parceiros_path, self.proprietarios_path, assinaturas]
+
+    def _nova_versao(self, tabela):
+        self.versao += 1
+        self.versoes[tabela] += 1
+
+    def _invalidar_derivados_reservas(self):
+        """Descarta as estruturas derivadas das reservas; cada uma é remontada na próxima consulta."""
+        self._indice_reservas = None
+        self._mapa_ocupacao = None
+        self._agregado_diario = None
+        self._indice_busca = None
+        self._livro_acertos = None
+        self._agenda_recorrente = None
+
+    def _reservas_avulsas(self):
+        """Reservas sem regra de recorrência: as que entram no índice de intervalos e no mapa de ocupação."""
+        mascara = recorrentes(self.df_reservas)
+        return self.df_reservas[~mascara] if mascara.any() else self.df_reservas
+
+    def _obter_indice_reservas(self):
+        """Retorna o índice de intervalos das reservas, montando-o na primeira chamada após um carregamento."""
+        with self._lock:
+            if self._indice_reservas is None:
+                if self.check_columns(self.df_reservas, ['Data de entrada', 'Data de saída']):
+                    avulsas = self._reservas_avulsas()
+                    self._indice_reservas = IndiceIntervalos.construir(
+                        avulsas.index, avulsas['Data de entrada'], avulsas['Data de saída']
+                    )
+                else:
+                    self._indice_reservas = IndiceIntervalos()
+            return self._indice_reservas
+
+    def _obter_mapa_ocupacao(self):
+        """Retorna o mapa de ocupação por apartamento, montando-o na primeira chamada após um carregamento."""
+        with self._lock:
+            if self._mapa_ocupacao is None:
+                if self.check_columns(self.df_reservas, ['Data de entrada', 'Data de saída', 'Número do apartamento']):
+                    self._mapa_ocupacao = MapaOcupacao.construir(self._reservas_avulsas())
+                else:
+                    self._mapa_ocupacao = MapaOcupacao()
+            return self._mapa_ocupacao
+
+    def _obter_agregado_diario(self):
+        """Retorna o agregado diário de ocupação e valores, montando-o na primeira chamada após um carregamento."""
+        with self._lock:
+            if self._agregado_diario is None:
+                if self.check_columns(self.df_reservas, ['Data de entrada', 'Data de saída', 'Número do apartamento']):
+                    self._agregado_diario = AgregadoDiario.construir(self.df_reservas)
+                else:
+                    self._agregado_diario = AgregadoDiario()
+            return self._agregado_diario
+
+    def _obter_indice_busca(self):
+        """Retorna o índice de busca das reservas, montando-o na primeira chamada após um carregamento."""
+        with self._lock:
+            if self._indice_busca is None:
+                self._indice_busca = IndiceBuscaReservas.construir(self.df_reservas)
+            return self._indice_busca
+
+    def _obter_agenda_recorrente(self):
+        """Retorna a agenda das reservas recorrentes, montando-a na primeira chamada após um carregamento."""
+        with self._lock:
+            if self._agenda_recorrente is None:
+                self._agenda_recorrente = AgendaRecorrente.construir(self.df_reservas)
+            return self._agenda_recorrente
+
+    def _ocorrencias(self, inicio, fim):
+        """Ocorrências das reservas recorrentes com algum dia em [inicio, fim], como linhas da tabela de reservas.
+
+        Cada linha repete a reserva de origem (o índice é o id dela) com as datas da ocorrência e o número
+        dela na coluna 'Ocorrência'.
+        """
+        return linhas_ocorrencias(self.df_reservas, self._obter_agenda_recorrente().ocorrencias(inicio, fim))
+
+    def _obter_livro_acertos(self):
+        """Retorna o livro de acertos, montando-o na primeira chamada após um carregamento ou mudança de regra."""
+        with self._lock:
+            if self._livro_acertos is None:
+                self._livro_acertos = LivroAcertos.construir(
+                    self.df_reservas,
+                    regras(self.df_parceiros, COLUNA_COMISSAO),
+                    regras(self.df_proprietarios, COLUNA_REPASSE)
+                )
+            return self._livro_acertos
+
+    def _ao_alterar_reservas(self, indices):
+        """Atualiza as estruturas derivadas das reservas depois que as linhas `indices` foram incluídas ou alteradas."""
+        if len(indices) > LIMITE_ATUALIZACAO_INCREMENTAL:
+            # Para lotes grandes é mais barato reconstruir tudo (sob demanda) do que inserir linha a linha
+            self._invalidar_derivados_reservas()
+            return
+        repetem = set()
+        if COLUNA_RECORRENCIA in self.df_reservas.columns:
+            # Reservas recorrentes ficam só na agenda; as avulsas saem dela (se eram recorrentes antes)
+            repetem = {indice for indice in indices if eh_recorrente(self.df_reservas.at[indice, COLUNA_RECORRENCIA])}
+            if self._agenda_recorrente is not None:
+                for indice in indices:
+                    self._agenda_recorrente.adicionar(indice, self.df_reservas.loc[indice])
+        self._atualizar_derivados_avulsos([indice for indice in indices if indice not in repetem], repetem)
+        self._atualizar_derivados_gerais(indices)
+
+    def _atualizar_derivados_avulsos(self, indices, removidos=()):
+        # Estruturas só das reservas avulsas; `removidos` passaram a ser recorrentes e saem delas
+        for estrutura in (self._indice_reservas, self._mapa_ocupacao):
+            if estrutura is not None:
+                for indice in removidos:
+                    estrutura.remover(indice)
+        if self._indice_reservas is not None:
+            for indice in indices:
+                self._indice_reservas.adicionar(
+                    indice,
+                    self.df_reservas.at[indice, 'Data de entrada'],
+                    self.df_reservas.at[indice, 'Data de saída']
+                )
+        if self._mapa_ocupacao is not None:
+            for indice in indices:
+                linha = self.df_reservas.loc[indice]
+                self._mapa_ocupacao.adicionar(
+                    indice, linha.get('Nome do Condomínio'), linha.get('Bloco'), linha['Número do apartamento'],
+                    linha['Data de entrada'], linha['Data de saída']
+                )
+
+    def _atualizar_derivados_gerais(self, indices):
+        # Estruturas que recebem avulsas e recorrentes (estas, expandidas em ocorrências pela própria estrutura)
+        if self._agregado_diario is not None:
+            for indice in indices:
+                self._agregado_diario.adicionar(indice, self.df_reservas.loc[indice])
+        if self._indice_busca is not None:
+            for indice in indices:
+                self._indice_busca.adicionar(indice, self.df_reservas.loc[indice])
+            if self._indice_busca.pendentes > LIMITE_PENDENTES:
+                self._indice_busca = None
+        if self._livro_acertos is not None:
+            for indice in indices:
+                self._livro_acertos.adicionar(indice, self.df_reservas.loc[indice])
+
+    def _conferir_partes(self, id_parceiro=None, id_proprietario=None):
+        """Levanta KeyError se o parceiro ou o proprietário informado não está cadastrado."""
+        for id_, tabela in ((id_parceiro, 'parceiros'), (id_proprietario, 'proprietarios')):
+            if id_ is not None and id_ not in getattr(self, f'df_{tabela}').index:
+                raise KeyError(f"ID {id_} não encontrado na tabela '{tabela}'.")
+
+    @instrumentar('verificar_conflitos', 'reservas')
+    def verificar_conflitos(self, data_entrada, data_saida, numero_apartamento, condominio, bloco, ignorar_id=None):
+        """Retorna os ids das reservas do mesmo apartamento que dividem alguma noite com o período informado."""
+        return [
+            id_
+            for estrutura in (self._obter_mapa_ocupacao(), self._obter_agenda_recorrente())
+            for id_ in estrutura.conflitos(condominio, bloco, numero_apartamento, data_entrada, data_saida,
+                                           ignorar=ignorar_id)
+        ]
+
+    def _aplicar_politica_conflitos(self, data_entrada, data_saida, numero_apartamento, condominio, bloco, ignorar_id=None,
+                                    recorrencia=None, excecoes=None):
+        """Rejeita (ConflitoReservaError) ou apenas avisa sobre uma reserva que ocuparia um apartamento já reservado.
+
+        Com `recorrencia`, todas as ocorrências da regra (menos as `excecoes`) são checadas. Uma regra cujas
+        ocorrências se sobrepõem entre si é recusada com ValueError em qualquer política: ela reservaria o
+        mesmo apartamento duas vezes sozinha.
+        """
+        regra = Recorrencia.de_texto(recorrencia) if eh_recorrente(recorrencia) else None
+        if regra is not None and regra.sobrepoe(data_entrada, data_saida):
+            raise ValueError(f"A regra '{regra}' repete a reserva antes do fim da estadia ({data_entrada} a "
+                             f"{data_saida}): as ocorrências se sobreporiam.")
+        if self.politica_conflitos == 'ignorar':
+            return
+        if regra is not None:
+            _, entradas, saidas = regra.ocorrencias(data_entrada, data_saida, excecoes=ler_excecoes(excecoes))
+            estadias = zip(entradas, saidas)
+        else:
+            estadias = [(data_entrada, data_saida)]
+        conflitos = []
+        for entrada, saida in estadias:
+            conflitos.extend(id_ for id_ in self.verificar_conflitos(entrada, saida, numero_apartamento, condominio,
+                                                                     bloco, ignorar_id) if id_ not in conflitos)
+        if not conflitos:
+            return
+        mensagem = (f"Apartamento {numero_apartamento} ({condominio}, bloco {bloco}) já reservado entre "
+                    f"{data_entrada} e {data_saida}: conflito com as reservas {conflitos}.")
+        if self.politica_conflitos == 'rejeitar':
+            raise ConflitoReservaError(mensagem, conflitos)
+        log.warning(mensagem)
+
+    @instrumentar('disponibilidade', 'reservas')
+    def disponibilidade(self, inicio, fim):
+        """Retorna os apartamentos (já vistos nas reservas) sem nenhuma noite reservada entre `inicio` e `fim` (saída)."""
+        agenda = self._obter_agenda_recorrente()
+        return self._obter_mapa_ocupacao().disponiveis(inicio, fim, agenda.ocupados(inicio, fim), agenda.rotulos())
+
+    def _registrar_eventos(self, tabela, operacao, antes, depois):
+        """Manda ao log de eventos as diferenças célula a célula entre `antes` e `depois` (mesmos ids).
+
+        Na inclusão (`antes` sem colunas) todo registro gera um evento; na alteração, só os que mudaram.
+        """
+        alteracoes = diferencas(antes, depois)
+        ids = depois.index if operacao == INSERIR else list(alteracoes)
+        versoes = getattr(self, f'df_{tabela}')[COLUNA_VERSAO]
+        # 'tabela' e 'id' vêm primeiro: LogEventos.ler_desde filtra um registro pelo texto da linha
+        eventos = [
+            {'tabela': tabela, 'id': valor_json(id_), 'operacao': operacao, 'versao': valor_json(versoes.get(id_)),
+             'alteracoes': alteracoes.get(id_, {})}
+            for id_ in ids
+        ]
+        try:
+            self.eventos.registrar(eventos)
+        except OSError as e:
+            log.error("Erro ao registrar %d eventos da tabela '%s': %s", len(eventos), tabela, e)
+
+    def historico(self, tabela, id_):
+        """Alterações registradas do registro `id_`, uma linha por campo alterado, da mais antiga à mais recente."""
+        colunas = ['Seq', 'Momento', 'Usuário', 'Operação', 'Versão', 'Campo', 'Antes', 'Depois']
+        if self.eventos is None:
+            return pd.DataFrame(columns=colunas)
+        linhas = [
+            (evento['seq'], evento['momento'], evento['usuario'], evento['operacao'], evento['versao'],
+             campo, antes, depois)
+            for evento in self.eventos.historico(tabela, id_)
+            for campo, (antes, depois) in evento['alteracoes'].items()
+        ]
+        return pd.DataFrame(linhas, columns=colunas)
+
+    def _persistir(self, tabela, indices, nova=False):
+        """Grava no armazenamento as linhas `indices` de df_<tabela> (inseridas se `nova`, senão alteradas).
+
+        Retorna se a gravação deu certo; só então as inclusões vão para o log de eventos (as alterações são
+        registradas por _aplicar_campos, pelo mesmo critério).
+        """
+        df = getattr(self, f'df_{tabela}')
+        # A tabela em memória já mudou, mesmo que a gravação falhe
+        self._nova_versao(tabela)
+        try:
+            with medir('persistir', tabela) as medicao:
+                medicao['linhas'] = len(indices)
+                if nova:
+                    self.armazenamento.inserir(tabela, df, indices)
+                else:
+                    self.armazenamento.atualizar(tabela, df, indices)
+        except Exception as e:
+            log.error("Erro ao salvar a tabela '%s': %s", tabela, e)
+            return False
+        self._assinaturas[tabela] = self.armazenamento.assinatura(tabela)
+        if nova and self.eventos is not None:
+            self._registrar_eventos(tabela, INSERIR, pd.DataFrame(index=indices),
+                                    df.loc[indices].drop(columns=[COLUNA_VERSAO], errors='ignore'))
+        return True
 
     def ensure_responsavel_columns(self):
         """Verifica se as colunas do responsável estão presentes no DataFrame de reservas e as adiciona, se necessário."""
         required_columns = ['Email do responsável', 'Telefone do responsável', 'Documento do responsável']
         for col in required_columns:
             if col not in self.df_reservas.columns:
-                self.df_reservas[col] = None  # Adiciona a coluna com valores nulos se não existir
+                # Adiciona a coluna de texto com valores nulos se não existir
+                self.df_reservas[col] = converter_serie(pd.Series(None, index=self.df_reservas.index), 'texto')
 
     
 
@@ -33,132 +679,317 @@ class GerenciamentoReservas:
         today = datetime.today().date()
         start_week = today - timedelta(days=today.weekday())  # Início da semana
         end_week = start_week + timedelta(days=6)  # Fim da semana
+        return self.calcular_totais(start_week, end_week)
 
-        # Converte as colunas 'Data de entrada' e 'Data de saída' para o tipo 'date' para comparação
-        self.df_reservas['Data de entrada'] = pd.to_datetime(self.df_reservas['Data de entrada']).dt.date
-        self.df_reservas['Data de saída'] = pd.to_datetime(self.df_reservas['Data de saída']).dt.date
+    @instrumentar('calcular_totais', 'reservas')
+    def calcular_totais(self, inicio, fim):
+        """Calcula os totais das reservas que ocupam algum dia entre `inicio` e `fim` (inclusive)."""
+        # Consulta o índice de intervalos em vez de varrer a tabela (e sem converter as colunas de data)
+        ids = self._obter_indice_reservas().sobrepostos(inicio, fim)
+        reservas_periodo = self.df_reservas.loc[ids]
+        ocorrencias = self._ocorrencias(inicio, fim)
+        if not ocorrencias.empty:
+            reservas_periodo = pd.concat([reservas_periodo, ocorrencias])
+        return (reservas_periodo,) + self.totais_periodo(inicio, fim)
 
-        # Filtrar reservas para a semana atual
-        reservas_semanal = self.df_reservas[
-            (self.df_reservas['Data de entrada'] <= end_week) &
-            (self.df_reservas['Data de saída'] >= start_week)
-        ]
+    @instrumentar('totais_periodo', 'reservas')
+    def totais_periodo(self, inicio, fim):
+        """Mesmos totais de calcular_totais, obtidos por somas de prefixo no agregado diário (sem ler as linhas)."""
+        # Cada ocorrência das recorrentes já está no agregado como uma estadia à parte
+        totais = self._obter_agregado_diario().totais(inicio, fim)
+        if 'Pago' in self.df_reservas.columns:
+            total_a_receber_parceiros = totais['Pago']
+        else:
+            log.warning("Coluna 'Pago' não encontrada. Definindo total_a_receber_parceiros como 0.")
+            total_a_receber_parceiros = 0
+        return (totais['Valor da hospedagem'], totais['A pagar'], total_a_receber_parceiros,
+                totais['Apartamentos ocupados'])
+
+    @instrumentar('relatorio_periodico', 'reservas')
+    def relatorio_periodico(self, inicio, fim, frequencia='mes'):
+        """Diárias, receita rateada, taxa de ocupação e totais por 'semana', 'mes' ou 'ano' entre `inicio` e `fim`."""
+        return self._obter_agregado_diario().relatorio_periodico(inicio, fim, frequencia)
+
+    @instrumentar('ocupacao_por_apartamento', 'reservas')
+    def ocupacao_por_apartamento(self, inicio, fim):
+        """Uma linha por (data, condomínio, apartamento) ocupado no período, com a receita rateada do dia."""
+        return self._obter_agregado_diario().por_apartamento(inicio, fim)
+
+    @instrumentar('indicadores', 'reservas')
+    def indicadores(self, inicio, fim, nivel='condominio', frequencia=None):
+        """Taxa de ocupação, ADR, RevPAR, estadia média e antecedência média entre `inicio` e `fim`.
+
+        `nivel` agrupa por 'total', 'condominio', 'bloco' ou 'apartamento'; `frequencia` ('semana', 'mes'
+        ou 'ano') divide o período. Veja analises.indicadores.
+        """
+        with self._lock:
+            ocorrencias = self._ocorrencias(inicio, fim)
+            if ocorrencias.empty:
+                return indicadores(self.df_reservas, inicio, fim, nivel, frequencia)
+            return indicadores(pd.concat([self._reservas_avulsas(), ocorrencias]), inicio, fim, nivel, frequencia)
+
+    @instrumentar('resumo_por_condominio', 'reservas')
+    def resumo_por_condominio(self, inicio=None, fim=None):
+        """Uma linha por condomínio com as reservas que ocupam algum dia do período (todas, sem período).
+
+        Com o armazenamento particionado, cobre o portfólio inteiro: cada partição é resumida em paralelo
+        direto do disco (só as dos anos que o período alcança, se a divisão for por ano) e os resultados
+        são somados; assim um gerenciador restrito a alguns condomínios também enxerga os demais.
+        """
+        mapear = getattr(self.armazenamento, 'mapear_particoes', None)
+        if mapear is None:
+            with self._lock:
+                periodo = _no_periodo(self._reservas_avulsas(), inicio, fim)
+                # Cada ocorrência das recorrentes conta como uma reserva (as regras sempre terminam)
+                ocorrencias = self._ocorrencias(DATA_MINIMA if inicio is None else inicio,
+                                                DATA_MAXIMA if fim is None else fim)
+                if not ocorrencias.empty:
+                    periodo = pd.concat([periodo, _no_periodo(ocorrencias)])
+                return _resumo_condominios(periodo)
+
+        anos = None
+        if inicio is not None and fim is not None:
+            # Uma reserva entra na partição do ano de entrada; a do ano anterior pode atravessar a virada
+            anos = range(pd.Timestamp(inicio).year - 1, pd.Timestamp(fim).year + 1)
+        # Cada partição devolve só as linhas do período e as colunas do resumo; o agrupamento é feito no fim.
+        # Cada ocorrência das recorrentes conta como uma reserva, como no caminho sem partições
+        partes = mapear(lambda df: _no_periodo(expandir(aplicar_esquema(df, 'reservas'), inicio, fim), inicio, fim),
+                        anos=anos)
+        partes = [parte for parte in partes if not parte.empty]
+        if not partes:
+            return _resumo_condominios(_no_periodo(pd.DataFrame()))
+        return _resumo_condominios(aplicar_esquema(pd.concat(partes, ignore_index=True), 'reservas'))
+
+    def _totais(self, ids):
+        """Totais das reservas `ids`, lendo apenas as colunas somadas (sem copiar as linhas inteiras)."""
+        df = self.df_reservas
+
+        # Cálculo dos totais com verificação de colunas
+        total_hospedagem = df['Valor da hospedagem'].loc[ids].sum()
+        total_a_pagar = df['A pagar'].loc[ids].sum()
 
-        # Cálculo dos totais semanais com verificação de colunas
-        total_hospedagem = reservas_semanal['Valor da hospedagem'].sum()
-        total_a_pagar = reservas_semanal['A pagar'].sum()
-        
         # Verifica se a coluna 'Pago' existe antes de acessá-la
-        if 'Pago' in reservas_semanal.columns:
-            total_a_receber_parceiros = reservas_semanal['Pago'].sum()
+        if 'Pago' in df.columns:
+            total_a_receber_parceiros = df['Pago'].loc[ids].sum()
         else:
-            print("Aviso: Coluna 'Pago' não encontrada. Definindo total_a_receber_parceiros como 0.")
+            log.warning("Coluna 'Pago' não encontrada. Definindo total_a_receber_parceiros como 0.")
             total_a_receber_parceiros = 0  # Define como 0 caso a coluna não exista
 
-        apartamentos_ocupados = reservas_semanal['Número do apartamento'].nunique()
-    
-        return reservas_semanal, total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados
+        apartamentos_ocupados = df['Número do apartamento'].loc[ids].nunique()
+
+        return total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados
+
+    def exportar_reservas(self, formato='csv', inicio=None, fim=None, colunas=None, tamanho_lote=TAMANHO_LOTE,
+                          progresso=None):
+        """Gera o relatório de reservas em pedaços de bytes ('csv' ou 'xlsx'): resumo no topo e detalhe em lotes.
+
+        Sem `inicio` e `fim` exporta o histórico inteiro; com eles, as reservas que ocupam algum dia do
+        período, seguidas das ocorrências das recorrentes no período (as mesmas que totais_periodo soma).
+        `colunas` escolhe as colunas do detalhe (todas, se None). Nenhuma cópia da tabela inteira é feita: o
+        resumo soma só as colunas necessárias e o detalhe é montado lote a lote. `progresso` vai para
+        lotes_dataframe.
+        """
+        with self._lock:
+            df = self.df_reservas
+            # Sem período as recorrentes entram como estão na tabela, uma linha cada
+            ocorrencias = df.iloc[:0]
+            if inicio is None and fim is None:
+                ids = df.index
+                totais = self._totais(ids)
+            else:
+                inicio = inicio if inicio is not None else DATA_MINIMA
+                fim = fim if fim is not None else DATA_MAXIMA
+                ids = self._obter_indice_reservas().sobrepostos(inicio, fim)
+                # O índice das ocorrências repete o id da reserva de origem: df.loc duplicaria as linhas
+                ocorrencias = self._ocorrencias(inicio, fim).reset_index(drop=True)
+                totais = self.totais_periodo(inicio, fim)
+            total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados = totais
+
+        resumo = [
+            ('Total Hospedagem', total_hospedagem),
+            ('Total a Pagar', total_a_pagar),
+            ('Total a Receber', total_a_receber_parceiros),
+            ('Apartamentos Ocupados', apartamentos_ocupados),
+        ]
+        colunas = list(df.columns) if colunas is None else [c for c in colunas if c in df.columns]
+        lotes = _lotes_detalhe([(df, ids), (ocorrencias, ocorrencias.index)], colunas, tamanho_lote, progresso)
+        relatorio = gerar_relatorio(formato, resumo, lotes, colunas)
+        return medir_gerador(f'exportar_{formato}', relatorio, 'reservas')
 
     def load_data(self, file_path):
         """Carrega dados de uma planilha Excel e retorna um DataFrame."""
-        try:
-            df = pd.read_excel(file_path)
-            print(f"Colunas carregadas de {file_path}: {df.columns.tolist()}")
-            return df
-        except FileNotFoundError:
-            print(f"Erro: Arquivo '{file_path}' não encontrado.")
-            return pd.DataFrame()
-        except Exception as e:
-            print(f"Erro ao carregar '{file_path}': {e}")
-            return pd.DataFrame()
+        return ler_excel(file_path)
 
     def save_to_excel(self, df, file_path):
         """Salva DataFrames no formato Excel."""
-        try:
-            df.to_excel(file_path, index=False)
-            print(f"Arquivo salvo com sucesso em: {file_path}")
-        except Exception as e:
-            print(f"Erro ao salvar arquivo Excel: {e}")
+        escrever_excel(df, file_path)
 
-    
+    # Métodos para gerenciar parceiros
+    def _saldos_partes(self, tipo, colunas):
+        """Cópia da tabela de partes `tipo` com `colunas` (os saldos digitados na planilha) somadas ao livro.
 
+        Os valores da planilha valem como saldo de abertura; o que as reservas ligadas à parte lançaram no
+        livro é somado a eles.
+        """
+        tabela = TABELAS_ACERTO[tipo][0]
+        df = getattr(self, f'df_{tabela}').copy()
+        saldos = self._obter_livro_acertos().saldos()
+        saldos = saldos[saldos['Tipo'] == tipo].set_index('ID')
+        for coluna in colunas:
+            lancado = saldos[coluna].reindex(df.index, fill_value=0.0)
+            if coluna in df.columns:
+                lancado = lancado + df[coluna].fillna(0)
+            df[coluna] = converter_serie(lancado, 'dinheiro')
+        return df
 
-    # Métodos para gerenciar parceiros
+    def _tabela_acerto(self, saldos):
+        """Acrescenta o nome de cada parte (Tipo, ID) a uma tabela de saldos do livro."""
+        nomes = pd.Series(None, index=saldos.index, dtype=object)
+        for tipo, (tabela, coluna_nome, _) in TABELAS_ACERTO.items():
+            linhas = saldos['Tipo'] == tipo
+            if linhas.any():
+                cadastro = getattr(self, f'df_{tabela}')
+                nomes[linhas] = (cadastro[coluna_nome].reindex(saldos.loc[linhas, 'ID']).to_numpy()
+                                 if coluna_nome in cadastro.columns else None)
+        saldos.insert(2, 'Nome', nomes)
+        return saldos
+
+    @instrumentar('gerar_relatorio_parceiros', 'parceiros')
     def gerar_relatorio_parceiros(self):
-        """Gera um relatório dos parceiros com totais a receber e a pagar."""
-        if not self.check_columns(self.df_parceiros, ['A receber', 'A pagar']):
-            return pd.DataFrame(), 0, 0
+        """Gera um relatório dos parceiros com totais a receber e a pagar (saldo da planilha mais o livro de acertos)."""
+        with self._lock:
+            df_parceiros = self._saldos_partes('parceiro', ['A receber', 'A pagar'])
+        total_a_receber = round(df_parceiros['A receber'].sum(), 2)
+        total_a_pagar = round(df_parceiros['A pagar'].sum(), 2)
+        return df_parceiros, total_a_receber, total_a_pagar
+
+    @instrumentar('relatorio_proprietarios', 'proprietarios')
+    def relatorio_proprietarios(self):
+        """Gera um relatório dos proprietários com o total a pagar a cada um (saldo da planilha mais o livro)."""
+        with self._lock:
+            df_proprietarios = self._saldos_partes('proprietario', ['A pagar'])
+        return df_proprietarios, round(df_proprietarios['A pagar'].sum(), 2)
+
+    @instrumentar('fechar_mes', 'reservas')
+    def fechar_mes(self, mes):
+        """Acerto do mês (ex.: '2024-03'): uma linha por parceiro ou proprietário com movimento no mês.
+
+        Colunas Tipo, ID, Nome, A pagar, A receber e Saldo (a receber - a pagar). Lê só os saldos já
+        acumulados no livro; nenhuma reserva é percorrida.
+        """
+        with self._lock:
+            return self._tabela_acerto(self._obter_livro_acertos().fechamento(mes))
+
+    def saldos_acerto(self):
+        """Saldos acumulados do livro de acertos de todas as partes, no formato de fechar_mes."""
+        with self._lock:
+            return self._tabela_acerto(self._obter_livro_acertos().saldos())
 
-        total_a_receber = self.df_parceiros['A receber'].sum()
-        total_a_pagar = self.df_parceiros['A pagar'].sum()
-        return self.df_parceiros, total_a_receber, total_a_pagar
+    @instrumentar('adicionar_parceiro', 'parceiros')
+    def adicionar_parceiro(self, parceiro, a_receber, a_pagar, comissao=0.0):
+        """Adiciona um novo parceiro ao DataFrame e o persiste no armazenamento.
 
-    def adicionar_parceiro(self, parceiro, a_receber, a_pagar):
-        """Adiciona um novo parceiro e salva no arquivo Excel diretamente no DataFrame."""
+        `comissao` é o percentual do valor da hospedagem devido ao parceiro nas reservas ligadas a ele que
+        não informam 'A pagar para parceiros'.
+        """
         new_data = pd.DataFrame({
             'Parceiro': [parceiro],
             'A receber': [a_receber],
-            'A pagar': [a_pagar]
+            'A pagar': [a_pagar],
+            COLUNA_COMISSAO: [comissao],
+            COLUNA_VERSAO: [1]
         })
-        self.df_parceiros = pd.concat([self.df_parceiros, new_data], ignore_index=True)
-        self.save_to_excel(self.df_parceiros, self.parceiros_path)
-
-    def atualizar_parceiro(self, id_parceiro, parceiro, a_receber, a_pagar):
-        """Atualiza um parceiro específico no DataFrame e salva no Excel."""
-        if id_parceiro in self.df_parceiros.index:
-            self.df_parceiros.at[id_parceiro, 'Parceiro'] = parceiro
-            self.df_parceiros.at[id_parceiro, 'A receber'] = a_receber
-            self.df_parceiros.at[id_parceiro, 'A pagar'] = a_pagar
-            self.save_to_excel(self.df_parceiros, self.parceiros_path)
-        else:
-            print(f"Parceiro com ID {id_parceiro} não encontrado.")
+        with self._escrita('parceiros'):
+            self._concatenar('parceiros', new_data)
+            self._persistir('parceiros', self.df_parceiros.index[-1:], nova=True)
+            self._livro_acertos = None
+
+    @instrumentar('atualizar_parceiro', 'parceiros')
+    def atualizar_parceiro(self, id_parceiro, parceiro, a_receber, a_pagar, comissao=None, versao_esperada=None,
+                           base=None):
+        """Atualiza um parceiro específico no DataFrame e o persiste no armazenamento.
+
+        `comissao` só é alterada quando fornecida. `versao_esperada` e `base` ativam o controle otimista
+        de versão (ver _conferir_versao).
+        """
+        valores = {'Parceiro': parceiro, 'A receber': a_receber, 'A pagar': a_pagar}
+        if comissao is not None:
+            valores[COLUNA_COMISSAO] = comissao
+        with self._escrita('parceiros'):
+            if id_parceiro in self.df_parceiros.index:
+                valores = self._conferir_versao('parceiros', id_parceiro, valores, versao_esperada, base)
+                self._aplicar_campos('parceiros', [id_parceiro], valores)
+            else:
+                log.warning("Parceiro com ID %s não encontrado.", id_parceiro)
+
+    def atualizar_parceiros(self, filtro, campos):
+        """Aplica `campos` a todos os parceiros escolhidos por `filtro` e os persiste de uma vez.
+
+        Aceita os mesmos formatos de filtro e de campos de atualizar_reservas. Retorna quantos parceiros
+        foram alterados.
+        """
+        return self._atualizar_em_massa('parceiros', filtro, campos)
 
     # Métodos para gerenciar proprietários
-    def adicionar_proprietario(self, nome, email, telefone, documento):
-        """Adiciona um novo proprietário e salva no arquivo Excel diretamente no DataFrame."""
+    @instrumentar('adicionar_proprietario', 'proprietarios')
+    def adicionar_proprietario(self, nome, email, telefone, documento, repasse=0.0):
+        """Adiciona um novo proprietário ao DataFrame e o persiste no armazenamento.
+
+        `repasse` é o percentual do valor da hospedagem devido ao proprietário nas reservas ligadas a ele
+        que não informam 'Valor para o proprietário'.
+        """
         new_data = pd.DataFrame({
             'Nome Completo': [nome],
             'Email': [email],
             'Telefone': [telefone],
-            'Documento': [documento]
+            'Documento': [documento],
+            COLUNA_REPASSE: [repasse],
+            COLUNA_VERSAO: [1]
         })
-        self.df_proprietarios = pd.concat([self.df_proprietarios, new_data], ignore_index=True)
-        self.save_to_excel(self.df_proprietarios, self.proprietarios_path)
-
-    def atualizar_proprietario(self, id_proprietario, nome, email, telefone, documento):
-        """Atualiza um proprietário específico no DataFrame e salva no Excel."""
-        if id_proprietario in self.df_proprietarios.index:
-            self.df_proprietarios.at[id_proprietario, 'Nome Completo'] = nome
-            self.df_proprietarios.at[id_proprietario, 'Email'] = email
-            self.df_proprietarios.at[id_proprietario, 'Telefone'] = telefone
-            self.df_proprietarios.at[id_proprietario, 'Documento'] = documento
-            self.save_to_excel(self.df_proprietarios, self.proprietarios_path)
-        else:
-            print(f"Proprietário com ID {id_proprietario} não encontrado.")
+        with self._escrita('proprietarios'):
+            self._concatenar('proprietarios', new_data)
+            self._persistir('proprietarios', self.df_proprietarios.index[-1:], nova=True)
+            self._livro_acertos = None
+
+    @instrumentar('atualizar_proprietario', 'proprietarios')
+    def atualizar_proprietario(self, id_proprietario, nome, email, telefone, documento, repasse=None,
+                               versao_esperada=None, base=None):
+        """Atualiza um proprietário específico no DataFrame e o persiste no armazenamento.
+
+        `repasse` só é alterado quando fornecido. `versao_esperada` e `base` ativam o controle otimista
+        de versão (ver _conferir_versao).
+        """
+        valores = {'Nome Completo': nome, 'Email': email, 'Telefone': telefone, 'Documento': documento}
+        if repasse is not None:
+            valores[COLUNA_REPASSE] = repasse
+        with self._escrita('proprietarios'):
+            if id_proprietario in self.df_proprietarios.index:
+                valores = self._conferir_versao('proprietarios', id_proprietario, valores, versao_esperada, base)
+                self._aplicar_campos('proprietarios', [id_proprietario], valores)
+            else:
+                log.warning("Proprietário com ID %s não encontrado.", id_proprietario)
 
     # Métodos para gerenciar reservas
+    @instrumentar('adicionar_reserva', 'reservas')
     def adicionar_reserva(self, nome, data_entrada, data_saida, numero_apartamento, 
                       valor_hospedagem, condominio, bloco, endereco, status, 
                       email_responsavel=None, telefone_responsavel=None, documento_responsavel=None,
-                      pago=0.0, a_pagar=0.0):
-     print("Método adicionar_reserva foi chamado com os argumentos:")
-     print("nome:", nome)
-     print("email_responsavel:", email_responsavel)
-     print("telefone_responsavel:", telefone_responsavel)
-     print("documento_responsavel:", documento_responsavel)
-    
-    # Resto do código para adicionar a reserva
-
-         # Verifica se as colunas de informações do responsável estão presentes e as adiciona se necessário
-     for coluna in ['Email do responsável', 'Telefone do responsável', 'Documento do responsável']:
-            if coluna not in self.df_reservas.columns:
-                self.df_reservas[coluna] = None
+                      pago=0.0, a_pagar=0.0, id_parceiro=None, id_proprietario=None, data_reserva=None,
+                      recorrencia=None, excecoes=None):
+        # id_parceiro e id_proprietario ligam a reserva às partes do acerto (índices de df_parceiros e df_proprietarios)
+        self._conferir_partes(id_parceiro, id_proprietario)
+        # recorrencia (texto ou Recorrencia) repete a estadia; um único registro guarda a regra e as exceções
+        recorrencia, excecoes = self._normalizar_recorrencia(recorrencia, excecoes)
+        # Sem data_reserva, a reserva conta como feita hoje (base da antecedência nas análises)
+        if data_reserva is None:
+            data_reserva = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
 
-         # Cria o novo registro da reserva com todas as informações, incluindo as do responsável
-     new_data = pd.DataFrame({
+        # Cria o novo registro da reserva com todas as informações, incluindo as do responsável
+        new_data = pd.DataFrame({
             'Nome do hóspede': [nome],
             'Data de entrada': [data_entrada],
             'Data de saída': [data_saida],
+            COLUNA_DATA_RESERVA: [data_reserva],
             'Número do apartamento': [numero_apartamento],
             'Valor da hospedagem': [valor_hospedagem],
             'Nome do Condomínio': [condominio],
@@ -169,50 +1000,255 @@ class GerenciamentoReservas:
             'A pagar': [a_pagar],
             'Email do responsável': [email_responsavel],
             'Telefone do responsável': [telefone_responsavel],
-            'Documento do responsável': [documento_responsavel]
-         })
+            'Documento do responsável': [documento_responsavel],
+            COLUNA_PARCEIRO: [id_parceiro],
+            COLUNA_PROPRIETARIO: [id_proprietario],
+            COLUNA_RECORRENCIA: [recorrencia],
+            COLUNA_EXCECOES: [excecoes],
+            COLUNA_VERSAO: [1]
+        })
+
+        with self._escrita('reservas'):
+            self._aplicar_politica_conflitos(data_entrada, data_saida, numero_apartamento, condominio, bloco,
+                                             recorrencia=recorrencia, excecoes=excecoes)
 
-         # Adiciona a nova reserva ao DataFrame de reservas e salva
-     self.df_reservas = pd.concat([self.df_reservas, new_data], ignore_index=True)
-     self.save_to_excel(self.df_reservas, self.reservas_path)
+            # Verifica se as colunas de informações do responsável estão presentes e as adiciona se necessário
+            self.ensure_responsavel_columns()
 
+            # Adiciona a nova reserva ao DataFrame de reservas e salva
+            self._concatenar('reservas', new_data)
+            self._persistir('reservas', self.df_reservas.index[-1:], nova=True)
+            self._ao_alterar_reservas(self.df_reservas.index[-1:])
+            log.info("Reserva %s adicionada (apartamento %s, %s a %s).", self.df_reservas.index[-1],
+                     numero_apartamento, data_entrada, data_saida)
+
+    @instrumentar('atualizar_reserva', 'reservas')
     def atualizar_reserva(self, id_reserva, nome, data_entrada, data_saida, numero_apartamento, 
                       valor_hospedagem, condominio, bloco, endereco, status, 
-                      pago, a_pagar, email_responsavel=None, telefone_responsavel=None, documento_responsavel=None):
-     """Atualiza uma reserva específica no DataFrame e salva no Excel."""
-     if id_reserva in self.df_reservas.index:
-        # Atualiza informações básicas da reserva
-        self.df_reservas.at[id_reserva, 'Nome do hóspede'] = nome
-        self.df_reservas.at[id_reserva, 'Data de entrada'] = data_entrada
-        self.df_reservas.at[id_reserva, 'Data de saída'] = data_saida
-        self.df_reservas.at[id_reserva, 'Número do apartamento'] = numero_apartamento
-        self.df_reservas.at[id_reserva, 'Valor da hospedagem'] = valor_hospedagem
-        self.df_reservas.at[id_reserva, 'Nome do Condomínio'] = condominio
-        self.df_reservas.at[id_reserva, 'Bloco'] = bloco
-        self.df_reservas.at[id_reserva, 'Endereço'] = endereco
-        self.df_reservas.at[id_reserva, 'Status'] = status
-        self.df_reservas.at[id_reserva, 'Pago'] = pago
-        self.df_reservas.at[id_reserva, 'A pagar'] = a_pagar
-
-        # Verifica e atualiza as informações do responsável, se fornecidas
-        if email_responsavel is not None:
-            self.df_reservas.at[id_reserva, 'Email do responsável'] = email_responsavel
-        if telefone_responsavel is not None:
-            self.df_reservas.at[id_reserva, 'Telefone do responsável'] = telefone_responsavel
-        if documento_responsavel is not None:
-            self.df_reservas.at[id_reserva, 'Documento do responsável'] = documento_responsavel
-
-        # Salva as alterações no arquivo Excel
-        self.save_to_excel(self.df_reservas, self.reservas_path)
-        print(f"Reserva com ID {id_reserva} foi atualizada com sucesso.")
-     else:
-        print(f"Reserva com ID {id_reserva} não encontrada.")
+                      pago, a_pagar, email_responsavel=None, telefone_responsavel=None, documento_responsavel=None,
+                      id_parceiro=None, id_proprietario=None, versao_esperada=None, base=None,
+                      recorrencia=None, excecoes=None):
+        """Atualiza uma reserva específica no DataFrame e a persiste no armazenamento.
+
+        `id_parceiro`, `id_proprietario`, `recorrencia` e `excecoes` só são alterados quando fornecidos
+        (recorrencia='' torna a reserva avulsa). `versao_esperada` e `base` ativam o controle otimista de
+        versão (ver _conferir_versao).
+        """
+        self._conferir_partes(id_parceiro, id_proprietario)
+        if recorrencia is not None:
+            recorrencia = Recorrencia.de_texto(recorrencia).texto() if eh_recorrente(recorrencia) else ''
+        if excecoes is not None:
+            excecoes = texto_excecoes(ler_excecoes(excecoes)) or ''
+        valores = {
+            'Nome do hóspede': nome,
+            'Data de entrada': data_entrada,
+            'Data de saída': data_saida,
+            'Número do apartamento': numero_apartamento,
+            'Valor da hospedagem': valor_hospedagem,
+            'Nome do Condomínio': condominio,
+            'Bloco': bloco,
+            'Endereço': endereco,
+            'Status': status,
+            'Pago': pago,
+            'A pagar': a_pagar,
+        }
+        # As informações do responsável só são alteradas quando fornecidas
+        for coluna, valor in (('Email do responsável', email_responsavel),
+                              ('Telefone do responsável', telefone_responsavel),
+                              ('Documento do responsável', documento_responsavel),
+                              (COLUNA_PARCEIRO, id_parceiro),
+                              (COLUNA_PROPRIETARIO, id_proprietario)):
+            if valor is not None:
+                valores[coluna] = valor
+        # Na recorrência, '' limpa o campo (a reserva volta a ser avulsa ou fica sem exceções)
+        for coluna, valor in ((COLUNA_RECORRENCIA, recorrencia), (COLUNA_EXCECOES, excecoes)):
+            if valor is not None:
+                valores[coluna] = valor or None
+
+        with self._escrita('reservas'):
+            if id_reserva not in self.df_reservas.index:
+                log.warning("Reserva com ID %s não encontrada.", id_reserva)
+                return
+            valores = self._conferir_versao('reservas', id_reserva, valores, versao_esperada, base)
+
+            # O conflito é checado com a reserva como ficará depois da alteração (inclusive após uma mesclagem)
+            reserva = {**self.df_reservas.loc[id_reserva].to_dict(), **valores}
+            self._aplicar_politica_conflitos(
+                reserva['Data de entrada'], reserva['Data de saída'], reserva['Número do apartamento'],
+                reserva['Nome do Condomínio'], reserva['Bloco'], ignorar_id=id_reserva,
+                recorrencia=reserva.get(COLUNA_RECORRENCIA), excecoes=reserva.get(COLUNA_EXCECOES)
+            )
+
+            self._aplicar_campos('reservas', [id_reserva], valores)
+            self._ao_alterar_reservas([id_reserva])
+            log.info("Reserva com ID %s foi atualizada com sucesso.", id_reserva)
+
+    @staticmethod
+    def _normalizar_recorrencia(recorrencia, excecoes):
+        """Regra e exceções no formato gravado na tabela (ValueError se a regra for inválida)."""
+        if not eh_recorrente(recorrencia):
+            return None, None
+        return Recorrencia.de_texto(recorrencia).texto(), texto_excecoes(ler_excecoes(excecoes))
+
+    @instrumentar('pular_ocorrencia', 'reservas')
+    def pular_ocorrencia(self, id_reserva, data_entrada):
+        """Inclui a ocorrência que entraria em `data_entrada` nas exceções da reserva recorrente `id_reserva`."""
+        with self._escrita('reservas'):
+            reserva = self.df_reservas.loc[id_reserva]
+            if not eh_recorrente(reserva.get(COLUNA_RECORRENCIA)):
+                raise ValueError(f"A reserva {id_reserva} não é recorrente.")
+            excecoes = ler_excecoes(reserva.get(COLUNA_EXCECOES)) | {para_dia(data_entrada)}
+            self._aplicar_campos('reservas', [id_reserva], {COLUNA_EXCECOES: texto_excecoes(excecoes)})
+            self._ao_alterar_reservas([id_reserva])
+            log.info("Ocorrência de %s da reserva %s pulada.", pd.Timestamp(data_entrada).date(), id_reserva)
+
+
+    def atualizar_reservas(self, filtro, campos):
+        """Aplica `campos` a todas as reservas escolhidas por `filtro`, coluna a coluna, e grava uma única vez.
+
+        `filtro` pode ser:
+        - uma lista (ou Index) de ids;
+        - uma Series booleana alinhada a df_reservas;
+        - um dict: as chaves de FILTROS_BUSCA vão para o índice de busca (como em filtrar_reservas) e as
+          demais são colunas comparadas por igualdade (ou pertinência, se o valor for uma lista);
+        - uma função que recebe df_reservas e devolve um dos formatos acima.
+        `campos` é {coluna: valor}, onde o valor é um escalar ou uma função que recebe a coluna atual das
+        linhas escolhidas e devolve os novos valores (ex.: {'Valor da hospedagem': lambda v: v * 1.1}).
+
+        Os tipos das colunas são preservados, a versão de cada linha é incrementada e, se datas ou apartamento
+        mudarem, o resultado é checado contra a politica_conflitos antes de qualquer alteração (com
+        'rejeitar', nada é gravado se alguma linha entrar em conflito). Retorna quantas reservas foram alteradas.
+        """
+        return self._atualizar_em_massa('reservas', filtro, campos)
+
+    @instrumentar('importar_reservas', 'reservas')
+    def importar_reservas(self, fonte, tamanho_lote=5000):
+        """Importa reservas em massa de um CSV ou XLSX (caminho ou arquivo enviado pelo usuário).
+
+        O arquivo é lido em lotes; cada linha é validada contra o esquema de reservas e as que passam são
+        checadas de uma só vez contra as reservas existentes e entre si, conforme a politica_conflitos.
+        As aceitas entram com um único concat e uma única gravação. Retorna um DataFrame com a situação de
+        cada linha do arquivo ('Linha', 'Situação', 'Motivo').
+        """
+        validas = []
+        rejeitadas = []
+        primeira_linha = 2
+        for lote in ler_em_lotes(fonte, tamanho_lote):
+            aceitas, motivos = validar_lote(lote, primeira_linha)
+            validas.append(aceitas)
+            rejeitadas.extend(motivos)
+            primeira_linha += len(lote)
+
+        novas = pd.concat(validas) if validas else pd.DataFrame()
+        avisos = {}
+        with self._escrita('reservas'):
+            if self.politica_conflitos != 'ignorar' and not novas.empty:
+                conflitos = detectar_conflitos(self.df_reservas, novas)
+                if self.politica_conflitos == 'rejeitar':
+                    rejeitadas.extend(conflitos.items())
+                    novas = novas.drop(index=list(conflitos))
+                else:
+                    avisos = conflitos
+
+            if not novas.empty:
+                self.ensure_responsavel_columns()
+                inicio = len(self.df_reservas)
+                novas[COLUNA_VERSAO] = 1
+                self._concatenar('reservas', novas.reset_index(drop=True))
+                novos_indices = self.df_reservas.index[inicio:]
+                self._persistir('reservas', novos_indices, nova=True)
+                self._ao_alterar_reservas(novos_indices)
+
+        relatorio = pd.DataFrame(
+            [(linha, 'importada', avisos.get(linha, '')) for linha in novas.index]
+            + [(linha, 'rejeitada', motivo) for linha, motivo in rejeitadas],
+            columns=['Linha', 'Situação', 'Motivo']
+        )
+        return relatorio.sort_values('Linha', ignore_index=True)
+
+    def filtrar_reservas(self, nome=None, numero_apartamento=None, entrada_de=None, entrada_ate=None, termo=None,
+                         colunas=None):
+        """Reservas que passam nos filtros (ver IndiceBuscaReservas.filtrar), sem copiar a tabela inteira.
+
+        Só as linhas encontradas (e as `colunas` pedidas) são copiadas para o resultado.
+        """
+        with self._lock, medir('filtrar_reservas', 'reservas') as medicao:
+            ids = self._obter_indice_busca().filtrar(
+                self.df_reservas, nome, numero_apartamento, entrada_de, entrada_ate, termo
+            )
+            medicao['linhas'] = len(ids)
+            df = self.df_reservas
+            if colunas is None:
+                return df.loc[ids]
+            return df.loc[ids, [c for c in colunas if c in df.columns]]
+
+    @instrumentar('consultar')
+    def consultar(self, tabela, offset=0, limite=50, ordenar_por=None, ascendente=True, colunas=None):
+        """Retorna (página, total): só as linhas [offset, offset + limite) da tabela na ordem pedida.
+
+        A ordenação por coluna é calculada uma vez por versão da tabela e reaproveitada entre as páginas;
+        `colunas` restringe as colunas devolvidas.
+        """
+        with self._lock:
+            df = getattr(self, f'df_{tabela}')
+            total = len(df)
+            if ordenar_por is None or ordenar_por not in df.columns:
+                # Ordem de inclusão: a página sai direto das posições, sem ordenar nada
+                posicoes = np.arange(offset, min(offset + limite, total))
+                if not ascendente:
+                    posicoes = total - 1 - posicoes
+            else:
+                posicoes = self._ordenacao(tabela, df, ordenar_por, ascendente)[offset:offset + limite]
+            pagina = df.iloc[posicoes]
+        if colunas is not None:
+            pagina = pagina[[c for c in colunas if c in pagina.columns]]
+        return pagina, total
+
+    def _ordenacao(self, tabela, df, coluna, ascendente):
+        chave = (tabela, coluna, ascendente)
+        guardada = self._ordenacoes.get(chave)
+        if guardada is None or guardada[0] != self.versoes[tabela]:
+            serie = df[coluna].reset_index(drop=True)
+            ordem = serie.sort_values(ascending=ascendente, kind='stable', na_position='last').index.to_numpy()
+            guardada = (self.versoes[tabela], ordem)
+            self._ordenacoes[chave] = guardada
+        return guardada[1]
+
+    def rotulos_registros(self, tabela):
+        """Rótulo legível de cada registro (id, nome e, nas reservas, apartamento e entrada), por versão da tabela."""
+        with self._lock:
+            guardado = self._rotulos.get(tabela)
+            if guardado is None or guardado[0] != self.versoes[tabela]:
+                df = getattr(self, f'df_{tabela}')
+                rotulos = pd.Series(df.index.astype(str), index=df.index, dtype=object)
+                for coluna in CAMPOS_ROTULO[tabela]:
+                    if coluna not in df.columns:
+                        continue
+                    serie = df[coluna]
+                    if pd.api.types.is_datetime64_dtype(serie.dtype):
+                        texto = serie.dt.strftime('%d/%m/%Y')
+                    else:
+                        texto = serie.astype(object).astype(str)
+                    if coluna == 'Número do apartamento':
+                        texto = 'apto ' + texto
+                    rotulos = rotulos + ' - ' + texto.fillna('').astype(object)
+                guardado = (self.versoes[tabela], rotulos)
+                self._rotulos[tabela] = guardado
+            return guardado[1]
 
+    @instrumentar('buscar_registros')
+    def buscar_registros(self, tabela, termo='', limite=50):
+        """Até `limite` registros cujo rótulo contém `termo` (sem diferenciar maiúsculas), os mais recentes primeiro."""
+        rotulos = self.rotulos_registros(tabela)
+        termo = (termo or '').strip()
+        if termo:
+            rotulos = rotulos[rotulos.str.contains(termo, case=False, regex=False)]
+        return rotulos.iloc[::-1].iloc[:limite]
 
     def check_columns(self, df, required_columns):
         """Verifica se as colunas necessárias estão presentes no DataFrame."""
         missing_columns = [col for col in required_columns if col not in df.columns]
         if missing_columns:
-            print(f"Erro: Colunas ausentes: {missing_columns}")
+            log.error("Colunas ausentes: %s", missing_columns)
             return False
         return True
@@ -0,0 +1,224 @@
+import io
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from disponibilidade import chaves_apartamentos
+from esquema import ESQUEMAS, aplicar_esquema
+from indice_intervalos import para_dias
+from recorrencia import COLUNA_RECORRENCIA, expandir, recorrentes, regra_valida
+
+# Nomes de coluna comuns em exportações de channel managers, já normalizados (sem acento, minúsculos)
+SINONIMOS_COLUNAS = {
+    'check-in': 'Data de entrada',
+    'checkin': 'Data de entrada',
+    'entrada': 'Data de entrada',
+    'chegada': 'Data de entrada',
+    'check-out': 'Data de saída',
+    'checkout': 'Data de saída',
+    'saida': 'Data de saída',
+    'partida': 'Data de saída',
+    'hospede': 'Nome do hóspede',
+    'nome': 'Nome do hóspede',
+    'guest': 'Nome do hóspede',
+    'apartamento': 'Número do apartamento',
+    'unidade': 'Número do apartamento',
+    'apto': 'Número do apartamento',
+    'valor': 'Valor da hospedagem',
+    'total': 'Valor da hospedagem',
+    'condominio': 'Nome do Condomínio',
+    'email': 'Email do responsável',
+    'telefone': 'Telefone do responsável',
+    'documento': 'Documento do responsável',
+}
+
+COLUNAS_OBRIGATORIAS = ['Nome do hóspede', 'Data de entrada', 'Data de saída', 'Número do apartamento']
+
+# Deslocamento usado para isolar os apartamentos ao calcular máximos/mínimos acumulados em um único vetor
+_SEPARADOR_GRUPOS = 10 ** 7
+
+
+def _normalizar_nome_coluna(nome):
+    sem_acento = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+    return sem_acento.strip().casefold()
+
+
+def _mapa_colunas(colunas):
+    """Associa cada coluna do arquivo a uma coluna de reservas (pelo nome exato, sem acento ou por sinônimo)."""
+    conhecidas = {_normalizar_nome_coluna(c): c for c in ESQUEMAS['reservas']}
+    mapa = {}
+    for coluna in colunas:
+        normalizada = _normalizar_nome_coluna(coluna)
+        destino = conhecidas.get(normalizada) or SINONIMOS_COLUNAS.get(normalizada)
+        if destino is not None and destino not in mapa.values():
+            mapa[coluna] = destino
+    return mapa
+
+
+def _nome_fonte(fonte):
+    return fonte if isinstance(fonte, (str, os.PathLike)) else getattr(fonte, 'name', '')
+
+
+def _separador_csv(fonte):
+    """Detecta ';' ou ',' pela primeira linha (planilhas em português costumam exportar com ';')."""
+    if isinstance(fonte, (str, os.PathLike)):
+        with open(fonte, encoding='utf-8-sig', errors='replace') as arquivo:
+            primeira = arquivo.readline()
+    else:
+        posicao = fonte.tell()
+        primeira = fonte.readline()
+        fonte.seek(posicao)
+        if isinstance(primeira, bytes):
+            primeira = primeira.decode('utf-8', errors='replace')
+    return ';' if primeira.count(';') > primeira.count(',') else ','
+
+
+def ler_em_lotes(fonte, tamanho_lote=5000):
+    """Lê um CSV ou XLSX (caminho ou arquivo aberto) em DataFrames de até `tamanho_lote` linhas."""
+    nome = str(_nome_fonte(fonte)).lower()
+    if nome.endswith(('.xlsx', '.xlsm')):
+        yield from _ler_xlsx_em_lotes(fonte, tamanho_lote)
+        return
+    leitor = pd.read_csv(fonte, sep=_separador_csv(fonte), chunksize=tamanho_lote, encoding='utf-8-sig', dtype=str)
+    with leitor:
+        yield from leitor
+
+
+def _ler_xlsx_em_lotes(fonte, tamanho_lote):
+    # O modo somente leitura do openpyxl percorre a planilha sem montar a pasta de trabalho inteira em memória
+    from openpyxl import load_workbook
+
+    if not isinstance(fonte, (str, os.PathLike)) and not hasattr(fonte, 'seek'):
+        fonte = io.BytesIO(fonte.read())
+    pasta = load_workbook(fonte, read_only=True, data_only=True)
+    try:
+        linhas = pasta.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        cabecalho = [str(c) if c is not None else f'Coluna {i + 1}' for i, c in enumerate(cabecalho)]
+        lote = []
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= tamanho_lote:
+                yield pd.DataFrame(lote, columns=cabecalho)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=cabecalho)
+    finally:
+        pasta.close()
+
+
+def validar_lote(lote, primeira_linha):
+    """Valida e tipa um lote. Retorna (linhas válidas já no esquema de reservas, lista de rejeições).
+
+    `primeira_linha` é o número, no arquivo, da primeira linha do lote (o cabeçalho é a linha 1).
+    """
+    mapa = _mapa_colunas(lote.columns)
+    lote = lote[list(mapa)].rename(columns=mapa)
+    lote.index = pd.RangeIndex(primeira_linha, primeira_linha + len(lote))
+
+    faltantes = [c for c in COLUNAS_OBRIGATORIAS if c not in lote.columns]
+    if faltantes:
+        motivo = f"Colunas obrigatórias ausentes: {faltantes}"
+        return lote.iloc[0:0], [(linha, motivo) for linha in lote.index]
+
+    # Aqui os valores que não se encaixam viram ausentes, e as linhas com eles são rejeitadas logo abaixo
+    tipado = aplicar_esquema(lote, 'reservas', coagir=True)
+    motivos = pd.Series('', index=lote.index, dtype=object)
+
+    def rejeitar(mascara, motivo):
+        mascara = mascara & (motivos == '')
+        motivos[mascara] = motivo
+
+    rejeitar(lote['Nome do hóspede'].isna() | (lote['Nome do hóspede'].astype(str).str.strip() == ''),
+             "Nome do hóspede vazio")
+    rejeitar(tipado['Data de entrada'].isna(), "Data de entrada inválida")
+    rejeitar(tipado['Data de saída'].isna(), "Data de saída inválida")
+    rejeitar(tipado['Data de saída'].dt.normalize() <= tipado['Data de entrada'].dt.normalize(),
+             "Data de saída deve ser posterior à data de entrada")
+    rejeitar(tipado['Número do apartamento'].isna(), "Número do apartamento inválido")
+    if 'Valor da hospedagem' in lote.columns:
+        rejeitar(lote['Valor da hospedagem'].notna() & tipado['Valor da hospedagem'].isna(),
+                 "Valor da hospedagem inválido")
+    if COLUNA_RECORRENCIA in lote.columns:
+        # Cada regra distinta é validada uma vez só
+        regras = lote[COLUNA_RECORRENCIA].astype(str)
+        erradas = [regra for regra in regras[recorrentes(lote)].unique() if not regra_valida(regra)]
+        rejeitar(recorrentes(lote) & regras.isin(erradas), "Regra de recorrência inválida")
+
+    invalidas = motivos != ''
+    return tipado[~invalidas], list(zip(motivos.index[invalidas], motivos[invalidas]))
+
+
+def _intervalos(df):
+    """Apartamento e noites [início, fim) em dias inteiros de cada linha que ocupa ao menos uma noite."""
+    chaves = chaves_apartamentos(df)
+    # Números e textos misturados na mesma coluna não se ordenam no groupby
+    chaves['numero'] = chaves['numero'].astype(str)
+    inicio, validos_inicio = para_dias(df['Data de entrada'])
+    fim, validos_fim = para_dias(df['Data de saída'])
+    validos = validos_inicio & validos_fim & (fim > inicio)
+    return chaves[validos], inicio[validos], fim[validos], df.index[validos]
+
+
+def detectar_conflitos(existentes, novas):
+    """Checa de uma vez todas as linhas novas contra as reservas existentes e entre si.
+
+    Retorna {índice da linha nova: motivo}. Quando duas linhas novas se sobrepõem, fica a que começa
+    primeiro; as demais da mesma sequência de sobreposições são marcadas. As reservas recorrentes entram
+    com cada ocorrência (as existentes, só as do intervalo coberto pelas novas); uma regra cujas
+    ocorrências se sobrepõem entre si é marcada como conflito dentro do lote.
+    """
+    if novas.empty:
+        return {}
+    novas = expandir(novas)
+    datas = pd.concat([pd.to_datetime(novas['Data de entrada'], errors='coerce'),
+                       pd.to_datetime(novas['Data de saída'], errors='coerce')]).dropna()
+    if not existentes.empty and not datas.empty:
+        existentes = expandir(existentes, datas.min(), datas.max())
+    chaves_e, inicio_e, fim_e, ids_e = _intervalos(existentes) if not existentes.empty else (
+        pd.DataFrame(columns=['condominio', 'bloco', 'numero']), np.empty(0, np.int64), np.empty(0, np.int64), [])
+    chaves_n, inicio_n, fim_n, ids_n = _intervalos(novas)
+
+    chaves = pd.concat([chaves_e, chaves_n], ignore_index=True)
+    grupo = chaves.groupby(['condominio', 'bloco', 'numero'], sort=True).ngroup().to_numpy(np.int64)
+    inicio = np.concatenate([inicio_e, inicio_n])
+    fim = np.concatenate([fim_e, fim_n])
+    nova = np.concatenate([np.zeros(len(inicio_e), bool), np.ones(len(inicio_n), bool)])
+    rotulo = np.concatenate([np.asarray(ids_e, dtype=object), np.asarray(ids_n, dtype=object)])
+
+    # Dias a partir de zero, para que o valor-sentinela -1 fique abaixo de qualquer data
+    origem = inicio.min() if len(inicio) else 0
+    inicio, fim = inicio - origem, fim - origem
+
+    ordem = np.lexsort((inicio, grupo))
+    grupo, inicio, fim, nova, rotulo = grupo[ordem], inicio[ordem], fim[ordem], nova[ordem], rotulo[ordem]
+    base = grupo * _SEPARADOR_GRUPOS
+
+    def maior_fim_anterior(considerar):
+        # Máximo acumulado de (grupo, fim) das linhas anteriores: vindo de outro grupo fica abaixo de `base`
+        valores = np.where(considerar, base + fim, -1)
+        acumulado = np.maximum.accumulate(valores)
+        return np.concatenate([[-1], acumulado[:-1]]) - base
+
+    def menor_inicio_seguinte(considerar):
+        # Mínimo acumulado de trás para frente de (grupo, início) das linhas seguintes
+        valores = np.where(considerar, base + inicio, np.iinfo(np.int64).max)
+        acumulado = np.minimum.accumulate(valores[::-1])[::-1]
+        return np.concatenate([acumulado[1:], [np.iinfo(np.int64).max]]) - base
+
+    conflito_existente = nova & (
+        (maior_fim_anterior(~nova) > inicio) | (menor_inicio_seguinte(~nova) < fim)
+    )
+    restantes = nova & ~conflito_existente
+    conflito_lote = restantes & (maior_fim_anterior(restantes) > inicio)
+
+    motivos = {}
+    for indice in rotulo[conflito_existente]:
+        motivos[indice] = "Conflito com reserva existente no mesmo apartamento"
+    for indice in rotulo[conflito_lote]:
+        motivos[indice] = "Conflito com outra linha do arquivo no mesmo apartamento"
+    return motivos
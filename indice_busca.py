@@ -0,0 +1,272 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Campos de texto das reservas cobertos pela busca livre
+CAMPOS_BUSCA = ['Nome do hóspede', 'Email do responsável', 'Telefone do responsável', 'Documento do responsável']
+
+# Um termo com algum destes caracteres é uma expressão regular: os trigramas não valem e a busca varre a coluna
+_METACARACTERES = set('.^$*+?{}[]\\|()')
+
+# Acima de tantas alterações pendentes sobre a parte compacta, vale mais reconstruir o índice do zero
+LIMITE_PENDENTES = 5000
+
+_VAZIO = np.empty(0, dtype=np.int64)
+
+
+def normalizar(texto):
+    """Remove acentos e diferenças de maiúsculas/minúsculas ('José' -> 'jose')."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _ausente(valor):
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor))
+
+
+class IndiceTrigramas:
+    """Índice de trigramas (sem acentos e sem maiúsculas) de uma coluna de texto.
+
+    A parte principal é compacta: para cada trigrama, um vetor ordenado de ids. Alterações posteriores vão
+    para uma parte pequena de conjuntos Python, e os ids alterados passam a ser ignorados na parte compacta.
+    O índice só seleciona candidatos: quem confirma o casamento é a mesma comparação usada pelos filtros.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._extras = {}
+        self._trigramas_extras = {}
+        self._obsoletos = set()
+        self._obsoletos_vetor = None
+
+    @property
+    def pendentes(self):
+        return len(self._obsoletos)
+
+    @classmethod
+    def construir(cls, ids, valores):
+        indice = cls()
+        # Nomes, e-mails e documentos se repetem muito: os trigramas são calculados uma vez por valor distinto
+        codigos, unicos = pd.factorize(pd.Series(valores, dtype=object))
+        ids = np.asarray(ids, dtype=np.int64)
+        ordem = np.argsort(codigos, kind='stable')
+        ids_por_codigo = ids[ordem]
+        limites = np.searchsorted(codigos[ordem], np.arange(len(unicos) + 1), side='left')
+
+        codigos_por_trigrama = {}
+        for codigo, valor in enumerate(unicos):
+            if _ausente(valor):
+                continue
+            for trigrama in trigramas(normalizar(str(valor))):
+                codigos_por_trigrama.setdefault(trigrama, []).append(codigo)
+        for trigrama, codigos_trigrama in codigos_por_trigrama.items():
+            partes = [ids_por_codigo[limites[c]:limites[c + 1]] for c in codigos_trigrama]
+            indice._postings[trigrama] = np.sort(np.concatenate(partes))
+        return indice
+
+    def adicionar(self, id_, valor):
+        """Inclui (ou substitui) o texto de `id_`."""
+        self.remover(id_)
+        self._obsoletos.add(id_)
+        self._obsoletos_vetor = None
+        if _ausente(valor):
+            return
+        novos = trigramas(normalizar(str(valor)))
+        self._trigramas_extras[id_] = novos
+        for trigrama in novos:
+            self._extras.setdefault(trigrama, set()).add(id_)
+
+    def remover(self, id_):
+        for trigrama in self._trigramas_extras.pop(id_, ()):
+            self._extras[trigrama].discard(id_)
+        self._obsoletos.add(id_)
+        self._obsoletos_vetor = None
+
+    def _lista(self, trigrama):
+        compacta = self._postings.get(trigrama, _VAZIO)
+        if self._obsoletos and len(compacta):
+            if self._obsoletos_vetor is None:
+                self._obsoletos_vetor = np.fromiter(self._obsoletos, dtype=np.int64, count=len(self._obsoletos))
+            compacta = compacta[~np.isin(compacta, self._obsoletos_vetor)]
+        extras = self._extras.get(trigrama)
+        if extras:
+            return np.union1d(compacta, np.fromiter(extras, dtype=np.int64, count=len(extras)))
+        return compacta
+
+    def candidatos(self, termo):
+        """Ids ordenados que podem conter `termo`, ou None se o índice não ajuda (termo curto ou regex)."""
+        if any(c in _METACARACTERES for c in termo):
+            return None
+        procurados = trigramas(normalizar(termo))
+        if not procurados:
+            return None
+        listas = sorted((self._lista(t) for t in procurados), key=len)
+        resultado = listas[0]
+        for lista in listas[1:]:
+            if not len(resultado):
+                break
+            resultado = np.intersect1d(resultado, lista, assume_unique=True)
+        return resultado
+
+
+class IndiceOrdenado:
+    """Valores inteiros (números ou datas em nanossegundos) ordenados, com o id de cada um, para filtros de faixa.
+
+    Num índice de `datas`, os limites e valores podem vir também como texto ('2024-01-31'), como no pd.Timestamp.
+    """
+
+    def __init__(self, datas=False):
+        self.datas = datas
+        self._valores = np.empty(0, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._valor_por_id = {}
+
+    @staticmethod
+    def _chaves(serie):
+        """Converte a coluna em (inteiros, máscara de válidos); datas viram nanossegundos desde 1970."""
+        if pd.api.types.is_datetime64_dtype(serie.dtype):
+            datas = serie.astype('datetime64[ns]')
+            return datas.to_numpy().astype(np.int64), datas.notna().to_numpy()
+        numeros = pd.to_numeric(serie, errors='coerce')
+        validos = numeros.notna().to_numpy()
+        return np.where(validos, numeros.fillna(0).to_numpy(np.float64), 0).astype(np.int64), validos
+
+    def _chave(self, valor):
+        if _ausente(valor):
+            return None
+        try:
+            if self.datas or isinstance(valor, (pd.Timestamp, np.datetime64)) or hasattr(valor, 'year'):
+                return int(pd.Timestamp(valor).as_unit('ns').value)
+            return int(valor)
+        except (TypeError, ValueError):
+            return None
+
+    def _limite(self, valor):
+        chave = self._chave(valor)
+        if chave is None:
+            raise ValueError(f"Limite de filtro inválido: {valor!r}.")
+        return chave
+
+    @classmethod
+    def construir(cls, ids, serie):
+        indice = cls(datas=pd.api.types.is_datetime64_dtype(serie.dtype))
+        chaves, validos = cls._chaves(serie)
+        ids = np.asarray(ids, dtype=np.int64)[validos]
+        chaves = chaves[validos]
+        ordem = np.argsort(chaves, kind='stable')
+        indice._valores, indice._ids = chaves[ordem], ids[ordem]
+        indice._valor_por_id = dict(zip(indice._ids.tolist(), indice._valores.tolist()))
+        return indice
+
+    def adicionar(self, id_, valor):
+        self.remover(id_)
+        chave = self._chave(valor)
+        if chave is None:
+            return
+        posicao = np.searchsorted(self._valores, chave, side='right')
+        self._valores = np.insert(self._valores, posicao, chave)
+        self._ids = np.insert(self._ids, posicao, id_)
+        self._valor_por_id[id_] = chave
+
+    def remover(self, id_):
+        chave = self._valor_por_id.pop(id_, None)
+        if chave is None:
+            return
+        esquerda = np.searchsorted(self._valores, chave, side='left')
+        direita = np.searchsorted(self._valores, chave, side='right')
+        posicao = esquerda + int(np.flatnonzero(self._ids[esquerda:direita] == id_)[0])
+        self._valores = np.delete(self._valores, posicao)
+        self._ids = np.delete(self._ids, posicao)
+
+    def entre(self, minimo=None, maximo=None):
+        """Ids ordenados com minimo <= valor <= maximo (qualquer ponta pode ficar aberta com None)."""
+        esquerda = 0 if minimo is None else np.searchsorted(self._valores, self._limite(minimo), side='left')
+        direita = len(self._valores) if maximo is None else np.searchsorted(
+            self._valores, self._limite(maximo), side='right')
+        return np.sort(self._ids[esquerda:direita])
+
+
+class IndiceBuscaReservas:
+    """Índices de busca das reservas: trigramas dos campos de texto e faixas de apartamento e data de entrada."""
+
+    def __init__(self):
+        self.textos = {campo: IndiceTrigramas() for campo in CAMPOS_BUSCA}
+        self.apartamentos = IndiceOrdenado()
+        self.entradas = IndiceOrdenado(datas=True)
+
+    @property
+    def pendentes(self):
+        return max(indice.pendentes for indice in self.textos.values())
+
+    @classmethod
+    def construir(cls, df):
+        indice = cls()
+        for campo in CAMPOS_BUSCA:
+            if campo in df.columns:
+                indice.textos[campo] = IndiceTrigramas.construir(df.index, df[campo])
+        if 'Número do apartamento' in df.columns:
+            indice.apartamentos = IndiceOrdenado.construir(df.index, df['Número do apartamento'])
+        if 'Data de entrada' in df.columns:
+            indice.entradas = IndiceOrdenado.construir(df.index, df['Data de entrada'])
+        return indice
+
+    def adicionar(self, id_, reserva):
+        """Inclui (ou substitui) a reserva `id_`; `reserva` é a linha da tabela (Series ou dict)."""
+        for campo, indice in self.textos.items():
+            indice.adicionar(id_, reserva.get(campo))
+        self.apartamentos.adicionar(id_, reserva.get('Número do apartamento'))
+        self.entradas.adicionar(id_, reserva.get('Data de entrada'))
+
+    def remover(self, id_):
+        for indice in self.textos.values():
+            indice.remover(id_)
+        self.apartamentos.remover(id_)
+        self.entradas.remover(id_)
+
+    def filtrar(self, df, nome=None, numero_apartamento=None, entrada_de=None, entrada_ate=None, termo=None):
+        """Ids (em ordem) das reservas que passam em todos os filtros informados.
+
+        - `nome`: 'Nome do hóspede' contém o texto, como str.contains(nome, case=False)
+        - `numero_apartamento`: número exato do apartamento
+        - `entrada_de`/`entrada_ate`: data de entrada dentro da faixa (inclusive)
+        - `termo`: algum dos CAMPOS_BUSCA contém o texto (mesma comparação do `nome`)
+        Cada filtro produz uma lista ordenada de ids e o resultado é a interseção delas; as listas das
+        buscas de texto vêm dos trigramas e são confirmadas só nas linhas candidatas.
+        """
+        listas = []
+        if entrada_de is not None or entrada_ate is not None:
+            listas.append(self.entradas.entre(entrada_de, entrada_ate))
+        if numero_apartamento is not None:
+            listas.append(self.apartamentos.entre(numero_apartamento, numero_apartamento))
+        listas.sort(key=len)
+        restritos = None
+        for lista in listas:
+            restritos = lista if restritos is None else np.intersect1d(restritos, lista, assume_unique=True)
+
+        if nome:
+            restritos = self._buscar_texto(df, 'Nome do hóspede', nome, restritos)
+        if termo:
+            encontrados = [self._buscar_texto(df, campo, termo, restritos) for campo in CAMPOS_BUSCA]
+            restritos = np.unique(np.concatenate(encontrados)) if encontrados else _VAZIO
+        if restritos is None:
+            return df.index.to_numpy(np.int64)
+        return restritos
+
+    def _buscar_texto(self, df, campo, termo, restritos):
+        if campo not in df.columns:
+            return _VAZIO
+        candidatos = self.textos[campo].candidatos(termo)
+        if candidatos is None:
+            candidatos = restritos
+        elif restritos is not None:
+            candidatos = np.intersect1d(candidatos, restritos, assume_unique=True)
+        serie = df[campo] if candidatos is None else df[campo].loc[candidatos]
+        if serie.empty:
+            return _VAZIO
+        confirmados = serie.str.contains(termo, case=False).fillna(False).astype(bool)
+        return serie.index[confirmados.to_numpy()].to_numpy(np.int64)
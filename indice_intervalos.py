@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+
+def para_dias(valores):
+    """Converte datas (escalares ou sequências) em dias inteiros desde 1970-01-01. Datas inválidas viram None/NaT."""
+    datas = pd.to_datetime(pd.Series(valores), errors='coerce')
+    dias = datas.values.astype('datetime64[D]').astype(np.int64)
+    validos = datas.notna().to_numpy()
+    return dias, validos
+
+
+def para_dia(valor):
+    """Converte uma data em dias inteiros desde 1970-01-01, ou None se for inválida."""
+    data = pd.to_datetime(valor, errors='coerce')
+    if pd.isna(data):
+        return None
+    return int(np.datetime64(data, 'D').astype(np.int64))
+
+
+class IndiceIntervalos:
+    """Índice de intervalos fechados [início, fim], em dias, mantido ordenado pelo início.
+
+    Uma consulta de sobreposição faz uma busca binária pelo trecho cujo início cabe na janela e filtra
+    os fins nesse trecho: O(log n + k), onde k inclui as estadias iniciadas até `duracao_maxima` dias antes
+    da janela. Inclusões e remoções mantêm a ordenação com np.insert/np.delete (cópias contíguas em C).
+    """
+
+    def __init__(self):
+        self._inicios = np.empty(0, dtype=np.int64)
+        self._fins = np.empty(0, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._inicio_por_id = {}
+        # Nunca diminui nas remoções: continua sendo um limite superior válido
+        self.duracao_maxima = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    @classmethod
+    def construir(cls, ids, inicios, fins):
+        """Monta o índice de uma vez a partir de colunas (ignora linhas com datas inválidas)."""
+        indice = cls()
+        dias_inicio, validos_inicio = para_dias(inicios)
+        dias_fim, validos_fim = para_dias(fins)
+        validos = validos_inicio & validos_fim
+        ids = np.asarray(ids, dtype=np.int64)[validos]
+        dias_inicio = dias_inicio[validos]
+        dias_fim = np.maximum(dias_fim[validos], dias_inicio)
+
+        ordem = np.argsort(dias_inicio, kind='stable')
+        indice._inicios = dias_inicio[ordem]
+        indice._fins = dias_fim[ordem]
+        indice._ids = ids[ordem]
+        indice._inicio_por_id = dict(zip(indice._ids.tolist(), indice._inicios.tolist()))
+        if len(ids):
+            indice.duracao_maxima = int((indice._fins - indice._inicios).max())
+        return indice
+
+    def adicionar(self, id_, inicio, fim):
+        """Inclui (ou substitui) o intervalo de `id_`. Datas inválidas apenas removem o intervalo anterior."""
+        self.remover(id_)
+        dia_inicio, dia_fim = para_dia(inicio), para_dia(fim)
+        if dia_inicio is None or dia_fim is None:
+            return
+        dia_fim = max(dia_fim, dia_inicio)
+        posicao = np.searchsorted(self._inicios, dia_inicio, side='right')
+        self._inicios = np.insert(self._inicios, posicao, dia_inicio)
+        self._fins = np.insert(self._fins, posicao, dia_fim)
+        self._ids = np.insert(self._ids, posicao, id_)
+        self._inicio_por_id[id_] = dia_inicio
+        self.duracao_maxima = max(self.duracao_maxima, dia_fim - dia_inicio)
+
+    def remover(self, id_):
+        dia_inicio = self._inicio_por_id.pop(id_, None)
+        if dia_inicio is None:
+            return
+        esquerda = np.searchsorted(self._inicios, dia_inicio, side='left')
+        direita = np.searchsorted(self._inicios, dia_inicio, side='right')
+        posicao = esquerda + int(np.flatnonzero(self._ids[esquerda:direita] == id_)[0])
+        self._inicios = np.delete(self._inicios, posicao)
+        self._fins = np.delete(self._fins, posicao)
+        self._ids = np.delete(self._ids, posicao)
+
+    def sobrepostos(self, inicio, fim):
+        """Retorna, em ordem crescente, os ids cujos intervalos têm algum dia em comum com [inicio, fim]."""
+        dia_inicio, dia_fim = para_dia(inicio), para_dia(fim)
+        if dia_inicio is None or dia_fim is None:
+            return np.empty(0, dtype=np.int64)
+        esquerda = np.searchsorted(self._inicios, dia_inicio - self.duracao_maxima, side='left')
+        direita = np.searchsorted(self._inicios, dia_fim, side='right')
+        trecho = slice(esquerda, direita)
+        return np.sort(self._ids[trecho][self._fins[trecho] >= dia_inicio])
@@ -0,0 +1,265 @@
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Logger de todo o sistema de reservas; o nível vem de RESERVAS_LOG_NIVEL (DEBUG, INFO, WARNING, ERROR)
+log = logging.getLogger('reservas')
+
+# Latências guardadas por operação para os percentis (as mais recentes; as antigas vão sendo descartadas)
+AMOSTRAS_POR_OPERACAO = 2048
+
+# Quantis publicados no formato Prometheus e no painel de administração
+QUANTIS = (0.5, 0.95)
+
+# Dados pessoais que nunca devem chegar ao log: e-mails, CPFs, telefones e sequências longas de dígitos
+_PADROES_PII = [
+    (re.compile(r'[\w.+-]+@[\w-]+(\.[\w-]+)+'), '[e-mail oculto]'),
+    (re.compile(r'\b\d{3}\.?\d{3}\.?\d{3}-\d{2}\b'), '[documento oculto]'),
+    (re.compile(r'\(?\b\d{2}\)?\s?\d{4,5}-\d{4}\b'), '[telefone oculto]'),
+    (re.compile(r'\b\d{9,}\b'), '[número oculto]'),
+]
+
+
+def redigir(texto):
+    """Substitui e-mails, documentos e telefones de `texto` por marcadores."""
+    for padrao, marcador in _PADROES_PII:
+        texto = padrao.sub(marcador, texto)
+    return texto
+
+
+class FiltroPII(logging.Filter):
+    """Aplica redigir() à mensagem já formatada de cada registro de log."""
+
+    def filter(self, record):
+        mensagem = record.getMessage()
+        redigida = redigir(mensagem)
+        if redigida != mensagem:
+            record.msg, record.args = redigida, ()
+        return True
+
+
+def configurar_log(nivel=None):
+    """Liga o handler do logger 'reservas' (uma única vez), no nível pedido ou no de RESERVAS_LOG_NIVEL."""
+    nivel = (nivel or os.environ.get('RESERVAS_LOG_NIVEL', 'INFO')).upper()
+    log.setLevel(getattr(logging, nivel, logging.INFO))
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handler.addFilter(FiltroPII())
+        log.addHandler(handler)
+        log.propagate = False
+
+
+configurar_log()
+
+
+class _Estatisticas:
+    __slots__ = ('chamadas', 'erros', 'segundos', 'linhas', 'bytes', 'amostras')
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.segundos = 0.0
+        self.linhas = 0
+        self.bytes = 0
+        self.amostras = deque(maxlen=AMOSTRAS_POR_OPERACAO)
+
+
+class Metricas:
+    """Contadores e latências por (operação, tabela), seguros entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = {}
+
+    def registrar(self, operacao, tabela, segundos, linhas=0, bytes_=0, erro=False):
+        with self._lock:
+            estatisticas = self._dados.get((operacao, tabela))
+            if estatisticas is None:
+                estatisticas = self._dados[(operacao, tabela)] = _Estatisticas()
+            estatisticas.chamadas += 1
+            estatisticas.erros += int(erro)
+            estatisticas.segundos += segundos
+            estatisticas.linhas += int(linhas or 0)
+            estatisticas.bytes += int(bytes_ or 0)
+            estatisticas.amostras.append(segundos)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def _copia(self):
+        with self._lock:
+            return [(chave, e.chamadas, e.erros, e.segundos, e.linhas, e.bytes, np.array(e.amostras))
+                    for chave, e in sorted(self._dados.items())]
+
+    def resumo(self):
+        """DataFrame com uma linha por (operação, tabela): chamadas, erros, p50/p95/média em ms, linhas e bytes."""
+        linhas = []
+        for (operacao, tabela), chamadas, erros, segundos, n_linhas, n_bytes, amostras in self._copia():
+            quantis = np.quantile(amostras, QUANTIS) * 1000 if len(amostras) else [np.nan] * len(QUANTIS)
+            linhas.append({
+                'Operação': operacao,
+                'Tabela': tabela,
+                'Chamadas': chamadas,
+                'Erros': erros,
+                **{f'p{int(q * 100)} (ms)': round(v, 3) for q, v in zip(QUANTIS, quantis)},
+                'Média (ms)': round(segundos / chamadas * 1000, 3) if chamadas else np.nan,
+                'Linhas': n_linhas,
+                'Bytes gravados': n_bytes,
+            })
+        return pd.DataFrame(linhas)
+
+    def texto_prometheus(self):
+        """Métricas no formato de exposição em texto do Prometheus (latências como summary com p50/p95)."""
+        saida = [
+            '# HELP reservas_operacao_segundos Latência das operações do gerenciador de reservas.',
+            '# TYPE reservas_operacao_segundos summary',
+        ]
+        copia = self._copia()
+        for (operacao, tabela), chamadas, _, segundos, _, _, amostras in copia:
+            rotulos = _rotulos(operacao, tabela)
+            if len(amostras):
+                for quantil, valor in zip(QUANTIS, np.quantile(amostras, QUANTIS)):
+                    saida.append(f'reservas_operacao_segundos{{{rotulos},quantile="{quantil}"}} {valor:.6f}')
+            saida.append(f'reservas_operacao_segundos_sum{{{rotulos}}} {segundos:.6f}')
+            saida.append(f'reservas_operacao_segundos_count{{{rotulos}}} {chamadas}')
+        contadores = [
+            ('reservas_operacao_erros_total', 'Operações que terminaram em exceção.', 2),
+            ('reservas_linhas_total', 'Linhas lidas, gravadas ou devolvidas pelas operações.', 4),
+            ('reservas_bytes_gravados_total', 'Bytes gravados ou gerados pelas operações.', 5),
+        ]
+        for nome, ajuda, posicao in contadores:
+            saida.append(f'# HELP {nome} {ajuda}')
+            saida.append(f'# TYPE {nome} counter')
+            for item in copia:
+                (operacao, tabela) = item[0]
+                saida.append(f'{nome}{{{_rotulos(operacao, tabela)}}} {item[posicao]}')
+        return '\n'.join(saida) + '\n'
+
+
+def _rotulos(operacao, tabela):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'operacao="{escapar(operacao)}",tabela="{escapar(tabela)}"'
+
+
+# Métricas do processo, compartilhadas por todas as instâncias de GerenciamentoReservas
+metricas = Metricas()
+
+
+@contextmanager
+def medir(operacao, tabela=''):
+    """Mede a duração do bloco e a registra em `metricas`.
+
+    O bloco recebe um dict onde pode informar 'linhas' e 'bytes' processados; se o bloco levantar uma
+    exceção, a chamada conta como erro e a exceção segue adiante.
+    """
+    dados = {'linhas': 0, 'bytes': 0}
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield dados
+    except BaseException:
+        erro = True
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        metricas.registrar(operacao, tabela, segundos, dados['linhas'], dados['bytes'], erro)
+        log.debug("%s[%s]: %.2f ms, %s linhas, %s bytes", operacao, tabela, segundos * 1000,
+                  dados['linhas'], dados['bytes'])
+
+
+def instrumentar(operacao, tabela=''):
+    """Decorador: mede cada chamada da função com medir()."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(operacao, tabela):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def medir_gerador(operacao, gerador, tabela=''):
+    """Repassa os pedaços de bytes de `gerador` e registra a duração e o total de bytes quando ele termina."""
+    with medir(operacao, tabela) as dados:
+        for pedaco in gerador:
+            dados['bytes'] += len(pedaco)
+            yield pedaco
+
+
+def gravar_prometheus(caminho):
+    """Grava as métricas em `caminho` (ex.: para o textfile collector do node_exporter) de forma atômica."""
+    temporario = f"{caminho}.tmp-{os.getpid()}"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(metricas.texto_prometheus())
+    os.replace(temporario, caminho)
+
+
+_exportacao_iniciada = False
+_exportacao_lock = threading.Lock()
+
+
+def iniciar_exportacao():
+    """Publica as métricas conforme as variáveis de ambiente (uma única vez por processo).
+
+    RESERVAS_METRICAS_ARQUIVO: arquivo regravado a cada RESERVAS_METRICAS_INTERVALO segundos (padrão 15).
+    RESERVAS_METRICAS_PORTA: porta HTTP que responde GET /metrics.
+    """
+    global _exportacao_iniciada
+    with _exportacao_lock:
+        if _exportacao_iniciada:
+            return
+        _exportacao_iniciada = True
+
+    caminho = os.environ.get('RESERVAS_METRICAS_ARQUIVO')
+    if caminho:
+        intervalo = float(os.environ.get('RESERVAS_METRICAS_INTERVALO', '15'))
+
+        def exportar_periodicamente():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    gravar_prometheus(caminho)
+                except OSError as e:
+                    log.warning("Não foi possível gravar as métricas em '%s': %s", caminho, e)
+
+        threading.Thread(target=exportar_periodicamente, name='metricas-arquivo', daemon=True).start()
+
+    porta = os.environ.get('RESERVAS_METRICAS_PORTA')
+    if porta:
+        iniciar_servidor_metricas(int(porta))
+
+
+def iniciar_servidor_metricas(porta, endereco=''):
+    """Serve GET /metrics em uma thread em segundo plano e retorna o servidor HTTP."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            corpo = metricas.texto_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            log.debug("metricas http: " + formato, *args)
+
+    servidor = ThreadingHTTPServer((endereco, porta), Handler)
+    threading.Thread(target=servidor.serve_forever, name='metricas-http', daemon=True).start()
+    log.info("Métricas disponíveis em http://%s:%s/metrics", endereco or '0.0.0.0', servidor.server_address[1])
+    return servidor
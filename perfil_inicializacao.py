@@ -0,0 +1,176 @@
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Só a biblioteca padrão aqui em cima: este módulo é importado antes de tudo nas interfaces, para que o
+# tempo de importação do pandas, do Plotly e do gerenciador apareça no perfil (e não seja pago por ele)
+
+# Referência do "início do processo": a primeira importação deste módulo, logo no topo de app.py
+INICIO_PROCESSO = time.perf_counter()
+
+_lock = threading.Lock()
+_importacoes = []
+_paginas = {}
+# Página sendo desenhada na thread atual (cada sessão do Streamlit roda o script em uma thread própria)
+_contexto = threading.local()
+
+
+def _registrar_metrica(operacao, rotulo, segundos):
+    # Importado aqui: instrumentacao traz o pandas, que já estará carregado quando houver algo a registrar
+    from instrumentacao import metricas
+    metricas.registrar(operacao, rotulo, segundos, 0, 0, False)
+
+
+@contextmanager
+def importacoes(grupo):
+    """Mede as importações feitas no bloco (só a primeira vez: depois os módulos já estão em sys.modules)."""
+    modulos_antes = len(sys.modules)
+    inicio = time.perf_counter()
+    yield
+    novos = len(sys.modules) - modulos_antes
+    if novos:
+        segundos = time.perf_counter() - inicio
+        with _lock:
+            _importacoes.append({
+                'Importação': grupo,
+                'Página': getattr(_contexto, 'pagina', None) or '(início)',
+                'Segundos': round(segundos, 4),
+                'Módulos novos': novos,
+                'Desde o início do processo (s)': round(time.perf_counter() - INICIO_PROCESSO, 4),
+            })
+        _registrar_metrica('importar', grupo, segundos)
+
+
+def importar(nome):
+    """importlib.import_module medido: para módulos pesados que só algumas páginas usam (ex.: plotly.express)."""
+    modulo = sys.modules.get(nome)
+    if modulo is not None:
+        return modulo
+    with importacoes(nome):
+        return importlib.import_module(nome)
+
+
+@contextmanager
+def renderizacao(pagina, inicio_execucao, gerenciador=None):
+    """Mede o desenho de `pagina`; a primeira vez de cada página no processo entra no relatório.
+
+    `inicio_execucao` é o perf_counter() do início da execução do script, então "Primeiro desenho" inclui
+    as importações do topo e a criação do gerenciador. Com o `gerenciador`, o relatório mostra também quais
+    tabelas a página precisou carregar.
+    """
+    carregadas = set(gerenciador.tabelas_carregadas()) if gerenciador is not None else set()
+    inicio = time.perf_counter()
+    _contexto.pagina = pagina
+    try:
+        yield
+    finally:
+        _contexto.pagina = None
+    fim = time.perf_counter()
+    with _lock:
+        if pagina in _paginas:
+            return
+        novas = [t for t in gerenciador.tabelas_carregadas() if t not in carregadas] if gerenciador is not None else []
+        _paginas[pagina] = {
+            'Página': pagina,
+            'Primeiro desenho (s)': round(fim - inicio_execucao, 4),
+            'Desenho da página (s)': round(fim - inicio, 4),
+            'Importações na página (s)': round(sum(i['Segundos'] for i in _importacoes if i['Página'] == pagina), 4),
+            'Tabelas carregadas': ', '.join(novas),
+            'Desde o início do processo (s)': round(fim - INICIO_PROCESSO, 4),
+        }
+    _registrar_metrica('primeiro_desenho', pagina, fim - inicio_execucao)
+
+
+def relatorio_paginas():
+    """Uma linha (dict) por página já desenhada neste processo, na ordem em que foram abertas."""
+    with _lock:
+        return [dict(linha) for linha in _paginas.values()]
+
+
+def relatorio_importacoes():
+    """Uma linha (dict) por importação medida neste processo, na ordem em que aconteceram."""
+    with _lock:
+        return [dict(linha) for linha in _importacoes]
+
+
+def medir_pagina(script, pagina):
+    """Abre `pagina` do `script` do Streamlit como a primeira coisa do processo, sem navegador (AppTest)."""
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    importacao_streamlit = time.perf_counter() - inicio
+    teste = AppTest.from_file(script, default_timeout=600)
+    teste.query_params['pagina'] = pagina
+    teste.run()
+    total = time.perf_counter() - inicio
+    # O script importa este arquivo como módulo, que não é o __main__ deste processo
+    perfil = importlib.import_module('perfil_inicializacao')
+    desenho = next((linha for linha in perfil.relatorio_paginas() if linha['Página'] == pagina), {})
+    return {
+        'Página': pagina,
+        'Processo até o primeiro desenho (s)': round(total, 4),
+        'Importação do Streamlit (s)': round(importacao_streamlit, 4),
+        'Primeiro desenho (s)': desenho.get('Primeiro desenho (s)'),
+        'Desenho da página (s)': desenho.get('Desenho da página (s)'),
+        'Importações no script (s)': round(sum(i['Segundos'] for i in perfil.relatorio_importacoes()), 4),
+        'Tabelas carregadas': desenho.get('Tabelas carregadas'),
+        'Erros': [str(erro.value) for erro in teste.exception],
+        'Importações': perfil.relatorio_importacoes(),
+    }
+
+
+def perfil_frio(script, paginas):
+    """Mede cada página em um processo novo (partida a frio, como depois de um deploy ou reinício)."""
+    resultados = []
+    for pagina in paginas:
+        print(f"Medindo '{pagina}'...")
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--medir-pagina', pagina, '--script', script],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(script)),
+        )
+        if saida.returncode != 0:
+            resultados.append({'Página': pagina, 'Erros': [saida.stderr.strip()[-2000:]]})
+            continue
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    return resultados
+
+
+def paginas_do_script(script):
+    """Nomes das páginas do dicionário `pages` do script, sem executá-lo."""
+    import ast
+    with open(script, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read())
+    for no in arvore.body:
+        if (isinstance(no, ast.Assign) and any(getattr(alvo, 'id', None) == 'pages' for alvo in no.targets)
+                and isinstance(no.value, ast.Dict)):
+            return [chave.value for chave in no.value.keys]
+    return []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfil de partida a frio das páginas da interface Streamlit.")
+    parser.add_argument("--script", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"))
+    parser.add_argument("--paginas", default="", help="Páginas a medir, separadas por vírgula (padrão: todas)")
+    parser.add_argument("--saida", default="perfil_inicializacao.json", help="Arquivo JSON de resultados")
+    parser.add_argument("--medir-pagina", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir_pagina:
+        # Processo filho de perfil_frio: o resultado vai como uma linha JSON no fim da saída
+        print(json.dumps(medir_pagina(args.script, args.medir_pagina), ensure_ascii=False))
+        sys.exit(0)
+
+    paginas = [p for p in args.paginas.split(',') if p] or paginas_do_script(args.script)
+    resultados = perfil_frio(args.script, paginas)
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+    import pandas as pd
+    tabela = pd.DataFrame(resultados).drop(columns=['Importações'], errors='ignore')
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(tabela.to_string(index=False))
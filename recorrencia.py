@@ -0,0 +1,303 @@
+import numpy as np
+import pandas as pd
+
+from disponibilidade import chave_apartamento
+from indice_intervalos import para_dia
+from instrumentacao import log
+
+# Colunas da reserva recorrente: a regra (texto, veja Recorrencia) e as datas de entrada puladas
+COLUNA_RECORRENCIA = 'Recorrência'
+COLUNA_EXCECOES = 'Exceções'
+
+# Frequências aceitas na regra -> passo em dias (o mês é tratado à parte, por calendário)
+PASSOS = {'diaria': 1, 'semanal': 7, 'mensal': None}
+
+# Limite de ocorrências de uma regra; toda regra precisa terminar ('ate' ou 'vezes')
+MAXIMO_OCORRENCIAS = 3660
+
+UM_DIA = pd.Timedelta(days=1)
+
+
+def _ausente(valor):
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor))
+
+
+def eh_recorrente(valor):
+    """Indica se o valor da coluna Recorrência descreve uma regra (não vazio)."""
+    return not _ausente(valor) and str(valor).strip() != ''
+
+
+def recorrentes(df):
+    """Máscara booleana das linhas de `df` com regra de recorrência."""
+    if COLUNA_RECORRENCIA not in df.columns:
+        return pd.Series(False, index=df.index)
+    regra = df[COLUNA_RECORRENCIA]
+    return regra.notna() & (regra.astype(str).str.strip() != '')
+
+
+def ler_excecoes(valor):
+    """Dias (desde 1970-01-01) das entradas puladas, a partir do texto 'AAAA-MM-DD, AAAA-MM-DD, ...'."""
+    if _ausente(valor):
+        return frozenset()
+    dias = (para_dia(parte.strip()) for parte in str(valor).split(',') if parte.strip())
+    return frozenset(dia for dia in dias if dia is not None)
+
+
+def texto_excecoes(dias):
+    """Inverso de ler_excecoes: as datas em ordem, separadas por vírgula (None se não há nenhuma)."""
+    if not dias:
+        return None
+    return ', '.join(str(np.datetime64(int(dia), 'D')) for dia in sorted(dias))
+
+
+def regra_valida(texto):
+    """Indica se o texto é uma regra que Recorrencia.de_texto aceita."""
+    try:
+        Recorrencia.de_texto(texto)
+    except ValueError:
+        return False
+    return True
+
+
+class Recorrencia:
+    """Regra de repetição de uma reserva: a cada `intervalo` dias, semanas ou meses, até `ate` ou por `vezes`.
+
+    Em texto: 'semanal;intervalo=2;ate=2025-12-31' ou 'mensal;vezes=12'. A estadia descrita pela reserva
+    (entrada e saída) é a primeira ocorrência; as seguintes mantêm a duração e o horário. No mês, a entrada
+    cai no mesmo dia do mês da primeira (ou no último dia, em meses mais curtos).
+    """
+
+    def __init__(self, frequencia, intervalo=1, ate=None, vezes=None):
+        if frequencia not in PASSOS:
+            raise ValueError(f"Frequência '{frequencia}' inválida; use uma de {list(PASSOS)}.")
+        if int(intervalo) < 1:
+            raise ValueError("O intervalo da recorrência deve ser de pelo menos 1.")
+        if ate is None and vezes is None:
+            raise ValueError("A recorrência precisa terminar: informe 'ate' ou 'vezes'.")
+        self.frequencia = frequencia
+        self.intervalo = int(intervalo)
+        self.ate = None if ate is None else pd.Timestamp(ate).normalize()
+        self.vezes = None if vezes is None else int(vezes)
+
+    @classmethod
+    def de_texto(cls, texto):
+        """Lê a regra no formato 'frequencia;intervalo=N;ate=AAAA-MM-DD;vezes=N' (ValueError se inválida)."""
+        if isinstance(texto, cls):
+            return texto
+        partes = [parte.strip() for parte in str(texto).split(';') if parte.strip()]
+        if not partes:
+            raise ValueError("Regra de recorrência vazia.")
+        opcoes = {}
+        for parte in partes[1:]:
+            nome, separador, valor = parte.partition('=')
+            if not separador or nome.strip() not in ('intervalo', 'ate', 'vezes'):
+                raise ValueError(f"Opção de recorrência inválida: '{parte}'.")
+            opcoes[nome.strip()] = valor.strip()
+        try:
+            return cls(partes[0].lower(), int(opcoes.get('intervalo', 1)), opcoes.get('ate'),
+                       int(opcoes['vezes']) if 'vezes' in opcoes else None)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Regra de recorrência inválida '{texto}': {e}") from e
+
+    def texto(self):
+        partes = [self.frequencia]
+        if self.intervalo != 1:
+            partes.append(f'intervalo={self.intervalo}')
+        if self.ate is not None:
+            partes.append(f"ate={self.ate.strftime('%Y-%m-%d')}")
+        if self.vezes is not None:
+            partes.append(f'vezes={self.vezes}')
+        return ';'.join(partes)
+
+    def __str__(self):
+        return self.texto()
+
+    def _ultima(self, primeira):
+        """Maior número de ocorrência (a partir de 0) permitido por 'vezes', 'ate' e MAXIMO_OCORRENCIAS."""
+        ultima = MAXIMO_OCORRENCIAS - 1
+        if self.vezes is not None:
+            ultima = min(ultima, self.vezes - 1)
+        if self.ate is not None:
+            ultima = min(ultima, self._numero_ate(primeira, para_dia(self.ate)))
+        return ultima
+
+    def _numero_ate(self, primeira, dia):
+        """Maior k cuja entrada não passa de `dia` (-1 se nenhuma)."""
+        passo = PASSOS[self.frequencia]
+        if passo is not None:
+            return (dia - para_dia(primeira)) // (passo * self.intervalo)
+        primeira = pd.Timestamp(primeira)
+        meses = (pd.Timestamp(np.datetime64(dia, 'D')).to_period('M') - primeira.to_period('M')).n
+        k = meses // self.intervalo
+        # O mês de `dia` pode ter a ocorrência depois de `dia`
+        while k >= 0 and para_dia(self._entradas(primeira, np.array([k]))[0]) > dia:
+            k -= 1
+        return k
+
+    def _entradas(self, primeira, numeros):
+        """Entradas (datetime64, com o horário da primeira) das ocorrências `numeros`."""
+        primeira = pd.Timestamp(primeira)
+        horario = primeira - primeira.normalize()
+        passo = PASSOS[self.frequencia]
+        if passo is not None:
+            dias = np.datetime64(primeira.normalize(), 'D') + numeros * passo * self.intervalo
+        else:
+            meses = np.datetime64(primeira.normalize(), 'M') + numeros * self.intervalo
+            inicio_mes = meses.astype('datetime64[D]')
+            dias_no_mes = ((meses + 1).astype('datetime64[D]') - inicio_mes).astype(np.int64)
+            dias = inicio_mes + np.minimum(primeira.day, dias_no_mes) - 1
+        return dias.astype('datetime64[ns]') + np.timedelta64(horario.value, 'ns')
+
+    def ocorrencias(self, entrada, saida, inicio=None, fim=None, excecoes=frozenset()):
+        """(números, entradas, saídas) das ocorrências que têm algum dia em [inicio, fim], sem as exceções.
+
+        Só as ocorrências da janela são calculadas; sem janela, todas (a regra sempre termina).
+        """
+        entrada, saida = pd.Timestamp(entrada), pd.Timestamp(saida)
+        duracao = max(para_dia(saida) - para_dia(entrada), 0)
+        ultima = self._ultima(entrada)
+        primeira = 0
+        if fim is not None:
+            ultima = min(ultima, self._numero_ate(entrada, para_dia(fim)))
+        if inicio is not None:
+            # Ocorrências que entram antes de `inicio - duração` já terminaram quando a janela começa
+            primeira = max(self._numero_ate(entrada, para_dia(inicio) - duracao - 1) + 1, 0)
+        numeros = np.arange(primeira, ultima + 1, dtype=np.int64)
+        entradas = self._entradas(entrada, numeros)
+        saidas = entradas + np.timedelta64((saida - entrada).value, 'ns')
+        if excecoes:
+            dias = entradas.astype('datetime64[D]').astype(np.int64)
+            mantidas = ~np.isin(dias, np.fromiter(excecoes, dtype=np.int64))
+            numeros, entradas, saidas = numeros[mantidas], entradas[mantidas], saidas[mantidas]
+        return numeros, entradas, saidas
+
+    def sobrepoe(self, entrada, saida):
+        """Indica se duas ocorrências seguidas dividiriam alguma noite (passo da regra menor que a estadia).
+
+        As exceções não contam: pular uma data não torna válida a regra que se sobrepõe nas demais.
+        """
+        _, entradas, _ = self.ocorrencias(entrada, saida)
+        if len(entradas) < 2:
+            return False
+        duracao = para_dia(saida) - para_dia(entrada)
+        dias = entradas.astype('datetime64[D]').astype(np.int64)
+        return int(np.diff(dias).min()) < duracao
+
+
+class AgendaRecorrente:
+    """Reservas recorrentes, cada uma guardada como regra + exceções e expandida só na janela consultada.
+
+    Complementa o IndiceIntervalos e o MapaOcupacao, que ficam só com as estadias avulsas: a cada consulta
+    de período, as ocorrências da janela são calculadas a partir da regra de cada registro.
+    """
+
+    def __init__(self):
+        self._registros = {}  # id -> (chave do apartamento, rótulo, entrada, saída, Recorrencia, exceções)
+
+    def __len__(self):
+        return len(self._registros)
+
+    def __contains__(self, id_):
+        return id_ in self._registros
+
+    @classmethod
+    def construir(cls, df):
+        """Monta a agenda com as linhas recorrentes de `df` (as demais são ignoradas)."""
+        agenda = cls()
+        for id_, linha in df[recorrentes(df)].iterrows():
+            agenda.adicionar(id_, linha)
+        return agenda
+
+    def adicionar(self, id_, reserva):
+        """Inclui (ou substitui) a reserva `id_` se ela for recorrente; senão, apenas a retira da agenda."""
+        self.remover(id_)
+        regra = reserva.get(COLUNA_RECORRENCIA)
+        entrada, saida = reserva.get('Data de entrada'), reserva.get('Data de saída')
+        if not eh_recorrente(regra) or _ausente(entrada) or _ausente(saida):
+            return
+        try:
+            regra = Recorrencia.de_texto(regra)
+        except ValueError as e:
+            # Regra corrompida na planilha: a reserva vale só pela estadia informada
+            log.warning("Reserva %s: %s Considerando apenas a primeira estadia.", id_, e)
+            regra = Recorrencia('diaria', vezes=1)
+        condominio, bloco, numero = reserva.get('Nome do Condomínio'), reserva.get('Bloco'), reserva.get('Número do apartamento')
+        self._registros[id_] = (
+            chave_apartamento(condominio, bloco, numero), (condominio, bloco, numero),
+            pd.Timestamp(entrada), pd.Timestamp(saida), regra, ler_excecoes(reserva.get(COLUNA_EXCECOES)),
+        )
+
+    def remover(self, id_):
+        self._registros.pop(id_, None)
+
+    def ocorrencias(self, inicio, fim, chave=None):
+        """Ocorrências com algum dia em [inicio, fim]: DataFrame com 'ID', 'Ocorrência', 'Data de entrada' e
+        'Data de saída' (só do apartamento `chave`, se informada)."""
+        partes = []
+        for id_, (chave_registro, _, entrada, saida, regra, excecoes) in self._registros.items():
+            if chave is not None and chave_registro != chave:
+                continue
+            numeros, entradas, saidas = regra.ocorrencias(entrada, saida, inicio, fim, excecoes)
+            if len(numeros):
+                partes.append(pd.DataFrame({'ID': id_, 'Ocorrência': numeros + 1,
+                                            'Data de entrada': entradas, 'Data de saída': saidas}))
+        if not partes:
+            return pd.DataFrame({'ID': pd.Series(dtype=np.int64), 'Ocorrência': pd.Series(dtype=np.int64),
+                                 'Data de entrada': pd.Series(dtype='datetime64[ns]'),
+                                 'Data de saída': pd.Series(dtype='datetime64[ns]')})
+        return pd.concat(partes, ignore_index=True)
+
+    def conflitos(self, condominio, bloco, numero_apartamento, entrada, saida, ignorar=None):
+        """Ids das reservas recorrentes do apartamento com alguma ocorrência dividindo noites com [entrada, saída)."""
+        # Mesma janela do MapaOcupacao: noites em comum equivalem a sobrepor (E + 1 dia, S - 1 dia)
+        janela = self.ocorrencias(pd.Timestamp(entrada) + UM_DIA, pd.Timestamp(saida) - UM_DIA,
+                                  chave_apartamento(condominio, bloco, numero_apartamento))
+        return [id_ for id_ in janela['ID'].unique().tolist() if id_ != ignorar]
+
+    def ocupados(self, inicio, fim):
+        """Chaves dos apartamentos com alguma noite recorrente entre `inicio` e `fim` (saída)."""
+        janela = self.ocorrencias(pd.Timestamp(inicio) + UM_DIA, pd.Timestamp(fim) - UM_DIA)
+        return {self._registros[id_][0] for id_ in janela['ID'].unique().tolist()}
+
+    def rotulos(self):
+        """{chave: (condomínio, bloco, número)} dos apartamentos com reservas recorrentes."""
+        return {chave: rotulo for chave, rotulo, *_ in self._registros.values()}
+
+
+def linhas_ocorrencias(df, janela):
+    """Linhas de `df` repetidas para cada ocorrência de `janela` (um resultado de AgendaRecorrente.ocorrencias).
+
+    O índice é o id da reserva de origem; as datas são as da ocorrência e o número dela vai na coluna 'Ocorrência'.
+    """
+    linhas = df.loc[janela['ID']].copy()
+    linhas['Data de entrada'] = janela['Data de entrada'].to_numpy()
+    linhas['Data de saída'] = janela['Data de saída'].to_numpy()
+    linhas['Ocorrência'] = janela['Ocorrência'].to_numpy()
+    return linhas
+
+
+def expandir(df, inicio=None, fim=None):
+    """`df` com cada reserva recorrente trocada pelas suas ocorrências com algum dia em [inicio, fim] (todas, sem janela).
+
+    As avulsas ficam como estão, mesmo fora da janela. Recorrentes sem alguma das datas também: a
+    AgendaRecorrente não as aceita, e elas valem como uma estadia só.
+    """
+    mascara = recorrentes(df)
+    for coluna in ('Data de entrada', 'Data de saída'):
+        if coluna not in df.columns:
+            return df
+        mascara &= df[coluna].notna()
+    if not mascara.any():
+        return df
+    janela = AgendaRecorrente.construir(df[mascara]).ocorrencias(inicio, fim)
+    return pd.concat([df[~mascara], linhas_ocorrencias(df, janela)])
+
+
+def estadias(id_, reserva):
+    """[(entrada, saída)] de cada estadia da reserva `id_` (Series ou dict): as ocorrências, se ela for recorrente."""
+    agenda = AgendaRecorrente()
+    agenda.adicionar(id_, reserva)
+    if not len(agenda):
+        return [(reserva.get('Data de entrada'), reserva.get('Data de saída'))]
+    janela = agenda.ocorrencias(None, None)
+    return list(zip(janela['Data de entrada'], janela['Data de saída']))
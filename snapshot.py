@@ -0,0 +1,88 @@
+import json
+import os
+
+from esquema import aplicar_esquema
+from instrumentacao import log
+
+# pyarrow é opcional: sem ele o armazenamento Excel simplesmente não usa snapshots
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Extensão do arquivo de snapshot para cada formato suportado
+FORMATOS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+_CHAVE_ORIGEM = b'assinatura_origem'
+
+
+def snapshots_disponiveis():
+    """Indica se o pyarrow está instalado."""
+    return pa is not None
+
+
+def caminho_snapshot(caminho_origem, formato):
+    """Retorna o caminho do snapshot que acompanha a planilha (ex.: reservas.xlsx -> reservas.arrow)."""
+    return os.path.splitext(caminho_origem)[0] + FORMATOS[formato]
+
+
+def tipar_para_snapshot(df, tabela):
+    """Aplica o esquema da tabela antes de gravar; colunas fora do esquema com tipo objeto viram texto."""
+    df = aplicar_esquema(df, tabela)
+    objetos = [coluna for coluna in df.columns if df[coluna].dtype == object]
+    if objetos:
+        # Colunas de objeto podem misturar números e texto (ex.: telefones), o que o Arrow não aceita
+        df = df.copy()
+        for coluna in objetos:
+            df[coluna] = df[coluna].astype('string')
+    return df
+
+
+def salvar_snapshot(df, caminho, formato, assinatura_origem, tabela):
+    """Grava o snapshot de `df`, registrando a assinatura da planilha da qual ele foi gerado."""
+    dados = pa.Table.from_pandas(tipar_para_snapshot(df, tabela), preserve_index=False)
+    metadados = dict(dados.schema.metadata or {})
+    metadados[_CHAVE_ORIGEM] = json.dumps(assinatura_origem).encode()
+    dados = dados.replace_schema_metadata(metadados)
+
+    temporario = caminho + '.tmp'
+    if formato == 'parquet':
+        pq.write_table(dados, temporario)
+    else:
+        with pa.OSFile(temporario, 'wb') as arquivo, pa.ipc.new_file(arquivo, dados.schema) as escritor:
+            escritor.write_table(dados)
+    os.replace(temporario, caminho)
+
+
+def carregar_snapshot(caminho, formato, assinatura_origem):
+    """Lê o snapshot se ele foi gerado a partir da versão atual da planilha; caso contrário retorna None.
+
+    No formato Arrow IPC o arquivo é lido por mapeamento de memória.
+    """
+    if not os.path.exists(caminho):
+        return None
+    try:
+        if formato == 'parquet':
+            if _assinatura_registrada(pq.read_schema(caminho)) != assinatura_origem:
+                return None
+            tabela = pq.read_table(caminho)
+        else:
+            with pa.memory_map(caminho, 'r') as origem:
+                leitor = pa.ipc.open_file(origem)
+                if _assinatura_registrada(leitor.schema) != assinatura_origem:
+                    return None
+                tabela = leitor.read_all()
+    except Exception as e:
+        log.warning("Snapshot '%s' ilegível, voltando para a planilha: %s", caminho, e)
+        return None
+    return tabela.to_pandas()
+
+
+def _assinatura_registrada(schema):
+    metadados = schema.metadata or {}
+    if _CHAVE_ORIGEM not in metadados:
+        return None
+    valor = json.loads(metadados[_CHAVE_ORIGEM])
+    return tuple(valor) if isinstance(valor, list) else valor
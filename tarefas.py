@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentacao import log, medir
+
+# Pasta dos relatórios já gerados (RESERVAS_ARTEFATOS_PASTA) e o tamanho máximo dela em MiB
+# (RESERVAS_ARTEFATOS_LIMITE_MB); acima do limite, os artefatos usados há mais tempo são apagados
+PASTA_ARTEFATOS = os.environ.get(
+    'RESERVAS_ARTEFATOS_PASTA', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artefatos')
+)
+LIMITE_ARTEFATOS_BYTES = int(float(os.environ.get('RESERVAS_ARTEFATOS_LIMITE_MB', '512')) * 2 ** 20)
+
+# Relatórios gerados ao mesmo tempo; os demais esperam na fila
+TRABALHADORES = int(os.environ.get('RESERVAS_TAREFAS_TRABALHADORES', '2'))
+
+# Tarefas concluídas mantidas em memória para consulta pela interface
+HISTORICO_TAREFAS = 200
+
+PENDENTE, EXECUTANDO, CONCLUIDA, ERRO = 'pendente', 'executando', 'concluída', 'erro'
+
+
+def chave_artefato(tipo, parametros, versao):
+    """Hash estável de (tipo, parâmetros, versão dos dados): o mesmo pedido sobre os mesmos dados dá a mesma chave."""
+    texto = json.dumps([tipo, parametros, versao], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+class Tarefa:
+    """Situação de um relatório pedido à fila: progresso de 0 a 1 e, ao concluir, o caminho do arquivo."""
+
+    def __init__(self, tipo, chave, caminho):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.chave = chave
+        self.caminho = caminho
+        self.situacao = PENDENTE
+        self.progresso = 0.0
+        self.erro = None
+        self.do_cache = False
+        self.criada = time.time()
+        self.concluida = None
+
+    @property
+    def terminada(self):
+        return self.situacao in (CONCLUIDA, ERRO)
+
+    def ler(self):
+        """Conteúdo do artefato gerado (bytes)."""
+        with open(self.caminho, 'rb') as arquivo:
+            return arquivo.read()
+
+
+class FilaTarefas:
+    """Gera relatórios em threads de fundo e guarda o resultado em disco, indexado pela chave do pedido.
+
+    Um pedido cuja chave já tem artefato em disco é atendido na hora; um pedido igual a outro ainda em
+    andamento recebe a mesma Tarefa. Depois de cada geração, os artefatos menos usados recentemente são
+    apagados até a pasta caber em `limite_bytes` (o uso é marcado no mtime dos arquivos, então o cache
+    sobrevive a reinícios e é compartilhado pelos processos que usam a mesma pasta).
+    """
+
+    def __init__(self, pasta=PASTA_ARTEFATOS, limite_bytes=LIMITE_ARTEFATOS_BYTES, trabalhadores=TRABALHADORES):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        os.makedirs(pasta, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='tarefa')
+        self._lock = threading.Lock()
+        self._tarefas = {}  # id -> Tarefa, na ordem de criação
+        self._em_andamento = {}  # chave -> Tarefa ainda não terminada
+
+    def _caminho(self, tipo, chave, extensao):
+        return os.path.join(self.pasta, f"{tipo}-{chave}{extensao}")
+
+    def enviar(self, tipo, parametros, versao, gerar, extensao='', versao_atual=None):
+        """Pede o relatório `tipo` com `parametros` sobre os dados na `versao` e retorna a Tarefa.
+
+        `gerar(progresso)` devolve um iterável de pedaços de bytes e pode chamar `progresso(fracao)` à
+        medida que avança. Se `versao_atual()` (opcional) não for mais `versao` ao fim da geração, os dados
+        mudaram no meio do caminho: o arquivo ainda é entregue a quem pediu, mas não entra no cache.
+        """
+        chave = chave_artefato(tipo, parametros, versao)
+        caminho = self._caminho(tipo, chave, extensao)
+        with self._lock:
+            andamento = self._em_andamento.get(chave)
+            if andamento is not None:
+                return andamento
+            tarefa = Tarefa(tipo, chave, caminho)
+            self._registrar(tarefa)
+            if self._usar_cache(caminho):
+                tarefa.situacao, tarefa.progresso, tarefa.do_cache = CONCLUIDA, 1.0, True
+                tarefa.concluida = time.time()
+                log.debug("Relatório '%s' servido do cache (%s).", tipo, chave)
+                return tarefa
+            self._em_andamento[chave] = tarefa
+        self._executor.submit(self._executar, tarefa, gerar, versao, versao_atual)
+        return tarefa
+
+    def _registrar(self, tarefa):
+        self._tarefas[tarefa.id] = tarefa
+        while len(self._tarefas) > HISTORICO_TAREFAS:
+            antiga = next(iter(self._tarefas.values()))
+            if not antiga.terminada:
+                break
+            del self._tarefas[antiga.id]
+
+    def _usar_cache(self, caminho):
+        try:
+            os.utime(caminho)  # marca o uso para a ordem de descarte (LRU)
+        except OSError:
+            return False
+        return True
+
+    def _executar(self, tarefa, gerar, versao, versao_atual):
+        tarefa.situacao = EXECUTANDO
+        temporario = f"{tarefa.caminho}.tmp-{tarefa.id}"
+
+        def progresso(fracao):
+            tarefa.progresso = min(max(float(fracao), 0.0), 1.0)
+
+        try:
+            with medir(f'tarefa_{tarefa.tipo}') as medicao, open(temporario, 'wb') as arquivo:
+                for pedaco in gerar(progresso):
+                    arquivo.write(pedaco)
+                    medicao['bytes'] += len(pedaco)
+            if versao_atual is not None and versao_atual() != versao:
+                # Gerado sobre dados que mudaram durante a geração: um arquivo avulso, fora do cache
+                base, extensao = os.path.splitext(tarefa.caminho)
+                tarefa.caminho = f"{base}-avulso-{tarefa.id}{extensao}"
+                log.info("Dados alterados durante o relatório '%s'; o resultado não foi guardado no cache.",
+                         tarefa.tipo)
+            os.replace(temporario, tarefa.caminho)
+            tarefa.progresso = 1.0
+            tarefa.situacao = CONCLUIDA
+        except Exception as e:
+            log.exception("Falha ao gerar o relatório '%s'.", tarefa.tipo)
+            tarefa.erro = str(e)
+            tarefa.situacao = ERRO
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+        finally:
+            tarefa.concluida = time.time()
+            with self._lock:
+                self._em_andamento.pop(tarefa.chave, None)
+        self.limitar_pasta(manter=tarefa.caminho)
+
+    def limitar_pasta(self, manter=None):
+        """Apaga os artefatos usados há mais tempo até a pasta caber no limite. Retorna quantos apagou."""
+        artefatos = []
+        for entrada in os.scandir(self.pasta):
+            if entrada.is_file() and '.tmp-' not in entrada.name:
+                estado = entrada.stat()
+                artefatos.append((estado.st_mtime, estado.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in artefatos)
+        apagados = 0
+        for _, tamanho, caminho in sorted(artefatos):
+            if total <= self.limite_bytes:
+                break
+            if caminho == manter:
+                continue
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            apagados += 1
+        if apagados:
+            log.info("%d relatórios antigos apagados do cache (%d bytes restantes).", apagados, total)
+        return apagados
+
+    def obter(self, id_tarefa):
+        with self._lock:
+            return self._tarefas.get(id_tarefa)
+
+    def tarefas(self):
+        """Tarefas conhecidas por esta fila, das mais recentes para as mais antigas."""
+        with self._lock:
+            return list(reversed(self._tarefas.values()))
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def obter_fila():
+    """Fila compartilhada pelo processo (todas as sessões do Streamlit usam as mesmas threads e o mesmo cache)."""
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = FilaTarefas()
+        return _fila
@@ -1,10 +1,66 @@
+import time
+# Início desta execução do script, para o perfil de inicialização (veja perfil_inicializacao.py)
+inicio_execucao = time.perf_counter()
+
+from perfil_inicializacao import importar, renderizacao
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from gerenciamento_reservas import GerenciamentoReservas
+from gerenciamento_reservas import obter_gerenciador
+from disponibilidade import ConflitoReservaError
+from concorrencia import ConflitoVersaoError
+from esquema import valor_texto
+from componentes import acompanhar_tarefa, encerrar_edicao, registro_em_edicao, selecionar_registro
+from exportacao import FORMATOS as FORMATOS_EXPORTACAO, gerar_relatorio, lotes_dataframe
+from tarefas import obter_fila
 from datetime import date, timedelta
 import os
-import io
+import functools
+
+# Cada seção do painel é um fragmento: a interação com um widget reexecuta só a seção dele.
+# Os relatórios ficam guardados na sessão junto com a versão dos dados e só são recalculados quando ela muda.
+
+def fragmento(nome):
+    """Transforma a função em um st.fragment e registra quanto tempo cada execução dele levou."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                registrar_tempo(nome, time.perf_counter() - inicio)
+        return st.fragment(medida)
+    return decorador
+
+def registrar_tempo(nome, segundos):
+    tempos = st.session_state.setdefault("tempos_fragmentos", {})
+    anterior = tempos.get(nome, {"Execuções": 0, "Total (ms)": 0.0})
+    tempos[nome] = {
+        "Execuções": anterior["Execuções"] + 1,
+        "Última (ms)": round(segundos * 1000, 1),
+        "Total (ms)": round(anterior["Total (ms)"] + segundos * 1000, 1),
+    }
+
+def exibir_tempos_fragmentos():
+    with st.sidebar.expander("Tempos de renderização"):
+        tempos = st.session_state.get("tempos_fragmentos", {})
+        if tempos:
+            st.dataframe(pd.DataFrame.from_dict(tempos, orient="index"))
+
+def memoizar(chave, versao, calcular):
+    """Retorna o resultado guardado para `chave` se a versão dos dados não mudou; senão recalcula."""
+    cache = st.session_state.setdefault("cache_relatorios", {})
+    if chave not in cache or cache[chave][0] != versao:
+        cache[chave] = (versao, calcular())
+    return cache[chave][1]
+
+def totais_semanais(reservas):
+    return memoizar(("totais_semanal", date.today()), reservas.versoes['reservas'], reservas.calcular_totais_semanal)
+
+def concluir_alteracao(mensagem):
+    # Os dados mudaram: reexecuta o app inteiro para que relatórios e gráficos dos outros fragmentos se atualizem
+    st.session_state["mensagem_sucesso"] = mensagem
+    st.rerun()
 
 def dashboard():
     st.title("Gerenciamento de Reservas")
@@ -14,14 +70,15 @@ def dashboard():
     parceiros_path = os.path.join(current_dir, "parceiros.xlsx")
     proprietarios_path = os.path.join(current_dir, "proprietarios.xlsx")
 
-    reservas = GerenciamentoReservas(reservas_path, parceiros_path, proprietarios_path)
+    reservas = obter_gerenciador(reservas_path, parceiros_path, proprietarios_path)
 
     if st.button("Recarregar Dados", key="botao_recarregar_dados"):
-        reservas.df_reservas = reservas.load_data(reservas.reservas_path)
-        reservas.df_parceiros = reservas.load_data(reservas.parceiros_path)
-        reservas.df_proprietarios = reservas.load_data(reservas.proprietarios_path)
+        reservas.recarregar()
         st.success("Dados recarregados com sucesso!")
 
+    if "mensagem_sucesso" in st.session_state:
+        st.success(st.session_state.pop("mensagem_sucesso"))
+
     exibir_relatorio_semanal(reservas)
     exibir_relatorio_parceiros(reservas)
     exibir_detalhamento_reservas(reservas)
@@ -46,210 +103,257 @@ def dashboard():
         with tabs[5]:  # Aba para adicionar novo proprietário
             adicionar_novo_proprietario(reservas)
 
+    exibir_tempos_fragmentos()
+
+@fragmento("Exportação")
 def exportar_dados(reservas):
     st.subheader("Exportação de Dados")
 
-    # Exportar Relatório Semanal
-    if st.button("Gerar Relatório Semanal", key="exportar_relatorio_semanal"):
-        df_semanal, total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados = reservas.calcular_totais_semanal()
-
-        colunas_ordenadas = [
-            'Nome do hóspede', 'Data de entrada', 'Data de saída', 
-            'Número do apartamento', 'Valor da hospedagem', 
-            'Nome do Condomínio', 'Bloco', 'Endereço'
-        ]
-        df_semanal = df_semanal[colunas_ordenadas]
-
-        resumo = pd.DataFrame({
-            'Descrição': ['Total Hospedagem', 'Total a Pagar', 'Total a Receber', 'Apartamentos Ocupados'],
-            'Valores': [total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados]
-        })
-
-        output = io.StringIO()
-        resumo.to_csv(output, index=False)
-        output.write("\n")
-        df_semanal.to_csv(output, index=False, float_format="%.2f")
-        csv_data = output.getvalue().encode('utf-8')
-
-        st.download_button(
-            label="Baixar Relatório Semanal como CSV",
-            data=csv_data,
-            file_name="relatorio_semanal_formatado.csv",
-            mime="text/csv"
-        )
+    formato = st.radio("Formato", ["csv", "xlsx"], horizontal=True, key="formato_exportacao")
+
+    # Exportar Relatório de Reservas (período e colunas à escolha; sem período, o histórico inteiro)
+    hoje = date.today()
+    inicio_semana = hoje - timedelta(days=hoje.weekday())
+    periodo = st.date_input("Período", (inicio_semana, inicio_semana + timedelta(days=6)), key="periodo_exportacao")
+    historico_completo = st.checkbox("Exportar o histórico completo", key="exportar_historico_completo")
+    colunas_ordenadas = [
+        'Nome do hóspede', 'Data de entrada', 'Data de saída', 
+        'Número do apartamento', 'Valor da hospedagem', 
+        'Nome do Condomínio', 'Bloco', 'Endereço'
+    ]
+    colunas = st.multiselect("Colunas", list(reservas.df_reservas.columns), default=colunas_ordenadas,
+                             key="colunas_exportacao")
+
+    if st.button("Gerar Relatório de Reservas", key="exportar_relatorio_semanal"):
+        if historico_completo:
+            inicio, fim = None, None
+        else:
+            inicio, fim = (periodo[0], periodo[-1]) if isinstance(periodo, (list, tuple)) else (periodo, periodo)
+        enviar_relatorio(reservas, "tarefa_relatorio_reservas", 'relatorio_reservas', formato,
+                         {'inicio': inicio, 'fim': fim, 'colunas': colunas}, ('reservas',),
+                         lambda progresso: reservas.exportar_reservas(formato, inicio, fim, colunas, progresso=progresso))
+    acompanhar_tarefa("tarefa_relatorio_reservas", "Baixar Relatório de Reservas", "relatorio_reservas_formatado")
 
     # Exportar Relatório de Parceiros
     if st.button("Gerar Relatório de Parceiros", key="exportar_relatorio_parceiros"):
-        df_parceiros, total_a_receber, total_a_pagar = reservas.gerar_relatorio_parceiros()
-
-        resumo_parceiros = pd.DataFrame({
-            'Descrição': ['Total a Receber', 'Total a Pagar'],
-            'Valores': [total_a_receber, total_a_pagar]
-        })
-
-        output_parceiros = io.StringIO()
-        resumo_parceiros.to_csv(output_parceiros, index=False)
-        output_parceiros.write("\n")
-        df_parceiros[['Parceiro', 'A receber', 'A pagar']].to_csv(output_parceiros, index=False, float_format="%.2f")
-        csv_data_parceiros = output_parceiros.getvalue().encode('utf-8')
-
-        st.download_button(
-            label="Baixar Relatório de Parceiros como CSV",
-            data=csv_data_parceiros,
-            file_name="relatorio_parceiros_formatado.csv",
-            mime="text/csv"
-        )
+        def gerar_parceiros(progresso):
+            df_parceiros, total_a_receber, total_a_pagar = reservas.gerar_relatorio_parceiros()
+            resumo = [('Total a Receber', total_a_receber), ('Total a Pagar', total_a_pagar)]
+            colunas_parceiros = ['Parceiro', 'A receber', 'A pagar']
+            return gerar_relatorio(formato, resumo, lotes_dataframe(df_parceiros, colunas=colunas_parceiros,
+                                                                    progresso=progresso), colunas_parceiros)
+        enviar_relatorio(reservas, "tarefa_relatorio_parceiros", 'relatorio_parceiros', formato, {},
+                         ('reservas', 'parceiros'), gerar_parceiros)
+    acompanhar_tarefa("tarefa_relatorio_parceiros", "Baixar Relatório de Parceiros", "relatorio_parceiros_formatado")
 
     # Exportar Relatório de Proprietários
     if st.button("Gerar Relatório de Proprietários", key="exportar_relatorio_proprietarios"):
-        total_a_pagar = reservas.df_proprietarios['A pagar'].sum() if 'A pagar' in reservas.df_proprietarios.columns else 0
-
-        resumo_proprietarios = pd.DataFrame({
-            'Descrição': ['Total a Pagar aos Proprietários'],
-            'Valores': [total_a_pagar]
-        })
-
-        output_proprietarios = io.StringIO()
-        resumo_proprietarios.to_csv(output_proprietarios, index=False)
-        output_proprietarios.write("\n")
-        df_proprietarios = reservas.df_proprietarios[['Nome Completo', 'Email', 'Telefone', 'Documento']]
-        if 'A pagar' in reservas.df_proprietarios.columns:
-            df_proprietarios['A pagar'] = reservas.df_proprietarios['A pagar']
-        
-        df_proprietarios.to_csv(output_proprietarios, index=False, float_format="%.2f")
-        csv_data_proprietarios = output_proprietarios.getvalue().encode('utf-8')
-
-        st.download_button(
-            label="Baixar Relatório de Proprietários como CSV",
-            data=csv_data_proprietarios,
-            file_name="relatorio_proprietarios_formatado.csv",
-            mime="text/csv"
-        )
-
+        def gerar_proprietarios(progresso):
+            df_proprietarios, total_a_pagar = reservas.relatorio_proprietarios()
+            resumo = [('Total a Pagar aos Proprietários', total_a_pagar)]
+            colunas_proprietarios = [c for c in ['Nome Completo', 'Email', 'Telefone', 'Documento', 'Repasse (%)', 'A pagar']
+                                     if c in df_proprietarios.columns]
+            return gerar_relatorio(formato, resumo, lotes_dataframe(df_proprietarios, colunas=colunas_proprietarios,
+                                                                    progresso=progresso), colunas_proprietarios)
+        enviar_relatorio(reservas, "tarefa_relatorio_proprietarios", 'relatorio_proprietarios', formato, {},
+                         ('reservas', 'proprietarios'), gerar_proprietarios)
+    acompanhar_tarefa("tarefa_relatorio_proprietarios", "Baixar Relatório de Proprietários",
+                      "relatorio_proprietarios_formatado")
+
+def enviar_relatorio(reservas, chave, tipo, formato, parametros, tabelas, gerar):
+    # O relatório é gerado em segundo plano; um pedido igual sobre os mesmos dados sai direto do cache em disco
+    _, extensao = FORMATOS_EXPORTACAO[formato]
+    tarefa = obter_fila().enviar(
+        tipo, {**parametros, 'formato': formato}, reservas.assinatura_dados(*tabelas), gerar, extensao,
+        versao_atual=lambda: reservas.assinatura_dados(*tabelas)
+    )
+    st.session_state[chave] = tarefa.id
+
+@fragmento("Relatório Semanal")
 def exibir_relatorio_semanal(reservas):
     st.subheader("Relatório Semanal")
-    df_semanal, total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados = reservas.calcular_totais_semanal()
+    df_semanal, total_hospedagem, total_a_pagar, total_a_receber_parceiros, apartamentos_ocupados = totais_semanais(reservas)
     
     st.write("**Valor total da hospedagem:**", total_hospedagem)
     st.write("**Total a pagar ao proprietário:**", total_a_pagar)
     st.write("**Total a receber dos parceiros:**", total_a_receber_parceiros)
     st.write("**Número de apartamentos ocupados na semana:**", apartamentos_ocupados)
 
-    grafico_df = pd.DataFrame({
-        'Descrição': ['Total Hospedagem', 'Total a Pagar', 'Total a Receber'],
-        'Valores': [total_hospedagem, total_a_pagar, total_a_receber_parceiros]
-    })
-    fig = px.bar(grafico_df, x='Descrição', y='Valores', title="Totais Semanais")
+    def montar_grafico():
+        grafico_df = pd.DataFrame({
+            'Descrição': ['Total Hospedagem', 'Total a Pagar', 'Total a Receber'],
+            'Valores': [total_hospedagem, total_a_pagar, total_a_receber_parceiros]
+        })
+        return importar('plotly.express').bar(grafico_df, x='Descrição', y='Valores', title="Totais Semanais")
+
+    fig = memoizar(("grafico_semanal", date.today()), reservas.versoes['reservas'], montar_grafico)
     st.plotly_chart(fig)
 
+@fragmento("Relatório de Parceiros")
 def exibir_relatorio_parceiros(reservas):
     st.subheader("Relatório de Parceiros")
-    df_parceiros, total_a_receber, total_a_pagar = reservas.gerar_relatorio_parceiros()
+    # Os saldos dependem dos parceiros e das reservas ligadas a eles
+    versao = (reservas.versoes['parceiros'], reservas.versoes['reservas'])
+    df_parceiros, total_a_receber, total_a_pagar = memoizar("relatorio_parceiros", versao, reservas.gerar_relatorio_parceiros)
 
     st.write("**Total a receber dos parceiros:**", total_a_receber)
     st.write("**Total a pagar aos parceiros:**", total_a_pagar)
     st.write("**Resumo por Parceiro:**")
     st.dataframe(df_parceiros)
 
-    fig = px.bar(df_parceiros, x='Parceiro', y=['A receber', 'A pagar'], title="Valores a Receber e Pagar por Parceiro")
+    fig = memoizar("grafico_parceiros", versao, lambda: importar('plotly.express').bar(
+        df_parceiros, x='Parceiro', y=['A receber', 'A pagar'], title="Valores a Receber e Pagar por Parceiro"
+    ))
     st.plotly_chart(fig)
 
+@fragmento("Detalhes das Reservas Semanais")
 def exibir_detalhamento_reservas(reservas):
     st.subheader("Detalhes das Reservas Semanais")
-    df_semanal, *_ = reservas.calcular_totais_semanal()
+    df_semanal, *_ = totais_semanais(reservas)
     st.dataframe(df_semanal[['Nome do hóspede', 'Data de entrada', 'Data de saída', 
                              'Número do apartamento', 'Valor da hospedagem',
                              'Nome do Condomínio', 'Bloco', 'Endereço']])
 
 def exibir_filtros(reservas):
+    # Fragmentos não podem escrever na barra lateral: os filtros ficam fora e o resultado é um fragmento próprio
     st.sidebar.header("Filtros de Reservas")
     nome_hospede = st.sidebar.text_input("Nome do Hóspede", key="filtro_nome_hospede")
     numero_apartamento = st.sidebar.number_input("Número do Apartamento", min_value=0, step=1, key="filtro_numero_apartamento")
     data_inicial = st.sidebar.date_input("Data de Entrada (inicial)", date.today() - timedelta(days=30), key="filtro_data_inicial")
     data_final = st.sidebar.date_input("Data de Entrada (final)", date.today(), key="filtro_data_final")
-
-    df_filtrado = reservas.df_reservas.copy()
-    if nome_hospede:
-        df_filtrado = df_filtrado[df_filtrado['Nome do hóspede'].str.contains(nome_hospede, case=False)]
-    if numero_apartamento > 0:
-        df_filtrado = df_filtrado[df_filtrado['Número do apartamento'] == numero_apartamento]
-    df_filtrado = df_filtrado[(df_filtrado['Data de entrada'] >= pd.Timestamp(data_inicial)) & 
-                              (df_filtrado['Data de entrada'] <= pd.Timestamp(data_final))]
+    termo = st.sidebar.text_input("Hóspede, e-mail, telefone ou documento", key="filtro_termo")
+    exibir_reservas_filtradas(reservas, nome_hospede, numero_apartamento, data_inicial, data_final, termo)
+
+@fragmento("Reservas Filtradas")
+def exibir_reservas_filtradas(reservas, nome_hospede, numero_apartamento, data_inicial, data_final, termo):
+    # Os filtros são respondidos pelos índices do gerenciador, sem copiar nem varrer a tabela inteira
+    df_filtrado = reservas.filtrar_reservas(
+        nome=nome_hospede or None,
+        numero_apartamento=numero_apartamento if numero_apartamento > 0 else None,
+        entrada_de=pd.Timestamp(data_inicial),
+        entrada_ate=pd.Timestamp(data_final),
+        termo=termo or None,
+    )
 
     st.subheader("Reservas Filtradas")
     st.dataframe(df_filtrado[['Nome do hóspede', 'Data de entrada', 'Data de saída', 
                               'Número do apartamento', 'Valor da hospedagem',
                               'Nome do Condomínio', 'Bloco', 'Endereço']])
 
+@fragmento("Editar Reservas")
 def editar_reservas(reservas):
     st.subheader("Editar Reservas")
-    id_reserva = st.selectbox("Selecione a Reserva para Editar", reservas.df_reservas.index, key="select_reserva_editar")
+    id_reserva = selecionar_registro(reservas, 'reservas', "a Reserva", "select_reserva_editar")
+    if id_reserva is None:
+        return
     reserva_selecionada = reservas.df_reservas.loc[id_reserva]
 
-    nome = st.text_input("Nome do Hóspede", reserva_selecionada['Nome do hóspede'], key="editar_nome_hospede")
+    nome = st.text_input("Nome do Hóspede", valor_texto(reserva_selecionada['Nome do hóspede']), key="editar_nome_hospede")
     data_entrada = st.date_input("Data de Entrada", reserva_selecionada['Data de entrada'], key="editar_data_entrada")
     data_saida = st.date_input("Data de Saída", reserva_selecionada['Data de saída'], key="editar_data_saida")
     numero_apartamento = st.number_input("Número do Apartamento", value=int(reserva_selecionada['Número do apartamento']), key="editar_numero_apartamento")
     valor_hospedagem = st.number_input("Valor da Hospedagem", value=float(reserva_selecionada['Valor da hospedagem']), key="editar_valor_hospedagem")
-    condominio = st.text_input("Nome do Condomínio", reserva_selecionada.get('Nome do Condomínio', ''), key="editar_condominio")
-    bloco = st.text_input("Bloco", reserva_selecionada.get('Bloco', ''), key="editar_bloco")
-    endereco = st.text_input("Endereço", reserva_selecionada.get('Endereço', ''), key="editar_endereco")
+    condominio = st.text_input("Nome do Condomínio", valor_texto(reserva_selecionada.get('Nome do Condomínio', '')), key="editar_condominio")
+    bloco = st.text_input("Bloco", valor_texto(reserva_selecionada.get('Bloco', '')), key="editar_bloco")
+    endereco = st.text_input("Endereço", valor_texto(reserva_selecionada.get('Endereço', '')), key="editar_endereco")
+    pago = st.number_input("Pago", value=float(reserva_selecionada.get('Pago', 0)), key="editar_pago")
+    a_pagar = st.number_input("A Pagar", value=float(reserva_selecionada.get('A pagar', 0)), key="editar_a_pagar")
+    status_lista = ["Paga", "A Pagar"]
+    status_atual = reserva_selecionada.get("Status", "Paga")
+    status = st.selectbox("Status do Pagamento", status_lista,
+                          index=status_lista.index(status_atual) if status_atual in status_lista else 0,
+                          key="editar_status_pagamento")
 
     if st.button("Salvar Alterações", key="salvar_alteracoes_reserva"):
-        reservas.atualizar_reserva(id_reserva, nome, data_entrada, data_saida, numero_apartamento, valor_hospedagem, condominio, bloco, endereco)
-        st.success("Reserva atualizada com sucesso!")
-
+        try:
+            reservas.atualizar_reserva(id_reserva, nome, data_entrada, data_saida, numero_apartamento, valor_hospedagem,
+                                       condominio, bloco, endereco, status, pago, a_pagar)
+            concluir_alteracao("Reserva atualizada com sucesso!")
+        except ConflitoReservaError as e:
+            st.error(str(e))
+
+@fragmento("Editar Parceiros")
 def editar_parceiros(reservas):
     st.subheader("Editar Parceiros")
-    id_parceiro = st.selectbox("Selecione o Parceiro para Editar", reservas.df_parceiros.index, key="select_parceiro_editar")
+    id_parceiro = selecionar_registro(reservas, 'parceiros', "o Parceiro", "select_parceiro_editar")
+    if id_parceiro is None:
+        return
     parceiro_selecionado = reservas.df_parceiros.loc[id_parceiro]
+    base = registro_em_edicao(reservas, 'parceiros', id_parceiro, "select_parceiro_editar")
 
-    parceiro = st.text_input("Nome do Parceiro", parceiro_selecionado['Parceiro'], key="editar_nome_parceiro")
+    parceiro = st.text_input("Nome do Parceiro", valor_texto(parceiro_selecionado['Parceiro']), key="editar_nome_parceiro")
     a_receber = st.number_input("A Receber", value=float(parceiro_selecionado['A receber']), key="editar_a_receber")
     a_pagar = st.number_input("A Pagar", value=float(parceiro_selecionado['A pagar']), key="editar_a_pagar")
+    comissao_atual = parceiro_selecionado.get('Comissão (%)')
+    comissao = st.number_input("Comissão (%)", min_value=0.0, max_value=100.0, step=0.5,
+                               value=float(comissao_atual) if pd.notna(comissao_atual) else 0.0, key="editar_comissao")
 
     if st.button("Salvar Alterações no Parceiro", key="salvar_alteracoes_parceiro"):
-        reservas.atualizar_parceiro(id_parceiro, parceiro, a_receber, a_pagar)
-        st.success("Parceiro atualizado com sucesso!")
-
+        try:
+            reservas.atualizar_parceiro(id_parceiro, parceiro, a_receber, a_pagar, comissao,
+                                        versao_esperada=base.get('Versão'), base=base)
+        except ConflitoVersaoError as e:
+            encerrar_edicao("select_parceiro_editar")
+            st.error(str(e))
+            return
+        encerrar_edicao("select_parceiro_editar")
+        concluir_alteracao("Parceiro atualizado com sucesso!")
+
+@fragmento("Editar Proprietários")
 def editar_proprietarios(reservas):
     st.subheader("Editar Proprietários")
-    id_proprietario = st.selectbox("Selecione o Proprietário para Editar", reservas.df_proprietarios.index, key="select_proprietario_editar")
+    id_proprietario = selecionar_registro(reservas, 'proprietarios', "o Proprietário", "select_proprietario_editar")
+    if id_proprietario is None:
+        return
     proprietario_selecionado = reservas.df_proprietarios.loc[id_proprietario]
+    base = registro_em_edicao(reservas, 'proprietarios', id_proprietario, "select_proprietario_editar")
 
-    nome = st.text_input("Nome Completo", proprietario_selecionado['Nome Completo'], key="editar_nome_proprietario")
-    email = st.text_input("Email", proprietario_selecionado['Email'], key="editar_email_proprietario")
-    telefone = st.text_input("Telefone", proprietario_selecionado['Telefone'], key="editar_telefone_proprietario")
-    documento = st.text_input("Documento", proprietario_selecionado['Documento'], key="editar_documento_proprietario")
+    nome = st.text_input("Nome Completo", valor_texto(proprietario_selecionado['Nome Completo']), key="editar_nome_proprietario")
+    email = st.text_input("Email", valor_texto(proprietario_selecionado['Email']), key="editar_email_proprietario")
+    telefone = st.text_input("Telefone", valor_texto(proprietario_selecionado['Telefone']), key="editar_telefone_proprietario")
+    documento = st.text_input("Documento", valor_texto(proprietario_selecionado['Documento']), key="editar_documento_proprietario")
+    repasse_atual = proprietario_selecionado.get('Repasse (%)')
+    repasse = st.number_input("Repasse (%)", min_value=0.0, max_value=100.0, step=0.5,
+                              value=float(repasse_atual) if pd.notna(repasse_atual) else 0.0, key="editar_repasse")
 
     if st.button("Salvar Alterações no Proprietário", key="salvar_alteracoes_proprietario"):
-        reservas.atualizar_proprietario(id_proprietario, nome, email, telefone, documento)
-        st.success("Proprietário atualizado com sucesso!")
+        try:
+            reservas.atualizar_proprietario(id_proprietario, nome, email, telefone, documento, repasse,
+                                            versao_esperada=base.get('Versão'), base=base)
+        except ConflitoVersaoError as e:
+            encerrar_edicao("select_proprietario_editar")
+            st.error(str(e))
+            return
+        encerrar_edicao("select_proprietario_editar")
+        concluir_alteracao("Proprietário atualizado com sucesso!")
 
 # Funções de Adicionar com Expansores
+@fragmento("Adicionar Novo Parceiro")
 def adicionar_novo_parceiro(reservas):
     with st.expander("Adicionar Novo Parceiro"):
         parceiro = st.text_input("Nome do Parceiro", key="novo_nome_parceiro")
         a_receber = st.number_input("A Receber", min_value=0.0, step=0.01, key="novo_a_receber_parceiro")
         a_pagar = st.number_input("A Pagar", min_value=0.0, step=0.01, key="novo_a_pagar_parceiro")
+        comissao = st.number_input("Comissão (%)", min_value=0.0, max_value=100.0, step=0.5, key="novo_comissao_parceiro")
 
         if st.button("Adicionar Parceiro", key="botao_adicionar_parceiro"):
-            reservas.adicionar_parceiro(parceiro, a_receber, a_pagar)
-            st.success("Novo parceiro adicionado com sucesso!")
-            reservas.df_parceiros = reservas.load_data(reservas.parceiros_path)
+            reservas.adicionar_parceiro(parceiro, a_receber, a_pagar, comissao)
+            concluir_alteracao("Novo parceiro adicionado com sucesso!")
 
+@fragmento("Adicionar Novo Proprietário")
 def adicionar_novo_proprietario(reservas):
     with st.expander("Adicionar Novo Proprietário"):
         nome = st.text_input("Nome Completo", key="novo_nome_proprietario")
         email = st.text_input("Email", key="novo_email_proprietario")
         telefone = st.text_input("Telefone", key="novo_telefone_proprietario")
         documento = st.text_input("Documento", key="novo_documento_proprietario")
+        repasse = st.number_input("Repasse (%)", min_value=0.0, max_value=100.0, step=0.5, key="novo_repasse_proprietario")
 
         if st.button("Adicionar Proprietário", key="botao_adicionar_proprietario"):
-            reservas.adicionar_proprietario(nome, email, telefone, documento)
-            st.success("Novo proprietário adicionado com sucesso!")
-            reservas.df_proprietarios = reservas.load_data(reservas.proprietarios_path)
+            reservas.adicionar_proprietario(nome, email, telefone, documento, repasse)
+            concluir_alteracao("Novo proprietário adicionado com sucesso!")
 
+@fragmento("Adicionar Nova Reserva")
 def adicionar_nova_reserva(reservas):
     with st.expander("Adicionar Nova Reserva"):
         nome = st.text_input("Nome do Hóspede", key="nome_hospede")
@@ -260,11 +364,18 @@ def adicionar_nova_reserva(reservas):
         condominio = st.text_input("Nome do Condomínio", key="condominio")
         bloco = st.text_input("Bloco", key="bloco")
         endereco = st.text_input("Endereço", key="endereco")
+        status = st.selectbox("Status do Pagamento", ["Paga", "A Pagar"], key="status_pagamento")
+        pago = st.number_input("Pago", min_value=0.0, step=0.01, key="pago")
+        a_pagar = st.number_input("A Pagar", min_value=0.0, step=0.01, key="a_pagar")
 
         if st.button("Adicionar Reserva", key="botao_adicionar_reserva"):
-            reservas.adicionar_reserva(nome, data_entrada, data_saida, numero_apartamento, valor_hospedagem, condominio, bloco, endereco)
-            st.success("Nova reserva adicionada com sucesso!")
-            reservas.df_reservas = reservas.load_data(reservas.reservas_path)
+            try:
+                reservas.adicionar_reserva(nome, data_entrada, data_saida, numero_apartamento, valor_hospedagem, condominio,
+                                           bloco, endereco, status, pago=pago, a_pagar=a_pagar)
+                concluir_alteracao("Nova reserva adicionada com sucesso!")
+            except ConflitoReservaError as e:
+                st.error(str(e))
 
 if __name__ == "__main__":
-    dashboard()
+    with renderizacao("Painel", inicio_execucao):
+        dashboard()
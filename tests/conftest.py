@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do sistema ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gerador_dados  # noqa: E402
+from armazenamento import ArmazenamentoExcel  # noqa: E402
+from gerenciamento_reservas import GerenciamentoReservas  # noqa: E402
+
+
+@pytest.fixture
+def planilhas(tmp_path):
+    """Caminhos (reservas, parceiros, proprietários) de planilhas fictícias pequenas."""
+    return gerador_dados.gerar_planilhas(str(tmp_path / 'dados'), 200, semente=7)
+
+
+@pytest.fixture
+def gerenciador(planilhas):
+    """Gerenciador sobre as planilhas fictícias, sem log de eventos em disco."""
+    return GerenciamentoReservas(*planilhas, eventos=False)
+
+
+def armazenamento_excel(planilhas):
+    return ArmazenamentoExcel(dict(zip(('reservas', 'parceiros', 'proprietarios'), planilhas)))
@@ -0,0 +1,81 @@
+import pandas as pd
+
+from acerto import COLUNA_COMISSAO, COLUNA_REPASSE, PARTES, LivroAcertos, regras
+
+
+def _centavos(valor):
+    return 0 if pd.isna(valor) else int(round(float(valor) * 100))
+
+
+def _varredura(gerenciador, mes=None):
+    """{(tipo, id): (a pagar, a receber)} lançando reserva por reserva as regras do livro."""
+    taxas = {'parceiro': regras(gerenciador.df_parceiros, COLUNA_COMISSAO),
+             'proprietario': regras(gerenciador.df_proprietarios, COLUNA_REPASSE)}
+    saldos = {}
+    for _, reserva in gerenciador.df_reservas.iterrows():
+        if mes is not None and pd.Timestamp(reserva['Data de saída']).strftime('%Y-%m') != mes:
+            continue
+        for tipo, coluna_id, coluna_valor, _ in PARTES:
+            if pd.isna(reserva.get(coluna_id)):
+                continue
+            parte = int(reserva[coluna_id])
+            a_pagar = reserva.get(coluna_valor)
+            if pd.isna(a_pagar):
+                a_pagar = reserva['Valor da hospedagem'] * taxas[tipo].get(parte, 0) / 100
+            a_receber = reserva['A receber de parceiros'] if tipo == 'parceiro' else 0
+            saldo = saldos.setdefault((tipo, parte), [0, 0])
+            saldo[0] += _centavos(a_pagar)
+            saldo[1] += _centavos(a_receber)
+    return {chave: (pagar / 100, receber / 100) for chave, (pagar, receber) in saldos.items() if pagar or receber}
+
+
+def _saldos(tabela):
+    return {(tipo, parte): (pagar, receber)
+            for tipo, parte, pagar, receber in tabela[['Tipo', 'ID', 'A pagar', 'A receber']].itertuples(index=False)}
+
+
+def _conferir(gerenciador, *meses):
+    assert _saldos(gerenciador.saldos_acerto()) == _varredura(gerenciador)
+    for mes in meses:
+        assert _saldos(gerenciador.fechar_mes(mes)) == _varredura(gerenciador, mes)
+
+
+def _reservar(gerenciador, nome, entrada, saida, valor, **kwargs):
+    gerenciador.adicionar_reserva(nome, entrada, saida, 950, valor, 'Condomínio Teste', 'A', 'Rua 1', 'Paga', **kwargs)
+    return gerenciador.df_reservas.index[-1]
+
+
+def test_saldos_depois_de_incluir_alterar_e_remover(gerenciador):
+    gerenciador.adicionar_parceiro('Agência', 0.0, 0.0, comissao=10.0)
+    agencia = gerenciador.df_parceiros.index[-1]
+    gerenciador.adicionar_proprietario('Dona', 'dona@exemplo.com', '0000-0000', '000', repasse=70.0)
+    dona = gerenciador.df_proprietarios.index[-1]
+    meses = ('2042-03', '2042-04')
+
+    primeira = _reservar(gerenciador, 'Primeira', '2042-03-01', '2042-03-05', 1000.0, id_parceiro=agencia,
+                         id_proprietario=dona)
+    # Sai em abril: entra no acerto de abril
+    virada = _reservar(gerenciador, 'Virada', '2042-03-29', '2042-04-02', 500.0, id_proprietario=dona)
+    _reservar(gerenciador, 'Terceira', '2042-04-10', '2042-04-12', 200.0, id_parceiro=agencia)
+    _conferir(gerenciador, *meses)
+    assert gerenciador._obter_livro_acertos().total('proprietario', dona) == (1050.0, 0.0)
+
+    # Edição de valor, de parte e de mês
+    gerenciador.atualizar_reserva(virada, 'Virada', '2042-03-25', '2042-03-28', 950, 800.0, 'Condomínio Teste', 'A',
+                                  'Rua 1', 'Paga', 0.0, 0.0, id_parceiro=agencia)
+    gerenciador.atualizar_reservas([primeira], {'Valor para o proprietário': 650.0, 'A receber de parceiros': 30.0})
+    _conferir(gerenciador, *meses)
+    # Mudança de regra: os lançamentos por percentual são refeitos
+    gerenciador.atualizar_parceiro(agencia, 'Agência', 0.0, 0.0, comissao=20.0)
+    _conferir(gerenciador, *meses)
+    assert gerenciador._obter_livro_acertos().total('parceiro', agencia) == (400.0, 30.0)
+
+    # Remover uma reserva deixa o livro igual ao montado sem ela
+    livro = gerenciador._obter_livro_acertos()
+    livro.remover(primeira)
+    sem_ela = LivroAcertos.construir(gerenciador.df_reservas.drop(index=primeira),
+                                     regras(gerenciador.df_parceiros, COLUNA_COMISSAO),
+                                     regras(gerenciador.df_proprietarios, COLUNA_REPASSE))
+    pd.testing.assert_frame_equal(livro.saldos(), sem_ela.saldos())
+    for mes in meses:
+        pd.testing.assert_frame_equal(livro.fechamento(mes), sem_ela.fechamento(mes))
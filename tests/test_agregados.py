@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from agregados import COLUNAS_VALORES, AgregadoDiario
+from disponibilidade import chaves_apartamentos
+
+
+def _dias(serie):
+    return serie.dt.normalize()
+
+
+def _varredura(df, inicio, fim):
+    """Totais das reservas que tocam [inicio, fim], somando linha a linha."""
+    a, b = pd.Timestamp(inicio), pd.Timestamp(fim)
+    periodo = df[(_dias(df['Data de entrada']) <= b) & (_dias(df['Data de saída']) >= a)]
+    totais = {'Reservas': len(periodo),
+              'Apartamentos ocupados': len(set(chaves_apartamentos(periodo)['numero']) - {''})}
+    for coluna in COLUNAS_VALORES:
+        totais[coluna] = periodo[coluna].fillna(0).mul(100).round().sum() / 100 if coluna in df.columns else 0.0
+    return totais
+
+
+def _diarias(df, data):
+    """Diárias ocupadas e receita rateada na noite de `data` (quem entrou até ela e sai depois)."""
+    entrada, saida = _dias(df['Data de entrada']), _dias(df['Data de saída'])
+    hospedados = df[(entrada <= data) & (saida > data)]
+    noites = (_dias(hospedados['Data de saída']) - _dias(hospedados['Data de entrada'])).dt.days
+    return len(hospedados), (hospedados['Valor da hospedagem'].fillna(0) / noites).sum()
+
+
+def _periodos(rng, quantidade):
+    inicios = pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 6 * 365, quantidade), unit='D')
+    return [(inicio, inicio + pd.Timedelta(days=int(dias))) for inicio, dias in zip(inicios, rng.integers(0, 90, quantidade))]
+
+
+def test_totais_por_somas_de_prefixo_iguais_a_varredura(gerenciador):
+    df = gerenciador.df_reservas
+    agregado = AgregadoDiario.construir(df)
+    for inicio, fim in _periodos(np.random.default_rng(6), 30):
+        esperado = _varredura(df, inicio, fim)
+        assert agregado.totais(inicio, fim) == esperado
+        assert gerenciador.totais_periodo(inicio, fim) == (
+            esperado['Valor da hospedagem'], esperado['A pagar'], esperado['Pago'], esperado['Apartamentos ocupados'])
+
+
+def test_serie_diaria_e_relatorio_iguais_a_varredura(gerenciador):
+    df = gerenciador.df_reservas
+    agregado = AgregadoDiario.construir(df)
+    serie = agregado.serie_diaria('2024-01-01', '2024-03-31')
+    for data, linha in serie.iloc[::7].iterrows():
+        diarias, receita = _diarias(df, data)
+        assert linha['Diárias ocupadas'] == diarias
+        assert linha['Receita rateada'] == round(receita, 2)
+
+    relatorio = agregado.relatorio_periodico('2024-01-01', '2024-03-31')
+    assert relatorio['Período'].tolist() == ['2024-01', '2024-02', '2024-03']
+    for _, linha in relatorio.iterrows():
+        assert linha['Diárias ocupadas'] == serie.loc[linha['Início']:linha['Fim'], 'Diárias ocupadas'].sum()
+        esperado = _varredura(df, linha['Início'], linha['Fim'])
+        assert linha['Reservas'] == esperado['Reservas']
+        assert linha['Valor da hospedagem'] == esperado['Valor da hospedagem']
+
+
+def test_alteracoes_incrementais_iguais_a_reconstruir(gerenciador):
+    df = gerenciador.df_reservas.copy()
+    agregado = AgregadoDiario.construir(df)
+    rng = np.random.default_rng(8)
+    removidos = rng.choice(df.index, 20, replace=False).tolist()
+    alterados = rng.choice(df.index.difference(removidos), 20, replace=False).tolist()
+    for id_ in removidos:
+        agregado.remover(id_)
+    df = df.drop(index=removidos)
+    # Datas fora do eixo atual obrigam o agregado a crescer para os dois lados
+    df.loc[alterados[:10], 'Data de entrada'] = pd.Timestamp('2010-05-01')
+    df.loc[alterados[:10], 'Data de saída'] = pd.Timestamp('2010-05-04')
+    df.loc[alterados[10:], 'Data de entrada'] = pd.Timestamp('2040-05-01')
+    df.loc[alterados[10:], 'Data de saída'] = pd.Timestamp('2040-05-09')
+    df.loc[alterados, 'Valor da hospedagem'] = 321.45
+    for id_ in alterados:
+        agregado.adicionar(id_, df.loc[id_])
+
+    reconstruido = AgregadoDiario.construir(df)
+    for inicio, fim in _periodos(rng, 20) + [('2010-01-01', '2010-12-31'), ('2040-05-03', '2040-05-03')]:
+        assert agregado.totais(inicio, fim) == reconstruido.totais(inicio, fim) == _varredura(df, inicio, fim)
+    pd.testing.assert_frame_equal(agregado.por_apartamento('2040-04-01', '2040-05-31'),
+                                  reconstruido.por_apartamento('2040-04-01', '2040-05-31'))
@@ -0,0 +1,94 @@
+import gzip
+
+import pytest
+
+from api import ApiReservas, ClienteLocal
+
+
+@pytest.fixture
+def cliente(planilhas, gerenciador):
+    return ClienteLocal(ApiReservas(planilhas, gerenciador=gerenciador))
+
+
+def test_filtros_de_reservas(cliente, gerenciador):
+    resposta = cliente.get('/reservas?entrada_de=2024-01-01&entrada_ate=2024-06-30&por_pagina=1000')
+    assert resposta.status == 200
+    # A data final vale pelo dia inteiro (as entradas são às 14h)
+    datas = gerenciador.df_reservas['Data de entrada'].dt.normalize()
+    esperados = gerenciador.df_reservas.index[(datas >= '2024-01-01') & (datas <= '2024-06-30')].tolist()
+    assert esperados
+    assert [item['ID'] for item in resposta.json()['itens']] == esperados
+
+    numero = int(gerenciador.df_reservas['Número do apartamento'].iloc[0])
+    itens = cliente.get(f'/reservas?apartamento={numero}&por_pagina=1000').json()['itens']
+    assert itens and {item['Número do apartamento'] for item in itens} == {numero}
+
+
+@pytest.mark.parametrize('alvo', [
+    '/parceiros?nome=Ana', '/proprietarios?apartamento=12', '/reservas?entrada_de=ontem', '/reservas?apartamento=x',
+])
+def test_filtros_invalidos_dao_400(cliente, alvo):
+    resposta = cliente.get(alvo)
+    assert resposta.status == 400
+    assert resposta.json()['erro']
+
+
+def test_paginacao_e_ordenacao(cliente, gerenciador):
+    df = gerenciador.df_reservas
+    pagina = cliente.get('/reservas?pagina=2&por_pagina=30').json()
+    assert (pagina['pagina'], pagina['por_pagina'], pagina['total'], pagina['paginas']) == (2, 30, len(df), 7)
+    assert [item['ID'] for item in pagina['itens']] == df.index[30:60].tolist()
+    assert len(cliente.get('/reservas?pagina=7&por_pagina=30').json()['itens']) == len(df) - 180
+    assert cliente.get('/reservas?pagina=8&por_pagina=30').json()['itens'] == []
+
+    ordenada = cliente.get('/reservas?ordenar=Valor da hospedagem&desc=1&por_pagina=5').json()['itens']
+    esperados = df['Valor da hospedagem'].sort_values(ascending=False, kind='stable').index[:5]
+    assert [item['Valor da hospedagem'] for item in ordenada] == df.loc[esperados, 'Valor da hospedagem'].tolist()
+    parceiro = int(gerenciador.df_parceiros.index[3])
+    assert cliente.get(f'/parceiros/{parceiro}').json()['ID'] == parceiro
+
+
+def test_etag_responde_304_ate_os_dados_mudarem(cliente, gerenciador):
+    primeira = cliente.get('/reservas?por_pagina=10')
+    etag = primeira.cabecalhos['etag']
+    repetida = cliente.get('/reservas?por_pagina=10', {'If-None-Match': etag})
+    assert repetida.status == 304 and repetida.corpo == b''
+    # Outra consulta tem outro ETag; outra tabela não muda o das reservas
+    assert cliente.get('/reservas?por_pagina=11').cabecalhos['etag'] != etag
+    gerenciador.atualizar_parceiros([gerenciador.df_parceiros.index[0]], {'A pagar': 1.0})
+    assert cliente.get('/reservas?por_pagina=10', {'If-None-Match': etag}).status == 304
+
+    gerenciador.atualizar_reservas([gerenciador.df_reservas.index[0]], {'Pago': 1.0})
+    nova = cliente.get('/reservas?por_pagina=10', {'If-None-Match': etag})
+    assert nova.status == 200 and nova.cabecalhos['etag'] != etag
+    assert nova.json()['itens'][0]['Pago'] == 1.0
+
+
+def test_gzip_so_quando_aceito_e_compensa(cliente):
+    simples = cliente.get('/reservas?por_pagina=50')
+    comprimida = cliente.get('/reservas?por_pagina=50', {'Accept-Encoding': 'br, gzip;q=0.8'})
+    assert 'content-encoding' not in simples.cabecalhos
+    assert comprimida.cabecalhos['content-encoding'] == 'gzip'
+    assert comprimida.cabecalhos['vary'] == 'Accept-Encoding'
+    assert len(comprimida.corpo) < len(simples.corpo)
+    assert gzip.decompress(comprimida.corpo) == simples.corpo
+    assert comprimida.json() == simples.json()
+    # Corpo pequeno vai sem compressão
+    assert 'content-encoding' not in cliente.get('/saude', {'Accept-Encoding': 'gzip'}).cabecalhos
+
+
+@pytest.mark.parametrize('alvo, status', [
+    ('/reservas?pagina=0', 400),
+    ('/reservas?por_pagina=5000', 400),
+    ('/reservas?por_pagina=dez', 400),
+    ('/disponibilidade?fim=2024-01-10', 400),
+    ('/disponibilidade?inicio=2024-01-10&fim=2024-01-10', 400),
+    ('/totais?inicio=2024-02-01&fim=2024-01-01', 400),
+    ('/reservas/999999', 404),
+    ('/reservas/abc', 404),
+    ('/inexistente', 404),
+])
+def test_erros(cliente, alvo, status):
+    resposta = cliente.get(alvo)
+    assert resposta.status == status
+    assert resposta.json()['erro']
@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from armazenamento import (ArmazenamentoExcel, ArmazenamentoParticionado, ArmazenamentoSQLite,
+                           importar_excel_para_sqlite, particionar_reservas)
+from conftest import armazenamento_excel
+from esquema import aplicar_esquema
+from gerenciamento_reservas import TABELAS, GerenciamentoReservas
+
+
+def _excel(pasta, formato_snapshot):
+    return ArmazenamentoExcel({t: str(pasta / f'{t}.xlsx') for t in TABELAS}, formato_snapshot=formato_snapshot)
+
+
+@pytest.mark.parametrize('criar', [
+    lambda pasta: _excel(pasta, None),
+    lambda pasta: _excel(pasta, 'arrow'),
+    lambda pasta: ArmazenamentoSQLite(str(pasta / 'reservas.db')),
+], ids=['excel', 'excel-arrow', 'sqlite'])
+@pytest.mark.parametrize('tabela', TABELAS)
+def test_ida_e_volta_preserva_a_tabela(tmp_path, planilhas, criar, tabela):
+    original = aplicar_esquema(armazenamento_excel(planilhas).carregar(tabela), tabela)
+    destino = criar(tmp_path)
+    try:
+        destino.salvar(tabela, original)
+        # Duas leituras: no Excel com snapshot a segunda vem do arquivo colunar
+        for _ in range(2):
+            relido = aplicar_esquema(destino.carregar(tabela), tabela)
+            pd.testing.assert_frame_equal(relido, original, check_dtype=False, check_index_type=False,
+                                          check_categorical=False)
+    finally:
+        if isinstance(destino, ArmazenamentoSQLite):
+            destino.fechar()
+
+
+def test_sqlite_preserva_datas_com_e_sem_fracao_de_segundo(tmp_path):
+    df = pd.DataFrame({
+        'Data de entrada': pd.to_datetime(['2024-01-01 00:00:00', '2024-01-02 13:29:20.008', '2024-01-03 14:00:00'], format='ISO8601'),
+        'Nome do hóspede': ['A', 'B', 'C'],
+    })
+    banco = ArmazenamentoSQLite(str(tmp_path / 'reservas.db'))
+    try:
+        banco.salvar('reservas', df)
+        relido = banco.carregar('reservas')
+    finally:
+        banco.fechar()
+    pd.testing.assert_series_equal(relido['Data de entrada'], df['Data de entrada'], check_dtype=False)
+
+
+def test_sqlite_inclusao_e_alteracao_nao_perdem_datas(tmp_path, planilhas):
+    caminho = str(tmp_path / 'reservas.db')
+    importar_excel_para_sqlite(caminho, *planilhas)
+    gerenciador = GerenciamentoReservas(*planilhas, armazenamento=ArmazenamentoSQLite(caminho), eventos=False)
+    gerenciador.adicionar_reserva('Novo', pd.Timestamp('2031-01-01 14:00:00.250'), '2031-01-05', 901, 500.0,
+                                  'Condomínio X', 'A', 'Rua 1', 'Paga')
+    novo = gerenciador.df_reservas.index[-1]
+    primeiro = gerenciador.df_reservas.index[0]
+    gerenciador.atualizar_reservas([primeiro], {'Pago': 1.0})
+
+    relido = GerenciamentoReservas(*planilhas, armazenamento=ArmazenamentoSQLite(caminho), eventos=False)
+    for coluna in ('Data de entrada', 'Data de saída'):
+        assert relido.df_reservas[coluna].notna().all()
+        pd.testing.assert_series_equal(relido.df_reservas[coluna], gerenciador.df_reservas[coluna],
+                                       check_dtype=False, check_index_type=False)
+    assert relido.df_reservas.at[novo, 'Data de entrada'] == pd.Timestamp('2031-01-01 14:00:00.250')
+
+
+def _particionado(pasta, planilhas, **kwargs):
+    return ArmazenamentoParticionado(str(pasta), dict(zip(TABELAS, planilhas)), por_ano=True, **kwargs)
+
+
+def test_particoes_por_condominio_e_ano_ida_e_volta(tmp_path, planilhas):
+    pasta = tmp_path / 'particoes'
+    particionar_reservas(planilhas[0], str(pasta), por_ano=True)
+    original = aplicar_esquema(armazenamento_excel(planilhas).carregar('reservas'), 'reservas')
+    manifesto = _particionado(pasta, planilhas)._ler_manifesto()
+    assert len({info['condominio'] for info in manifesto.values()}) > 1
+    assert len({info['ano'] for info in manifesto.values()}) > 1
+    assert sum(info['linhas'] for info in manifesto.values()) == len(original)
+
+    gerenciador = GerenciamentoReservas(*planilhas, armazenamento=_particionado(pasta, planilhas), eventos=False)
+    pd.testing.assert_frame_equal(gerenciador.df_reservas.drop(columns='Versão'), original, check_dtype=False,
+                                  check_index_type=False, check_categorical=False)
+
+    # Uma reserva nova em condomínio novo e uma que muda de condomínio e de ano (sai da partição de origem)
+    gerenciador.adicionar_reserva('Nova', '2031-02-01', '2031-02-03', 901, 300.0, 'Condomínio Novo', 'A', 'Rua 1',
+                                  'Paga')
+    nova = gerenciador.df_reservas.index[-1]
+    movida = gerenciador.df_reservas.index[0]
+    gerenciador.atualizar_reservas([movida], {'Nome do Condomínio': 'Condomínio Novo',
+                                              'Data de entrada': pd.Timestamp('2032-06-01'),
+                                              'Data de saída': pd.Timestamp('2032-06-04')})
+    relido = GerenciamentoReservas(*planilhas, armazenamento=_particionado(pasta, planilhas), eventos=False)
+    pd.testing.assert_frame_equal(relido.df_reservas, gerenciador.df_reservas, check_dtype=False,
+                                  check_categorical=False)
+    manifesto = _particionado(pasta, planilhas)._ler_manifesto()
+    assert sum(info['linhas'] for info in manifesto.values()) == len(original) + 1
+    assert {(info['condominio'], info['ano']) for info in manifesto.values()} >= {('Condomínio Novo', 2031),
+                                                                                  ('Condomínio Novo', 2032)}
+
+    # Escopo restrito: só as partições pedidas são lidas, e gravar nelas não apaga as demais
+    escopo = _particionado(pasta, planilhas, condominios=['Condomínio Novo'], anos=[2032])
+    restrito = GerenciamentoReservas(*planilhas, armazenamento=escopo, eventos=False)
+    assert restrito.df_reservas.index.tolist() == [movida]
+    restrito.atualizar_reservas([movida], {'Pago': 12.5})
+    final = GerenciamentoReservas(*planilhas, armazenamento=_particionado(pasta, planilhas), eventos=False)
+    assert len(final.df_reservas) == len(original) + 1
+    assert final.df_reservas.at[movida, 'Pago'] == 12.5
+    assert final.df_reservas.at[nova, 'Nome do hóspede'] == 'Nova'
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from concorrencia import ConflitoVersaoError
+from disponibilidade import ConflitoReservaError
+from gerenciamento_reservas import GerenciamentoReservas
+
+
+def test_filtros_e_valores_por_funcao(gerenciador, planilhas):
+    df = gerenciador.df_reservas
+    antes = df.copy()
+    tipos = df.dtypes.copy()
+    escolhidas = df.index[(df['Status'] == 'A Pagar') & (df['Nome do Condomínio'] == 'Condomínio 3')]
+
+    alteradas = gerenciador.atualizar_reservas({'Status': 'A Pagar', 'Nome do Condomínio': 'Condomínio 3'}, {
+        'Valor da hospedagem': lambda valores: valores * 1.1,
+        'Status': 'Em análise',
+    })
+    assert alteradas == len(escolhidas) > 0
+    df = gerenciador.df_reservas
+    esperado = (antes.loc[escolhidas, 'Valor da hospedagem'] * 1.1).round(2)
+    pd.testing.assert_series_equal(df.loc[escolhidas, 'Valor da hospedagem'], esperado)
+    assert (df.loc[escolhidas, 'Status'] == 'Em análise').all()
+    assert (df.loc[escolhidas, 'Versão'] == antes.loc[escolhidas, 'Versão'] + 1).all()
+    intactas = df.index.difference(escolhidas)
+    pd.testing.assert_frame_equal(df.loc[intactas], antes.loc[intactas], check_categorical=False)
+    # A categoria nova é incluída sem trocar o tipo das colunas
+    assert (df.dtypes.astype(str) == tipos.astype(str)).all()
+
+    # Os demais formatos de filtro escolhem as mesmas linhas
+    for filtro in (list(escolhidas), df['Status'] == 'Em análise', lambda tabela: tabela['Status'] == 'Em análise'):
+        assert gerenciador.atualizar_reservas(filtro, {'Pago': 10.0}) == len(escolhidas)
+    assert (gerenciador.df_reservas.loc[escolhidas, 'Versão'] == antes.loc[escolhidas, 'Versão'] + 4).all()
+
+    # Gravado uma vez só, e o que foi gravado é o que está em memória
+    relido = GerenciamentoReservas(*planilhas, eventos=False).df_reservas
+    pd.testing.assert_frame_equal(relido, gerenciador.df_reservas, check_dtype=False, check_categorical=False)
+
+
+def test_conflito_em_massa_nao_grava_nada(gerenciador):
+    df = gerenciador.df_reservas
+    antes = df.copy()
+    ids = list(df.index[:3])
+    # As três iriam para o mesmo apartamento nas mesmas datas
+    with pytest.raises(ConflitoReservaError) as erro:
+        gerenciador.atualizar_reservas(ids, {'Data de entrada': pd.Timestamp('2045-01-10'),
+                                             'Data de saída': pd.Timestamp('2045-01-12'),
+                                             'Número do apartamento': 1234, 'Nome do Condomínio': 'Condomínio 1',
+                                             'Bloco': 'A'})
+    assert set(erro.value.conflitos) <= set(ids) and len(erro.value.conflitos) == 2
+    pd.testing.assert_frame_equal(gerenciador.df_reservas, antes)
+
+
+def test_edicao_aberta_antes_da_atualizacao_em_massa(gerenciador):
+    id_ = gerenciador.df_reservas.index[0]
+    base = gerenciador.df_reservas.loc[id_].to_dict()
+    gerenciador.atualizar_reservas([id_], {'Pago': 77.0})
+
+    def editar(**mudancas):
+        campos = {'nome': base['Nome do hóspede'], 'data_entrada': base['Data de entrada'],
+                  'data_saida': base['Data de saída'], 'numero_apartamento': base['Número do apartamento'],
+                  'valor_hospedagem': base['Valor da hospedagem'], 'condominio': base['Nome do Condomínio'],
+                  'bloco': base['Bloco'], 'endereco': base['Endereço'], 'status': base['Status'],
+                  'pago': base['Pago'], 'a_pagar': base['A pagar'], **mudancas}
+        gerenciador.atualizar_reserva(id_, **campos, versao_esperada=base['Versão'], base=base)
+
+    # O mesmo campo mudou dos dois lados: a edição é recusada
+    with pytest.raises(ConflitoVersaoError):
+        editar(pago=5.0)
+    assert gerenciador.df_reservas.at[id_, 'Pago'] == 77.0
+    # Campos diferentes: as duas alterações ficam
+    editar(nome='Nome corrigido')
+    assert gerenciador.df_reservas.at[id_, 'Nome do hóspede'] == 'Nome corrigido'
+    assert gerenciador.df_reservas.at[id_, 'Pago'] == 77.0
+    assert gerenciador.df_reservas.at[id_, 'Versão'] == base['Versão'] + 2
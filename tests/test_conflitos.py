@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from concorrencia import ConflitoVersaoError
+from disponibilidade import ConflitoReservaError
+
+
+def _reservar(gerenciador, nome, entrada, saida, numero=701, bloco='A', **kwargs):
+    gerenciador.adicionar_reserva(nome, entrada, saida, numero, 100.0, 'Condomínio Teste', bloco, 'Rua 1', 'Paga',
+                                  **kwargs)
+    return gerenciador.df_reservas.index[-1]
+
+
+def test_sobreposicao_no_mesmo_apartamento_e_recusada(gerenciador):
+    primeira = _reservar(gerenciador, 'Primeira', '2040-03-10', '2040-03-15')
+    with pytest.raises(ConflitoReservaError) as erro:
+        _reservar(gerenciador, 'Segunda', '2040-03-14', '2040-03-16')
+    assert erro.value.conflitos == [primeira]
+    # Grafia diferente do mesmo apartamento continua sendo o mesmo apartamento
+    with pytest.raises(ConflitoReservaError):
+        _reservar(gerenciador, 'Terceira', '2040-03-12', '2040-03-13', bloco=' a ')
+
+
+def test_saida_no_dia_da_entrada_e_outro_apartamento_nao_conflitam(gerenciador):
+    _reservar(gerenciador, 'Primeira', '2040-03-10', '2040-03-15')
+    _reservar(gerenciador, 'Seguinte', '2040-03-15', '2040-03-18')
+    _reservar(gerenciador, 'Vizinha', '2040-03-10', '2040-03-15', numero=702)
+    livres = gerenciador.disponibilidade('2040-03-11', '2040-03-12')
+    assert 701 not in livres['Número do apartamento'].tolist()
+
+
+def test_conflito_com_ocorrencia_recorrente(gerenciador):
+    _reservar(gerenciador, 'Contrato', '2040-04-01', '2040-04-03', recorrencia='semanal;vezes=4')
+    with pytest.raises(ConflitoReservaError):
+        _reservar(gerenciador, 'Avulsa', '2040-04-16', '2040-04-17')
+    _reservar(gerenciador, 'Entre ocorrências', '2040-04-10', '2040-04-15')
+
+
+def test_regra_que_se_sobrepoe_a_si_mesma_e_recusada(gerenciador):
+    gerenciador.politica_conflitos = 'ignorar'
+    with pytest.raises(ValueError, match='se sobreporiam'):
+        _reservar(gerenciador, 'Diária', '2030-01-01', '2030-01-04', numero=901, recorrencia='diaria;vezes=5')
+    id_ = _reservar(gerenciador, 'Semanal', '2030-01-01', '2030-01-04', numero=901, recorrencia='semanal;vezes=5')
+    with pytest.raises(ValueError, match='se sobreporiam'):
+        gerenciador.atualizar_reserva(id_, 'Semanal', '2030-01-01', '2030-01-10', 901, 100.0, 'Condomínio Teste',
+                                      'A', 'Rua 1', 'Paga', 0.0, 0.0)
+
+
+def test_edicao_sobre_versao_antiga_e_recusada(gerenciador):
+    id_ = _reservar(gerenciador, 'Original', '2040-05-01', '2040-05-03')
+    versao = gerenciador.df_reservas.at[id_, 'Versão']
+    gerenciador.atualizar_reservas([id_], {'Pago': 50.0})
+    with pytest.raises(ConflitoVersaoError):
+        gerenciador.atualizar_reserva(id_, 'Outra pessoa', '2040-05-01', '2040-05-03', 701, 100.0, 'Condomínio Teste',
+                                      'A', 'Rua 1', 'Paga', 0.0, 0.0, versao_esperada=versao)
+    assert gerenciador.df_reservas.at[id_, 'Nome do hóspede'] == 'Original'
+
+
+def test_importacao_e_alteracao_em_massa_conferem_ocorrencias(gerenciador, tmp_path):
+    _reservar(gerenciador, 'Contrato', '2040-06-01', '2040-06-03', recorrencia='semanal;vezes=4')
+    avulsa = _reservar(gerenciador, 'Avulsa', '2040-07-01', '2040-07-03')
+    arquivo = tmp_path / 'novas.csv'
+    pd.DataFrame({
+        'Nome do hóspede': ['Na ocorrência', 'Entre ocorrências', 'Recorrente nova'],
+        'Data de entrada': ['2040-06-15', '2040-06-10', '2040-06-24'],
+        'Data de saída': ['2040-06-16', '2040-06-12', '2040-06-25'],
+        'Número do apartamento': [701, 701, 701],
+        'Nome do Condomínio': ['Condomínio Teste'] * 3,
+        'Bloco': ['A'] * 3,
+        # A segunda ocorrência (2040-07-01) cai sobre a reserva avulsa
+        'Recorrência': [None, None, 'semanal;vezes=2'],
+    }).to_csv(arquivo, index=False)
+    relatorio = gerenciador.importar_reservas(str(arquivo))
+    assert relatorio['Situação'].tolist() == ['rejeitada', 'importada', 'rejeitada']
+
+    with pytest.raises(ConflitoReservaError):
+        gerenciador.atualizar_reservas([avulsa], {'Data de entrada': pd.Timestamp('2040-06-21'),
+                                                  'Data de saída': pd.Timestamp('2040-06-23')})
+    # Diária em uma estadia de duas noites: as ocorrências da própria regra se sobrepõem
+    with pytest.raises(ConflitoReservaError):
+        gerenciador.atualizar_reservas([avulsa], {'Recorrência': 'diaria;vezes=3'})
+    assert gerenciador.df_reservas.at[avulsa, 'Data de entrada'] == pd.Timestamp('2040-07-01')
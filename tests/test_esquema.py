@@ -0,0 +1,38 @@
+import pandas as pd
+
+from esquema import aplicar_esquema, concatenar
+
+
+def test_valores_que_nao_se_encaixam_ficam_como_vieram():
+    df = pd.DataFrame({
+        'Número do apartamento': [101, '101A', None],
+        'Data de entrada': ['2024-01-01', 'amanhã', None],
+        'Valor da hospedagem': ['10.5', '20', None],
+    })
+    tipado = aplicar_esquema(df, 'reservas')
+    assert tipado['Número do apartamento'].tolist()[:2] == [101, '101A']
+    assert tipado['Data de entrada'].tolist()[:2] == ['2024-01-01', 'amanhã']
+    assert tipado['Valor da hospedagem'].tolist()[:2] == [10.5, 20.0]
+
+
+def test_coagir_transforma_valores_invalidos_em_ausentes():
+    df = pd.DataFrame({'Número do apartamento': ['101', '101A'], 'Data de entrada': ['2024-01-01', 'amanhã']})
+    tipado = aplicar_esquema(df, 'reservas', coagir=True)
+    assert tipado['Número do apartamento'].dtype == 'Int64'
+    assert tipado['Número do apartamento'].isna().tolist() == [False, True]
+    assert tipado['Data de entrada'].isna().tolist() == [False, True]
+
+
+def test_inteiro_com_casas_decimais_nao_e_arredondado():
+    tipado = aplicar_esquema(pd.DataFrame({'Quantidade de pessoas': [2.0, 2.5, None]}), 'reservas')
+    assert tipado['Quantidade de pessoas'].tolist()[:2] == [2.0, 2.5]
+
+
+def test_categoria_so_quando_economiza_memoria():
+    poucas = aplicar_esquema(pd.DataFrame({'Nome do Condomínio': ['A', 'B']}), 'reservas')
+    muitas = aplicar_esquema(pd.DataFrame({'Nome do Condomínio': ['Condomínio Azul'] * 1000}), 'reservas')
+    assert isinstance(poucas['Nome do Condomínio'].dtype, pd.StringDtype)
+    assert isinstance(muitas['Nome do Condomínio'].dtype, pd.CategoricalDtype)
+    juntas = concatenar(muitas, pd.DataFrame({'Nome do Condomínio': ['Condomínio Novo']}), 'reservas')
+    assert isinstance(juntas['Nome do Condomínio'].dtype, pd.CategoricalDtype)
+    assert juntas['Nome do Condomínio'].iloc[-1] == 'Condomínio Novo'
@@ -0,0 +1,54 @@
+from conftest import armazenamento_excel
+from eventos import LogEventos
+from gerenciamento_reservas import GerenciamentoReservas
+
+
+class ArmazenamentoQueFalha:
+    """Armazenamento Excel cujas gravações de linhas sempre falham."""
+
+    def __init__(self, interno):
+        self.interno = interno
+
+    def __getattr__(self, nome):
+        return getattr(self.interno, nome)
+
+    def inserir(self, tabela, df, indices):
+        raise OSError('disco cheio')
+
+    def atualizar(self, tabela, df, indices):
+        raise OSError('disco cheio')
+
+
+def test_historico_acompanha_o_log_entre_segmentos(tmp_path):
+    # Segmentos minúsculos: quase todo evento abre um segmento novo
+    eventos = LogEventos(str(tmp_path / 'eventos'), tamanho_segmento=200)
+    eventos.registrar([{'tabela': 'reservas', 'id': id_, 'operacao': 'inserir', 'versao': 0,
+                        'alteracoes': {'Nome do hóspede': [None, f'Hóspede {id_}']}} for id_ in range(5)])
+    assert [e['seq'] for e in eventos.historico('reservas', 3)] == [4]
+
+    # Gravado por "outro processo": o índice só lê o que foi acrescentado
+    outro = LogEventos(str(tmp_path / 'eventos'), tamanho_segmento=200)
+    outro.registrar([{'tabela': 'reservas', 'id': 3, 'operacao': 'atualizar', 'versao': 1,
+                      'alteracoes': {'Pago': [0.0, 1.0]}}])
+    historico = eventos.historico('reservas', 3)
+    assert [e['seq'] for e in historico] == [4, 6]
+    assert historico == list(eventos.ler_desde(0, 'reservas', 3))
+    assert len(eventos.segmentos()) > 1
+    assert eventos.historico('parceiros', 3) == []
+
+
+def test_eventos_so_depois_de_gravar(tmp_path, planilhas):
+    eventos = LogEventos(str(tmp_path / 'eventos'))
+    gerenciador = GerenciamentoReservas(*planilhas, eventos=eventos,
+                                        armazenamento=ArmazenamentoQueFalha(armazenamento_excel(planilhas)))
+    id_ = gerenciador.df_reservas.index[0]
+    gerenciador.atualizar_reservas([id_], {'Pago': 1.0})
+    gerenciador.adicionar_reserva('Sem gravação', '2031-03-01', '2031-03-03', 903, 200.0,
+                                  'Condomínio X', 'C', 'Rua 3', 'Pendente')
+    assert list(eventos.ler_desde(0)) == []
+
+    gerenciador.armazenamento = armazenamento_excel(planilhas)
+    gerenciador.atualizar_reservas([id_], {'Pago': 2.0})
+    historico = gerenciador.historico('reservas', id_)
+    assert historico['Campo'].tolist() == ['Pago']
+    assert historico['Depois'].tolist() == [2.0]
@@ -0,0 +1,24 @@
+import io
+
+import pandas as pd
+
+
+def _ler_csv(pedacos):
+    resumo, detalhe = b''.join(pedacos).decode('utf-8').split('\n\n', 1)
+    resumo = pd.read_csv(io.StringIO(resumo)).set_index('Descrição')['Valores']
+    return resumo, pd.read_csv(io.StringIO(detalhe))
+
+
+def test_detalhe_do_periodo_inclui_ocorrencias_recorrentes(gerenciador):
+    gerenciador.adicionar_reserva('Avulsa', '2040-01-02', '2040-01-04', 801, 100.0, 'Condomínio X', 'A', 'Rua 1', 'Paga')
+    gerenciador.adicionar_reserva('Recorrente', '2040-01-05', '2040-01-06', 802, 50.0, 'Condomínio X', 'A', 'Rua 1',
+                                  'Paga', recorrencia='semanal;vezes=4')
+    fracoes = []
+
+    resumo, detalhe = _ler_csv(gerenciador.exportar_reservas('csv', pd.Timestamp('2040-01-01'),
+                                                             pd.Timestamp('2040-01-31'), tamanho_lote=2,
+                                                             progresso=fracoes.append))
+
+    assert sorted(detalhe['Nome do hóspede']) == ['Avulsa'] + ['Recorrente'] * 4
+    assert detalhe['Valor da hospedagem'].sum() == float(resumo['Total Hospedagem']) == 300.0
+    assert fracoes == sorted(fracoes) and fracoes[-1] == 1.0
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import armazenamento_excel
+from esquema import aplicar_esquema
+from indice_busca import CAMPOS_BUSCA, IndiceBuscaReservas
+
+EXTRAS = ['José Álvares', 'jose alvares', 'JOSÉ DA SILVA', 'Ana Bia', 'Ana (Bia)', 'a.b Souza', 'Joã']
+
+
+def _antigo(df, nome=None, numero_apartamento=None, entrada_de=None, entrada_ate=None, termo=None):
+    """Os filtros como eram antes do índice: máscaras sobre a tabela inteira."""
+    mascara = pd.Series(True, index=df.index)
+    if nome:
+        mascara &= df['Nome do hóspede'].str.contains(nome, case=False).fillna(False).astype(bool)
+    if numero_apartamento is not None:
+        mascara &= (df['Número do apartamento'] == numero_apartamento).fillna(False).astype(bool)
+    if entrada_de is not None:
+        mascara &= (df['Data de entrada'] >= pd.Timestamp(entrada_de)).fillna(False).astype(bool)
+    if entrada_ate is not None:
+        mascara &= (df['Data de entrada'] <= pd.Timestamp(entrada_ate)).fillna(False).astype(bool)
+    if termo:
+        algum = pd.Series(False, index=df.index)
+        for campo in CAMPOS_BUSCA:
+            algum |= df[campo].str.contains(termo, case=False).fillna(False).astype(bool)
+        mascara &= algum
+    return df.index[mascara.to_numpy()].to_numpy(np.int64)
+
+
+@pytest.fixture
+def reservas(planilhas):
+    df = aplicar_esquema(armazenamento_excel(planilhas).carregar('reservas'), 'reservas')
+    extras = df.iloc[:len(EXTRAS)].copy()
+    extras['Nome do hóspede'] = EXTRAS
+    return pd.concat([df, extras], ignore_index=True)
+
+
+@pytest.mark.filterwarnings('ignore:This pattern is interpreted as a regular expression')
+@pytest.mark.parametrize('filtros', [
+    # Acentos e maiúsculas: a comparação continua sendo a do str.contains (com acento)
+    {'nome': 'José'}, {'nome': 'jose'}, {'nome': 'JOSÉ'}, {'nome': 'álv'},
+    # Metacaracteres: o termo é uma expressão regular, como antes
+    {'nome': 'Ana (Bia)'}, {'nome': 'a.b'}, {'nome': '^jo'}, {'nome': 'silva$'}, {'termo': '[0-9]{3}'},
+    # Termos com menos de três caracteres não têm trigramas
+    {'nome': 'Jo'}, {'nome': 'ã'}, {'termo': '@'},
+    {'termo': 'gmail'}, {'termo': 'José', 'entrada_de': '2023-01-01', 'entrada_ate': '2024-12-31'},
+])
+def test_filtrar_igual_aos_filtros_antigos(reservas, filtros):
+    numero = reservas['Número do apartamento'].iloc[0]
+    for extras in ({}, {'numero_apartamento': numero}):
+        esperado = _antigo(reservas, **filtros, **extras)
+        obtido = IndiceBuscaReservas.construir(reservas).filtrar(reservas, **filtros, **extras)
+        np.testing.assert_array_equal(obtido, esperado)
+
+
+def test_adicionar_e_remover_depois_de_construir(reservas):
+    indice = IndiceBuscaReservas.construir(reservas)
+    numero = reservas['Número do apartamento'].iloc[0]
+    alterado, removido = reservas.index[1], reservas.index[2]
+    reservas.loc[alterado, ['Nome do hóspede', 'Número do apartamento']] = ['Josué Nogueira', numero]
+    reservas.loc[alterado, 'Data de entrada'] = pd.Timestamp('2035-06-01')
+    novo = reservas.index.max() + 1
+    reservas.loc[novo] = reservas.loc[alterado]
+    reservas.loc[novo, 'Nome do hóspede'] = 'José Álvares Júnior'
+    reservas = reservas.drop(index=removido)
+    for id_ in (alterado, novo):
+        indice.adicionar(id_, reservas.loc[id_])
+    indice.remover(removido)
+
+    for filtros in ({'nome': 'José'}, {'nome': 'josu'}, {'nome': 'Jo'}, {'nome': 'a.v'},
+                    {'numero_apartamento': numero}, {'entrada_de': '2035-01-01'},
+                    {'termo': 'Júnior', 'numero_apartamento': numero}):
+        np.testing.assert_array_equal(indice.filtrar(reservas, **filtros), _antigo(reservas, **filtros))
+    assert removido not in indice.filtrar(reservas, entrada_de='1900-01-01')
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from indice_intervalos import IndiceIntervalos
+
+
+def _intervalos(rng, ids):
+    inicios = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24, len(ids)), unit='h')
+    # Estadias de um dia só, comuns e algumas bem longas (aumentam a duracao_maxima)
+    duracoes = np.where(rng.random(len(ids)) < 0.05, rng.integers(60, 200, len(ids)), rng.integers(0, 15, len(ids)))
+    return dict(zip(ids, zip(inicios, inicios + pd.to_timedelta(duracoes, unit='D'))))
+
+
+def _varredura(intervalos, inicio, fim):
+    a, b = pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize()
+    return sorted(id_ for id_, (entrada, saida) in intervalos.items()
+                  if entrada.normalize() <= b and max(saida, entrada).normalize() >= a)
+
+
+def _janelas(rng, quantidade, primeiro='2023-12-01', dias=420):
+    inicios = pd.Timestamp(primeiro) + pd.to_timedelta(rng.integers(0, dias, quantidade), unit='D')
+    return [(inicio, inicio + pd.Timedelta(days=int(dias))) for inicio, dias in zip(inicios, rng.integers(0, 45, quantidade))]
+
+
+def test_sobrepostos_igual_a_varredura_com_inclusoes_e_remocoes():
+    rng = np.random.default_rng(4)
+    intervalos = _intervalos(rng, range(400))
+    indice = IndiceIntervalos.construir(list(intervalos), [e for e, _ in intervalos.values()],
+                                        [s for _, s in intervalos.values()])
+    for inicio, fim in _janelas(rng, 40):
+        assert indice.sobrepostos(inicio, fim).tolist() == _varredura(intervalos, inicio, fim)
+
+    # Depois de construído: remove uns, muda as datas de outros e inclui ids novos
+    for id_ in rng.choice(400, 80, replace=False).tolist():
+        indice.remover(id_)
+        del intervalos[id_]
+    alterados = _intervalos(rng, rng.choice(list(intervalos), 50, replace=False).tolist() + list(range(400, 450)))
+    for id_, (entrada, saida) in alterados.items():
+        indice.adicionar(id_, entrada, saida)
+    intervalos.update(alterados)
+    assert len(indice) == len(intervalos)
+    for inicio, fim in _janelas(rng, 40):
+        assert indice.sobrepostos(inicio, fim).tolist() == _varredura(intervalos, inicio, fim)
+
+
+def test_datas_invalidas_ficam_fora_do_indice():
+    indice = IndiceIntervalos.construir([1, 2], ['2024-01-01', None], ['2024-01-03', '2024-01-05'])
+    indice.adicionar(3, 'não é data', '2024-01-02')
+    assert len(indice) == 1
+    assert indice.sobrepostos('2024-01-03', '2024-01-10').tolist() == [1]
+    assert indice.sobrepostos('2024-01-04', '2024-01-10').tolist() == []
+
+
+def test_calcular_totais_devolve_as_reservas_do_periodo(gerenciador):
+    df = gerenciador.df_reservas
+    vistas = 0
+    for inicio, fim in _janelas(np.random.default_rng(5), 20, '2022-01-01', 6 * 365):
+        periodo = gerenciador.calcular_totais(inicio, fim)[0]
+        esperado = _varredura(dict(zip(df.index, zip(df['Data de entrada'], df['Data de saída']))), inicio, fim)
+        assert sorted(periodo.index) == esperado
+        vistas += len(esperado)
+    assert vistas
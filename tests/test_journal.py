@@ -0,0 +1,44 @@
+import shutil
+
+from armazenamento import ArmazenamentoJournal
+from conftest import armazenamento_excel
+from gerenciamento_reservas import GerenciamentoReservas
+
+
+def _journal(planilhas, caminho):
+    # Sem flush automático durante o teste: só o explícito ou o de fechar()
+    return ArmazenamentoJournal(armazenamento_excel(planilhas), str(caminho), intervalo=3600, max_entradas=10**6)
+
+
+def test_entradas_pendentes_sao_reaplicadas_ao_carregar(tmp_path, planilhas):
+    journal = _journal(planilhas, tmp_path / 'reservas.journal')
+    gerenciador = GerenciamentoReservas(*planilhas, armazenamento=journal, eventos=False)
+    id_ = gerenciador.df_reservas.index[3]
+    gerenciador.atualizar_reservas([id_], {'Nome do hóspede': 'Alterada pelo journal'})
+    gerenciador.adicionar_reserva('Hóspede do journal', '2031-02-01', '2031-02-04', 902, 300.0,
+                                  'Condomínio X', 'B', 'Rua 2', 'Pendente')
+    novo = gerenciador.df_reservas.index[-1]
+
+    # Queda antes do flush: a planilha ainda não tem nada, só o journal
+    shutil.copy(tmp_path / 'reservas.journal', tmp_path / 'copia.journal')
+    assert armazenamento_excel(planilhas).carregar('reservas').at[id_, 'Nome do hóspede'] != 'Alterada pelo journal'
+    reaberto = _journal(planilhas, tmp_path / 'copia.journal')
+    try:
+        df = reaberto.carregar('reservas')
+    finally:
+        reaberto.fechar()
+        journal.fechar()
+    assert df.at[id_, 'Nome do hóspede'] == 'Alterada pelo journal'
+    assert df.at[novo, 'Nome do hóspede'] == 'Hóspede do journal'
+
+
+def test_flush_grava_a_tabela_como_estava_na_gravacao(tmp_path, planilhas):
+    journal = _journal(planilhas, tmp_path / 'reservas.journal')
+    gerenciador = GerenciamentoReservas(*planilhas, armazenamento=journal, eventos=False)
+    id_ = gerenciador.df_reservas.index[0]
+    gerenciador.atualizar_reservas([id_], {'Pago': 1.0})
+    # Alteração em andamento no DataFrame do gerenciador, ainda não entregue ao armazenamento
+    gerenciador.df_reservas.at[id_, 'Pago'] = 999.0
+    journal.flush()
+    journal.fechar()
+    assert armazenamento_excel(planilhas).carregar('reservas').at[id_, 'Pago'] == 1.0
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from armazenamento import ArmazenamentoParticionado, particionar_reservas
+from gerenciamento_reservas import TABELAS, GerenciamentoReservas
+from recorrencia import Recorrencia, ler_excecoes
+
+
+def _datas(entradas):
+    return [str(data) for data in entradas.astype('datetime64[D]')]
+
+
+def test_semanal_mantem_duracao_e_horario():
+    numeros, entradas, saidas = Recorrencia('semanal', vezes=3).ocorrencias('2024-01-05 14:00', '2024-01-07 11:00')
+    assert numeros.tolist() == [0, 1, 2]
+    assert _datas(entradas) == ['2024-01-05', '2024-01-12', '2024-01-19']
+    assert all(pd.Timestamp(e).hour == 14 for e in entradas)
+    assert ((saidas - entradas) == np.timedelta64(pd.Timedelta(hours=45).value, 'ns')).all()
+
+
+def test_mensal_cai_no_ultimo_dia_dos_meses_curtos():
+    _, entradas, _ = Recorrencia('mensal', ate='2024-05-31').ocorrencias('2024-01-31', '2024-02-01')
+    assert _datas(entradas) == ['2024-01-31', '2024-02-29', '2024-03-31', '2024-04-30', '2024-05-31']
+
+
+def test_janela_calcula_so_as_ocorrencias_do_periodo():
+    regra = Recorrencia('diaria', intervalo=3, vezes=100)
+    # Estadia de 3 noites: a ocorrência que entra em 2024-01-07 ainda ocupa 2024-01-09
+    numeros, entradas, _ = regra.ocorrencias('2024-01-01', '2024-01-04', '2024-01-09', '2024-01-12')
+    assert numeros.tolist() == [2, 3]
+    assert _datas(entradas) == ['2024-01-07', '2024-01-10']
+
+
+def test_regra_com_passo_menor_que_a_estadia_se_sobrepoe():
+    assert Recorrencia('diaria', vezes=5).sobrepoe('2030-01-01', '2030-01-04')
+    assert not Recorrencia('diaria', intervalo=3, vezes=5).sobrepoe('2030-01-01', '2030-01-04')
+    # Mensal a partir do dia 31: de janeiro para fevereiro são só 29 dias
+    assert Recorrencia('mensal', vezes=3).sobrepoe('2024-01-31', '2024-03-01')
+    assert not Recorrencia('mensal', vezes=3).sobrepoe('2024-01-31', '2024-02-29')
+    assert not Recorrencia('semanal', vezes=1).sobrepoe('2030-01-01', '2030-01-20')
+
+
+def test_excecoes_e_texto_da_regra():
+    regra = Recorrencia.de_texto('semanal;intervalo=2;ate=2024-03-01')
+    assert Recorrencia.de_texto(regra.texto()).texto() == 'semanal;intervalo=2;ate=2024-03-01'
+    _, entradas, _ = regra.ocorrencias('2024-01-01', '2024-01-02', excecoes=ler_excecoes('2024-01-15, 2024-02-12'))
+    assert _datas(entradas) == ['2024-01-01', '2024-01-29', '2024-02-26']
+
+
+def test_regra_precisa_terminar():
+    with pytest.raises(ValueError):
+        Recorrencia('semanal')
+    with pytest.raises(ValueError):
+        Recorrencia.de_texto('anual;vezes=2')
+
+
+def _contrato(gerenciador, entrada, saida, regra, **kwargs):
+    gerenciador.adicionar_reserva('Contrato', entrada, saida, 901, 100.0, 'Condomínio Teste', 'A', 'Rua 1', 'Paga',
+                                  recorrencia=regra, **kwargs)
+    return gerenciador.df_reservas.index[-1]
+
+
+def test_agregado_e_livro_contam_cada_ocorrencia(gerenciador):
+    gerenciador.adicionar_proprietario('Dona', 'dona@exemplo.com', '0000-0000', '000', repasse=10.0)
+    dona = gerenciador.df_proprietarios.index[-1]
+    _contrato(gerenciador, '2041-03-01', '2041-03-03', 'semanal;vezes=4', id_proprietario=dona, excecoes='2041-03-15')
+
+    # Atualizado incrementalmente e remontado do zero, o resultado é o mesmo
+    for _ in range(2):
+        periodo, *totais = gerenciador.calcular_totais('2041-03-01', '2041-03-31')
+        assert len(periodo) == 3
+        assert totais == [300.0, 0.0, 0.0, 1]
+        relatorio = gerenciador.relatorio_periodico('2041-03-01', '2041-03-31')
+        assert relatorio[['Diárias ocupadas', 'Reservas', 'Valor da hospedagem']].iloc[0].tolist() == [6, 3, 300.0]
+        assert len(gerenciador.ocupacao_por_apartamento('2041-03-01', '2041-03-31')) == 6
+        assert gerenciador._obter_livro_acertos().total('proprietario', dona) == (30.0, 0.0)
+        gerenciador._invalidar_derivados_reservas()
+
+
+def test_resumo_particionado_conta_ocorrencias_de_anos_anteriores(tmp_path, planilhas):
+    pasta = str(tmp_path / 'particoes')
+    particionar_reservas(planilhas[0], pasta, por_ano=True)
+    armazenamento = ArmazenamentoParticionado(pasta, dict(zip(TABELAS, planilhas)), por_ano=True)
+    gerenciador = GerenciamentoReservas(*planilhas, armazenamento=armazenamento, eventos=False)
+    # Fica na partição de 2040, mas tem ocorrências até maio de 2041
+    _contrato(gerenciador, '2040-12-10', '2040-12-12', 'mensal;vezes=6')
+
+    resumo = gerenciador.resumo_por_condominio('2041-03-01', '2041-04-30').set_index('Nome do Condomínio')
+    assert resumo.loc['Condomínio Teste', 'Reservas'] == 2